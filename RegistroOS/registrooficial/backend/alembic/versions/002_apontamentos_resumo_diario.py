@@ -0,0 +1,79 @@
+"""Resumo diário de apontamentos (rollup dos dashboards)
+
+Revision ID: 002
+Revises: 001
+Create Date: 2025-10-06 09:00:00.000000
+
+Cria a tabela apontamentos_resumo_diario, mantida incrementalmente pelos
+endpoints de apontamento (app/utils/resumo_diario.py), e popula com os
+dados existentes usando SQL próprio (a migração não importa a aplicação).
+
+Tabelas criadas:
+- apontamentos_resumo_diario: horas/quantidades por (data, setor, usuário, OS)
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Aplicar mudanças do schema (upgrade)"""
+
+    op.create_table(
+        'apontamentos_resumo_diario',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('data', sa.Date(), nullable=False),
+        sa.Column('id_setor', sa.Integer(), sa.ForeignKey('tipo_setores.id'), nullable=False),
+        sa.Column('id_usuario', sa.Integer(), sa.ForeignKey('tipo_usuarios.id'), nullable=False),
+        sa.Column('id_os', sa.Integer(), sa.ForeignKey('ordens_servico.id'), nullable=False),
+        sa.Column('horas_trabalhadas', sa.Float(), server_default='0'),
+        sa.Column('total_apontamentos', sa.Integer(), server_default='0'),
+        sa.Column('total_retrabalhos', sa.Integer(), server_default='0'),
+        sa.Column('total_aprovados', sa.Integer(), server_default='0'),
+        sa.Column('total_em_andamento', sa.Integer(), server_default='0'),
+        sa.Column('data_ultima_atualizacao', sa.DateTime()),
+        sa.UniqueConstraint('data', 'id_setor', 'id_usuario', 'id_os', name='uq_resumo_diario_chave')
+    )
+
+    # Backfill inicial a partir dos apontamentos existentes (SQL próprio da
+    # migração: o esquema e as regras da aplicação podem mudar depois dela)
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        dia = "date(data_hora_inicio)"
+        horas = "(julianday(data_hora_fim) - julianday(data_hora_inicio)) * 24.0"
+    else:
+        dia = "CAST(data_hora_inicio AS DATE)"
+        horas = "EXTRACT(EPOCH FROM (data_hora_fim - data_hora_inicio)) / 3600.0"
+
+    resultado = bind.execute(sa.text(f"""
+        INSERT INTO apontamentos_resumo_diario (
+            data, id_setor, id_usuario, id_os,
+            horas_trabalhadas, total_apontamentos, total_retrabalhos,
+            total_aprovados, total_em_andamento, data_ultima_atualizacao
+        )
+        SELECT
+            {dia}, id_setor, id_usuario, id_os,
+            COALESCE(SUM({horas}), 0),
+            COUNT(id),
+            SUM(CASE WHEN foi_retrabalho = :verdadeiro THEN 1 ELSE 0 END),
+            SUM(CASE WHEN aprovado_supervisor = :verdadeiro THEN 1 ELSE 0 END),
+            SUM(CASE WHEN data_hora_fim IS NULL THEN 1 ELSE 0 END),
+            CURRENT_TIMESTAMP
+        FROM apontamentos_detalhados
+        WHERE data_hora_inicio IS NOT NULL
+          AND id_setor IS NOT NULL AND id_usuario IS NOT NULL AND id_os IS NOT NULL
+        GROUP BY {dia}, id_setor, id_usuario, id_os
+    """).bindparams(verdadeiro=True))
+    print(f"Resumo diário populado com {resultado.rowcount or 0} linhas.")
+
+
+def downgrade() -> None:
+    """Reverter mudanças do schema (downgrade)"""
+
+    op.drop_table('apontamentos_resumo_diario')
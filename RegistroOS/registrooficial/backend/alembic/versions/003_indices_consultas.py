@@ -0,0 +1,56 @@
+"""Índices compostos para filtros e ordenações frequentes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-10-08 09:00:00.000000
+
+Cria os índices declarados em app/database_models.py para as colunas usadas
+nos filtros/ordenações das rotas (apontamentos por usuário/setor e data,
+pendências por status e data, programações por responsável/setor, etc.).
+
+Usa CREATE INDEX IF NOT EXISTS para conviver com bancos em que parte dos
+índices já foi criada manualmente.
+
+Verificação dos planos de consulta: scripts/verificar_planos_consulta.py
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+# (nome, tabela, colunas)
+INDICES = [
+    ('ix_ordens_servico_os_numero', 'ordens_servico', ['os_numero']),
+    ('ix_ordens_servico_data_criacao', 'ordens_servico', ['data_criacao']),
+    ('ix_apontamentos_usuario_inicio', 'apontamentos_detalhados', ['id_usuario', 'data_hora_inicio']),
+    ('ix_apontamentos_setor_inicio', 'apontamentos_detalhados', ['id_setor', 'data_hora_inicio']),
+    ('ix_apontamentos_os', 'apontamentos_detalhados', ['id_os']),
+    ('ix_pendencias_status_inicio', 'pendencias', ['status', 'data_inicio']),
+    ('ix_pendencias_data_inicio', 'pendencias', ['data_inicio']),
+    ('ix_pendencias_numero_os', 'pendencias', ['numero_os']),
+    ('ix_pendencias_apontamento_origem', 'pendencias', ['id_apontamento_origem']),
+    ('ix_programacoes_responsavel_status', 'programacoes', ['responsavel_id', 'status']),
+    ('ix_programacoes_setor_inicio', 'programacoes', ['id_setor', 'inicio_previsto']),
+    ('ix_resultados_teste_apontamento', 'resultados_teste', ['id_apontamento']),
+]
+
+
+def upgrade() -> None:
+    """Aplicar mudanças do schema (upgrade)"""
+
+    for nome, tabela, colunas in INDICES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({', '.join(colunas)})")
+
+    # Atualizar estatísticas para o planejador escolher os novos índices
+    op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    """Reverter mudanças do schema (downgrade)"""
+
+    for nome, _tabela, _colunas in reversed(INDICES):
+        op.execute(f"DROP INDEX IF EXISTS {nome}")
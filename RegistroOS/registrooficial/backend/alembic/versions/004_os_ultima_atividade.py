@@ -0,0 +1,55 @@
+"""Coluna ultima_atividade em ordens_servico (paginação por cursor)
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-10-09 09:00:00.000000
+
+Adiciona ordens_servico.ultima_atividade, mantida pelos eventos de
+app/utils/ultima_atividade.py, com índice composto (ultima_atividade, id)
+para a listagem de OS paginada por cursor, e popula com os apontamentos
+existentes. Após o backfill a coluna passa a NOT NULL.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Aplicar mudanças do schema (upgrade)"""
+
+    op.add_column('ordens_servico', sa.Column('ultima_atividade', sa.DateTime(), nullable=True))
+
+    # Backfill a partir dos apontamentos existentes (SQL próprio da migração,
+    # sem importar a aplicação): fim/início mais recente, senão data_criacao
+    op.get_bind().execute(sa.text("""
+        UPDATE ordens_servico SET ultima_atividade = COALESCE(
+            (SELECT MAX(COALESCE(a.data_hora_fim, a.data_hora_inicio))
+             FROM apontamentos_detalhados a WHERE a.id_os = ordens_servico.id),
+            data_criacao,
+            CURRENT_TIMESTAMP
+        )
+    """))
+
+    # NOT NULL depois do backfill: a paginação por (ultima_atividade, id) não
+    # enxerga linhas NULL. O default do servidor só cobre INSERTs que não
+    # informam a coluna (a aplicação grava no horário local)
+    with op.batch_alter_table('ordens_servico') as batch_op:
+        batch_op.alter_column(
+            'ultima_atividade', existing_type=sa.DateTime(), nullable=False,
+            server_default=sa.text('CURRENT_TIMESTAMP')
+        )
+    op.create_index('ix_ordens_servico_ultima_atividade', 'ordens_servico', ['ultima_atividade', 'id'])
+
+
+def downgrade() -> None:
+    """Reverter mudanças do schema (downgrade)"""
+
+    op.drop_index('ix_ordens_servico_ultima_atividade', table_name='ordens_servico')
+    with op.batch_alter_table('ordens_servico') as batch_op:
+        batch_op.drop_column('ultima_atividade')
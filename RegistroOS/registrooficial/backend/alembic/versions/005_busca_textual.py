@@ -0,0 +1,144 @@
+"""Índice de busca textual (FTS5 / tsvector) para OS, clientes e equipamentos
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-10-10 09:00:00.000000
+
+Cria a tabela busca_textual (FTS5 no SQLite, tsvector + GIN no PostgreSQL)
+com os triggers que a mantêm a partir de ordens_servico, clientes e
+equipamentos, e popula com os registros existentes.
+
+Consulta: GET /api/search (app/utils/busca_textual.py)
+
+O DDL é mantido aqui por extenso (cópia congelada do de
+app/utils/busca_textual.py): a migração não importa a aplicação.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+TABELA_BUSCA = "busca_textual"
+FATOR_ROWID = 4
+
+# tipo → (tabela de origem, código no rowid, colunas de título, colunas de detalhe)
+FONTES = {
+    "os": ("ordens_servico", 1, ["os_numero"], ["descricao_maquina"]),
+    "cliente": ("clientes", 2, ["razao_social"], ["nome_fantasia", "cnpj_cpf"]),
+    "equipamento": ("equipamentos", 3, ["descricao"], ["fabricante", "modelo", "numero_serie"]),
+}
+
+
+def _expressao(colunas, prefixo):
+    return " || ' ' || ".join(f"COALESCE({prefixo}{coluna}, '')" for coluna in colunas)
+
+
+def _ddl_sqlite():
+    comandos = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5(
+            titulo, detalhe, tipo UNINDEXED, ref_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'
+        )"""
+    ]
+    for tipo, (tabela, codigo, titulo, detalhe) in FONTES.items():
+        inserir = (
+            f"INSERT INTO {TABELA_BUSCA}(rowid, titulo, detalhe, tipo, ref_id) VALUES ("
+            f"new.id * {FATOR_ROWID} + {codigo}, {_expressao(titulo, 'new.')}, "
+            f"{_expressao(detalhe, 'new.')}, '{tipo}', new.id);"
+        )
+        remover = f"DELETE FROM {TABELA_BUSCA} WHERE rowid = old.id * {FATOR_ROWID} + {codigo};"
+        comandos += [
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_{tipo}_ai AFTER INSERT ON {tabela} BEGIN {inserir} END",
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_{tipo}_au AFTER UPDATE OF id, {', '.join(titulo + detalhe)} "
+            f"ON {tabela} BEGIN {remover} {inserir} END",
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_{tipo}_ad AFTER DELETE ON {tabela} BEGIN {remover} END",
+        ]
+    return comandos
+
+
+def _ddl_postgresql(sem_acentos):
+    comandos = [
+        f"""CREATE TABLE IF NOT EXISTS {TABELA_BUSCA} (
+            id BIGINT PRIMARY KEY, tipo VARCHAR(20) NOT NULL, ref_id INTEGER NOT NULL,
+            titulo TEXT, detalhe TEXT, documento TSVECTOR
+        )""",
+        f"CREATE INDEX IF NOT EXISTS ix_{TABELA_BUSCA}_documento ON {TABELA_BUSCA} USING GIN (documento)",
+    ]
+    for tipo, (tabela, codigo, titulo, detalhe) in FONTES.items():
+        novo_titulo, novo_detalhe = _expressao(titulo, "NEW."), _expressao(detalhe, "NEW.")
+        comandos += [
+            f"""CREATE OR REPLACE FUNCTION {TABELA_BUSCA}_{tipo}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM {TABELA_BUSCA} WHERE id = OLD.id * {FATOR_ROWID} + {codigo};
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {TABELA_BUSCA}(id, tipo, ref_id, titulo, detalhe, documento)
+                    VALUES (NEW.id * {FATOR_ROWID} + {codigo}, '{tipo}', NEW.id, {novo_titulo}, {novo_detalhe},
+                            to_tsvector('simple', {sem_acentos}({novo_titulo} || ' ' || {novo_detalhe})));
+                END IF;
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql""",
+            f"DROP TRIGGER IF EXISTS {TABELA_BUSCA}_{tipo} ON {tabela}",
+            f"""CREATE TRIGGER {TABELA_BUSCA}_{tipo} AFTER INSERT OR UPDATE OR DELETE ON {tabela}
+                FOR EACH ROW EXECUTE FUNCTION {TABELA_BUSCA}_{tipo}()""",
+        ]
+    return comandos
+
+
+def _backfill(tipo, tabela, codigo, titulo, detalhe, postgresql, sem_acentos):
+    titulo, detalhe = _expressao(titulo, ""), _expressao(detalhe, "")
+    chave = f"id * {FATOR_ROWID} + {codigo}"
+    if postgresql:
+        return (
+            f"INSERT INTO {TABELA_BUSCA}(id, tipo, ref_id, titulo, detalhe, documento) "
+            f"SELECT {chave}, '{tipo}', id, {titulo}, {detalhe}, "
+            f"to_tsvector('simple', {sem_acentos}({titulo} || ' ' || {detalhe})) FROM {tabela}"
+        )
+    return (
+        f"INSERT INTO {TABELA_BUSCA}(rowid, titulo, detalhe, tipo, ref_id) "
+        f"SELECT {chave}, {titulo}, {detalhe}, '{tipo}', id FROM {tabela}"
+    )
+
+
+def upgrade() -> None:
+    """Aplicar mudanças do schema (upgrade)"""
+
+    conexao = op.get_bind()
+    postgresql = conexao.dialect.name == "postgresql"
+    sem_acentos = ""
+    if postgresql:
+        # unaccent quando a extensão puder ser habilitada; senão busca sensível a acentos
+        try:
+            with conexao.begin_nested():
+                conexao.execute(sa.text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+            sem_acentos = "unaccent"
+        except Exception as e:
+            print(f"Extensão unaccent indisponível: {e}")
+
+    for comando in (_ddl_postgresql(sem_acentos) if postgresql else _ddl_sqlite()):
+        conexao.execute(sa.text(comando))
+
+    linhas = 0
+    for tipo, (tabela, codigo, titulo, detalhe) in FONTES.items():
+        linhas += conexao.execute(sa.text(_backfill(tipo, tabela, codigo, titulo, detalhe, postgresql, sem_acentos))).rowcount or 0
+    print(f"Índice de busca textual populado com {linhas} registros.")
+
+
+def downgrade() -> None:
+    """Reverter mudanças do schema (downgrade)"""
+
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    for tipo, (tabela, _codigo, _titulo, _detalhe) in FONTES.items():
+        if postgresql:
+            op.execute(f"DROP TRIGGER IF EXISTS {TABELA_BUSCA}_{tipo} ON {tabela}")
+            op.execute(f"DROP FUNCTION IF EXISTS {TABELA_BUSCA}_{tipo}()")
+        else:
+            for sufixo in ("ai", "au", "ad"):
+                op.execute(f"DROP TRIGGER IF EXISTS {TABELA_BUSCA}_{tipo}_{sufixo}")
+    op.execute(f"DROP TABLE IF EXISTS {TABELA_BUSCA}")
@@ -0,0 +1,56 @@
+"""Índice de deduplicação de clientes e equipamentos
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-10-11 09:00:00.000000
+
+Cria as tabelas dedup_chaves (hash de nome normalizado / documento) e
+dedup_trigramas (similaridade de nomes) usadas pelo scraping para reconhecer
+clientes e equipamentos já cadastrados (app/utils/deduplicacao.py).
+
+As tabelas são criadas vazias: a normalização dos nomes vive na aplicação e
+a migração não a importa. Os registros existentes são indexados pela
+própria aplicação - na primeira resolução (sincronizar_indice, a partir do
+id 0) ou pela reconciliação da task periódica de limpeza.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Aplicar mudanças do schema (upgrade)"""
+
+    op.create_table(
+        'dedup_chaves',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('entidade', sa.String(20), nullable=False),
+        sa.Column('ref_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(10), nullable=False),
+        sa.Column('hash', sa.String(16), nullable=False),
+    )
+    op.create_index('ix_dedup_chaves_busca', 'dedup_chaves', ['entidade', 'hash'])
+    op.create_index('ix_dedup_chaves_ref', 'dedup_chaves', ['entidade', 'ref_id'])
+
+    op.create_table(
+        'dedup_trigramas',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('entidade', sa.String(20), nullable=False),
+        sa.Column('trigrama', sa.String(3), nullable=False),
+        sa.Column('ref_id', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_dedup_trigramas_busca', 'dedup_trigramas', ['entidade', 'trigrama', 'ref_id'])
+    op.create_index('ix_dedup_trigramas_ref', 'dedup_trigramas', ['entidade', 'ref_id', 'trigrama'])
+
+
+def downgrade() -> None:
+    """Reverter mudanças do schema (downgrade)"""
+
+    op.drop_table('dedup_trigramas')
+    op.drop_table('dedup_chaves')
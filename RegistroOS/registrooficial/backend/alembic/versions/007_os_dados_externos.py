@@ -0,0 +1,41 @@
+"""Payload do scraping por OS (cache de frescor)
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-10-12 09:00:00.000000
+
+Cria a tabela os_dados_externos com o último payload coletado do sistema
+externo, o hash do conteúdo e a data da coleta, usados para decidir quando
+revalidar uma OS (app/utils/frescor_os.py).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Aplicar mudanças do schema (upgrade)"""
+
+    op.create_table(
+        'os_dados_externos',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('os_numero', sa.String(20), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('hash_conteudo', sa.String(16), nullable=False),
+        sa.Column('status_os', sa.String(), nullable=True),
+        sa.Column('scraped_at', sa.DateTime(), nullable=False),
+        sa.Column('alterado_em', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('os_numero', name='uq_os_dados_externos_os_numero'),
+    )
+
+
+def downgrade() -> None:
+    """Reverter mudanças do schema (downgrade)"""
+
+    op.drop_table('os_dados_externos')
@@ -0,0 +1,215 @@
+"""Payload comprimido e campos tipados em os_dados_externos
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-10-13 09:00:00.000000
+
+Troca o payload JSON em texto por JSON comprimido (zlib) e adiciona colunas
+tipadas extraídas do payload (cliente, CNPJ, equipamento, potências,
+rotação, tensões, peso e datas), com índices para filtros de relatórios.
+Linhas existentes são convertidas.
+
+A conversão (compressão e extração dos campos tipados) é mantida aqui por
+extenso (cópia congelada da de app/utils/dados_externos_os.py): a migração
+não importa a aplicação.
+
+"""
+import json
+import re
+import zlib
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+COLUNAS_TIPADAS = [
+    sa.Column('cliente', sa.String(200), nullable=True),
+    sa.Column('cnpj', sa.String(14), nullable=True),
+    sa.Column('tipo_equipamento', sa.String(200), nullable=True),
+    sa.Column('fabricante', sa.String(200), nullable=True),
+    sa.Column('modelo', sa.String(200), nullable=True),
+    sa.Column('numero_serie', sa.String(200), nullable=True),
+    sa.Column('tipo_servico', sa.String(200), nullable=True),
+    sa.Column('potencia_cv', sa.Float(), nullable=True),
+    sa.Column('potencia_kw', sa.Float(), nullable=True),
+    sa.Column('potencia_kva', sa.Float(), nullable=True),
+    sa.Column('rotacao_rpm', sa.Integer(), nullable=True),
+    sa.Column('tensao_alta_v', sa.Float(), nullable=True),
+    sa.Column('tensao_baixa_v', sa.Float(), nullable=True),
+    sa.Column('peso_total_kg', sa.Float(), nullable=True),
+    sa.Column('data_emissao', sa.Date(), nullable=True),
+    sa.Column('data_conclusao', sa.Date(), nullable=True),
+]
+
+# Colunas tipadas: coluna -> (chaves do payload em ordem de preferência, tipo)
+CAMPOS_TIPADOS = {
+    "cliente": (("CLIENTE", "NOME CLIENTE"), "texto"),
+    "cnpj": (("CNPJ",), "documento"),
+    "tipo_equipamento": (("TIPO DO EQUIPAMENTO", "TAG TIPO EQUIPAMENTO"), "texto"),
+    "fabricante": (("FABRICANTE",), "texto"),
+    "modelo": (("MODELO",), "texto"),
+    "numero_serie": (("NUMERO DE SERIE",), "texto"),
+    "tipo_servico": (("TIPO DE SERVICO", "TIPO DE SERVICO GERAL"), "texto"),
+    "potencia_cv": (("POTENCIA CV/HP",), "numero"),
+    "potencia_kw": (("POTENCIA KW",), "numero"),
+    "potencia_kva": (("POTENCIA KVA",), "numero"),
+    "rotacao_rpm": (("ROTACAO (RPM)",), "numero"),
+    "tensao_alta_v": (("TENSAO DE ALTA", "TENSAO DO ESTATOR (V)"), "numero"),
+    "tensao_baixa_v": (("TENSAO DE BAIXA",), "numero"),
+    "peso_total_kg": (("PESO TOTAL",), "numero"),
+    "data_emissao": (("DATA DA EMISSAO",), "data"),
+    "data_conclusao": (("DATA DA CONCLUSAO",), "data"),
+}
+
+# Colunas numéricas com unidade: unidade escrita no valor -> fator para a unidade da coluna
+UNIDADES = {
+    "potencia_cv": {"CV": 1.0, "HP": 1.01387, "KW": 1.35962},
+    "potencia_kw": {"KW": 1.0, "W": 0.001, "MW": 1000.0, "CV": 0.73550, "HP": 0.74570},
+    "potencia_kva": {"KVA": 1.0, "VA": 0.001, "MVA": 1000.0},
+    "tensao_alta_v": {"V": 1.0, "KV": 1000.0},
+    "tensao_baixa_v": {"V": 1.0, "KV": 1000.0},
+    "peso_total_kg": {"KG": 1.0, "T": 1000.0, "TON": 1000.0},
+}
+
+_NUMERO = re.compile(r"-?\d[\d.,]*")
+_UNIDADE = re.compile(r"-?\d[\d.,]*\s*([A-Za-z]+)")
+_DATA = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{2,4})")
+_DATA_ISO = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+
+def _converter_numero(valor):
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    encontrado = _NUMERO.search(str(valor or ""))
+    if not encontrado:
+        return None
+    numero = encontrado.group().rstrip(".,")
+    if "," in numero:
+        numero = numero.replace(".", "").replace(",", ".")
+    elif numero.count(".") > 1 or re.fullmatch(r"-?\d{1,3}\.\d{3}", numero):
+        numero = numero.replace(".", "")  # Separador de milhar
+    try:
+        return float(numero)
+    except ValueError:
+        return None
+
+
+def _converter_grandeza(valor, unidades):
+    numero = _converter_numero(valor)
+    if numero is None or isinstance(valor, (int, float)):
+        return numero
+    encontrada = _UNIDADE.search(str(valor))
+    fator = unidades.get(encontrada.group(1).upper(), 1.0) if encontrada else 1.0
+    return round(numero * fator, 6)
+
+
+def _converter_data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor or "")
+    encontrado = _DATA.search(texto)
+    try:
+        if encontrado:
+            dia, mes, ano = (int(g) for g in encontrado.groups())
+            return date(ano + 2000 if ano < 100 else ano, mes, dia)
+        encontrado = _DATA_ISO.search(texto)
+        if encontrado:
+            return date(*(int(g) for g in encontrado.groups()))
+    except ValueError:
+        return None
+    return None
+
+
+def _extrair_campos_tipados(os_data):
+    campos = {}
+    for coluna, (chaves, tipo) in CAMPOS_TIPADOS.items():
+        bruto = next((os_data[c] for c in chaves if str(os_data.get(c) or "").strip()), None)
+        if bruto is None:
+            campos[coluna] = None
+        elif tipo == "numero":
+            campos[coluna] = _converter_grandeza(bruto, UNIDADES.get(coluna, {}))
+        elif tipo == "data":
+            campos[coluna] = _converter_data(bruto)
+        elif tipo == "documento":
+            campos[coluna] = re.sub(r"\D", "", str(bruto))[:14] or None
+        else:
+            campos[coluna] = str(bruto).strip()[:200]
+    if campos["rotacao_rpm"] is not None:
+        campos["rotacao_rpm"] = int(campos["rotacao_rpm"])
+    return campos
+
+
+def _comprimir_payload(os_data):
+    preenchidos = {k: v for k, v in os_data.items() if v not in ("", None)}
+    vazios = sorted(k for k, v in os_data.items() if v in ("", None))
+    conteudo = json.dumps({"c": preenchidos, "v": vazios}, ensure_ascii=False, separators=(",", ":"), default=str)
+    return zlib.compress(conteudo.encode("utf-8"), 9)
+
+
+def _descomprimir_payload(dados):
+    if not dados:
+        return {}
+    conteudo = json.loads(zlib.decompress(dados).decode("utf-8"))
+    payload = {chave: "" for chave in conteudo.get("v", [])}
+    payload.update(conteudo.get("c", {}))
+    return payload
+
+
+def upgrade() -> None:
+    """Aplicar mudanças do schema (upgrade)"""
+
+    with op.batch_alter_table('os_dados_externos') as batch_op:
+        batch_op.add_column(sa.Column('payload_zlib', sa.LargeBinary(), nullable=True))
+        for coluna in COLUNAS_TIPADAS:
+            batch_op.add_column(coluna.copy())
+
+    conexao = op.get_bind()
+    tabela = sa.table('os_dados_externos', sa.column('id'), sa.column('payload'), sa.column('payload_zlib'),
+                      *(sa.column(c.name) for c in COLUNAS_TIPADAS))
+    for linha in conexao.execute(sa.select(tabela.c.id, tabela.c.payload)).fetchall():
+        os_data = json.loads(linha.payload or "{}")
+        conexao.execute(
+            tabela.update().where(tabela.c.id == linha.id).values(
+                payload_zlib=_comprimir_payload(os_data), **_extrair_campos_tipados(os_data)
+            )
+        )
+
+    with op.batch_alter_table('os_dados_externos') as batch_op:
+        batch_op.alter_column('payload_zlib', existing_type=sa.LargeBinary(), nullable=False)
+        batch_op.drop_column('payload')
+        batch_op.create_index('idx_os_dados_externos_cnpj', ['cnpj'])
+        batch_op.create_index('idx_os_dados_externos_equipamento', ['tipo_equipamento', 'fabricante', 'modelo'])
+        batch_op.create_index('idx_os_dados_externos_data_emissao', ['data_emissao'])
+
+
+def downgrade() -> None:
+    """Reverter mudanças do schema (downgrade)"""
+
+    with op.batch_alter_table('os_dados_externos') as batch_op:
+        batch_op.add_column(sa.Column('payload', sa.Text(), nullable=True))
+
+    conexao = op.get_bind()
+    tabela = sa.table('os_dados_externos', sa.column('id'), sa.column('payload'), sa.column('payload_zlib'))
+    for linha in conexao.execute(sa.select(tabela.c.id, tabela.c.payload_zlib)).fetchall():
+        conexao.execute(
+            tabela.update().where(tabela.c.id == linha.id).values(
+                payload=json.dumps(_descomprimir_payload(linha.payload_zlib), ensure_ascii=False, default=str)
+            )
+        )
+
+    with op.batch_alter_table('os_dados_externos') as batch_op:
+        batch_op.drop_index('idx_os_dados_externos_data_emissao')
+        batch_op.drop_index('idx_os_dados_externos_equipamento')
+        batch_op.drop_index('idx_os_dados_externos_cnpj')
+        batch_op.alter_column('payload', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('payload_zlib')
+        for coluna in reversed(COLUNAS_TIPADAS):
+            batch_op.drop_column(coluna.name)
@@ -0,0 +1,48 @@
+"""Estado das tasks do executor local de scraping
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-10-14 09:00:00.000000
+
+Cria a tabela scraping_jobs, onde o executor local (tasks/executor_local.py,
+usado quando Celery/Redis não estão disponíveis) persiste estado, progresso
+e resultado das tasks de scraping, servidos por /scraping-status/{task_id}.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Aplicar mudanças do schema (upgrade)"""
+
+    op.create_table(
+        'scraping_jobs',
+        sa.Column('id', sa.String(64), primary_key=True),
+        sa.Column('modulo', sa.String(200), nullable=False),
+        sa.Column('nome', sa.String(100), nullable=False),
+        sa.Column('args', sa.Text(), nullable=False),
+        sa.Column('kwargs', sa.Text(), nullable=False),
+        sa.Column('prioridade', sa.Integer(), nullable=False, server_default='5'),
+        sa.Column('estado', sa.String(20), nullable=False),
+        sa.Column('info', sa.Text(), nullable=True),
+        sa.Column('resultado', sa.Text(), nullable=True),
+        sa.Column('tentativas', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('criado_em', sa.DateTime(), nullable=False),
+        sa.Column('iniciado_em', sa.DateTime(), nullable=True),
+        sa.Column('concluido_em', sa.DateTime(), nullable=True),
+    )
+    op.create_index('idx_scraping_jobs_estado', 'scraping_jobs', ['estado', 'prioridade'])
+
+
+def downgrade() -> None:
+    """Reverter mudanças do schema (downgrade)"""
+
+    op.drop_index('idx_scraping_jobs_estado', table_name='scraping_jobs')
+    op.drop_table('scraping_jobs')
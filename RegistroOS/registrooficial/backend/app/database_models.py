@@ -5,7 +5,7 @@ Modelos SQLAlchemy conforme esquema EXATO fornecido pelo usuário.
 """
 
 import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Time, Boolean, Float, DECIMAL, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Time, Boolean, Float, DECIMAL, ForeignKey, JSON, UniqueConstraint, Index, LargeBinary
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
 from config.database_config import Base
@@ -14,7 +14,12 @@ from config.database_config import Base
 
 class OrdemServico(Base):
     __tablename__ = "ordens_servico"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_ordens_servico_os_numero', 'os_numero'),
+        Index('ix_ordens_servico_data_criacao', 'data_criacao'),
+        Index('ix_ordens_servico_ultima_atividade', 'ultima_atividade', 'id'),
+        {'extend_existing': True}
+    )
 
     id = Column(Integer, primary_key=True)
     os_numero = Column(String, nullable=False)
@@ -56,6 +61,7 @@ class OrdemServico(Base):
     inicio_os = Column(DateTime)
     fim_os = Column(DateTime)
     descricao_maquina = Column(Text)
+    ultima_atividade = Column(DateTime, nullable=False, server_default=func.now())  # Mantida por app/utils/ultima_atividade.py (paginação da listagem)
 
     # Relacionamentos conforme hierarquia
     responsavel_registro = relationship("Usuario", foreign_keys=[id_responsavel_registro])
@@ -78,7 +84,12 @@ class OrdemServico(Base):
 
 class ApontamentoDetalhado(Base):
     __tablename__ = "apontamentos_detalhados"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_apontamentos_usuario_inicio', 'id_usuario', 'data_hora_inicio'),
+        Index('ix_apontamentos_setor_inicio', 'id_setor', 'data_hora_inicio'),
+        Index('ix_apontamentos_os', 'id_os'),
+        {'extend_existing': True}
+    )
     
     id = Column(Integer, primary_key=True)
     id_os = Column(Integer, ForeignKey("ordens_servico.id"), nullable=False)
@@ -149,7 +160,13 @@ class ApontamentoDetalhado(Base):
 
 class Pendencia(Base):
     __tablename__ = "pendencias"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_pendencias_status_inicio', 'status', 'data_inicio'),
+        Index('ix_pendencias_data_inicio', 'data_inicio'),
+        Index('ix_pendencias_numero_os', 'numero_os'),
+        Index('ix_pendencias_apontamento_origem', 'id_apontamento_origem'),
+        {'extend_existing': True}
+    )
 
     id = Column(Integer, primary_key=True)
     numero_os = Column(String, ForeignKey("ordens_servico.os_numero"), nullable=False)
@@ -184,7 +201,11 @@ class Pendencia(Base):
 
 class Programacao(Base):
     __tablename__ = "programacoes"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_programacoes_responsavel_status', 'responsavel_id', 'status'),
+        Index('ix_programacoes_setor_inicio', 'id_setor', 'inicio_previsto'),
+        {'extend_existing': True}
+    )
     
     id = Column(Integer, primary_key=True)
     id_ordem_servico = Column(Integer, ForeignKey("ordens_servico.id"))
@@ -207,7 +228,10 @@ class Programacao(Base):
 
 class ResultadoTeste(Base):
     __tablename__ = "resultados_teste"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        Index('ix_resultados_teste_apontamento', 'id_apontamento'),
+        {'extend_existing': True}
+    )
 
     id = Column(Integer, primary_key=True)
     id_apontamento = Column(Integer, ForeignKey("apontamentos_detalhados.id"), nullable=False)
@@ -243,6 +267,31 @@ class OSTestesExclusivosFinalizados(Base):
     teste_exclusivo = relationship("TipoTeste", foreign_keys=[id_teste_exclusivo])
     usuario = relationship("Usuario", foreign_keys=[usuario_finalizacao])
 
+class ApontamentoResumoDiario(Base):
+    """Rollup diário de apontamentos mantido por app/utils/resumo_diario.py"""
+    __tablename__ = "apontamentos_resumo_diario"
+    __table_args__ = (
+        UniqueConstraint('data', 'id_setor', 'id_usuario', 'id_os', name='uq_resumo_diario_chave'),
+        {'extend_existing': True}
+    )
+
+    id = Column(Integer, primary_key=True)
+    data = Column(Date, nullable=False)  # Dia de data_hora_inicio
+    id_setor = Column(Integer, ForeignKey("tipo_setores.id"), nullable=False)
+    id_usuario = Column(Integer, ForeignKey("tipo_usuarios.id"), nullable=False)
+    id_os = Column(Integer, ForeignKey("ordens_servico.id"), nullable=False)
+    horas_trabalhadas = Column(Float, default=0)
+    total_apontamentos = Column(Integer, default=0)
+    total_retrabalhos = Column(Integer, default=0)
+    total_aprovados = Column(Integer, default=0)
+    total_em_andamento = Column(Integer, default=0)  # Sem data_hora_fim
+    data_ultima_atualizacao = Column(DateTime)
+
+    # Relacionamentos conforme hierarquia
+    setor_obj = relationship("Setor", foreign_keys=[id_setor])
+    usuario = relationship("Usuario", foreign_keys=[id_usuario])
+    ordem_servico = relationship("OrdemServico", foreign_keys=[id_os])
+
 # ========== TABELAS REFERENCIAIS ==========
 
 class Cliente(Base):
@@ -273,6 +322,94 @@ class Equipamento(Base):
     data_criacao = Column(DateTime)
     data_ultima_atualizacao = Column(DateTime)
 
+class DedupChave(Base):
+    """Chaves normalizadas (nome/documento) de clientes e equipamentos - app/utils/deduplicacao.py"""
+    __tablename__ = "dedup_chaves"
+    __table_args__ = (
+        Index('ix_dedup_chaves_busca', 'entidade', 'hash'),
+        Index('ix_dedup_chaves_ref', 'entidade', 'ref_id'),
+        {'extend_existing': True}
+    )
+
+    id = Column(Integer, primary_key=True)
+    entidade = Column(String(20), nullable=False)  # cliente, equipamento
+    ref_id = Column(Integer, nullable=False)  # clientes.id / equipamentos.id
+    tipo = Column(String(10), nullable=False)  # nome, documento
+    hash = Column(String(16), nullable=False)
+
+class DedupTrigrama(Base):
+    """Trigramas do nome normalizado (similaridade) - app/utils/deduplicacao.py"""
+    __tablename__ = "dedup_trigramas"
+    __table_args__ = (
+        Index('ix_dedup_trigramas_busca', 'entidade', 'trigrama', 'ref_id'),
+        Index('ix_dedup_trigramas_ref', 'entidade', 'ref_id', 'trigrama'),
+        {'extend_existing': True}
+    )
+
+    id = Column(Integer, primary_key=True)
+    entidade = Column(String(20), nullable=False)
+    trigrama = Column(String(3), nullable=False)
+    ref_id = Column(Integer, nullable=False)
+
+class OsDadosExternos(Base):
+    """Último payload coletado do sistema externo por OS (frescor) - app/utils/frescor_os.py"""
+    __tablename__ = "os_dados_externos"
+    __table_args__ = (
+        UniqueConstraint('os_numero', name='uq_os_dados_externos_os_numero'),
+        Index('idx_os_dados_externos_cnpj', 'cnpj'),
+        Index('idx_os_dados_externos_equipamento', 'tipo_equipamento', 'fabricante', 'modelo'),
+        Index('idx_os_dados_externos_data_emissao', 'data_emissao'),
+        {'extend_existing': True}
+    )
+
+    id = Column(Integer, primary_key=True)
+    os_numero = Column(String(20), nullable=False)  # Número normalizado (sem zeros à esquerda)
+    payload_zlib = Column(LargeBinary, nullable=False)  # JSON completo do scraping comprimido (app/utils/dados_externos_os.py)
+    hash_conteudo = Column(String(16), nullable=False)
+    status_os = Column(String)  # STATUS DA OS no sistema externo (define o TTL)
+    scraped_at = Column(DateTime, nullable=False)  # Última coleta (alterada ou não)
+    alterado_em = Column(DateTime, nullable=False)  # Última coleta com conteúdo diferente
+
+    # Campos tipados extraídos do payload (filtros, relatórios e formulários)
+    cliente = Column(String(200))
+    cnpj = Column(String(14))  # Somente dígitos
+    tipo_equipamento = Column(String(200))
+    fabricante = Column(String(200))
+    modelo = Column(String(200))
+    numero_serie = Column(String(200))
+    tipo_servico = Column(String(200))
+    potencia_cv = Column(Float)
+    potencia_kw = Column(Float)
+    potencia_kva = Column(Float)
+    rotacao_rpm = Column(Integer)
+    tensao_alta_v = Column(Float)
+    tensao_baixa_v = Column(Float)
+    peso_total_kg = Column(Float)
+    data_emissao = Column(Date)
+    data_conclusao = Column(Date)
+
+class JobScraping(Base):
+    """Estado das tasks de scraping do executor local (sem Celery/Redis) - tasks/executor_local.py"""
+    __tablename__ = "scraping_jobs"
+    __table_args__ = (
+        Index('idx_scraping_jobs_estado', 'estado', 'prioridade'),
+        {'extend_existing': True}
+    )
+
+    id = Column(String(64), primary_key=True)  # task_id (mesmo formato das tasks do Celery)
+    modulo = Column(String(200), nullable=False)
+    nome = Column(String(100), nullable=False)
+    args = Column(Text, nullable=False)  # JSON
+    kwargs = Column(Text, nullable=False)  # JSON
+    prioridade = Column(Integer, nullable=False, default=5)  # 0 é a mais alta (como no broker Redis)
+    estado = Column(String(20), nullable=False)  # PENDING, STARTED, PROGRESS, RETRY, SUCCESS, FAILURE
+    info = Column(Text)  # JSON do update_state ou mensagem de erro
+    resultado = Column(Text)  # JSON do retorno da task
+    tentativas = Column(Integer, nullable=False, default=0)
+    criado_em = Column(DateTime, nullable=False)
+    iniciado_em = Column(DateTime)
+    concluido_em = Column(DateTime)
+
 class Usuario(Base):
     __tablename__ = "tipo_usuarios"
     __table_args__ = {'extend_existing': True}
@@ -0,0 +1,46 @@
+"""
+Scraping de OS do sistema externo - RegistroOS
+==============================================
+
+Ponto único de entrada para API e workers:
+
+    from app.scraping import executar_scraping
+    dados = executar_scraping("12345")  # backend de SCRAPING_BACKEND
+
+BACKENDS REGISTRADOS (scripts em SCRAPING_SCRIPTS_DIR):
+- selenium (padrão): navegadores logados em pool por processo
+  (scrape_os_data_optimized); fallback: selenium_original
+- selenium_original: um navegador por chamada (scrape_os_data)
+- http: API JSON do sistema externo, sem navegador (scrape_os_data_http);
+  fallback: selenium
+
+Outros backends: registrar_backend("nome", "modulo:funcao", fallback="selenium")
+ou SCRAPING_EXTRA_BACKENDS (ver config/scraping_config.py).
+"""
+
+from app.scraping.registro import (
+    BackendScraping,
+    registrar_backend,
+    obter_backend,
+    backends_registrados,
+    cadeia_de_backends,
+    executar_scraping,
+    aquecer_backends,
+    registrar_backends_extras,
+)
+
+registrar_backend("selenium", "scrape_os_data_optimized:execute_scraping_pooled", fallback="selenium_original")
+registrar_backend("selenium_original", "scrape_os_data:execute_scraping")
+registrar_backend("http", "scrape_os_data_http:execute_scraping_http", fallback="selenium")
+registrar_backends_extras()
+
+__all__ = [
+    "BackendScraping",
+    "registrar_backend",
+    "obter_backend",
+    "backends_registrados",
+    "cadeia_de_backends",
+    "executar_scraping",
+    "aquecer_backends",
+    "registrar_backends_extras",
+]
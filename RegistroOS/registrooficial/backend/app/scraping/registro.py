@@ -0,0 +1,124 @@
+"""
+Registro de backends de scraping - RegistroOS
+=============================================
+
+Cada backend é uma função `scrape(numero_os) -> List[Dict]` (mesmo formato de
+scrape_os_data.execute_scraping), indicada por "modulo:funcao" ou por um
+callable. O módulo é importado normalmente (cache em sys.modules) na primeira
+chamada ou no aquecimento do worker, uma única vez por processo.
+
+Um backend pode indicar outro como fallback: se ele falhar (inclusive ao
+carregar o módulo), `executar_scraping` tenta o seguinte da cadeia.
+"""
+
+import importlib
+import logging
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from config.scraping_config import SCRAPING_SCRIPTS_DIR, SCRAPING_BACKEND, SCRAPING_EXTRA_BACKENDS
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()  # Threads do lote não podem importar o mesmo script em paralelo
+
+class BackendScraping:
+    """Backend registrado: alvo "modulo:funcao" (ou callable) e fallback opcional"""
+
+    def __init__(self, nome: str, alvo: Union[str, Callable], fallback: Optional[str] = None):
+        self.nome = nome
+        self.alvo = alvo
+        self.fallback = fallback
+        self.modulo = None
+        self._funcao = alvo if callable(alvo) else None
+
+    @property
+    def carregado(self) -> bool:
+        return self._funcao is not None
+
+    def carregar(self) -> Callable:
+        """Importa o módulo do backend (uma vez por processo) e retorna a função"""
+        if self._funcao is not None:
+            return self._funcao
+
+        with _lock:
+            if self._funcao is None:
+                nome_modulo, _, nome_funcao = self.alvo.partition(":")
+                if SCRAPING_SCRIPTS_DIR not in sys.path:
+                    sys.path.insert(0, SCRAPING_SCRIPTS_DIR)
+                self.modulo = importlib.import_module(nome_modulo)
+                self._funcao = getattr(self.modulo, nome_funcao or "execute_scraping")
+                logger.info(f"📦 Backend de scraping '{self.nome}' carregado ({self.alvo})")
+        return self._funcao
+
+    def __call__(self, numero_os: str) -> List[Dict[str, Any]]:
+        return self.carregar()(numero_os)
+
+_backends: Dict[str, BackendScraping] = {}
+
+def registrar_backend(nome: str, alvo: Union[str, Callable], fallback: Optional[str] = None) -> BackendScraping:
+    """Registra (ou substitui) um backend de scraping"""
+    backend = BackendScraping(nome.strip().lower(), alvo, fallback)
+    with _lock:
+        _backends[backend.nome] = backend
+    return backend
+
+def obter_backend(nome: Optional[str] = None) -> BackendScraping:
+    """Backend pelo nome (padrão: SCRAPING_BACKEND)"""
+    nome = (nome or SCRAPING_BACKEND).strip().lower()
+    if nome not in _backends:
+        raise KeyError(f"Backend de scraping não registrado: {nome} (disponíveis: {', '.join(sorted(_backends))})")
+    return _backends[nome]
+
+def backends_registrados() -> Dict[str, Dict[str, Any]]:
+    return {
+        nome: {"alvo": b.alvo if isinstance(b.alvo, str) else repr(b.alvo), "fallback": b.fallback, "carregado": b.carregado}
+        for nome, b in _backends.items()
+    }
+
+def cadeia_de_backends(nome: Optional[str] = None) -> List[BackendScraping]:
+    """Backend e seus fallbacks, sem repetir (evita ciclos)"""
+    cadeia = []
+    atual = (nome or SCRAPING_BACKEND).strip().lower()
+    while atual and atual not in [b.nome for b in cadeia]:
+        if cadeia and atual not in _backends:
+            logger.warning(f"⚠️ Fallback '{atual}' do backend '{cadeia[-1].nome}' não está registrado")
+            break
+        backend = obter_backend(atual)
+        cadeia.append(backend)
+        atual = backend.fallback
+    return cadeia
+
+def executar_scraping(numero_os: str, backend: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Scraping de uma OS pelo backend configurado, seguindo os fallbacks em falhas"""
+    cadeia = cadeia_de_backends(backend)
+    for i, atual in enumerate(cadeia):
+        try:
+            return atual(numero_os)
+        except Exception as e:
+            if i == len(cadeia) - 1:
+                raise
+            logger.warning(f"⚠️ Backend '{atual.nome}' falhou para OS {numero_os} ({e}), usando '{cadeia[i + 1].nome}'")
+    return []
+
+def aquecer_backends(backend: Optional[str] = None) -> List[str]:
+    """Importa os módulos da cadeia do backend (ex.: na inicialização do worker)"""
+    carregados = []
+    for atual in cadeia_de_backends(backend):
+        try:
+            atual.carregar()
+            carregados.append(atual.nome)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível carregar o backend '{atual.nome}': {e}")
+    return carregados
+
+def registrar_backends_extras(especificacao: str = SCRAPING_EXTRA_BACKENDS) -> None:
+    """Backends de SCRAPING_EXTRA_BACKENDS: "nome=modulo:funcao[>fallback]", separados por vírgula"""
+    for item in filter(None, (parte.strip() for parte in especificacao.split(","))):
+        nome, _, resto = item.partition("=")
+        alvo, _, fallback = resto.partition(">")
+        if not nome or ":" not in alvo:
+            logger.warning(f"⚠️ Backend extra inválido em SCRAPING_EXTRA_BACKENDS: {item}")
+            continue
+        registrar_backend(nome, alvo.strip(), fallback.strip() or None)
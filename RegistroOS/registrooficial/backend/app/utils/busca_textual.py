@@ -0,0 +1,255 @@
+"""
+Busca Textual (typeahead) - RegistroOS
+======================================
+
+Índice de texto único para OS, clientes e equipamentos, mantido por
+triggers no próprio banco:
+- SQLite: tabela virtual FTS5 (tokenizer unicode61 sem acentos, índice de
+  prefixos) - rowid = id * FATOR_ROWID + código da fonte
+- PostgreSQL: tabela com coluna tsvector (config 'simple' + unaccent) e GIN
+
+A consulta passa pela mesma normalização de utils/text_validators.limpar_texto
+(maiúsculas, só A-Z/0-9 e pontuação permitida), com os acentos convertidos
+antes (Ç → C, Ã → A) para não serem descartados. Cada termo vira um prefixo;
+os resultados cujo título começa pelo primeiro termo vêm antes dos demais.
+
+USO:
+    garantir_indice_busca()  # startup da API (main.py)
+    resultados = buscar(db, "motor weg", tipos=["equipamento"], limite=10)
+"""
+
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import inspect, text
+
+from utils.text_validators import limpar_texto
+
+logger = logging.getLogger(__name__)
+
+TABELA_BUSCA = "busca_textual"
+FATOR_ROWID = 4
+MAX_TERMOS = 8
+
+# tipo → tabela de origem, código no rowid e colunas de título/detalhe
+FONTES: Dict[str, Dict[str, Any]] = {
+    "os": {
+        "tabela": "ordens_servico", "codigo": 1,
+        "titulo": ["os_numero"], "detalhe": ["descricao_maquina"],
+    },
+    "cliente": {
+        "tabela": "clientes", "codigo": 2,
+        "titulo": ["razao_social"], "detalhe": ["nome_fantasia", "cnpj_cpf"],
+    },
+    "equipamento": {
+        "tabela": "equipamentos", "codigo": 3,
+        "titulo": ["descricao"], "detalhe": ["fabricante", "modelo", "numero_serie"],
+    },
+}
+
+_indice_verificado = False
+
+# =============================================================================
+# NORMALIZAÇÃO
+# =============================================================================
+
+def normalizar_busca(texto: Optional[str]) -> str:
+    """Remove acentos e aplica as regras de limpar_texto (maiúsculas, caracteres permitidos)"""
+    if not texto:
+        return ""
+    sem_acentos = "".join(
+        c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c)
+    )
+    return " ".join(limpar_texto(sem_acentos).split())
+
+def termos_busca(texto: Optional[str]) -> List[str]:
+    """Termos (A-Z/0-9) da consulta, na ordem digitada"""
+    return re.findall(r"[A-Z0-9]+", normalizar_busca(texto))[:MAX_TERMOS]
+
+def _expressao(colunas: Sequence[str], prefixo: str) -> str:
+    """Concatena colunas da linha (new./old.) ignorando nulos"""
+    partes = [f"COALESCE({prefixo}{coluna}, '')" for coluna in colunas]
+    return " || ' ' || ".join(partes)
+
+# =============================================================================
+# DDL E BACKFILL
+# =============================================================================
+
+def _ddl_sqlite() -> List[str]:
+    comandos = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5(
+            titulo, detalhe, tipo UNINDEXED, ref_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'
+        )"""
+    ]
+    for tipo, fonte in FONTES.items():
+        tabela, codigo = fonte["tabela"], fonte["codigo"]
+        colunas = ", ".join(fonte["titulo"] + fonte["detalhe"])
+        inserir = (
+            f"INSERT INTO {TABELA_BUSCA}(rowid, titulo, detalhe, tipo, ref_id) VALUES ("
+            f"new.id * {FATOR_ROWID} + {codigo}, {_expressao(fonte['titulo'], 'new.')}, "
+            f"{_expressao(fonte['detalhe'], 'new.')}, '{tipo}', new.id);"
+        )
+        remover = f"DELETE FROM {TABELA_BUSCA} WHERE rowid = old.id * {FATOR_ROWID} + {codigo};"
+        comandos += [
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_{tipo}_ai AFTER INSERT ON {tabela} BEGIN {inserir} END",
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_{tipo}_au AFTER UPDATE OF id, {colunas} ON {tabela} "
+            f"BEGIN {remover} {inserir} END",
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_BUSCA}_{tipo}_ad AFTER DELETE ON {tabela} BEGIN {remover} END",
+        ]
+    return comandos
+
+def _ddl_postgresql(sem_acentos: str) -> List[str]:
+    comandos = [
+        f"""CREATE TABLE IF NOT EXISTS {TABELA_BUSCA} (
+            id BIGINT PRIMARY KEY, tipo VARCHAR(20) NOT NULL, ref_id INTEGER NOT NULL,
+            titulo TEXT, detalhe TEXT, documento TSVECTOR
+        )""",
+        f"CREATE INDEX IF NOT EXISTS ix_{TABELA_BUSCA}_documento ON {TABELA_BUSCA} USING GIN (documento)",
+    ]
+    for tipo, fonte in FONTES.items():
+        tabela, codigo = fonte["tabela"], fonte["codigo"]
+        titulo, detalhe = _expressao(fonte["titulo"], "NEW."), _expressao(fonte["detalhe"], "NEW.")
+        comandos += [
+            f"""CREATE OR REPLACE FUNCTION {TABELA_BUSCA}_{tipo}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM {TABELA_BUSCA} WHERE id = OLD.id * {FATOR_ROWID} + {codigo};
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {TABELA_BUSCA}(id, tipo, ref_id, titulo, detalhe, documento)
+                    VALUES (NEW.id * {FATOR_ROWID} + {codigo}, '{tipo}', NEW.id, {titulo}, {detalhe},
+                            to_tsvector('simple', {sem_acentos}({titulo} || ' ' || {detalhe})));
+                END IF;
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql""",
+            f"DROP TRIGGER IF EXISTS {TABELA_BUSCA}_{tipo} ON {tabela}",
+            f"""CREATE TRIGGER {TABELA_BUSCA}_{tipo} AFTER INSERT OR UPDATE OR DELETE ON {tabela}
+                FOR EACH ROW EXECUTE FUNCTION {TABELA_BUSCA}_{tipo}()""",
+        ]
+    return comandos
+
+def _funcao_sem_acentos(conexao) -> str:
+    """unaccent quando a extensão puder ser habilitada; senão texto como está"""
+    try:
+        with conexao.begin_nested():
+            conexao.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        return "unaccent"
+    except Exception as e:
+        logger.warning(f"⚠️ Extensão unaccent indisponível, busca sensível a acentos: {e}")
+        return ""
+
+def criar_indice_busca(conexao) -> None:
+    """Cria a tabela de busca e os triggers de manutenção (idempotente)"""
+    if conexao.dialect.name == "postgresql":
+        comandos = _ddl_postgresql(_funcao_sem_acentos(conexao))
+    else:
+        comandos = _ddl_sqlite()
+    for comando in comandos:
+        conexao.execute(text(comando))
+
+def reconstruir_indice_busca(conexao) -> int:
+    """Repopula o índice a partir das tabelas de origem"""
+    postgresql = conexao.dialect.name == "postgresql"
+    sem_acentos = _funcao_sem_acentos(conexao) if postgresql else ""
+    conexao.execute(text(f"DELETE FROM {TABELA_BUSCA}"))
+    total = 0
+    for tipo, fonte in FONTES.items():
+        titulo, detalhe = _expressao(fonte["titulo"], ""), _expressao(fonte["detalhe"], "")
+        chave = f"id * {FATOR_ROWID} + {fonte['codigo']}"
+        if postgresql:
+            sql = (
+                f"INSERT INTO {TABELA_BUSCA}(id, tipo, ref_id, titulo, detalhe, documento) "
+                f"SELECT {chave}, '{tipo}', id, {titulo}, {detalhe}, "
+                f"to_tsvector('simple', {sem_acentos}({titulo} || ' ' || {detalhe})) FROM {fonte['tabela']}"
+            )
+        else:
+            sql = (
+                f"INSERT INTO {TABELA_BUSCA}(rowid, titulo, detalhe, tipo, ref_id) "
+                f"SELECT {chave}, {titulo}, {detalhe}, '{tipo}', id FROM {fonte['tabela']}"
+            )
+        total += conexao.execute(text(sql)).rowcount or 0
+    return total
+
+def garantir_indice_busca() -> None:
+    """
+    Cria e popula o índice quando ele ainda não existe (bancos criados por
+    create_all, sem a migração 005). Chamada uma vez no startup da API.
+    """
+    global _indice_verificado
+    if _indice_verificado:
+        return
+
+    from config.database_config import engine
+
+    try:
+        with engine.begin() as conexao:
+            if not inspect(conexao).has_table(TABELA_BUSCA):
+                criar_indice_busca(conexao)
+                linhas = reconstruir_indice_busca(conexao)
+                logger.info(f"✅ Índice de busca textual inicializado: {linhas} registros")
+        _indice_verificado = True
+    except Exception as e:
+        logger.error(f"❌ Erro ao inicializar índice de busca textual: {e}")
+
+# =============================================================================
+# CONSULTA
+# =============================================================================
+
+def _consultar_sqlite(db, termos: List[str], tipos: List[str], limite: int) -> List[Any]:
+    prefixos = [f'"{termo}"*' for termo in termos]
+    filtro_tipo = f"AND tipo IN ({', '.join(repr(t) for t in tipos)})"
+    sql = text(f"""
+        SELECT rowid, tipo, ref_id, titulo, detalhe FROM {TABELA_BUSCA}
+        WHERE {TABELA_BUSCA} MATCH :consulta {filtro_tipo}
+        LIMIT :limite
+    """)
+
+    # 1º: título começando pelo primeiro termo; 2º: demais correspondências.
+    # Sem ORDER BY rank: o bm25 obrigaria a pontuar todas as correspondências
+    # de prefixos curtos; na ordem do índice o LIMIT encerra a leitura cedo.
+    consultas = [
+        " AND ".join([f"titulo : ^{prefixos[0]}"] + prefixos[1:]),
+        " AND ".join(prefixos),
+    ]
+    linhas, vistos = [], set()
+    for consulta in consultas:
+        for linha in db.execute(sql, {"consulta": consulta, "limite": limite}).fetchall():
+            if linha[0] not in vistos and len(linhas) < limite:
+                vistos.add(linha[0])
+                linhas.append(linha[1:])
+    return linhas
+
+def _consultar_postgresql(db, termos: List[str], tipos: List[str], limite: int) -> List[Any]:
+    filtro_tipo = f"AND tipo IN ({', '.join(repr(t) for t in tipos)})"
+    sql = text(f"""
+        SELECT tipo, ref_id, titulo, detalhe FROM {TABELA_BUSCA}
+        WHERE documento @@ to_tsquery('simple', :consulta) {filtro_tipo}
+        ORDER BY (upper(titulo) LIKE :inicio) DESC, ts_rank(documento, to_tsquery('simple', :consulta)) DESC
+        LIMIT :limite
+    """)
+    parametros = {
+        "consulta": " & ".join(f"{termo}:*" for termo in termos),
+        "inicio": f"{termos[0]}%",
+        "limite": limite,
+    }
+    return db.execute(sql, parametros).fetchall()
+
+def buscar(db, consulta: str, tipos: Optional[Sequence[str]] = None, limite: int = 10) -> List[Dict[str, Any]]:
+    """Busca por prefixo em OS, clientes e equipamentos"""
+    termos = termos_busca(consulta)
+    tipos_validos = [t for t in (tipos or FONTES) if t in FONTES]
+    if not termos or not tipos_validos:
+        return []
+
+    if db.get_bind().dialect.name == "postgresql":
+        linhas = _consultar_postgresql(db, termos, tipos_validos, limite)
+    else:
+        linhas = _consultar_sqlite(db, termos, tipos_validos, limite)
+
+    return [
+        {"tipo": tipo, "id": int(ref_id), "titulo": (titulo or "").strip(), "detalhe": (detalhe or "").strip() or None}
+        for tipo, ref_id, titulo, detalhe in linhas
+    ]
@@ -0,0 +1,165 @@
+"""
+Catalog Cache - RegistroOS
+==========================
+
+Cache em processo das tabelas de catálogo (departamentos, setores, tipos de
+máquina, tipos de atividade, descrições de atividade, causas de retrabalho,
+tipos de teste e tipos de falha). Usado por app/utils/db_lookups.py para as
+conversões nome ↔ ID sem consultar o banco a cada chamada.
+
+VERSIONAMENTO:
+- Cada catálogo é um domínio de invalidação do response_cache
+  ("catalogo:<nome>"); commits que escrevem na tabela (CRUD de
+  routes/admin_config_routes.py ou qualquer outra escrita via Session)
+  incrementam a geração
+- Ao acessar um catálogo, a geração carregada é comparada com a atual; se
+  mudou, o catálogo é recarregado com uma única consulta
+- Com RESPONSE_CACHE_BACKEND=redis as gerações são compartilhadas entre
+  workers; com o backend em memória, escritas de outro processo só são
+  vistas após o TTL (CATALOG_CACHE_TTL, padrão 300s), que limita a
+  desatualização em qualquer backend
+- Só guarda catálogos lidos sem escritas pendentes no mesmo domínio: uma
+  carga feita dentro de uma transação que alterou o catálogo é usada só
+  por aquela chamada (nada de linhas fantasmas após rollback)
+
+USO:
+- catalog_cache.precarregar(db): carga em lote de todos os catálogos
+- catalog_cache.id_por_nome(db, "setores", "MECANICA")
+- catalog_cache.linha_por_id(db, "departamentos", 1)
+- catalog_cache.estatisticas(): hits, misses e recargas
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database_models import (
+    Departamento, Setor, TipoMaquina, TipoAtividade,
+    TipoDescricaoAtividade, TipoCausaRetrabalho, TipoTeste, TipoFalha
+)
+from app.utils.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_CONFIG = {
+    "ttl": int(os.getenv("CATALOG_CACHE_TTL", "300"))
+}
+
+# nome do catálogo -> (modelo, coluna usada como "nome" nas conversões)
+CATALOGOS = {
+    "departamentos": (Departamento, "nome_tipo"),
+    "setores": (Setor, "nome"),
+    "tipos_maquina": (TipoMaquina, "nome_tipo"),
+    "tipos_atividade": (TipoAtividade, "nome_tipo"),
+    "descricoes_atividade": (TipoDescricaoAtividade, "codigo"),
+    "causas_retrabalho": (TipoCausaRetrabalho, "codigo"),
+    "tipos_teste": (TipoTeste, "nome"),
+    "tipos_falha": (TipoFalha, "codigo"),
+}
+
+def dominio_catalogo(nome: str) -> str:
+    """Domínio de invalidação do catálogo no response_cache"""
+    return f"catalogo:{nome}"
+
+DOMINIOS_CATALOGOS = tuple(dominio_catalogo(nome) for nome in CATALOGOS)
+
+class _Catalogo:
+    """Snapshot imutável de um catálogo carregado"""
+
+    def __init__(self, geracao: int, linhas: List[Dict[str, Any]], coluna_nome: str, expira_em: float):
+        self.geracao = geracao
+        self.expira_em = expira_em
+        self.linhas = linhas
+        self.ativos_por_id = {linha["id"]: linha for linha in linhas if linha.get("ativo")}
+        self.ativos_por_nome: Dict[str, int] = {}
+        for linha in linhas:
+            if linha.get("ativo") and linha.get(coluna_nome) is not None:
+                self.ativos_por_nome.setdefault(linha[coluna_nome], linha["id"])
+
+class CatalogCache:
+    """Catálogos em memória, recarregados quando a geração muda"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**CATALOG_CACHE_CONFIG, **(config or {})}
+        self._catalogos: Dict[str, _Catalogo] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recargas = 0
+
+    def _carregar(self, db: Session, nome: str, geracao: int) -> _Catalogo:
+        modelo, coluna_nome = CATALOGOS[nome]
+        colunas = [atributo.key for atributo in modelo.__mapper__.column_attrs]
+        linhas = [
+            {coluna: getattr(objeto, coluna) for coluna in colunas}
+            for objeto in db.query(modelo).order_by(modelo.id).all()
+        ]
+        catalogo = _Catalogo(geracao, linhas, coluna_nome, time.monotonic() + self.config["ttl"])
+        # A consulta fez autoflush: escritas desta transação no catálogo já
+        # aparecem em cache_dominios_alterados (eventos do response_cache) e
+        # só valem depois do commit
+        if dominio_catalogo(nome) in db.info.get("cache_dominios_alterados", ()):
+            return catalogo
+        with self._lock:
+            self._catalogos[nome] = catalogo
+            self.recargas += 1
+        return catalogo
+
+    def _valido(self, catalogo: Optional[_Catalogo], geracao: int) -> bool:
+        return catalogo is not None and catalogo.geracao == geracao and time.monotonic() < catalogo.expira_em
+
+    def catalogo(self, db: Session, nome: str) -> _Catalogo:
+        # A geração é lida antes da consulta: uma escrita concorrente
+        # resulta em nova recarga no próximo acesso
+        geracao = response_cache.geracoes((dominio_catalogo(nome),))[0]
+        atual = self._catalogos.get(nome)
+        if self._valido(atual, geracao):
+            self.hits += 1
+            return atual
+        self.misses += 1
+        return self._carregar(db, nome, geracao)
+
+    def precarregar(self, db: Session, nomes: Optional[Iterable[str]] = None) -> None:
+        """Carrega (ou valida) todos os catálogos informados de uma vez"""
+        nomes = tuple(nomes or CATALOGOS)
+        geracoes = response_cache.geracoes(dominio_catalogo(nome) for nome in nomes)
+        for nome, geracao in zip(nomes, geracoes):
+            if not self._valido(self._catalogos.get(nome), geracao):
+                self._carregar(db, nome, geracao)
+
+    def invalidar(self, *nomes: str) -> None:
+        """Força recarga dos catálogos (todos, se nenhum for informado)"""
+        response_cache.invalidar(*(dominio_catalogo(nome) for nome in (nomes or CATALOGOS)))
+
+    # ---- Consultas -----------------------------------------------------------
+
+    def linhas(self, db: Session, nome: str, somente_ativos: bool = True) -> List[Dict[str, Any]]:
+        catalogo = self.catalogo(db, nome)
+        if somente_ativos:
+            return list(catalogo.ativos_por_id.values())
+        return list(catalogo.linhas)
+
+    def linha_por_id(self, db: Session, nome: str, id_registro: Optional[int]) -> Optional[Dict[str, Any]]:
+        return self.catalogo(db, nome).ativos_por_id.get(id_registro)
+
+    def id_por_nome(self, db: Session, nome: str, valor: Optional[str]) -> Optional[int]:
+        return self.catalogo(db, nome).ativos_por_nome.get(valor)
+
+    def mapa_nomes(self, db: Session, nome: str) -> Dict[str, int]:
+        return dict(self.catalogo(db, nome).ativos_por_nome)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "catalogos_carregados": {nome: len(c.linhas) for nome, c in self._catalogos.items()},
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / total * 100, 1) if total else 0.0,
+            "recargas": self.recargas
+        }
+
+catalog_cache = CatalogCache()
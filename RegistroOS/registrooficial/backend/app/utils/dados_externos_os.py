@@ -0,0 +1,160 @@
+"""
+Dados externos da OS - RegistroOS
+=================================
+
+Armazenamento compacto do payload completo do scraping (~90 campos:
+potência, tensões, rotação, pesos, datas...) em os_dados_externos:
+
+- payload_zlib: JSON compacto comprimido com zlib (campos vazios omitidos;
+  todas as chaves voltam ao descomprimir via carregar_payload)
+- colunas tipadas extraídas dos campos usados em filtros e formulários
+  (cliente, CNPJ, equipamento, potências, rotação, tensões, datas)
+- números gravados na unidade da coluna: "13,8 KV" vira 13800 em
+  tensao_alta_v, "250 CV" vira 183,9 em potencia_kw (valor sem unidade já
+  está na unidade da coluna)
+
+USO:
+    campos = extrair_campos_tipados(os_data)      # dict de colunas
+    registro.payload_zlib = comprimir_payload(os_data)
+    os_data = carregar_payload(registro)
+"""
+
+import json
+import re
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+# Colunas tipadas: coluna -> (chaves do payload em ordem de preferência, tipo)
+CAMPOS_TIPADOS = {
+    "cliente": (("CLIENTE", "NOME CLIENTE"), "texto"),
+    "cnpj": (("CNPJ",), "documento"),
+    "tipo_equipamento": (("TIPO DO EQUIPAMENTO", "TAG TIPO EQUIPAMENTO"), "texto"),
+    "fabricante": (("FABRICANTE",), "texto"),
+    "modelo": (("MODELO",), "texto"),
+    "numero_serie": (("NUMERO DE SERIE",), "texto"),
+    "tipo_servico": (("TIPO DE SERVICO", "TIPO DE SERVICO GERAL"), "texto"),
+    "potencia_cv": (("POTENCIA CV/HP",), "numero"),
+    "potencia_kw": (("POTENCIA KW",), "numero"),
+    "potencia_kva": (("POTENCIA KVA",), "numero"),
+    "rotacao_rpm": (("ROTACAO (RPM)",), "numero"),
+    "tensao_alta_v": (("TENSAO DE ALTA", "TENSAO DO ESTATOR (V)"), "numero"),
+    "tensao_baixa_v": (("TENSAO DE BAIXA",), "numero"),
+    "peso_total_kg": (("PESO TOTAL",), "numero"),
+    "data_emissao": (("DATA DA EMISSAO",), "data"),
+    "data_conclusao": (("DATA DA CONCLUSAO",), "data"),
+}
+
+# Colunas numéricas com unidade: unidade escrita no valor -> fator para a unidade da coluna
+UNIDADES = {
+    "potencia_cv": {"CV": 1.0, "HP": 1.01387, "KW": 1.35962},
+    "potencia_kw": {"KW": 1.0, "W": 0.001, "MW": 1000.0, "CV": 0.73550, "HP": 0.74570},
+    "potencia_kva": {"KVA": 1.0, "VA": 0.001, "MVA": 1000.0},
+    "tensao_alta_v": {"V": 1.0, "KV": 1000.0},
+    "tensao_baixa_v": {"V": 1.0, "KV": 1000.0},
+    "peso_total_kg": {"KG": 1.0, "T": 1000.0, "TON": 1000.0},
+}
+
+_NUMERO = re.compile(r"-?\d[\d.,]*")
+_UNIDADE = re.compile(r"-?\d[\d.,]*\s*([A-Za-z]+)")
+_DATA = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{2,4})")
+_DATA_ISO = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+def converter_numero(valor: Any) -> Optional[float]:
+    """Primeiro número do texto no formato brasileiro ("1.500", "13,8 KV", "250 CV")"""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    encontrado = _NUMERO.search(str(valor or ""))
+    if not encontrado:
+        return None
+    numero = encontrado.group().rstrip(".,")
+    if "," in numero:
+        numero = numero.replace(".", "").replace(",", ".")
+    elif numero.count(".") > 1 or re.fullmatch(r"-?\d{1,3}\.\d{3}", numero):
+        numero = numero.replace(".", "")  # Separador de milhar
+    try:
+        return float(numero)
+    except ValueError:
+        return None
+
+def converter_grandeza(valor: Any, unidades: Dict[str, float]) -> Optional[float]:
+    """Número convertido para a unidade da coluna pela unidade escrita após ele ("13,8 KV" -> 13800)"""
+    numero = converter_numero(valor)
+    if numero is None or isinstance(valor, (int, float)):
+        return numero
+    encontrada = _UNIDADE.search(str(valor))
+    fator = unidades.get(encontrada.group(1).upper(), 1.0) if encontrada else 1.0
+    return round(numero * fator, 6)
+
+def converter_data(valor: Any) -> Optional[date]:
+    """Datas dd/mm/aaaa (com ou sem hora) ou aaaa-mm-dd"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor or "")
+    encontrado = _DATA.search(texto)
+    try:
+        if encontrado:
+            dia, mes, ano = (int(g) for g in encontrado.groups())
+            return date(ano + 2000 if ano < 100 else ano, mes, dia)
+        encontrado = _DATA_ISO.search(texto)
+        if encontrado:
+            return date(*(int(g) for g in encontrado.groups()))
+    except ValueError:
+        return None
+    return None
+
+def extrair_campos_tipados(os_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Valores das colunas tipadas de os_dados_externos (None quando ausentes ou inválidos)"""
+    campos = {}
+    for coluna, (chaves, tipo) in CAMPOS_TIPADOS.items():
+        bruto = next((os_data[c] for c in chaves if str(os_data.get(c) or "").strip()), None)
+        if bruto is None:
+            campos[coluna] = None
+        elif tipo == "numero":
+            campos[coluna] = converter_grandeza(bruto, UNIDADES.get(coluna, {}))
+        elif tipo == "data":
+            campos[coluna] = converter_data(bruto)
+        elif tipo == "documento":
+            campos[coluna] = re.sub(r"\D", "", str(bruto))[:14] or None
+        else:
+            campos[coluna] = str(bruto).strip()[:200]
+    if campos["rotacao_rpm"] is not None:
+        campos["rotacao_rpm"] = int(campos["rotacao_rpm"])
+    return campos
+
+def comprimir_payload(os_data: Dict[str, Any]) -> bytes:
+    """JSON compacto (sem campos vazios) comprimido com zlib"""
+    preenchidos = {k: v for k, v in os_data.items() if v not in ("", None)}
+    vazios = sorted(k for k, v in os_data.items() if v in ("", None))
+    conteudo = json.dumps({"c": preenchidos, "v": vazios}, ensure_ascii=False, separators=(",", ":"), default=str)
+    return zlib.compress(conteudo.encode("utf-8"), 9)
+
+def descomprimir_payload(dados: Optional[bytes]) -> Dict[str, Any]:
+    """Payload completo: campos preenchidos + chaves vazias restauradas com ''"""
+    if not dados:
+        return {}
+    conteudo = json.loads(zlib.decompress(dados).decode("utf-8"))
+    payload = {chave: "" for chave in conteudo.get("v", [])}
+    payload.update(conteudo.get("c", {}))
+    return payload
+
+def carregar_payload(registro) -> Dict[str, Any]:
+    """Payload completo de um OsDadosExternos"""
+    return descomprimir_payload(registro.payload_zlib)
+
+def serializar_dados_externos(registro) -> Dict[str, Any]:
+    """Resposta da API: colunas tipadas, metadados da coleta e payload completo"""
+    campos = {}
+    for coluna in CAMPOS_TIPADOS:
+        valor = getattr(registro, coluna)
+        campos[coluna] = valor.isoformat() if isinstance(valor, date) else valor
+    return {
+        "numero_os": registro.os_numero,
+        "status_os": registro.status_os,
+        "scraped_at": registro.scraped_at.isoformat() if registro.scraped_at else None,
+        "alterado_em": registro.alterado_em.isoformat() if registro.alterado_em else None,
+        "campos": campos,
+        "payload": carregar_payload(registro)
+    }
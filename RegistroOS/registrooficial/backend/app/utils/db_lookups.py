@@ -20,18 +20,17 @@ PADRÕES DE NOMENCLATURA:
 - enrich_with_names(): Enriquecimento de dados com nomes
 
 PERFORMANCE:
-- Queries otimizadas com filtros de ativo=True
+- Catálogos (departamentos, setores, tipos de máquina, atividades,
+  descrições, causas de retrabalho, tipos de teste) servidos pelo
+  catalog_cache em memória, com filtro de ativo=True
+- Recarga automática após commits que alteram o catálogo (CRUD de admin)
 - Mapeamentos em lote para reduzir consultas
-- Cache implícito via session do SQLAlchemy
 """
 
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, List
-from app.database_models import (
-    Departamento, Setor, TipoMaquina, TipoAtividade, 
-    TipoDescricaoAtividade, TipoCausaRetrabalho, TipoTeste,
-    Usuario, Cliente, Equipamento
-)
+from app.database_models import Usuario, Cliente, Equipamento
+from app.utils.catalog_cache import catalog_cache
 
 # =============================================================================
 # DEPARTAMENTO LOOKUPS
@@ -39,24 +38,16 @@ from app.database_models import (
 
 def get_departamento_id_by_nome(db: Session, nome_tipo: str) -> Optional[int]:
     """Busca ID do departamento pelo nome_tipo"""
-    departamento = db.query(Departamento).filter(
-        Departamento.nome_tipo == nome_tipo,
-        Departamento.ativo == True
-    ).first()
-    return departamento.id if departamento else None
+    return catalog_cache.id_por_nome(db, "departamentos", nome_tipo)
 
 def get_departamento_nome_by_id(db: Session, departamento_id: int) -> Optional[str]:
     """Busca nome_tipo do departamento pelo ID"""
-    departamento = db.query(Departamento).filter(
-        Departamento.id == departamento_id,
-        Departamento.ativo == True
-    ).first()
-    return departamento.nome_tipo if departamento else None
+    departamento = catalog_cache.linha_por_id(db, "departamentos", departamento_id)
+    return departamento["nome_tipo"] if departamento else None
 
 def get_all_departamentos_map(db: Session) -> Dict[str, int]:
     """Retorna mapeamento nome_tipo → ID para todos os departamentos ativos"""
-    departamentos = db.query(Departamento).filter(Departamento.ativo == True).all()
-    return {dept.nome_tipo: dept.id for dept in departamentos}
+    return catalog_cache.mapa_nomes(db, "departamentos")
 
 def validate_departamento_exists(db: Session, nome_tipo: str) -> bool:
     """Verifica se departamento existe e está ativo"""
@@ -64,11 +55,7 @@ def validate_departamento_exists(db: Session, nome_tipo: str) -> bool:
 
 def validate_departamento_exists_by_id(db: Session, departamento_id: int) -> bool:
     """Verifica se departamento existe e está ativo pelo ID"""
-    departamento = db.query(Departamento).filter(
-        Departamento.id == departamento_id,
-        Departamento.ativo == True
-    ).first()
-    return departamento is not None
+    return catalog_cache.linha_por_id(db, "departamentos", departamento_id) is not None
 
 # =============================================================================
 # SETOR LOOKUPS
@@ -76,24 +63,16 @@ def validate_departamento_exists_by_id(db: Session, departamento_id: int) -> boo
 
 def get_setor_id_by_nome(db: Session, nome: str) -> Optional[int]:
     """Busca ID do setor pelo nome"""
-    setor = db.query(Setor).filter(
-        Setor.nome == nome,
-        Setor.ativo == True
-    ).first()
-    return setor.id if setor else None
+    return catalog_cache.id_por_nome(db, "setores", nome)
 
 def get_setor_nome_by_id(db: Session, setor_id: int) -> Optional[str]:
     """Busca nome do setor pelo ID"""
-    setor = db.query(Setor).filter(
-        Setor.id == setor_id,
-        Setor.ativo == True
-    ).first()
-    return setor.nome if setor else None
+    setor = catalog_cache.linha_por_id(db, "setores", setor_id)
+    return setor["nome"] if setor else None
 
 def get_all_setores_map(db: Session) -> Dict[str, int]:
     """Retorna mapeamento nome → ID para todos os setores ativos"""
-    setores = db.query(Setor).filter(Setor.ativo == True).all()
-    return {setor.nome: setor.id for setor in setores}
+    return catalog_cache.mapa_nomes(db, "setores")
 
 def validate_setor_exists(db: Session, nome: str) -> bool:
     """Verifica se setor existe e está ativo"""
@@ -101,28 +80,20 @@ def validate_setor_exists(db: Session, nome: str) -> bool:
 
 def validate_setor_exists_by_id(db: Session, setor_id: int) -> bool:
     """Verifica se setor existe e está ativo pelo ID"""
-    setor = db.query(Setor).filter(
-        Setor.id == setor_id,
-        Setor.ativo == True
-    ).first()
-    return setor is not None
+    return catalog_cache.linha_por_id(db, "setores", setor_id) is not None
 
 def validate_setor_belongs_to_departamento(db: Session, setor_id: int, departamento_id: int) -> bool:
     """Verifica se setor pertence ao departamento especificado"""
-    setor = db.query(Setor).filter(
-        Setor.id == setor_id,
-        Setor.id_departamento == departamento_id,
-        Setor.ativo == True
-    ).first()
-    return setor is not None
+    setor = catalog_cache.linha_por_id(db, "setores", setor_id)
+    return setor is not None and setor["id_departamento"] == departamento_id
 
 def get_setores_by_departamento_id(db: Session, departamento_id: int) -> List[Dict]:
     """Retorna todos os setores de um departamento"""
-    setores = db.query(Setor).filter(
-        Setor.id_departamento == departamento_id,
-        Setor.ativo == True
-    ).all()
-    return [{"id": s.id, "nome": s.nome, "area_tipo": s.area_tipo} for s in setores]
+    return [
+        {"id": s["id"], "nome": s["nome"], "area_tipo": s["area_tipo"]}
+        for s in catalog_cache.linhas(db, "setores")
+        if s["id_departamento"] == departamento_id
+    ]
 
 # =============================================================================
 # TIPO MÁQUINA LOOKUPS
@@ -130,24 +101,16 @@ def get_setores_by_departamento_id(db: Session, departamento_id: int) -> List[Di
 
 def get_tipo_maquina_id_by_nome(db: Session, nome_tipo: str) -> Optional[int]:
     """Busca ID do tipo de máquina pelo nome_tipo"""
-    tipo = db.query(TipoMaquina).filter(
-        TipoMaquina.nome_tipo == nome_tipo,
-        TipoMaquina.ativo == True
-    ).first()
-    return tipo.id if tipo else None
+    return catalog_cache.id_por_nome(db, "tipos_maquina", nome_tipo)
 
 def get_tipo_maquina_nome_by_id(db: Session, tipo_id: int) -> Optional[str]:
     """Busca nome_tipo do tipo de máquina pelo ID"""
-    tipo = db.query(TipoMaquina).filter(
-        TipoMaquina.id == tipo_id,
-        TipoMaquina.ativo == True
-    ).first()
-    return tipo.nome_tipo if tipo else None
+    tipo = catalog_cache.linha_por_id(db, "tipos_maquina", tipo_id)
+    return tipo["nome_tipo"] if tipo else None
 
 def get_all_tipos_maquina_map(db: Session) -> Dict[str, int]:
     """Retorna mapeamento nome_tipo → ID para todos os tipos de máquina ativos"""
-    tipos = db.query(TipoMaquina).filter(TipoMaquina.ativo == True).all()
-    return {tipo.nome_tipo: tipo.id for tipo in tipos}
+    return catalog_cache.mapa_nomes(db, "tipos_maquina")
 
 # =============================================================================
 # TIPO ATIVIDADE LOOKUPS
@@ -155,19 +118,33 @@ def get_all_tipos_maquina_map(db: Session) -> Dict[str, int]:
 
 def get_tipo_atividade_id_by_nome(db: Session, nome_tipo: str) -> Optional[int]:
     """Busca ID do tipo de atividade pelo nome_tipo"""
-    tipo = db.query(TipoAtividade).filter(
-        TipoAtividade.nome_tipo == nome_tipo,
-        TipoAtividade.ativo == True
-    ).first()
-    return tipo.id if tipo else None
+    return catalog_cache.id_por_nome(db, "tipos_atividade", nome_tipo)
 
 def get_tipo_atividade_nome_by_id(db: Session, tipo_id: int) -> Optional[str]:
     """Busca nome_tipo do tipo de atividade pelo ID"""
-    tipo = db.query(TipoAtividade).filter(
-        TipoAtividade.id == tipo_id,
-        TipoAtividade.ativo == True
-    ).first()
-    return tipo.nome_tipo if tipo else None
+    tipo = catalog_cache.linha_por_id(db, "tipos_atividade", tipo_id)
+    return tipo["nome_tipo"] if tipo else None
+
+# =============================================================================
+# DESCRIÇÃO DE ATIVIDADE / CAUSA DE RETRABALHO / TIPO DE TESTE LOOKUPS
+# =============================================================================
+
+def get_descricao_atividade_id_by_codigo(db: Session, codigo: str) -> Optional[int]:
+    """Busca ID da descrição de atividade pelo código"""
+    return catalog_cache.id_por_nome(db, "descricoes_atividade", codigo)
+
+def get_causa_retrabalho_id_by_codigo(db: Session, codigo: str) -> Optional[int]:
+    """Busca ID da causa de retrabalho pelo código"""
+    return catalog_cache.id_por_nome(db, "causas_retrabalho", codigo)
+
+def get_tipo_teste_id_by_nome(db: Session, nome: str) -> Optional[int]:
+    """Busca ID do tipo de teste pelo nome"""
+    return catalog_cache.id_por_nome(db, "tipos_teste", nome)
+
+def get_tipo_teste_nome_by_id(db: Session, tipo_id: int) -> Optional[str]:
+    """Busca nome do tipo de teste pelo ID"""
+    tipo = catalog_cache.linha_por_id(db, "tipos_teste", tipo_id)
+    return tipo["nome"] if tipo else None
 
 # =============================================================================
 # USUÁRIO LOOKUPS
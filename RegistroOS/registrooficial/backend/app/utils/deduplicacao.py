@@ -0,0 +1,413 @@
+"""
+Deduplicação de Clientes e Equipamentos - RegistroOS
+====================================================
+
+Índice dedicado para reconhecer clientes/equipamentos já cadastrados quando
+o scraping traz um nome ou documento (CNPJ/CPF, fabricante + nº de série):
+
+- dedup_chaves: hash do nome normalizado e do documento → busca indexada
+  (O(log n)) para correspondências exatas
+- dedup_trigramas: trigramas do nome normalizado → similaridade de Jaccard
+  (mesma ideia do pg_trgm) para variações de grafia
+
+Normalização do nome: sem acentos, regras de limpar_texto, sem pontuação e
+sem termos societários (LTDA, S/A, ME, EPP...). "WEG" não casa mais com
+"WEGNER" como no LIKE '%...%' anterior.
+
+MANUTENÇÃO DO ÍNDICE:
+- Inclusões: antes de cada resolução as linhas com id acima do último
+  indexado são incluídas (cadastros feitos fora do scraping)
+- Alterações e exclusões via Session (ORM): eventos after_flush reindexam
+  ou removem as chaves na mesma transação
+- SQL direto (UPDATE/DELETE textual, rowid reaproveitado no SQLite):
+  reconciliar_indice_dedup() compara os hashes esperados com os gravados e
+  corrige as divergências; executado pela task periódica de limpeza
+
+USO:
+    candidato = melhor_candidato(db, "cliente", {"razao_social": nome, "cnpj_cpf": cnpj})
+    ids = resolver_ou_criar_lote(db, "cliente", registros, criar=funcao_que_insere)
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import weakref
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, inspect, literal_column, select
+from sqlalchemy.orm import Session
+
+from app.database_models import Cliente, Equipamento, DedupChave, DedupTrigrama
+from app.utils.busca_textual import normalizar_busca
+from app.utils.response_cache import TTLLRUCache
+
+logger = logging.getLogger(__name__)
+
+LIMIAR_SIMILARIDADE = float(os.getenv("DEDUP_LIMIAR_SIMILARIDADE", "0.75"))
+MAX_CANDIDATOS = 20
+FREQUENCIA_TTL = int(os.getenv("DEDUP_FREQUENCIA_TTL", "3600"))
+
+_tabelas_por_engine: "weakref.WeakKeyDictionary[Any, bool]" = weakref.WeakKeyDictionary()
+_cache_frequencias = TTLLRUCache(max_entries=100000)
+
+# Termos que não distinguem empresas/equipamentos entre si
+PALAVRAS_IGNORADAS = {
+    "LTDA", "LTD", "ME", "EPP", "EIRELI", "SA", "S", "A", "CIA", "E", "DE", "DA", "DO", "DAS", "DOS",
+}
+SERIES_INVALIDAS = {"NA", "SN", "SEM", "NAO", "INFORMADO", "0", "00", "000"}
+
+# entidade → modelo, coluna do nome e colunas usadas no documento
+ENTIDADES: Dict[str, Dict[str, Any]] = {
+    "cliente": {"modelo": Cliente, "nome": "razao_social", "documento": ["cnpj_cpf"]},
+    "equipamento": {"modelo": Equipamento, "nome": "descricao", "documento": ["fabricante", "numero_serie"]},
+}
+
+@dataclass
+class Candidato:
+    ref_id: int
+    score: float
+    criterio: str  # documento, nome, similaridade
+
+# =============================================================================
+# NORMALIZAÇÃO
+# =============================================================================
+
+def normalizar_nome(texto: Optional[str]) -> str:
+    """Nome comparável: sem acentos/pontuação e sem termos societários"""
+    termos = re.findall(r"[A-Z0-9]+", normalizar_busca(texto))
+    return " ".join(t for t in termos if t not in PALAVRAS_IGNORADAS)
+
+def normalizar_documento(entidade: str, registro: Dict[str, Any]) -> Optional[str]:
+    """CNPJ/CPF (só dígitos) ou FABRICANTE|SERIE; None quando ausente/inválido"""
+    if entidade == "cliente":
+        digitos = re.sub(r"\D", "", str(registro.get("cnpj_cpf") or ""))
+        if len(digitos) not in (11, 14) or len(set(digitos)) == 1:
+            return None
+        return digitos
+    serie = "".join(re.findall(r"[A-Z0-9]+", normalizar_busca(registro.get("numero_serie"))))
+    if len(serie) < 4 or serie in SERIES_INVALIDAS:
+        return None
+    return f"{normalizar_nome(registro.get('fabricante'))}|{serie}"
+
+def trigramas(nome_normalizado: str) -> Set[str]:
+    """Trigramas por palavra, com as bordas marcadas como no pg_trgm"""
+    resultado = set()
+    for palavra in nome_normalizado.split():
+        marcada = f"  {palavra} "
+        resultado.update(marcada[i:i + 3] for i in range(len(marcada) - 2))
+    return resultado
+
+def _hash(valor: str) -> str:
+    return hashlib.sha1(valor.encode()).hexdigest()[:16]
+
+def _chaves(entidade: str, registro: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    return normalizar_nome(registro.get(ENTIDADES[entidade]["nome"])), normalizar_documento(entidade, registro)
+
+# =============================================================================
+# MANUTENÇÃO DO ÍNDICE
+# =============================================================================
+
+def registrar(db, entidade: str, ref_id: int, registro: Dict[str, Any]) -> None:
+    """Reindexa um cliente/equipamento já indexado (ex.: nome alterado), sem commit"""
+    db.execute(delete(DedupChave).where(DedupChave.entidade == entidade, DedupChave.ref_id == ref_id))
+    db.execute(delete(DedupTrigrama).where(DedupTrigrama.entidade == entidade, DedupTrigrama.ref_id == ref_id))
+    _inserir_chaves(db, entidade, [(ref_id, registro)])
+
+def _inserir_chaves(db, entidade: str, linhas: Sequence[Tuple[int, Dict[str, Any]]]) -> None:
+    chaves, trigramas_linhas = [], []
+    for ref_id, registro in linhas:
+        nome, documento = _chaves(entidade, registro)
+        if documento:
+            chaves.append({"entidade": entidade, "ref_id": ref_id, "tipo": "documento", "hash": _hash(documento)})
+        if nome:
+            chaves.append({"entidade": entidade, "ref_id": ref_id, "tipo": "nome", "hash": _hash(nome)})
+            trigramas_linhas.extend({"entidade": entidade, "trigrama": t, "ref_id": ref_id} for t in trigramas(nome))
+    if chaves:
+        db.execute(insert(DedupChave), chaves)
+    if trigramas_linhas:
+        db.execute(insert(DedupTrigrama), trigramas_linhas)
+        _contar_novos_trigramas(entidade, trigramas_linhas)
+
+def sincronizar_indice(db, entidade: str) -> int:
+    """Indexa as linhas da tabela de origem com id acima do último indexado"""
+    config = ENTIDADES[entidade]
+    modelo = config["modelo"]
+    ultimo = db.execute(
+        select(func.max(DedupChave.ref_id)).where(DedupChave.entidade == entidade)
+    ).scalar() or 0
+
+    colunas = [config["nome"]] + config["documento"]
+    resultado = db.execute(
+        select(modelo.id, *[getattr(modelo, c) for c in colunas]).where(modelo.id > ultimo).order_by(modelo.id)
+    ).fetchall()
+    _inserir_chaves(db, entidade, [(linha[0], dict(zip(colunas, linha[1:]))) for linha in resultado])
+    if resultado:
+        logger.debug(f"🔎 Deduplicação: {len(resultado)} registro(s) de {entidade} indexado(s)")
+    return len(resultado)
+
+def reconstruir_indice_dedup(db) -> int:
+    """Apaga e reconstrói o índice das duas entidades (sem commit)"""
+    db.execute(delete(DedupChave))
+    db.execute(delete(DedupTrigrama))
+    return sum(sincronizar_indice(db, entidade) for entidade in ENTIDADES)
+
+def remover(db, entidade: str, ref_ids: Sequence[int]) -> None:
+    """Remove do índice os registros informados (sem commit)"""
+    for inicio in range(0, len(ref_ids), 500):
+        lote = list(ref_ids[inicio:inicio + 500])
+        db.execute(delete(DedupChave).where(DedupChave.entidade == entidade, DedupChave.ref_id.in_(lote)))
+        db.execute(delete(DedupTrigrama).where(DedupTrigrama.entidade == entidade, DedupTrigrama.ref_id.in_(lote)))
+
+def reconciliar_indice_dedup(db) -> int:
+    """
+    Corrige o índice para escritas que não passaram pelos eventos de Session:
+    registros com chaves divergentes são reindexados e chaves de registros
+    inexistentes são removidas. Retorna o nº de registros corrigidos (sem commit).
+    """
+    corrigidos = 0
+    for entidade, config in ENTIDADES.items():
+        modelo = config["modelo"]
+        colunas = [config["nome"]] + config["documento"]
+        registros = {
+            linha[0]: dict(zip(colunas, linha[1:]))
+            for linha in db.execute(select(modelo.id, *[getattr(modelo, c) for c in colunas]))
+        }
+        esperadas: Dict[int, Set[Tuple[str, str]]] = {}
+        for ref_id, registro in registros.items():
+            nome, documento = _chaves(entidade, registro)
+            esperadas[ref_id] = {(tipo, _hash(valor)) for tipo, valor in (("nome", nome), ("documento", documento)) if valor}
+
+        gravadas: Dict[int, Set[Tuple[str, str]]] = defaultdict(set)
+        for ref_id, tipo, valor_hash in db.execute(
+            select(DedupChave.ref_id, DedupChave.tipo, DedupChave.hash).where(DedupChave.entidade == entidade)
+        ):
+            gravadas[ref_id].add((tipo, valor_hash))
+
+        divergentes = sorted(
+            ref_id for ref_id in set(esperadas) | set(gravadas)
+            if esperadas.get(ref_id, set()) != gravadas.get(ref_id, set())
+        )
+        if not divergentes:
+            continue
+        remover(db, entidade, divergentes)
+        _inserir_chaves(db, entidade, [(ref_id, registros[ref_id]) for ref_id in divergentes if ref_id in registros])
+        corrigidos += len(divergentes)
+        logger.info(f"🔎 Deduplicação: {len(divergentes)} registro(s) de {entidade} reconciliado(s)")
+    return corrigidos
+
+# =============================================================================
+# EVENTOS DE SESSION (alterações e exclusões via ORM)
+# =============================================================================
+
+def _indice_disponivel(conexao) -> bool:
+    """Tabelas do índice existem neste banco (verificado uma vez por engine)"""
+    if conexao.engine not in _tabelas_por_engine:
+        _tabelas_por_engine[conexao.engine] = inspect(conexao).has_table(DedupChave.__tablename__)
+    return _tabelas_por_engine[conexao.engine]
+
+def _entidade_do_objeto(objeto) -> Optional[str]:
+    for entidade, config in ENTIDADES.items():
+        if isinstance(objeto, config["modelo"]):
+            return entidade
+    return None
+
+@event.listens_for(Session, "after_flush")
+def _manter_indice(session, flush_context):
+    _ = flush_context  # Silenciar warning
+    alterados: Dict[str, Dict[int, Any]] = defaultdict(dict)
+    excluidos: Dict[str, List[int]] = defaultdict(list)
+    for objeto in session.dirty:
+        entidade = _entidade_do_objeto(objeto)
+        if entidade is None or objeto.id is None:
+            continue
+        colunas = [ENTIDADES[entidade]["nome"]] + ENTIDADES[entidade]["documento"]
+        estado = inspect(objeto)
+        if any(estado.attrs[coluna].history.has_changes() for coluna in colunas):
+            alterados[entidade][objeto.id] = {coluna: getattr(objeto, coluna) for coluna in colunas}
+    for objeto in session.deleted:
+        entidade = _entidade_do_objeto(objeto)
+        if entidade is not None and objeto.id is not None:
+            excluidos[entidade].append(objeto.id)
+
+    if not alterados and not excluidos:
+        return
+    conexao = session.connection()
+    if not _indice_disponivel(conexao):
+        return
+    for entidade in set(alterados) | set(excluidos):
+        # Alcança primeiro as inclusões pendentes: reindexar um id acima do
+        # último indexado faria o sincronizar_indice pular os anteriores
+        sincronizar_indice(conexao, entidade)
+        remover(conexao, entidade, excluidos[entidade] + list(alterados[entidade]))
+        _inserir_chaves(conexao, entidade, list(alterados[entidade].items()))
+
+# =============================================================================
+# RESOLUÇÃO
+# =============================================================================
+
+def garantir_tabelas_dedup(db) -> None:
+    """Cria as tabelas do índice se não existirem (bancos sem a migração 006)"""
+    conexao = db.connection()
+    if _tabelas_por_engine.get(conexao.engine):
+        return
+    for modelo in (DedupChave, DedupTrigrama):
+        modelo.__table__.create(bind=conexao, checkfirst=True)
+    _tabelas_por_engine[conexao.engine] = True
+
+def _contar_novos_trigramas(entidade: str, linhas: Sequence[Dict[str, Any]]) -> None:
+    """Soma os registros recém-indexados às frequências já em cache neste processo"""
+    novos: Dict[str, int] = defaultdict(int)
+    for linha in linhas:
+        novos[linha["trigrama"]] += 1
+    for trigrama, quantidade in novos.items():
+        chave = f"{entidade}:{trigrama}"
+        encontrado, valor = _cache_frequencias.get(chave)
+        if encontrado:
+            _cache_frequencias.set(chave, valor + quantidade, FREQUENCIA_TTL)
+
+def _frequencias(db, entidade: str, conjunto: Set[str]) -> Dict[str, int]:
+    """
+    Nº de registros por trigrama. Só contagens positivas entram no cache (por
+    FREQUENCIA_TTL): um trigrama com 0 registros fica fora do prefixo, então
+    um zero defasado esconderia candidatos cadastrados depois (inclusive por
+    outro processo). Uma contagem positiva defasada só altera a ordem dos
+    trigramas no prefixo (desempenho), não o resultado; as inclusões deste
+    processo são somadas por _inserir_chaves.
+    """
+    frequencia, faltantes = {}, []
+    for trigrama in conjunto:
+        encontrado, valor = _cache_frequencias.get(f"{entidade}:{trigrama}")
+        if encontrado:
+            frequencia[trigrama] = valor
+        else:
+            faltantes.append(trigrama)
+
+    if faltantes:
+        contagens = dict(db.execute(
+            select(DedupTrigrama.trigrama, func.count())
+            .where(DedupTrigrama.entidade == entidade, DedupTrigrama.trigrama.in_(faltantes))
+            .group_by(DedupTrigrama.trigrama)
+        ).fetchall())
+        for trigrama in faltantes:
+            frequencia[trigrama] = contagens.get(trigrama, 0)
+            if frequencia[trigrama]:
+                _cache_frequencias.set(f"{entidade}:{trigrama}", frequencia[trigrama], FREQUENCIA_TTL)
+    return frequencia
+
+def resolver_lote(db, entidade: str, registros: Sequence[Dict[str, Any]]) -> List[Optional[Candidato]]:
+    """
+    Melhor candidato existente para cada registro (None se nenhum atinge o
+    limiar). Uma consulta de hashes para o lote inteiro; os nomes sem
+    correspondência exata consultam apenas o prefixo de trigramas mais raros.
+    """
+    garantir_tabelas_dedup(db)
+    sincronizar_indice(db, entidade)
+    chaves = [_chaves(entidade, registro) for registro in registros]
+    resultado: List[Optional[Candidato]] = [None] * len(registros)
+
+    # 1) Correspondência exata de documento ou nome normalizado
+    hashes = {_hash(valor) for par in chaves for valor in par if valor}
+    encontrados: Dict[Tuple[str, str], int] = {}
+    if hashes:
+        for tipo, valor_hash, ref_id in db.execute(
+            select(DedupChave.tipo, DedupChave.hash, func.min(DedupChave.ref_id))
+            .where(DedupChave.entidade == entidade, DedupChave.hash.in_(hashes))
+            .group_by(DedupChave.tipo, DedupChave.hash)
+        ):
+            encontrados[(tipo, valor_hash)] = ref_id
+
+    pendentes = []
+    for indice, (nome, documento) in enumerate(chaves):
+        if documento and ("documento", _hash(documento)) in encontrados:
+            resultado[indice] = Candidato(encontrados[("documento", _hash(documento))], 1.0, "documento")
+        elif nome and ("nome", _hash(nome)) in encontrados:
+            resultado[indice] = Candidato(encontrados[("nome", _hash(nome))], 1.0, "nome")
+        elif nome:
+            pendentes.append((indice, trigramas(nome)))
+
+    # 2) Similaridade por trigramas para o que sobrou (filtro de prefixo)
+    todos_trigramas = set().union(*(conjunto for _, conjunto in pendentes)) if pendentes else set()
+    if not todos_trigramas:
+        return resultado
+
+    # Jaccard >= limiar exige |A ∩ B| >= limiar * |A|: todo candidato contém ao
+    # menos um dos (|A| - ceil(limiar * |A|) + 1) trigramas mais raros de A
+    frequencia = _frequencias(db, entidade, todos_trigramas)
+
+    prefixos: Dict[int, List[str]] = {}
+    for indice, conjunto in pendentes:
+        tamanho_prefixo = len(conjunto) - math.ceil(LIMIAR_SIMILARIDADE * len(conjunto)) + 1
+        raros = sorted((t for t in conjunto if frequencia[t]), key=lambda t: (frequencia[t], t))
+        if len(conjunto) - len(raros) < tamanho_prefixo:
+            prefixos[indice] = raros[:tamanho_prefixo - (len(conjunto) - len(raros))]
+
+    # SQLite: agrupar por "ref_id + 0" impede o planejador de percorrer
+    # ix_dedup_trigramas_ref (a entidade inteira) só para evitar a ordenação.
+    # A mesma expressão vai no SELECT, GROUP BY e ORDER BY (SQL padrão); os
+    # demais bancos agrupam pela coluna
+    ref_agrupado = DedupTrigrama.ref_id + literal_column("0") if db.get_bind().dialect.name == "sqlite" else DedupTrigrama.ref_id
+
+    mais_provaveis: Dict[int, List[int]] = {}
+    for indice, lista in prefixos.items():
+        mais_provaveis[indice] = list(db.execute(
+            select(ref_agrupado)
+            .where(DedupTrigrama.entidade == entidade, DedupTrigrama.trigrama.in_(lista))
+            .group_by(ref_agrupado)
+            .order_by(func.count().desc(), ref_agrupado)
+            .limit(MAX_CANDIDATOS)
+        ).scalars())
+
+    # Verificação: conjuntos completos dos candidatos (índice ix_dedup_trigramas_ref)
+    ids_candidatos = sorted({ref_id for lista in mais_provaveis.values() for ref_id in lista})
+    conjuntos: Dict[int, Set[str]] = defaultdict(set)
+    for ref_id, trigrama in db.execute(
+        select(DedupTrigrama.ref_id, DedupTrigrama.trigrama)
+        .where(DedupTrigrama.entidade == entidade, DedupTrigrama.ref_id.in_(ids_candidatos))
+    ) if ids_candidatos else ():
+        conjuntos[ref_id].add(trigrama)
+
+    for indice, conjunto in pendentes:
+        melhor = None
+        for ref_id in mais_provaveis.get(indice, ()):
+            outro = conjuntos.get(ref_id, set())
+            score = len(conjunto & outro) / len(conjunto | outro) if outro else 0.0
+            if score >= LIMIAR_SIMILARIDADE and (melhor is None or score > melhor.score):
+                melhor = Candidato(ref_id, round(score, 3), "similaridade")
+        resultado[indice] = melhor
+    return resultado
+
+def melhor_candidato(db, entidade: str, registro: Dict[str, Any]) -> Optional[Candidato]:
+    """Melhor candidato existente para um único registro"""
+    return resolver_lote(db, entidade, [registro])[0]
+
+def resolver_ou_criar_lote(
+    db,
+    entidade: str,
+    registros: Sequence[Dict[str, Any]],
+    criar: Callable[[Dict[str, Any]], Optional[int]]
+) -> List[Optional[int]]:
+    """
+    Resolve o lote e cria (via `criar`) os registros sem correspondência.
+    Repetições dentro do próprio lote reaproveitam o registro recém-criado.
+    """
+    candidatos = resolver_lote(db, entidade, registros)
+    ids: List[Optional[int]] = []
+    criados = False
+    for registro, candidato in zip(registros, candidatos):
+        if candidato is None and criados:
+            candidato = melhor_candidato(db, entidade, registro)
+        if candidato is not None:
+            ids.append(candidato.ref_id)
+            continue
+
+        novo_id = criar(registro)
+        if novo_id is not None:
+            # Indexa pelo id (inclui o novo e qualquer cadastro anterior ainda não indexado)
+            sincronizar_indice(db, entidade)
+            criados = True
+        ids.append(novo_id)
+    return ids
@@ -0,0 +1,389 @@
+"""
+Fila de scraping com prioridade, justiça por usuário e contrapressão - RegistroOS
+================================================================================
+
+O site externo comporta poucas sessões simultâneas (SCRAPING_SLOTS, o mesmo
+número de processos do worker). Cada scraping - consulta interativa de uma
+OS, item de lote ou revalidação - pede a sua "vez" antes de acessar o site:
+
+- Consultas interativas (uma OS, usuário aguardando) passam na frente de
+  qualquer item de lote e podem usar todos os slots
+- Itens de lote (e revalidações) nunca ocupam os slots reservados para
+  consultas interativas e são intercalados por usuário (round-robin): um
+  lote de 100 OS não atrasa o lote de 5 OS de outro usuário
+- Admissão com limite de profundidade por fila: acima do limite a API
+  responde 429 com Retry-After calculado pela vazão recente
+- status() estima a espera de cada fila pela vazão dos últimos minutos
+
+BACKENDS:
+- auto (padrão): redis quando o Celery está em uso (instalado e com broker
+  acessível, ver config/scraping_config.py), memory caso contrário
+- memory: estado por processo (API sem Celery)
+- redis: estado compartilhado entre API e workers (REDIS_URL, o mesmo do
+  Celery), atualizado em transação otimista (WATCH/MULTI). Com Celery,
+  Redis indisponível é erro: cada worker teria os próprios slots e o limite
+  do site deixaria de valer, então cada operação tenta reconectar e levanta
+  RuntimeError. Sem Celery, cai para memória e reconecta com backoff
+  (conexão em app/utils/redis_compartilhado.py)
+
+CONFIGURAÇÃO (variáveis de ambiente):
+- SCRAPING_QUEUE_BACKEND: auto | memory | redis
+- SCRAPING_SLOTS: scrapings simultâneos no site (padrão 3)
+- SCRAPING_SLOTS_INTERATIVOS: slots reservados às consultas interativas (padrão 1)
+- SCRAPING_FILA_MAX_INTERATIVO: consultas interativas pendentes (padrão 30)
+- SCRAPING_FILA_MAX_LOTE: itens de lote pendentes (padrão 300)
+- SCRAPING_FILA_MAX_LOTE_USUARIO: itens de lote pendentes por usuário (padrão 150)
+- SCRAPING_JANELA_VAZAO: segundos considerados na vazão recente (padrão 900)
+
+USO:
+    admissao = fila_scraping.admitir("lote", user_id, task_id, itens=len(os_numbers))
+    if not admissao.aceita: ...  # 429 com admissao.retry_after
+    with fila_scraping.vez("lote", user_id, f"{task_id}:{indice}"):
+        execute_scraping(numero_os)
+    fila_scraping.encerrar(task_id)
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from app.utils.redis_compartilhado import ConexaoRedis, REDIS_URL, redis
+from config.scraping_config import celery_utilizavel
+
+logger = logging.getLogger(__name__)
+
+INTERATIVO = "interativo"
+LOTE = "lote"
+CLASSES = (INTERATIVO, LOTE)
+
+# Prioridades do Celery com broker Redis: 0 é a MAIS alta (ordem inversa do RabbitMQ)
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_REVALIDACAO = 6
+PRIORIDADE_LOTE = 9
+
+# Opções do transporte Redis para as prioridades acima: precisam estar no app
+# que envia as tasks (filas por prioridade) e no worker (consumo em ordem)
+OPCOES_BROKER_PRIORIDADE = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+
+# Filas do Celery: lotes e revalidações (prioridade abaixo da interativa) vão
+# para uma fila própria. A prioridade ordena as tasks na fila, mas um lote em
+# execução ocupa o processo do worker por até 30 minutos; com um worker
+# dedicado aos lotes, os processos do worker interativo ficam livres:
+#   celery -A tasks.scraping_tasks worker -Q celery -c 2
+#   celery -A tasks.scraping_tasks worker -Q scraping_batch -c 1
+# (um worker sem -Q consome as duas filas, sem a reserva)
+FILA_CELERY_INTERATIVA = "celery"
+FILA_CELERY_LOTE = "scraping_batch"
+
+def rotear_por_prioridade(name, args, kwargs, options, task=None, **kw):
+    """Roteador do Celery (task_routes): prioridade abaixo da interativa vai para a fila de lotes"""
+    _ = name, args, kwargs, task, kw  # Silenciar warning
+    prioridade = options.get("priority")
+    if prioridade is not None and prioridade > PRIORIDADE_INTERATIVA:
+        return {"queue": FILA_CELERY_LOTE}
+    return None
+
+FILA_SCRAPING_CONFIG = {
+    "backend": os.getenv("SCRAPING_QUEUE_BACKEND", "auto").lower(),
+    "exigir_redis": celery_utilizavel(),  # API e workers em processos diferentes
+    "slots": max(1, int(os.getenv("SCRAPING_SLOTS", "3"))),
+    "slots_interativos": max(0, int(os.getenv("SCRAPING_SLOTS_INTERATIVOS", "1"))),
+    "max_interativo": int(os.getenv("SCRAPING_FILA_MAX_INTERATIVO", "30")),
+    "max_lote": int(os.getenv("SCRAPING_FILA_MAX_LOTE", "300")),
+    "max_lote_usuario": int(os.getenv("SCRAPING_FILA_MAX_LOTE_USUARIO", "150")),
+    "janela_vazao": int(os.getenv("SCRAPING_JANELA_VAZAO", "900")),
+    "segundos_por_os": float(os.getenv("SCRAPING_SECONDS_PER_OS", "15")),  # Vazão estimada sem histórico
+    "lease": 600,  # Slot de um processo que morreu volta após 10 minutos
+    "reserva_ttl": {INTERATIVO: 900, LOTE: 3600},
+    "espera_viva": 15,  # Pedido de vez sem renovação há 15s é descartado
+    "timeout_vez": {INTERATIVO: 120, LOTE: 1800},
+    "intervalo_consulta": 0.2,
+    "redis_url": REDIS_URL,
+    "chave_redis": "registroos:scraping:fila"
+}
+
+class Admissao(NamedTuple):
+    """Resultado de admitir: aceita ou recusada com Retry-After (segundos)"""
+    aceita: bool
+    retry_after: int
+    espera_estimada: int
+    motivo: Optional[str] = None
+
+def _estado_vazio() -> Dict[str, Any]:
+    return {
+        "ativos": {},       # ticket -> [classe, expira_em]
+        "espera": {},       # ticket -> [classe, usuario, entrou_em, vivo_em]
+        "atendido": {},     # usuario -> último item de lote iniciado (round-robin)
+        "reservas": {},     # ticket -> [classe, usuario, itens, expira_em]
+        "concluidas": {INTERATIVO: [], LOTE: []}  # instantes de conclusão (vazão)
+    }
+
+class FilaScraping:
+    """Escalonador das vezes no site externo (prioridade, round-robin e admissão)"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(FILA_SCRAPING_CONFIG, **(config or {}))
+        self._estado = _estado_vazio()
+        self._lock = threading.Lock()
+        self._remota = None  # Fila do processo da API (processos do executor local)
+        self.recusadas = {INTERATIVO: 0, LOTE: 0}
+
+        backend = self.config["backend"]
+        if backend == "auto":
+            backend = "redis" if self.config["exigir_redis"] else "memory"
+        # Com Celery, slots em memória seriam por worker e o limite do site
+        # deixaria de valer: Redis exigido
+        self._conexao = ConexaoRedis(
+            "Fila de scraping", self.config["redis_url"],
+            exigir=backend == "redis" and self.config["exigir_redis"], decode_responses=True
+        )
+        if backend == "redis":
+            self._conexao.iniciar()
+
+    def usar_fila_da_api(self, remota) -> None:
+        """
+        Processos do executor local: admissão, vez, consumo e reservas passam a
+        ser decididos pela fila do processo da API (proxy de multiprocessing)
+        """
+        self._remota = remota
+
+    # ---- Estado compartilhado ------------------------------------------------
+
+    def _transacao(self, operacao: Callable[[Dict[str, Any], float], Any]) -> Any:
+        """Aplica `operacao(estado, agora)` de forma atômica (Redis WATCH/MULTI ou lock local)"""
+        if self._conexao.usar():
+            try:
+                chave = self.config["chave_redis"]
+                with self._conexao.cliente.pipeline() as pipe:
+                    while True:
+                        try:
+                            pipe.watch(chave)
+                            bruto = pipe.get(chave)
+                            estado = json.loads(bruto) if bruto else _estado_vazio()
+                            resultado = operacao(estado, self._limpar(estado))
+                            pipe.multi()
+                            pipe.set(chave, json.dumps(estado, separators=(",", ":")), ex=86400)
+                            pipe.execute()
+                            return resultado
+                        except redis.WatchError:
+                            continue
+            except Exception as e:
+                self._conexao.falha(e)
+
+        with self._lock:
+            return operacao(self._estado, self._limpar(self._estado))
+
+    def _limpar(self, estado: Dict[str, Any]) -> float:
+        """Descarta slots, pedidos e reservas expirados; retorna o instante atual"""
+        agora = time.time()
+        for ticket, (_, expira) in list(estado["ativos"].items()):
+            if expira <= agora:
+                del estado["ativos"][ticket]
+        for ticket, pedido in list(estado["espera"].items()):
+            if pedido[3] + self.config["espera_viva"] <= agora:
+                del estado["espera"][ticket]
+        for ticket, reserva in list(estado["reservas"].items()):
+            if reserva[3] <= agora or reserva[2] <= 0:
+                del estado["reservas"][ticket]
+        limite = agora - self.config["janela_vazao"]
+        for classe in CLASSES:
+            estado["concluidas"][classe] = [t for t in estado["concluidas"][classe] if t > limite]
+        return agora
+
+    # ---- Vazão e estimativas -------------------------------------------------
+
+    def _slots_lote(self) -> int:
+        """Slots que itens de lote podem ocupar (ao menos um, para o lote sempre andar)"""
+        return max(1, self.config["slots"] - self.config["slots_interativos"])
+
+    def _vazao(self, estado: Dict[str, Any], classe: str, agora: float) -> float:
+        """OS por segundo concluídas na janela recente (ou estimativa pelos slots)"""
+        concluidas = estado["concluidas"][classe]
+        if concluidas:
+            janela = min(self.config["janela_vazao"], max(60.0, agora - min(concluidas)))
+            return len(concluidas) / janela
+        slots = self.config["slots"] if classe == INTERATIVO else self._slots_lote()
+        return slots / self.config["segundos_por_os"]
+
+    @staticmethod
+    def _pendentes(estado: Dict[str, Any], classe: str, usuario: Optional[str] = None) -> int:
+        return sum(r[2] for r in estado["reservas"].values()
+                   if r[0] == classe and (usuario is None or r[1] == usuario))
+
+    def _espera(self, estado: Dict[str, Any], classe: str, itens: int, agora: float) -> int:
+        return int(math.ceil(itens / self._vazao(estado, classe, agora)))
+
+    # ---- Admissão (contrapressão) --------------------------------------------
+
+    def admitir(self, classe: str, usuario: Any, ticket: str, itens: int = 1) -> Admissao:
+        """Reserva `itens` na fila da classe; recusa com Retry-After se a fila estiver cheia"""
+        if self._remota is not None:
+            return self._remota.admitir(classe, usuario, ticket, itens)
+        usuario = str(usuario)
+
+        def operacao(estado, agora):
+            pendentes = self._pendentes(estado, classe)
+            if classe == INTERATIVO:
+                excesso, motivo = pendentes + itens - self.config["max_interativo"], "fila_interativa_cheia"
+            else:
+                excesso, motivo = pendentes + itens - self.config["max_lote"], "fila_lote_cheia"
+                excesso_usuario = self._pendentes(estado, LOTE, usuario) + itens - self.config["max_lote_usuario"]
+                if excesso_usuario > 0 and excesso <= 0:
+                    excesso, motivo = excesso_usuario, "limite_lote_usuario"
+
+            if excesso > 0:
+                retry_after = min(3600, max(1, self._espera(estado, classe, excesso, agora)))
+                return Admissao(False, retry_after, self._espera(estado, classe, pendentes, agora), motivo)
+
+            estado["reservas"][ticket] = [classe, usuario, itens, agora + self.config["reserva_ttl"][classe]]
+            return Admissao(True, 0, self._espera(estado, classe, pendentes + itens, agora))
+
+        admissao = self._transacao(operacao)
+        if not admissao.aceita:
+            self.recusadas[classe] += 1
+            logger.warning(f"🚦 Scraping {classe} recusado para o usuário {usuario} ({admissao.motivo}), retry em {admissao.retry_after}s")
+        return admissao
+
+    def consumir(self, ticket: str, itens: int = 1) -> None:
+        """Abate itens processados da reserva (lotes)"""
+        if self._remota is not None:
+            self._remota.consumir(ticket, itens)
+            return
+
+        def operacao(estado, agora):
+            _ = agora  # Silenciar warning
+            reserva = estado["reservas"].get(ticket)
+            if reserva is not None:
+                reserva[2] -= itens
+        self._transacao(operacao)
+
+    def encerrar(self, ticket: str) -> None:
+        """Remove a reserva (task concluída, com erro ou cancelada)"""
+        if self._remota is not None:
+            self._remota.encerrar(ticket)
+            return
+        self._transacao(lambda estado, agora: estado["reservas"].pop(ticket, None))
+
+    # ---- Vez no site (prioridade e round-robin) ------------------------------
+
+    def _pode_iniciar(self, estado: Dict[str, Any], ticket: str) -> bool:
+        classe, usuario, entrou_em, _ = estado["espera"][ticket]
+        livres = self.config["slots"] - len(estado["ativos"])
+        if livres <= 0:
+            return False
+
+        interativos = sorted((p[2], t) for t, p in estado["espera"].items() if p[0] == INTERATIVO)
+        if classe == INTERATIVO:
+            return ticket in [t for _, t in interativos[:livres]]
+        if interativos:
+            return False  # Consultas interativas aguardando passam na frente
+
+        ativos_lote = sum(1 for c, _ in estado["ativos"].values() if c == LOTE)
+        if ativos_lote >= self._slots_lote():
+            return False
+
+        # Round-robin: usuário atendido há mais tempo; dentro do usuário, ordem de chegada
+        primeiros = {}
+        for t, (c, u, e, _) in estado["espera"].items():
+            if c == LOTE and (u not in primeiros or e < primeiros[u][0]):
+                primeiros[u] = (e, t)
+        proximo = min(primeiros, key=lambda u: (estado["atendido"].get(u, 0), primeiros[u][0]))
+        return proximo == usuario and primeiros[usuario][1] == ticket
+
+    def tentar_vez(self, classe: str, usuario: Any, ticket: str) -> bool:
+        """Registra/renova o pedido e ocupa um slot se for a vez do ticket"""
+        if self._remota is not None:
+            return self._remota.tentar_vez(classe, usuario, ticket)
+        usuario = str(usuario)
+
+        def operacao(estado, agora):
+            if ticket in estado["ativos"]:
+                return True
+            pedido = estado["espera"].setdefault(ticket, [classe, usuario, agora, agora])
+            pedido[3] = agora
+            if not self._pode_iniciar(estado, ticket):
+                return False
+            del estado["espera"][ticket]
+            estado["ativos"][ticket] = [classe, agora + self.config["lease"]]
+            if classe == LOTE:
+                estado["atendido"][usuario] = agora
+            return True
+
+        return self._transacao(operacao)
+
+    def sair(self, ticket: str, concluida: bool = True) -> None:
+        """Libera o slot (ou desiste da espera) e registra a conclusão para a vazão"""
+        if self._remota is not None:
+            self._remota.sair(ticket, concluida)
+            return
+
+        def operacao(estado, agora):
+            estado["espera"].pop(ticket, None)
+            ativo = estado["ativos"].pop(ticket, None)
+            if ativo is not None and concluida:
+                estado["concluidas"][ativo[0]].append(agora)
+        self._transacao(operacao)
+
+    @contextmanager
+    def vez(self, classe: str, usuario: Any, ticket: str, timeout: Optional[float] = None):
+        """Aguarda a vez do ticket no site; após o timeout segue sem slot (com aviso)"""
+        limite = time.monotonic() + (timeout if timeout is not None else self.config["timeout_vez"][classe])
+        inicio = time.monotonic()
+        while not self.tentar_vez(classe, usuario, ticket):
+            if time.monotonic() >= limite:
+                logger.warning(f"⚠️ Scraping {ticket} sem vez após {time.monotonic() - inicio:.0f}s, executando assim mesmo")
+                break
+            time.sleep(self.config["intervalo_consulta"])
+
+        espera = time.monotonic() - inicio
+        if espera >= 1:
+            logger.info(f"🚦 Scraping {classe} {ticket} aguardou {espera:.1f}s pela vez")
+        try:
+            yield espera
+        finally:
+            self.sair(ticket)
+
+    # ---- Status ----------------------------------------------------------------
+
+    def status(self) -> Dict[str, Any]:
+        """Profundidade, slots em uso, vazão recente e espera estimada por fila"""
+        if self._remota is not None:
+            return self._remota.status()
+
+        def operacao(estado, agora):
+            filas = {}
+            for classe in CLASSES:
+                pendentes = self._pendentes(estado, classe)
+                vazao = self._vazao(estado, classe, agora)
+                filas[classe] = {
+                    "pendentes": pendentes,
+                    "aguardando_vez": sum(1 for p in estado["espera"].values() if p[0] == classe),
+                    "em_execucao": sum(1 for c, _ in estado["ativos"].values() if c == classe),
+                    "limite": self.config["max_interativo"] if classe == INTERATIVO else self.config["max_lote"],
+                    "vazao_por_minuto": round(vazao * 60, 2),
+                    "concluidas_na_janela": len(estado["concluidas"][classe]),
+                    "espera_estimada_segundos": int(math.ceil(pendentes / vazao)),
+                    "recusadas": self.recusadas[classe]
+                }
+            filas[LOTE]["usuarios"] = len({r[1] for r in estado["reservas"].values() if r[0] == LOTE})
+            return filas
+
+        return {
+            "backend": self._conexao.backend,
+            "slots": self.config["slots"],
+            "slots_interativos": self.config["slots_interativos"],
+            "janela_vazao_segundos": self.config["janela_vazao"],
+            "filas": self._transacao(operacao)
+        }
+
+# Instância global (API e workers)
+fila_scraping = FilaScraping()
@@ -0,0 +1,142 @@
+"""
+Frescor das OS coletadas por scraping - RegistroOS
+==================================================
+
+Cada coleta grava em os_dados_externos o payload completo (comprimido, com
+os campos tipados - app/utils/dados_externos_os.py), o hash do conteúdo e
+a data (scraped_at). Uma OS já cadastrada é servida na hora e,
+se estiver "velha" para o seu status, é revalidada em segundo plano
+(stale-while-revalidate):
+
+- OS fechadas (FINALIZADA, CONCLUIDA, CANCELADA...): nunca revalidadas
+- Demais status: TTL padrão de 1 dia, ou o configurado para o status
+- Revalidação com o mesmo hash só atualiza scraped_at (sem escrever em
+  ordens_servico); com hash diferente a OS é atualizada
+
+CONFIGURAÇÃO (variáveis de ambiente):
+- SCRAPING_TTL_PADRAO: segundos até revalidar uma OS aberta (padrão 86400)
+- SCRAPING_TTL_POR_STATUS: JSON {"EM ANDAMENTO": 3600, ...}
+- SCRAPING_STATUS_FECHADOS: status sem revalidação, separados por vírgula
+
+USO:
+    coleta = registrar_coleta(db, numero_os, os_data)   # antes do commit
+    frescor = avaliar_frescor(db, numero_os, status_local)
+    if frescor.revalidar: ...  # agendar scraping em segundo plano
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from app.database_models import OsDadosExternos
+from app.utils.dados_externos_os import comprimir_payload, extrair_campos_tipados
+from app.utils.intervalo_datas import agora_local
+from app.utils.single_flight import normalizar_numero_os
+
+logger = logging.getLogger(__name__)
+
+STATUS_FECHADOS_PADRAO = "FINALIZADA,CONCLUIDA,CONCLUÍDA,FECHADA,ENCERRADA,CANCELADA,ENTREGUE,FATURADA"
+
+def _ttl_por_status() -> Dict[str, int]:
+    try:
+        return {str(k).strip().upper(): int(v) for k, v in json.loads(os.getenv("SCRAPING_TTL_POR_STATUS") or "{}").items()}
+    except (ValueError, AttributeError):
+        logger.warning("⚠️ SCRAPING_TTL_POR_STATUS não é um JSON válido, ignorando")
+        return {}
+
+FRESCOR_CONFIG = {
+    "ttl_padrao": int(os.getenv("SCRAPING_TTL_PADRAO", "86400")),
+    "ttl_por_status": _ttl_por_status(),
+    "status_fechados": {s.strip().upper() for s in os.getenv("SCRAPING_STATUS_FECHADOS", STATUS_FECHADOS_PADRAO).split(",") if s.strip()},
+}
+
+class Coleta(NamedTuple):
+    """Resultado de registrar_coleta"""
+    alterado: bool
+    hash_conteudo: str
+    status_anterior: Optional[str]
+
+class Frescor(NamedTuple):
+    """Estado de frescor de uma OS: fresco, velho, sem_coleta ou fechado"""
+    estado: str
+    scraped_at: Optional[datetime]
+    ttl: Optional[int]
+
+    @property
+    def revalidar(self) -> bool:
+        return self.estado in ("velho", "sem_coleta")
+
+def ttl_para_status(status: Optional[str], config: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """Segundos até revalidar; None para OS fechadas (nunca revalidadas)"""
+    config = config or FRESCOR_CONFIG
+    chave = (status or "").strip().upper()
+    if chave in config["status_fechados"]:
+        return None
+    return config["ttl_por_status"].get(chave, config["ttl_padrao"])
+
+def hash_conteudo(os_data: Dict[str, Any]) -> str:
+    """Hash estável do payload (ordem das chaves e espaços não importam)"""
+    normalizado = {str(k): (v.strip() if isinstance(v, str) else v) for k, v in os_data.items()}
+    serializado = json.dumps(normalizado, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(serializado.encode()).hexdigest()[:16]
+
+def obter_dados_externos(db, numero_os: str) -> Optional[OsDadosExternos]:
+    return db.execute(
+        select(OsDadosExternos).where(OsDadosExternos.os_numero == normalizar_numero_os(numero_os))
+    ).scalar_one_or_none()
+
+def registrar_coleta(db, numero_os: str, os_data: Dict[str, Any], agora: Optional[datetime] = None) -> Coleta:
+    """Grava o payload coletado (sem commit); indica se o conteúdo mudou desde a última coleta"""
+    agora = agora or agora_local()
+    novo_hash = hash_conteudo(os_data)
+    status = (os_data.get("STATUS DA OS") or "").strip() or None
+
+    registro = obter_dados_externos(db, numero_os)
+    if registro is None:
+        db.add(OsDadosExternos(
+            os_numero=normalizar_numero_os(numero_os),
+            payload_zlib=comprimir_payload(os_data),
+            hash_conteudo=novo_hash,
+            status_os=status,
+            scraped_at=agora,
+            alterado_em=agora,
+            **extrair_campos_tipados(os_data)
+        ))
+        db.flush()
+        return Coleta(True, novo_hash, None)
+
+    status_anterior = registro.status_os
+    alterado = registro.hash_conteudo != novo_hash
+    registro.scraped_at = agora
+    if alterado:
+        registro.payload_zlib = comprimir_payload(os_data)
+        for coluna, valor in extrair_campos_tipados(os_data).items():
+            setattr(registro, coluna, valor)
+        registro.hash_conteudo = novo_hash
+        registro.status_os = status
+        registro.alterado_em = agora
+    db.flush()
+    return Coleta(alterado, novo_hash, status_anterior)
+
+def avaliar_frescor(db, numero_os: str, status_local: Optional[str] = None,
+                    agora: Optional[datetime] = None, config: Optional[Dict[str, Any]] = None) -> Frescor:
+    """
+    Decide se a OS cadastrada pode ser servida sem revalidar. O status do
+    sistema externo (última coleta) tem precedência sobre o status local.
+    """
+    registro = obter_dados_externos(db, numero_os)
+    status = (registro.status_os if registro is not None and registro.status_os else status_local)
+    ttl = ttl_para_status(status, config)
+
+    if ttl is None:
+        return Frescor("fechado", registro.scraped_at if registro is not None else None, None)
+    if registro is None:
+        return Frescor("sem_coleta", None, ttl)
+
+    idade = ((agora or agora_local()) - registro.scraped_at).total_seconds()
+    return Frescor("fresco" if idade < ttl else "velho", registro.scraped_at, ttl)
@@ -0,0 +1,95 @@
+"""
+Intervalos de Datas (filtros sargáveis) - RegistroOS
+====================================================
+
+Converte filtros por dia em predicados de intervalo semiaberto
+[inicio, fim) sobre a própria coluna de data/hora, em vez de
+func.date(coluna) == dia. Assim o banco usa o índice da coluna
+(range scan) em vez de avaliar a função linha a linha.
+
+As datas são gravadas sem fuso (horário local da fábrica); os limites de
+dia são calculados no fuso FUSO_HORARIO, o mesmo do celery_config.py.
+Datetimes com fuso recebidos nos filtros são convertidos para ele.
+
+PADRÕES:
+- interpretar_data(): 'YYYY-MM-DD' / date / datetime → date (None se inválido)
+- intervalo_dias(): dia inicial e final (inclusivo) → (inicio, fim)
+- intervalo_periodo(): últimos N dias → (inicio, None)
+- filtro_intervalo(): lista de predicados para .filter(*...)
+- filtro_dia(): atalho para um único dia
+"""
+
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, List, Optional, Tuple
+
+FUSO_HORARIO = os.getenv("APP_TIMEZONE", "America/Sao_Paulo")
+
+try:
+    from zoneinfo import ZoneInfo
+    _ZONA = ZoneInfo(FUSO_HORARIO)
+except Exception:
+    # Windows sem o pacote tzdata: São Paulo não tem horário de verão desde 2019
+    _ZONA = timezone(timedelta(hours=-3), FUSO_HORARIO)
+
+Intervalo = Tuple[Optional[datetime], Optional[datetime]]
+
+def agora_local() -> datetime:
+    """Data/hora atual no fuso da aplicação, sem tzinfo (como gravado no banco)"""
+    return datetime.now(_ZONA).replace(tzinfo=None)
+
+def hoje_local() -> date:
+    """Dia atual no fuso da aplicação"""
+    return agora_local().date()
+
+def para_local(valor: datetime) -> datetime:
+    """Converte datetimes com fuso para o horário local sem tzinfo"""
+    if valor.tzinfo is None:
+        return valor
+    return valor.astimezone(_ZONA).replace(tzinfo=None)
+
+def interpretar_data(valor: Any) -> Optional[date]:
+    """Aceita date, datetime ou string ISO ('YYYY-MM-DD'); None se vazio/inválido"""
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, datetime):
+        return para_local(valor).date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(str(valor).strip()[:10])
+    except ValueError:
+        return None
+
+def inicio_do_dia(dia: date) -> datetime:
+    return datetime.combine(dia, time.min)
+
+def intervalo_dias(data_inicio: Any = None, data_fim: Any = None) -> Intervalo:
+    """
+    Intervalo [inicio, fim) cobrindo de data_inicio até data_fim (inclusiva).
+    Limites não informados (ou inválidos) ficam None.
+    """
+    dia_inicio = interpretar_data(data_inicio)
+    dia_fim = interpretar_data(data_fim)
+    inicio = inicio_do_dia(dia_inicio) if dia_inicio else None
+    fim = inicio_do_dia(dia_fim + timedelta(days=1)) if dia_fim else None
+    return inicio, fim
+
+def intervalo_periodo(dias: Optional[int]) -> Intervalo:
+    """Últimos N dias a partir de agora (sem limite superior)"""
+    if not dias:
+        return None, None
+    return agora_local() - timedelta(days=dias), None
+
+def filtro_intervalo(coluna, inicio: Optional[datetime], fim: Optional[datetime]) -> List[Any]:
+    """Predicados coluna >= inicio AND coluna < fim (apenas os limites informados)"""
+    filtros = []
+    if inicio is not None:
+        filtros.append(coluna >= para_local(inicio))
+    if fim is not None:
+        filtros.append(coluna < para_local(fim))
+    return filtros
+
+def filtro_dia(coluna, dia: Any) -> List[Any]:
+    """Predicados para as linhas de um único dia (vazio se o dia for inválido)"""
+    return filtro_intervalo(coluna, *intervalo_dias(dia, dia))
@@ -0,0 +1,72 @@
+"""
+Paginação Keyset (cursor) - RegistroOS
+======================================
+
+Helpers para paginar listagens por chave (ex.: data + id) em vez de
+OFFSET: cada página continua a partir da última linha da anterior, com
+custo constante mesmo em páginas profundas (usa o índice da ordenação).
+
+PADRÕES:
+- codificar_cursor(): valores da última linha → string opaca (base64 url-safe)
+- decodificar_cursor(): string → lista de valores (None se inválido)
+- filtro_apos_cursor(): predicado "(col1, col2) < (v1, v2)" para ordem DESC
+  ou "> " para ordem ASC
+- HEADER_PROXIMO_CURSOR: header usado pelas listagens que retornam lista pura
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import tuple_
+
+HEADER_PROXIMO_CURSOR = "X-Proximo-Cursor"
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    return valor
+
+def _desserializar(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        if "dt" in valor:
+            return datetime.fromisoformat(valor["dt"])
+        if "d" in valor:
+            return date.fromisoformat(valor["d"])
+    return valor
+
+def codificar_cursor(*valores: Any) -> str:
+    """Codifica os valores de ordenação da última linha da página"""
+    bruto = json.dumps([_serializar(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: Optional[str], quantidade: int) -> Optional[List[Any]]:
+    """Decodifica um cursor; retorna None se ausente ou malformado"""
+    if not cursor:
+        return None
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento).decode())
+        if not isinstance(valores, list) or len(valores) != quantidade:
+            return None
+        return [_desserializar(v) for v in valores]
+    except (ValueError, TypeError):
+        return None
+
+def filtro_apos_cursor(colunas: Sequence[Any], valores: Sequence[Any], descendente: bool = True):
+    """Predicado que seleciona as linhas depois do cursor na ordenação informada"""
+    if descendente:
+        return tuple_(*colunas) < tuple_(*valores)
+    return tuple_(*colunas) > tuple_(*valores)
+
+def normalizar_limite(limite: Optional[int]) -> int:
+    """Limita o tamanho da página a [1, LIMITE_MAXIMO]"""
+    if not limite:
+        return LIMITE_PADRAO
+    return max(1, min(int(limite), LIMITE_MAXIMO))
@@ -0,0 +1,131 @@
+"""
+Query Plan Checker - RegistroOS
+===============================
+
+Captura os SELECTs executados por um trecho de código (ex.: chamadas às
+rotas) e analisa o EXPLAIN QUERY PLAN de cada um no SQLite. Uma consulta é
+reprovada quando faz varredura completa ("SCAN tabela" sem índice) em uma
+tabela com mais linhas que o limite configurado. Em outros bancos a
+verificação é pulada (nenhuma violação, com aviso no log).
+
+USO:
+    with capturar_consultas(engine) as consultas:
+        ...  # chamar rotas / funções
+    violacoes = verificar_consultas(engine, consultas, limite_linhas=1000)
+
+Linha de comando: python scripts/verificar_planos_consulta.py
+"""
+
+import logging
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LIMITE_LINHAS_PADRAO = 1000
+
+_REFERENCIA_TABELA = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?"?(\w+)"?)?', re.IGNORECASE)
+_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS (\w+))?(.*)$')
+
+@dataclass
+class ConsultaCapturada:
+    sql: str
+    parametros: Tuple = ()
+
+@dataclass
+class ViolacaoPlano:
+    tabela: str
+    linhas: int
+    detalhe: str
+    sql: str
+    plano: List[str] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return f"SCAN completo em {self.tabela} ({self.linhas} linhas): {self.sql[:160]}"
+
+@contextmanager
+def capturar_consultas(engine: Engine) -> Iterator[List[ConsultaCapturada]]:
+    """Registra os SELECTs (SQL + parâmetros) executados no engine"""
+    consultas: List[ConsultaCapturada] = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        _ = (conn, cursor, context)  # Silenciar warning
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            consultas.append(ConsultaCapturada(statement, tuple(parameters) if isinstance(parameters, (list, tuple)) else parameters))
+
+    event.listen(engine, "before_cursor_execute", _registrar)
+    try:
+        yield consultas
+    finally:
+        event.remove(engine, "before_cursor_execute", _registrar)
+
+def _aliases(sql: str) -> Dict[str, str]:
+    """Mapeia alias → tabela a partir das cláusulas FROM/JOIN"""
+    mapa = {}
+    for tabela, alias in _REFERENCIA_TABELA.findall(sql):
+        mapa[tabela] = tabela
+        if alias and alias.upper() not in ("ON", "WHERE", "JOIN", "LEFT", "INNER", "OUTER", "GROUP", "ORDER", "LIMIT", "USING"):
+            mapa[alias] = tabela
+    return mapa
+
+def plano_consulta(conexao, consulta: ConsultaCapturada) -> List[str]:
+    """Linhas de detalhe do EXPLAIN QUERY PLAN"""
+    resultado = conexao.exec_driver_sql(f"EXPLAIN QUERY PLAN {consulta.sql}", consulta.parametros or ())
+    return [linha[-1] for linha in resultado.fetchall()]
+
+def varreduras_completas(plano: List[str], sql: str) -> List[Tuple[str, str]]:
+    """(tabela, detalhe) das varreduras sem índice no plano"""
+    aliases = _aliases(sql)
+    encontradas = []
+    for detalhe in plano:
+        correspondencia = _SCAN.match(detalhe.strip())
+        if not correspondencia:
+            continue
+        nome, alias, resto = correspondencia.groups()
+        if "USING" in resto or nome in ("CONSTANT", "SUBQUERY"):
+            continue
+        tabela = aliases.get(alias or nome, aliases.get(nome, nome))
+        encontradas.append((tabela, detalhe))
+    return encontradas
+
+def verificar_consultas(
+    engine: Engine,
+    consultas: List[ConsultaCapturada],
+    limite_linhas: int = LIMITE_LINHAS_PADRAO
+) -> List[ViolacaoPlano]:
+    """Retorna as consultas que varrem tabelas acima do limite de linhas (só SQLite)"""
+    if engine.dialect.name != "sqlite":
+        logger.warning(f"⚠️ Verificação de planos disponível apenas para SQLite, pulando ({engine.dialect.name})")
+        return []
+
+    violacoes: List[ViolacaoPlano] = []
+    contagens: Dict[str, Optional[int]] = {}
+    vistas = set()
+
+    with engine.connect() as conexao:
+        for consulta in consultas:
+            if consulta.sql in vistas:
+                continue
+            vistas.add(consulta.sql)
+
+            try:
+                plano = plano_consulta(conexao, consulta)
+            except Exception:
+                # Consulta inválida no banco atual (a própria rota já falhou)
+                conexao.rollback()
+                continue
+            for tabela, detalhe in varreduras_completas(plano, consulta.sql):
+                if tabela not in contagens:
+                    try:
+                        contagens[tabela] = conexao.execute(text(f'SELECT COUNT(*) FROM "{tabela}"')).scalar()
+                    except Exception:
+                        contagens[tabela] = None
+                linhas = contagens[tabela]
+                if linhas is not None and linhas > limite_linhas:
+                    violacoes.append(ViolacaoPlano(tabela, linhas, detalhe, consulta.sql, plano))
+    return violacoes
@@ -0,0 +1,136 @@
+"""
+Rate Limiter - RegistroOS
+=========================
+
+Limite de requisições por site externo para o scraping em lote. Cada
+scraping reserva um horário de início (GCRA: "theoretical arrival time") e
+dorme até ele; até `rajada` inícios podem acontecer imediatamente, depois o
+ritmo é `taxa` por segundo.
+
+BACKENDS:
+- memory (padrão): por processo; com N processos do worker o site recebe
+  até N vezes a taxa configurada
+- redis: compartilhado entre todos os processos/máquinas (usa REDIS_URL, o
+  mesmo do Celery); se o Redis estiver indisponível, cai para memória e
+  reconecta com backoff (app/utils/redis_compartilhado.py)
+
+CONFIGURAÇÃO (variáveis de ambiente):
+- SCRAPING_RATE_LIMIT_BACKEND: memory | redis
+- SCRAPING_SITE_RATE: inícios de scraping por segundo por site (padrão 1)
+- SCRAPING_SITE_BURST: inícios imediatos permitidos (padrão 3)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from app.utils.redis_compartilhado import ConexaoRedis, REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_CONFIG = {
+    "backend": os.getenv("SCRAPING_RATE_LIMIT_BACKEND", "memory").lower(),
+    "taxa": float(os.getenv("SCRAPING_SITE_RATE", "1")),
+    "rajada": int(os.getenv("SCRAPING_SITE_BURST", "3")),
+    "redis_url": REDIS_URL,
+    "prefixo": "registroos:ratelimit"
+}
+
+# Reserva atômica no Redis: KEYS[1] = chave do site; ARGV = intervalo, tolerância (segundos)
+_RESERVAR_LUA = """
+local agora_redis = redis.call('TIME')
+local agora = tonumber(agora_redis[1]) + tonumber(agora_redis[2]) / 1000000
+local intervalo = tonumber(ARGV[1])
+local tolerancia = tonumber(ARGV[2])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or 0), agora)
+local novo_tat = tat + intervalo
+redis.call('SET', KEYS[1], tostring(novo_tat), 'PX', math.ceil((novo_tat - agora) * 1000) + 1000)
+return tostring(math.max(0, tat - tolerancia - agora))
+"""
+
+class LimitadorTaxa:
+    """Limitador de taxa por chave (GCRA), seguro entre threads"""
+
+    def __init__(self, chave: str, taxa: Optional[float] = None, rajada: Optional[int] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        self.config = dict(RATE_LIMIT_CONFIG, **(config or {}))
+        self.chave = chave
+        self.taxa = taxa if taxa is not None else self.config["taxa"]
+        self.rajada = max(1, rajada if rajada is not None else self.config["rajada"])
+        self._tat = 0.0
+        self._lock = threading.Lock()
+        self._conexao = ConexaoRedis(
+            f"Limitador de taxa de {chave}", self.config["redis_url"], scripts={"reservar": _RESERVAR_LUA}
+        )
+        self.esperas = 0
+        self.tempo_espera = 0.0
+
+        if self.config["backend"] == "redis" and self.taxa > 0:
+            self._conexao.iniciar()
+
+    @property
+    def intervalo(self) -> float:
+        return 1.0 / self.taxa
+
+    def reservar(self) -> float:
+        """Reserva o próximo início e retorna quantos segundos esperar por ele"""
+        if self.taxa <= 0:
+            return 0.0  # Sem limite
+
+        tolerancia = (self.rajada - 1) * self.intervalo
+        if self._conexao.usar():
+            try:
+                chave = f"{self.config['prefixo']}:{self.chave}"
+                return float(self._conexao.scripts["reservar"](keys=[chave], args=[self.intervalo, tolerancia]))
+            except Exception as e:
+                self._conexao.falha(e)
+
+        with self._lock:
+            agora = time.monotonic()
+            tat = max(self._tat, agora)
+            self._tat = tat + self.intervalo
+            return max(0.0, tat - tolerancia - agora)
+
+    def aguardar(self) -> float:
+        """Bloqueia até o horário reservado; retorna o tempo esperado"""
+        espera = self.reservar()
+        if espera > 0:
+            with self._lock:
+                self.esperas += 1
+                self.tempo_espera += espera
+            time.sleep(espera)
+        return espera
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "chave": self.chave,
+            "backend": self._conexao.backend,
+            "taxa": self.taxa,
+            "rajada": self.rajada,
+            "esperas": self.esperas,
+            "tempo_espera": round(self.tempo_espera, 3)
+        }
+
+# ============================================================================
+# LIMITADORES POR SITE
+# ============================================================================
+
+_limitadores: Dict[str, LimitadorTaxa] = {}
+_limitadores_lock = threading.Lock()
+
+def chave_do_site(url: Optional[str]) -> str:
+    """Host da URL (sites diferentes têm limites independentes)"""
+    if not url:
+        return "padrao"
+    return (urlparse(url if "://" in url else f"//{url}").netloc or url).lower()
+
+def limitador_do_site(url: Optional[str]) -> LimitadorTaxa:
+    """Limitador compartilhado pelas threads do processo para o site da URL"""
+    chave = chave_do_site(url)
+    with _limitadores_lock:
+        if chave not in _limitadores:
+            _limitadores[chave] = LimitadorTaxa(chave)
+        return _limitadores[chave]
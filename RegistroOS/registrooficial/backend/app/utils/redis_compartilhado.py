@@ -0,0 +1,124 @@
+"""
+Redis Compartilhado - RegistroOS
+================================
+
+Conexão Redis dos estados compartilhados entre API e workers: fila de
+scraping, single flight, limitador de taxa do site e cache de respostas.
+Todos usam o REDIS_URL do Celery.
+
+MODOS:
+- opcional (padrão): sem Redis, o componente usa memória. Após uma falha,
+  tenta reconectar depois de uma espera que dobra a cada falha
+  (reconexao_segundos até reconexao_max_segundos)
+- exigido (exigir=True, com Celery): estado em memória não seria visto pelos
+  workers, então cada operação sem conexão tenta reconectar e levanta
+  RuntimeError, e erros do Redis sobem como exceção
+
+CONFIGURAÇÃO (variáveis de ambiente):
+- REDIS_URL: padrão redis://localhost:6379/0
+- REDIS_RECONEXAO_SEGUNDOS: espera inicial para reconectar (padrão 5)
+- REDIS_RECONEXAO_MAX_SEGUNDOS: espera máxima entre tentativas (padrão 300)
+
+USO:
+    self._conexao = ConexaoRedis("Fila de scraping", url, exigir=True, decode_responses=True)
+    self._conexao.iniciar()
+    if self._conexao.usar():
+        try:
+            self._conexao.cliente.get(chave)
+        except Exception as e:
+            self._conexao.falha(e)
+"""
+
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+RECONEXAO_SEGUNDOS = float(os.getenv("REDIS_RECONEXAO_SEGUNDOS", "5"))
+RECONEXAO_MAX_SEGUNDOS = float(os.getenv("REDIS_RECONEXAO_MAX_SEGUNDOS", "300"))
+
+class ConexaoRedis:
+    """Cliente Redis de um componente, com fallback para memória ou Redis exigido"""
+
+    def __init__(self, nome: str, url: str = REDIS_URL, exigir: bool = False, decode_responses: bool = False,
+                 scripts: Optional[Dict[str, str]] = None, reconexao_segundos: float = RECONEXAO_SEGUNDOS,
+                 reconexao_max_segundos: float = RECONEXAO_MAX_SEGUNDOS):
+        self.nome = nome
+        self.url = url
+        self.exigir = exigir
+        self.decode_responses = decode_responses
+        self.cliente = None
+        self.scripts = {}
+        self._scripts_lua = dict(scripts or {})
+        self._configurada = False  # Backend redis escolhido (iniciar/conectar já chamados)
+        self._reconexao_inicial = reconexao_segundos
+        self._reconexao_max = reconexao_max_segundos
+        self._espera = reconexao_segundos
+        self._proxima_tentativa = 0.0
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self.cliente is not None else "memory"
+
+    def iniciar(self) -> Optional[Exception]:
+        """Primeira conexão do componente; sem Redis, registra o fallback (ou o erro, se exigido)"""
+        erro = self.conectar()
+        if erro is not None and self.exigir:
+            logger.error(f"❌ Redis indisponível para: {self.nome} (exigido com Celery): {erro}")
+        elif erro is not None:
+            logger.warning(f"⚠️ Redis indisponível para: {self.nome}, usando memória: {erro}")
+        return erro
+
+    def conectar(self) -> Optional[Exception]:
+        self._configurada = True
+        if not REDIS_AVAILABLE:
+            return RuntimeError("pacote redis não instalado")
+        try:
+            cliente = redis.Redis.from_url(self.url, socket_timeout=0.5, decode_responses=self.decode_responses)
+            self.scripts = {nome: cliente.register_script(lua) for nome, lua in self._scripts_lua.items()}
+            cliente.ping()
+            self.cliente = cliente
+            self._espera = self._reconexao_inicial
+            logger.info(f"✅ {self.nome} usando Redis")
+            return None
+        except Exception as e:
+            self.cliente = None
+            self._agendar_reconexao()
+            return e
+
+    def _agendar_reconexao(self) -> None:
+        """Próxima tentativa após a espera atual, que dobra até o máximo"""
+        self._proxima_tentativa = time.monotonic() + self._espera
+        self._espera = min(self._espera * 2, self._reconexao_max)
+
+    def usar(self) -> bool:
+        """
+        True para usar o Redis. Exigido: sem conexão, reconecta ou levanta
+        RuntimeError. Opcional: reconecta quando a espera do backoff vence
+        """
+        if self.cliente is None and self._configurada:
+            if self.exigir:
+                erro = self.conectar()
+                if erro is not None:
+                    raise RuntimeError(f"{self.nome} exige Redis com Celery ({self.url}): {erro}") from erro
+            elif REDIS_AVAILABLE and time.monotonic() >= self._proxima_tentativa:
+                self.conectar()
+        return self.cliente is not None
+
+    def falha(self, e: Exception) -> None:
+        """Erro numa operação: descarta o cliente; exigido, a exceção sobe"""
+        self.cliente = None
+        if self.exigir:
+            raise e
+        logger.warning(f"⚠️ Erro no Redis ({self.nome}), usando memória: {e}")
+        self._agendar_reconexao()
@@ -0,0 +1,311 @@
+"""
+Response Cache - RegistroOS
+===========================
+
+Cache de respostas de curta duração para dashboards consultados em polling
+(gestão e PCP). A chave combina endpoint + parâmetros normalizados + escopo
+de privilégio do usuário + geração dos domínios de dados do endpoint.
+
+BACKENDS:
+- memory (padrão): LRU em processo com TTL
+- redis: compartilhado entre workers (usa REDIS_URL, o mesmo do Celery);
+  se o Redis estiver indisponível, cai para o backend em memória e
+  reconecta com backoff (app/utils/redis_compartilhado.py)
+- off: desliga o cache
+
+INVALIDAÇÃO POR GERAÇÃO:
+- Cada domínio (apontamentos, pendencias, programacoes, ordens_servico e
+  os catálogos "catalogo:<nome>") tem um contador de geração que faz
+  parte da chave
+- Commits que escrevem nas tabelas do domínio incrementam o contador
+  (eventos de Session: ORM e SQL textual), tornando as entradas antigas
+  inalcançáveis; elas saem por TTL/LRU
+
+CONFIGURAÇÃO (variáveis de ambiente):
+- RESPONSE_CACHE_BACKEND: memory | redis | off
+- RESPONSE_CACHE_TTL: segundos (padrão 30)
+- RESPONSE_CACHE_MAX_ENTRIES: entradas no LRU em memória (padrão 512)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import wraps
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.utils.redis_compartilhado import ConexaoRedis, REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG = {
+    "backend": os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower(),
+    "ttl": int(os.getenv("RESPONSE_CACHE_TTL", "30")),
+    "max_entries": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+    "redis_url": REDIS_URL,
+    "prefixo": "registroos:cache"
+}
+
+# Tabela -> domínio de invalidação
+TABELAS_DOMINIO = {
+    "apontamentos_detalhados": "apontamentos",
+    "apontamentos_resumo_diario": "apontamentos",
+    "pendencias": "pendencias",
+    "programacoes": "programacoes",
+    "ordens_servico": "ordens_servico",
+    # Catálogos (app/utils/catalog_cache.py)
+    "tipo_departamentos": "catalogo:departamentos",
+    "tipo_setores": "catalogo:setores",
+    "tipos_maquina": "catalogo:tipos_maquina",
+    "tipo_atividade": "catalogo:tipos_atividade",
+    "tipo_descricao_atividade": "catalogo:descricoes_atividade",
+    "tipo_causas_retrabalho": "catalogo:causas_retrabalho",
+    "tipos_teste": "catalogo:tipos_teste",
+    "tipo_falha": "catalogo:tipos_falha",
+}
+
+DOMINIOS_DASHBOARD = ("apontamentos", "pendencias", "programacoes", "ordens_servico")
+
+# Parâmetros do endpoint que não entram na chave
+PARAMETROS_IGNORADOS = {"db", "current_user", "request", "response"}
+
+_SQL_ESCRITA = re.compile(r'^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM)\s+["`\[]?(\w+)', re.IGNORECASE)
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class TTLLRUCache:
+    """LRU em memória com expiração por entrada (thread-safe)"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._dados: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: str) -> Tuple[bool, Any]:
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return False, None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                return False, None
+            self._dados.move_to_end(chave)
+            return True, valor
+
+    def set(self, chave: str, valor: Any, ttl: int) -> None:
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_entries:
+                self._dados.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self) -> int:
+        return len(self._dados)
+
+class ResponseCache:
+    """Fachada do cache: backend de valores + contadores de geração"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(CACHE_CONFIG, **(config or {}))
+        self.habilitado = self.config["backend"] != "off"
+        self.memoria = TTLLRUCache(self.config["max_entries"])
+        self._geracoes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._conexao = ConexaoRedis("Cache de respostas", self.config["redis_url"])
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+        if self.config["backend"] == "redis":
+            self._conexao.iniciar()
+
+    def _chave_redis(self, *partes: str) -> str:
+        return ":".join((self.config["prefixo"],) + partes)
+
+    # ---- Gerações ------------------------------------------------------------
+
+    def geracoes(self, dominios: Iterable[str]) -> Tuple[int, ...]:
+        dominios = tuple(dominios)
+        if self._conexao.usar():
+            try:
+                valores = self._conexao.cliente.mget([self._chave_redis("geracao", d) for d in dominios])
+                return tuple(int(v or 0) for v in valores)
+            except Exception as e:
+                self._conexao.falha(e)
+        return tuple(self._geracoes.get(d, 0) for d in dominios)
+
+    def invalidar(self, *dominios: str) -> None:
+        """Incrementa a geração dos domínios (entradas antigas deixam de ser lidas)"""
+        for dominio in dominios:
+            if self._conexao.usar():
+                try:
+                    self._conexao.cliente.incr(self._chave_redis("geracao", dominio))
+                except Exception as e:
+                    self._conexao.falha(e)
+            with self._lock:
+                self._geracoes[dominio] = self._geracoes.get(dominio, 0) + 1
+                self.invalidacoes += 1
+
+    # ---- Valores -------------------------------------------------------------
+
+    def obter(self, chave: str) -> Tuple[bool, Any]:
+        encontrado, valor = False, None
+        if self._conexao.usar():
+            try:
+                bruto = self._conexao.cliente.get(self._chave_redis("valor", chave))
+                if bruto is not None:
+                    encontrado, valor = True, json.loads(bruto)
+            except Exception as e:
+                self._conexao.falha(e)
+        if self._conexao.cliente is None:
+            encontrado, valor = self.memoria.get(chave)
+
+        if encontrado:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return encontrado, valor
+
+    def guardar(self, chave: str, valor: Any, ttl: Optional[int] = None) -> None:
+        ttl = ttl or self.config["ttl"]
+        if self._conexao.usar():
+            try:
+                self._conexao.cliente.setex(self._chave_redis("valor", chave), ttl, json.dumps(jsonable_encoder(valor)))
+                return
+            except Exception as e:
+                self._conexao.falha(e)
+        self.memoria.set(chave, valor, ttl)
+
+    def limpar(self) -> None:
+        self.memoria.clear()
+        with self._lock:
+            self._geracoes.clear()
+            self.hits = self.misses = self.invalidacoes = 0
+
+    def estatisticas(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": self._conexao.backend if self.habilitado else "off",
+            "ttl": self.config["ttl"],
+            "entradas_memoria": len(self.memoria),
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / total * 100, 1) if total else 0.0,
+            "invalidacoes": self.invalidacoes,
+            "geracoes": dict(self._geracoes)
+        }
+
+response_cache = ResponseCache()
+
+# =============================================================================
+# CHAVE E DECORATOR
+# =============================================================================
+
+def escopo_privilegio(usuario) -> str:
+    """Escopo do usuário na chave: nível global ou nível + setor"""
+    if usuario is None:
+        return "anonimo"
+    nivel = getattr(usuario, "privilege_level", None) or "USER"
+    if nivel in ("ADMIN", "GESTAO", "PCP"):
+        return nivel
+    return f"{nivel}:{getattr(usuario, 'id_setor', None)}"
+
+def _normalizar(valor: Any) -> Any:
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, str):
+        return valor.strip()
+    if isinstance(valor, (list, tuple, set)):
+        return sorted(_normalizar(v) for v in valor)
+    return valor
+
+def montar_chave(endpoint: str, parametros: Dict[str, Any], escopo: str, dominios: Iterable[str] = DOMINIOS_DASHBOARD) -> str:
+    """endpoint:escopo:gerações:hash(parâmetros normalizados, sem valores None)"""
+    normalizados = {
+        nome: _normalizar(valor)
+        for nome, valor in parametros.items()
+        if nome not in PARAMETROS_IGNORADOS and valor is not None
+    }
+    resumo = hashlib.sha1(json.dumps(normalizados, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    geracoes = ".".join(str(g) for g in response_cache.geracoes(dominios))
+    return f"{endpoint}:{escopo}:{geracoes}:{resumo}"
+
+def cache_resposta(endpoint: str, dominios: Iterable[str] = DOMINIOS_DASHBOARD, ttl: Optional[int] = None):
+    """
+    Decorator para endpoints async do FastAPI. Deve ficar abaixo do
+    @router.get(...). Respostas com chave "error" não são guardadas.
+    """
+    dominios = tuple(dominios)
+
+    def decorador(funcao):
+        @wraps(funcao)
+        async def wrapper(*args, **kwargs):
+            if not response_cache.habilitado:
+                return await funcao(*args, **kwargs)
+
+            chave = montar_chave(endpoint, kwargs, escopo_privilegio(kwargs.get("current_user")), dominios)
+            encontrado, valor = response_cache.obter(chave)
+            if encontrado:
+                return valor
+
+            valor = await funcao(*args, **kwargs)
+            if not (isinstance(valor, dict) and "error" in valor):
+                response_cache.guardar(chave, valor, ttl)
+            return valor
+        return wrapper
+    return decorador
+
+# =============================================================================
+# INVALIDAÇÃO AUTOMÁTICA (eventos de Session)
+# =============================================================================
+
+def _registrar_tabela(session: Session, tabela: Optional[str]) -> None:
+    dominio = TABELAS_DOMINIO.get(tabela or "")
+    if dominio:
+        session.info.setdefault("cache_dominios_alterados", set()).add(dominio)
+
+@event.listens_for(Session, "after_flush")
+def _coletar_escritas_orm(session, flush_context):
+    _ = flush_context  # Silenciar warning
+    for objeto in list(session.new) + list(session.dirty) + list(session.deleted):
+        tabela = getattr(objeto, "__table__", None)
+        _registrar_tabela(session, tabela.name if tabela is not None else None)
+
+@event.listens_for(Session, "do_orm_execute")
+def _coletar_escritas_sql(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    declaracao = orm_execute_state.statement
+    tabela = getattr(declaracao, "table", None)
+    if tabela is not None:
+        _registrar_tabela(orm_execute_state.session, getattr(tabela, "name", None))
+        return
+    correspondencia = _SQL_ESCRITA.match(str(declaracao))
+    if correspondencia:
+        _registrar_tabela(orm_execute_state.session, correspondencia.group(1).lower())
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_apos_commit(session):
+    dominios = session.info.pop("cache_dominios_alterados", None)
+    if dominios:
+        response_cache.invalidar(*sorted(dominios))
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_apos_rollback(session):
+    session.info.pop("cache_dominios_alterados", None)
@@ -0,0 +1,149 @@
+"""
+Resumo Diário de Apontamentos - RegistroOS
+==========================================
+
+Mantém a tabela apontamentos_resumo_diario: horas trabalhadas, quantidade,
+retrabalhos, aprovados e em andamento por (data, id_setor, id_usuario, id_os).
+Os dashboards de PCP, gestão e relatórios leem estas linhas pré-agregadas
+em vez de recalcular horas sobre toda a tabela apontamentos_detalhados.
+
+MANUTENÇÃO INCREMENTAL:
+- chave_resumo(): Chave do rollup afetada por um apontamento
+- atualizar_resumo_apontamento(): Recalcula as chaves de um apontamento
+  (antes e depois da alteração) na mesma transação do endpoint
+- recalcular_chaves(): Recalcula um conjunto de chaves a partir dos apontamentos
+
+BACKFILL:
+- reconstruir_resumo_diario(): Reconstrói o rollup (total ou por período)
+- Migração 002 (criação e carga inicial) e linha de comando:
+  python scripts/backfill_resumo_diario.py
+- Rotas de leitura nunca escrevem no rollup
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.database_models import ApontamentoDetalhado, ApontamentoResumoDiario
+from app.utils.sql_aggregates import horas_entre, contar_se
+
+ChaveResumo = Tuple[date, int, int, int]
+
+def chave_resumo(apontamento: ApontamentoDetalhado) -> Optional[ChaveResumo]:
+    """Retorna a chave (data, id_setor, id_usuario, id_os) de um apontamento"""
+    inicio = getattr(apontamento, 'data_hora_inicio', None)
+    if inicio is None or apontamento.id_setor is None or apontamento.id_usuario is None or apontamento.id_os is None:
+        return None
+    dia = inicio.date() if isinstance(inicio, datetime) else inicio
+    return (dia, apontamento.id_setor, apontamento.id_usuario, apontamento.id_os)
+
+def _metricas_agregadas(db: Session):
+    horas = horas_entre(db, ApontamentoDetalhado.data_hora_inicio, ApontamentoDetalhado.data_hora_fim)
+    return (
+        func.coalesce(func.sum(horas), 0),
+        func.count(ApontamentoDetalhado.id),
+        contar_se(ApontamentoDetalhado.foi_retrabalho == True),
+        contar_se(ApontamentoDetalhado.aprovado_supervisor == True),
+        contar_se(ApontamentoDetalhado.data_hora_fim.is_(None))
+    )
+
+def recalcular_chaves(db: Session, chaves: Iterable[ChaveResumo]) -> None:
+    """Recalcula as linhas do rollup para as chaves informadas"""
+    agora = datetime.now()
+    for dia, id_setor, id_usuario, id_os in set(chaves):
+        inicio_dia = datetime.combine(dia, datetime.min.time())
+        horas, total, retrabalhos, aprovados, em_andamento = db.query(*_metricas_agregadas(db)).filter(
+            ApontamentoDetalhado.id_setor == id_setor,
+            ApontamentoDetalhado.id_usuario == id_usuario,
+            ApontamentoDetalhado.id_os == id_os,
+            ApontamentoDetalhado.data_hora_inicio >= inicio_dia,
+            ApontamentoDetalhado.data_hora_inicio < inicio_dia + timedelta(days=1)
+        ).one()
+
+        resumo = db.query(ApontamentoResumoDiario).filter(
+            ApontamentoResumoDiario.data == dia,
+            ApontamentoResumoDiario.id_setor == id_setor,
+            ApontamentoResumoDiario.id_usuario == id_usuario,
+            ApontamentoResumoDiario.id_os == id_os
+        ).first()
+
+        if not total:
+            if resumo:
+                db.delete(resumo)
+            continue
+
+        if not resumo:
+            resumo = ApontamentoResumoDiario(data=dia, id_setor=id_setor, id_usuario=id_usuario, id_os=id_os)
+            db.add(resumo)
+
+        resumo.horas_trabalhadas = float(horas or 0)
+        resumo.total_apontamentos = total
+        resumo.total_retrabalhos = retrabalhos or 0
+        resumo.total_aprovados = aprovados or 0
+        resumo.total_em_andamento = em_andamento or 0
+        resumo.data_ultima_atualizacao = agora
+
+def atualizar_resumo_apontamento(
+    db: Session,
+    apontamento: Optional[ApontamentoDetalhado] = None,
+    chave_anterior: Optional[ChaveResumo] = None
+) -> None:
+    """
+    Atualiza o rollup após inserir, editar, aprovar, finalizar ou excluir
+    um apontamento. Deve ser chamado antes do db.commit() do endpoint.
+
+    chave_anterior: chave capturada antes de uma edição que pode mover o
+    apontamento de dia/setor/usuário/OS (ou de um apontamento excluído).
+    Erros são propagados para que o endpoint faça rollback da transação
+    inteira: apontamento e rollup nunca divergem.
+    """
+    db.flush()
+    chaves = {chave for chave in (chave_anterior, chave_resumo(apontamento) if apontamento is not None else None) if chave}
+    if chaves:
+        recalcular_chaves(db, chaves)
+
+def reconstruir_resumo_diario(db: Session, data_inicio: Optional[date] = None, data_fim: Optional[date] = None) -> int:
+    """
+    Reconstrói o rollup a partir de apontamentos_detalhados com um único
+    INSERT ... SELECT agrupado. Sem datas, reconstrói a tabela inteira.
+    Retorna o número de linhas geradas. Não faz commit.
+    """
+    filtros_resumo = []
+    filtros_apontamento = []
+    if data_inicio:
+        filtros_resumo.append(ApontamentoResumoDiario.data >= data_inicio)
+        filtros_apontamento.append(ApontamentoDetalhado.data_hora_inicio >= datetime.combine(data_inicio, datetime.min.time()))
+    if data_fim:
+        filtros_resumo.append(ApontamentoResumoDiario.data <= data_fim)
+        filtros_apontamento.append(ApontamentoDetalhado.data_hora_inicio < datetime.combine(data_fim + timedelta(days=1), datetime.min.time()))
+
+    db.query(ApontamentoResumoDiario).filter(*filtros_resumo).delete(synchronize_session=False)
+
+    dia = func.date(ApontamentoDetalhado.data_hora_inicio)
+    selecao = db.query(
+        dia,
+        ApontamentoDetalhado.id_setor,
+        ApontamentoDetalhado.id_usuario,
+        ApontamentoDetalhado.id_os,
+        *_metricas_agregadas(db),
+        func.current_timestamp()
+    ).filter(
+        ApontamentoDetalhado.data_hora_inicio.isnot(None),
+        *filtros_apontamento
+    ).group_by(
+        dia, ApontamentoDetalhado.id_setor, ApontamentoDetalhado.id_usuario, ApontamentoDetalhado.id_os
+    )
+
+    resultado = db.execute(
+        insert(ApontamentoResumoDiario).from_select(
+            [
+                'data', 'id_setor', 'id_usuario', 'id_os',
+                'horas_trabalhadas', 'total_apontamentos', 'total_retrabalhos',
+                'total_aprovados', 'total_em_andamento', 'data_ultima_atualizacao'
+            ],
+            selecao.statement
+        )
+    )
+    return resultado.rowcount or 0
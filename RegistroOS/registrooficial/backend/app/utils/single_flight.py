@@ -0,0 +1,265 @@
+"""
+Single Flight - RegistroOS
+==========================
+
+Um único scraping externo por número de OS, mesmo com vários técnicos
+abrindo o formulário da mesma OS ao mesmo tempo.
+
+- Trava por OS (número normalizado): quem reserva primeiro é o "líder" e
+  faz o scraping; os demais se anexam a ele (mesmo task_id do Celery, ou
+  aguardam o resultado e reconsultam o banco)
+- Em um mesmo processo, pedidos simultâneos aguardam o mesmo future
+- Cache negativo curto para "OS não encontrada" no sistema externo; só
+  entra no cache a OS que o backend de scraping confirmou não existir
+  (lista vazia) - timeout e erro sobem como exceção e não são cacheados
+
+BACKENDS:
+- auto (padrão): redis quando o Celery está em uso (instalado e com broker
+  acessível, ver config/scraping_config.py; API e workers em processos
+  diferentes), memory caso contrário
+- memory: travas e cache negativo por processo (API sem Celery)
+- redis: compartilhados entre API e workers (usa REDIS_URL, o mesmo do
+  Celery). Com Celery, Redis indisponível é erro: travas em memória não
+  seriam vistas pelos workers, então cada operação tenta reconectar e
+  levanta RuntimeError. Sem Celery, cai para memória e reconecta com
+  backoff (conexão em app/utils/redis_compartilhado.py)
+- Executor local (sem Celery): os processos do pool usam o single flight
+  do processo da API por um proxy de multiprocessing (usar_single_flight_da_api)
+
+CONFIGURAÇÃO (variáveis de ambiente):
+- SCRAPING_SINGLE_FLIGHT_BACKEND: auto | memory | redis
+- SCRAPING_LOCK_TTL: validade máxima da trava em segundos (padrão 900,
+  cobre as novas tentativas da task)
+- SCRAPING_NEGATIVE_TTL: segundos que uma OS não encontrada fica em cache (padrão 120)
+- SCRAPING_FOLLOWER_TIMEOUT: segundos que um pedido aguarda o scraping de
+  outro processo (padrão 75)
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+from app.utils.redis_compartilhado import ConexaoRedis, REDIS_URL
+from config.scraping_config import celery_utilizavel
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_CONFIG = {
+    "backend": os.getenv("SCRAPING_SINGLE_FLIGHT_BACKEND", "auto").lower(),
+    "exigir_redis": celery_utilizavel(),  # API e workers em processos diferentes
+    "lock_ttl": int(os.getenv("SCRAPING_LOCK_TTL", "900")),
+    "negative_ttl": int(os.getenv("SCRAPING_NEGATIVE_TTL", "120")),
+    "follower_timeout": float(os.getenv("SCRAPING_FOLLOWER_TIMEOUT", "75")),
+    "redis_url": REDIS_URL,
+    "prefixo": "registroos:scraping"
+}
+
+# Libera a trava apenas se ela ainda pertence ao dono (não apaga a de outro líder)
+_LIBERAR_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def normalizar_numero_os(numero_os: Any) -> str:
+    """Chave da OS: sem espaços e sem zeros à esquerda ("000012345" == "12345")"""
+    valor = str(numero_os or "").strip().upper()
+    if valor.isdigit():
+        return valor.lstrip("0") or "0"
+    return valor
+
+class Voo(NamedTuple):
+    """Resultado de uma reserva/execução: líder ou anexado ao scraping de `dono`"""
+    lider: bool
+    dono: Optional[str]
+    resultado: Any = None
+
+class SingleFlight:
+    """Travas por OS, coalescência em processo e cache negativo"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(SINGLE_FLIGHT_CONFIG, **(config or {}))
+        self._travas: Dict[str, Tuple[str, float]] = {}
+        self._negativos: Dict[str, float] = {}
+        self._em_voo: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._remota = None  # Single flight do processo da API (processos do executor local)
+        self.coalescidos = 0
+        self.negativos_servidos = 0
+
+        backend = self.config["backend"]
+        if backend == "auto":
+            backend = "redis" if self.config["exigir_redis"] else "memory"
+        # Com Celery, travas em memória não seriam vistas pelos workers: Redis exigido
+        self._conexao = ConexaoRedis(
+            "Single flight do scraping", self.config["redis_url"],
+            exigir=backend == "redis" and self.config["exigir_redis"],
+            decode_responses=True, scripts={"liberar": _LIBERAR_LUA}
+        )
+        if backend == "redis":
+            self._conexao.iniciar()
+
+    def usar_single_flight_da_api(self, remota) -> None:
+        """
+        Processos do executor local: travas e cache negativo passam a ser os do
+        processo da API (proxy de multiprocessing), onde as rotas os consultam
+        """
+        self._remota = remota
+
+    def _chave_redis(self, *partes: str) -> str:
+        return ":".join((self.config["prefixo"],) + partes)
+
+    # ---- Travas por OS -------------------------------------------------------
+
+    def reservar(self, chave: str, dono: str, ttl: Optional[int] = None) -> Voo:
+        """Reserva a OS para `dono`; se já houver líder, retorna Voo(False, líder)"""
+        if self._remota is not None:
+            return Voo(*self._remota.reservar(chave, dono, ttl))
+        ttl = ttl or self.config["lock_ttl"]
+        if self._conexao.usar():
+            try:
+                chave_redis = self._chave_redis("trava", chave)
+                if self._conexao.cliente.set(chave_redis, dono, nx=True, ex=ttl):
+                    return Voo(True, dono)
+                atual = self._conexao.cliente.get(chave_redis)
+                if atual is not None:
+                    return Voo(False, atual)
+                # Trava expirou entre o SET e o GET: nova tentativa
+                return Voo(bool(self._conexao.cliente.set(chave_redis, dono, nx=True, ex=ttl)), dono)
+            except Exception as e:
+                self._conexao.falha(e)
+
+        agora = time.monotonic()
+        with self._lock:
+            atual = self._travas.get(chave)
+            if atual and atual[1] > agora:
+                return Voo(False, atual[0])
+            self._travas[chave] = (dono, agora + ttl)
+            return Voo(True, dono)
+
+    def dono_atual(self, chave: str) -> Optional[str]:
+        if self._remota is not None:
+            return self._remota.dono_atual(chave)
+        if self._conexao.usar():
+            try:
+                return self._conexao.cliente.get(self._chave_redis("trava", chave))
+            except Exception as e:
+                self._conexao.falha(e)
+
+        with self._lock:
+            atual = self._travas.get(chave)
+            return atual[0] if atual and atual[1] > time.monotonic() else None
+
+    def liberar(self, chave: str, dono: str) -> None:
+        if self._remota is not None:
+            self._remota.liberar(chave, dono)
+            return
+        if self._conexao.usar():
+            try:
+                self._conexao.scripts["liberar"](keys=[self._chave_redis("trava", chave)], args=[dono])
+                return
+            except Exception as e:
+                self._conexao.falha(e)
+
+        with self._lock:
+            if self._travas.get(chave, (None,))[0] == dono:
+                del self._travas[chave]
+
+    # ---- Cache negativo ------------------------------------------------------
+
+    def marcar_nao_encontrada(self, chave: str, ttl: Optional[int] = None) -> None:
+        """Só para não encontrada confirmada pelo site (lista vazia), nunca para erro"""
+        if self._remota is not None:
+            self._remota.marcar_nao_encontrada(chave, ttl)
+            return
+        ttl = ttl or self.config["negative_ttl"]
+        if ttl <= 0:
+            return
+        if self._conexao.usar():
+            try:
+                self._conexao.cliente.setex(self._chave_redis("nao_encontrada", chave), ttl, "1")
+                return
+            except Exception as e:
+                self._conexao.falha(e)
+
+        with self._lock:
+            self._negativos[chave] = time.monotonic() + ttl
+
+    def nao_encontrada(self, chave: str) -> bool:
+        """OS recentemente não encontrada no sistema externo (não repetir o scraping)"""
+        if self._remota is not None:
+            return self._remota.nao_encontrada(chave)
+        encontrada = False
+        if self._conexao.usar():
+            try:
+                encontrada = bool(self._conexao.cliente.exists(self._chave_redis("nao_encontrada", chave)))
+            except Exception as e:
+                self._conexao.falha(e)
+
+        if self._conexao.cliente is None:
+            with self._lock:
+                expira = self._negativos.get(chave)
+                if expira is not None and expira <= time.monotonic():
+                    del self._negativos[chave]
+                    expira = None
+                encontrada = expira is not None
+
+        if encontrada:
+            self.negativos_servidos += 1
+        return encontrada
+
+    # ---- Execução coalescida (endpoints síncronos) ---------------------------
+
+    async def executar(self, chave: str, fabrica: Callable[[], Awaitable[Any]]) -> Voo:
+        """
+        Executa `fabrica()` uma única vez por OS. Pedidos simultâneos do mesmo
+        processo recebem Voo(False, ...) quando o líder termina; os de outros
+        processos aguardam a trava ser liberada. Quem não foi líder deve
+        reconsultar o banco (o líder já salvou a OS).
+        """
+        futuro = self._em_voo.get(chave)
+        if futuro is not None:
+            self.coalescidos += 1
+            await asyncio.shield(futuro)
+            return Voo(False, "local")
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._em_voo[chave] = futuro
+        try:
+            dono = f"api:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+            voo = self.reservar(chave, dono)
+            if not voo.lider:
+                self.coalescidos += 1
+                await self._aguardar_liberacao(chave)
+                return voo
+
+            try:
+                return Voo(True, dono, await fabrica())
+            finally:
+                self.liberar(chave, dono)
+        finally:
+            # Seguidores locais seguem mesmo se o líder falhar (reconsultam o banco)
+            self._em_voo.pop(chave, None)
+            if not futuro.done():
+                futuro.set_result(None)
+
+    async def _aguardar_liberacao(self, chave: str) -> None:
+        limite = time.monotonic() + self.config["follower_timeout"]
+        while self.dono_atual(chave) is not None and time.monotonic() < limite:
+            await asyncio.sleep(0.5)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "backend": self._conexao.backend,
+            "em_voo": len(self._em_voo),
+            "coalescidos": self.coalescidos,
+            "negativos_servidos": self.negativos_servidos
+        }
+
+# Instância global (API e workers)
+single_flight = SingleFlight()
@@ -0,0 +1,43 @@
+"""
+SQL Aggregate Helpers - RegistroOS
+==================================
+
+Expressões SQL portáveis (SQLite/PostgreSQL) para métricas agregadas.
+Permitem que dashboards calculem horas, contagens e séries mensais
+diretamente no banco em vez de carregar registros para o Python.
+
+PADRÕES DE NOMENCLATURA:
+- horas_entre(): Duração em horas entre duas colunas DateTime
+- mes_referencia(): Chave 'YYYY-MM' de uma coluna DateTime
+- contar_se(): Soma condicional (equivalente a COUNT(*) FILTER (WHERE ...))
+
+PERFORMANCE:
+- Uma única consulta agrupada por endpoint, independente do volume de linhas
+- Dialeto detectado pelo bind da sessão, sem SQL específico nos endpoints
+"""
+
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+def get_dialect_name(db: Session) -> str:
+    """Retorna o nome do dialeto da sessão ('sqlite', 'postgresql', ...)"""
+    return db.get_bind().dialect.name
+
+def horas_entre(db: Session, inicio, fim):
+    """
+    Duração em horas entre duas colunas DateTime.
+    Retorna NULL quando alguma das colunas é NULL (ignorado por SUM/AVG).
+    """
+    if get_dialect_name(db) == "sqlite":
+        return (func.julianday(fim) - func.julianday(inicio)) * 24.0
+    return func.extract("epoch", fim - inicio) / 3600.0
+
+def mes_referencia(db: Session, coluna):
+    """Chave 'YYYY-MM' do mês de uma coluna DateTime"""
+    if get_dialect_name(db) == "sqlite":
+        return func.strftime("%Y-%m", coluna)
+    return func.to_char(coluna, "YYYY-MM")
+
+def contar_se(condicao):
+    """Soma 1 para cada linha que satisfaz a condição"""
+    return func.sum(case((condicao, 1), else_=0))
@@ -0,0 +1,85 @@
+"""
+Última Atividade da OS - RegistroOS
+===================================
+
+Mantém ordens_servico.ultima_atividade: o instante mais recente entre a
+criação da OS e o início/fim dos seus apontamentos. A listagem de OS pagina
+por (ultima_atividade, id) usando o índice ix_ordens_servico_ultima_atividade,
+sem agregar apontamentos_detalhados a cada página.
+
+MANUTENÇÃO (eventos de Session, na mesma transação da escrita):
+- OS nova sem ultima_atividade recebe data_criacao (ou agora)
+- Apontamento novo/alterado avança a ultima_atividade da OS (nunca recua)
+
+A coluna é NOT NULL (migração 004): INSERTs em SQL textual que não a
+informam recebem o CURRENT_TIMESTAMP do banco; os da aplicação gravam
+agora_local() explicitamente.
+
+BACKFILL:
+- reconstruir_ultima_atividade(): recalcula todas as OS a partir dos
+  apontamentos (a migração 004 tem a sua própria cópia em SQL)
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database_models import ApontamentoDetalhado, OrdemServico
+from app.utils.intervalo_datas import agora_local
+
+def momento_apontamento(apontamento: ApontamentoDetalhado) -> Optional[datetime]:
+    """Instante mais recente registrado no apontamento (fim ou início)"""
+    momentos = [m for m in (apontamento.data_hora_inicio, apontamento.data_hora_fim) if isinstance(m, datetime)]
+    return max(momentos) if momentos else None
+
+def avancar_ultima_atividade(conexao, id_os: int, momento: datetime) -> None:
+    """Atualiza a OS apenas se o momento for posterior ao registrado"""
+    conexao.execute(
+        update(OrdemServico.__table__)
+        .where(OrdemServico.id == id_os)
+        .where(or_(OrdemServico.ultima_atividade.is_(None), OrdemServico.ultima_atividade < momento))
+        .values(ultima_atividade=momento)
+    )
+
+def reconstruir_ultima_atividade(db: Session) -> int:
+    """Recalcula ultima_atividade de todas as OS a partir dos apontamentos"""
+    ultimo_apontamento = select(
+        func.max(func.coalesce(ApontamentoDetalhado.data_hora_fim, ApontamentoDetalhado.data_hora_inicio))
+    ).where(ApontamentoDetalhado.id_os == OrdemServico.id).scalar_subquery()
+
+    resultado = db.execute(
+        update(OrdemServico)
+        .values(ultima_atividade=func.coalesce(ultimo_apontamento, OrdemServico.data_criacao, agora_local()))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return resultado.rowcount or 0
+
+# =============================================================================
+# EVENTOS DE SESSION
+# =============================================================================
+
+@event.listens_for(Session, "before_flush")
+def _coletar_atividades(session, flush_context, instances):
+    _ = (flush_context, instances)  # Silenciar warning
+    pendentes: Dict[int, datetime] = session.info.setdefault("ultima_atividade_pendente", {})
+
+    for objeto in list(session.new) + list(session.dirty):
+        if isinstance(objeto, OrdemServico) and objeto in session.new and objeto.ultima_atividade is None:
+            objeto.ultima_atividade = objeto.data_criacao or agora_local()
+        elif isinstance(objeto, ApontamentoDetalhado) and objeto.id_os is not None:
+            momento = momento_apontamento(objeto)
+            if momento is not None and momento > pendentes.get(objeto.id_os, datetime.min):
+                pendentes[objeto.id_os] = momento
+
+@event.listens_for(Session, "after_flush")
+def _aplicar_atividades(session, flush_context):
+    _ = flush_context  # Silenciar warning
+    pendentes = session.info.pop("ultima_atividade_pendente", None)
+    if not pendentes:
+        return
+    conexao = session.connection()
+    for id_os, momento in pendentes.items():
+        avancar_ultima_atividade(conexao, id_os, momento)
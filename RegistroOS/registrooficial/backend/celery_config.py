@@ -10,6 +10,10 @@ import os
 import logging
 from datetime import timedelta
 
+from app.utils.fila_scraping import (
+    OPCOES_BROKER_PRIORIDADE, FILA_CELERY_INTERATIVA, FILA_CELERY_LOTE, rotear_por_prioridade
+)
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,6 +21,7 @@ logger = logging.getLogger(__name__)
 # Importação condicional do Celery
 try:
     from celery import Celery
+    from kombu import Queue
     CELERY_AVAILABLE = True
     logger.info("✅ Celery disponível - modo assíncrono ativado")
 except ImportError:
@@ -64,18 +69,22 @@ app.conf.update(
     task_serializer='json',
     accept_content=['json'],
     result_serializer='json',
-    timezone='America/Sao_Paulo',
+    timezone=os.getenv('APP_TIMEZONE', 'America/Sao_Paulo'),  # Mesmo fuso de app/utils/intervalo_datas.py
     enable_utc=True,
     
-    # Configurações de performance
-    task_routes={
-        'scraping_tasks.scrape_os_task': {'queue': 'scraping'},
-        'scraping_tasks.scrape_batch_os_task': {'queue': 'scraping_batch'},
-        'scraping_tasks.cleanup_task': {'queue': 'maintenance'},
-    },
+    # Configurações de performance: lotes e revalidações (prioridade abaixo da
+    # interativa) na fila de lotes, consumida por um worker dedicado
+    task_queues=[Queue(FILA_CELERY_INTERATIVA), Queue(FILA_CELERY_LOTE)] if CELERY_AVAILABLE else None,
+    task_default_queue=FILA_CELERY_INTERATIVA,
+    task_routes=[rotear_por_prioridade],
     
+    # Prioridades (broker Redis: 0 é a mais alta) - ver app/utils/fila_scraping.py
+    task_default_priority=5,
+    worker_prefetch_multiplier=1,  # Não reservar tasks à frente de consultas interativas recém-chegadas
+    broker_transport_options=OPCOES_BROKER_PRIORIDADE,
+
     # Limites de recursos
-    worker_concurrency=3,  # Máximo 3 workers simultâneos
+    worker_concurrency=3,  # Máximo 3 workers simultâneos (1 navegador logado em pool por processo)
     task_time_limit=300,   # 5 minutos timeout
     task_soft_time_limit=240,  # 4 minutos soft timeout
     
@@ -90,6 +99,8 @@ app.conf.update(
         },
         'scraping_tasks.scrape_batch_os_task': {
             'rate_limit': '2/h',  # 2 lotes por hora por worker
+            'time_limit': 1800,  # Até 100 OS em paralelo (SCRAPING_BATCH_CONCURRENCY)
+            'soft_time_limit': 1740,  # Soft timeout devolve o resultado parcial
         }
     },
     
@@ -35,7 +35,9 @@ update the db_path variable below.
 """
 
 import os
-from sqlalchemy import create_engine, MetaData, text
+from sqlalchemy import create_engine, MetaData, text, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -62,16 +64,146 @@ DATABASE_CONFIG = {
     "future": True         # Usar SQLAlchemy 2.0
 }
 
+# Configurações do pool de conexões (ajustáveis por variável de ambiente)
+POOL_CONFIG = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),   # segundos
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),     # segundos
+    "pool_pre_ping": True
+}
+
+# PRAGMAs aplicados em cada nova conexão SQLite
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",                                       # leituras concorrentes com escrita
+    "synchronous": "NORMAL",                                     # seguro com WAL e bem mais rápido
+    "busy_timeout": int(os.getenv("DB_SQLITE_BUSY_TIMEOUT", "30000")),   # ms esperando lock
+    "cache_size": int(os.getenv("DB_SQLITE_CACHE_SIZE", "-64000")),      # negativo = KiB (64 MB)
+    "mmap_size": int(os.getenv("DB_SQLITE_MMAP_SIZE", "268435456")),     # 256 MB
+    "temp_store": "MEMORY"
+}
+
 # =============================================================================
 # ENGINE E SESSÃO
 # =============================================================================
 
-# Criar engine do SQLAlchemy
-engine = create_engine(DATABASE_URL, **DATABASE_CONFIG)
+def is_sqlite_url(url: str) -> bool:
+    """Indica se a URL aponta para um banco SQLite"""
+    return url.startswith("sqlite")
+
+def _apply_sqlite_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for nome, valor in pragmas.items():
+            if valor is None:
+                continue
+            cursor.execute(f"PRAGMA {nome}={valor}")
+    finally:
+        cursor.close()
+
+def create_configured_engine(url: str = None, pragmas: dict = None, **overrides):
+    """
+    Fábrica única de engines do sistema (API e workers Celery).
+
+    - SQLite: WAL, busy_timeout, cache e mmap aplicados em cada conexão;
+      pool de conexões por arquivo com pre-ping.
+    - PostgreSQL/outros: pool_size, max_overflow, pool_recycle e pre-ping.
+
+    Qualquer parâmetro de POOL_CONFIG/DATABASE_CONFIG pode ser sobrescrito
+    via kwargs (ex: pool_size=2 para scripts).
+    """
+    url = url or DATABASE_URL
+    options = {**DATABASE_CONFIG, **POOL_CONFIG}
+
+    if is_sqlite_url(url):
+        connect_args = {
+            "check_same_thread": False,
+            "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000
+        }
+        connect_args.update(overrides.pop("connect_args", {}))
+        options["connect_args"] = connect_args
+        # Pool explícito: no SQLAlchemy 1.4 o padrão para arquivo é NullPool
+        options["poolclass"] = QueuePool
+
+        if ":memory:" in url or url in ("sqlite://", "sqlite:///"):
+            # Banco em memória: uma única conexão compartilhada, sem pool
+            for key in ("pool_size", "max_overflow", "pool_recycle", "pool_timeout"):
+                options.pop(key, None)
+            options["poolclass"] = StaticPool
+
+    options.update(overrides)
+    new_engine = create_engine(url, **options)
+
+    if is_sqlite_url(url):
+        sqlite_pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+
+        @event.listens_for(new_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            _ = connection_record  # Silenciar warning
+            _apply_sqlite_pragmas(dbapi_connection, sqlite_pragmas)
+
+    return new_engine
+
+# Criar engine do SQLAlchemy (compartilhado por API e workers)
+engine = create_configured_engine(DATABASE_URL)
 
 # Criar sessão local
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# =============================================================================
+# ENGINE SOMENTE LEITURA (DASHBOARDS E RELATÓRIOS)
+# =============================================================================
+
+# URL da réplica de leitura (PostgreSQL). Se ausente, usa o banco principal
+# com um pool separado e transações read-only.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# Pool de leitura menor que o de escrita: poucas consultas analíticas longas
+READ_POOL_CONFIG = {
+    "pool_size": int(os.getenv("DB_READ_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_READ_MAX_OVERFLOW", "10"))
+}
+
+def _sqlite_read_only_url(url: str) -> str:
+    """Converte sqlite:///caminho em URI sqlite:///file:caminho?mode=ro&uri=true"""
+    parsed = make_url(url)
+    database = parsed.database
+    if not database or database == ":memory:" or database.startswith("file:"):
+        return url
+    database = database.replace("\\", "/")
+    return parsed.set(database=f"file:{database}", query={"mode": "ro", "uri": "true"}).render_as_string(hide_password=False)
+
+def create_read_only_engine(url: str = None):
+    """
+    Cria engine para consultas pesadas de leitura.
+
+    - SQLite: segunda conexão ao mesmo arquivo aberta em mode=ro com
+      PRAGMA query_only (lê o WAL sem disputar o lock de escrita).
+    - PostgreSQL: DATABASE_READ_URL (réplica) ou o primário com
+      default_transaction_read_only.
+    """
+    url = url or DATABASE_READ_URL or DATABASE_URL
+
+    if is_sqlite_url(url):
+        if ":memory:" in url or url in ("sqlite://", "sqlite:///"):
+            # Banco em memória não é compartilhável entre engines
+            return engine
+        return create_configured_engine(
+            _sqlite_read_only_url(url),
+            # journal_mode é persistente no arquivo e só o escritor o define
+            pragmas={"journal_mode": None, "query_only": "ON"},
+            **READ_POOL_CONFIG
+        )
+
+    connect_args = {}
+    if url.startswith("postgresql"):
+        connect_args["options"] = "-c default_transaction_read_only=on"
+    return create_configured_engine(url, connect_args=connect_args, **READ_POOL_CONFIG)
+
+read_engine = create_read_only_engine()
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 # Base para modelos declarativos
 # A resolução para conflitos de tabelas é feita em database_models.py
 Base = declarative_base()
@@ -94,6 +226,18 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """
+    Dependência para endpoints somente leitura (dashboards e relatórios).
+    Usar em endpoints FastAPI com 'Depends(get_read_db)'; qualquer escrita
+    nesta sessão falha por ser read-only.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 def create_tables():
     """
     Criar todas as tabelas definidas nos modelos.
@@ -129,7 +273,7 @@ TEST_DATABASE_URL = os.getenv(
 )
 
 # Engine para testes
-test_engine = create_engine(TEST_DATABASE_URL, **DATABASE_CONFIG)
+test_engine = create_configured_engine(TEST_DATABASE_URL)
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
 def get_test_db():
@@ -146,28 +290,46 @@ def get_test_db():
 # INFORMAÇÕES DE CONEXÃO
 # =============================================================================
 
-def get_connection_info():
+def _pool_metric(pool, name):
+    """Lê uma métrica do pool (métodos em QueuePool, ausentes em StaticPool)"""
+    metric = getattr(pool, name, None)
+    if callable(metric):
+        try:
+            return metric()
+        except Exception:
+            return "N/A"
+    return "N/A" if metric is None else metric
+
+def get_connection_info(target_engine=None):
     """
     Retornar informações sobre a conexão atual.
-    Útil para debug e monitoramento.
+    Útil para debug e monitoramento - inclui métricas vivas do pool.
     """
+    target_engine = target_engine or engine
+    url = target_engine.url.render_as_string(hide_password=True)
+    database_type = "SQLite" if is_sqlite_url(url) else "PostgreSQL"
     try:
-        pool = engine.pool
+        pool = target_engine.pool
         return {
-            "database_url": DATABASE_URL.replace(":password@", ":***@"),
-            "database_type": "SQLite" if "sqlite" in DATABASE_URL else "PostgreSQL",
-            "pool_size": getattr(pool, 'size', 'N/A'),
-            "pool_checked_in": getattr(pool, 'checkedin', 'N/A'),
-            "pool_checked_out": getattr(pool, 'checkedout', 'N/A'),
-            "pool_invalid": getattr(pool, 'invalid', 'N/A'),
-            "pool_recycle": DATABASE_CONFIG.get("pool_recycle", "N/A")
+            "database_url": url,
+            "database_type": database_type,
+            "pool_class": type(pool).__name__,
+            "pool_size": _pool_metric(pool, "size"),
+            "pool_checked_in": _pool_metric(pool, "checkedin"),
+            "pool_checked_out": _pool_metric(pool, "checkedout"),
+            "pool_overflow": _pool_metric(pool, "overflow"),
+            "pool_max_overflow": getattr(pool, "_max_overflow", "N/A"),
+            "pool_timeout": _pool_metric(pool, "timeout"),
+            "pool_recycle": getattr(pool, "_recycle", POOL_CONFIG["pool_recycle"]),
+            "pool_status": _pool_metric(pool, "status"),
+            "sqlite_pragmas": SQLITE_PRAGMAS if database_type == "SQLite" else None
         }
     except Exception as e:
         return {
-            "database_url": DATABASE_URL.replace(":password@", ":***@"),
-            "database_type": "SQLite" if "sqlite" in DATABASE_URL else "PostgreSQL",
+            "database_url": url,
+            "database_type": database_type,
             "pool_info": f"Erro ao obter info do pool: {str(e)}",
-            "pool_recycle": DATABASE_CONFIG.get("pool_recycle", "N/A")
+            "pool_recycle": POOL_CONFIG["pool_recycle"]
         }
 
 # =============================================================================
@@ -0,0 +1,54 @@
+"""
+CONFIGURAÇÃO DO SCRAPING - RegistroOS
+=====================================
+
+Onde ficam os scripts de scraping e qual backend cada implantação usa.
+Lido pelo pacote app.scraping (API e workers do Celery).
+
+VARIÁVEIS DE AMBIENTE:
+- SCRAPING_SCRIPTS_DIR: diretório dos scripts (padrão: backend/scripts)
+- SCRAPING_BACKEND: backend padrão registrado em app.scraping (padrão: selenium)
+- SCRAPING_EXTRA_BACKENDS: backends adicionais "nome=modulo:funcao[>fallback]"
+  separados por vírgula (ex.: "portal=meu_pacote.portal:scrape>selenium")
+- SCRAPING_WARMUP: carregar os backends na inicialização do worker (padrão: true)
+- SCRAPING_BROKER_TIMEOUT: segundos para testar o broker do Celery (REDIS_URL)
+  ao decidir entre Celery e o executor local (padrão: 1)
+"""
+
+import functools
+import importlib.util
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRAPING_SCRIPTS_DIR = os.path.abspath(os.getenv("SCRAPING_SCRIPTS_DIR") or os.path.join(BACKEND_DIR, "scripts"))
+SCRAPING_BACKEND = os.getenv("SCRAPING_BACKEND", "selenium").strip().lower()
+SCRAPING_EXTRA_BACKENDS = os.getenv("SCRAPING_EXTRA_BACKENDS", "")
+SCRAPING_WARMUP = os.getenv("SCRAPING_WARMUP", "true").lower() in ("1", "true", "yes", "sim")
+CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SCRAPING_BROKER_TIMEOUT = float(os.getenv("SCRAPING_BROKER_TIMEOUT", "1"))
+
+def caminho_script(nome: str) -> str:
+    """Caminho de scripts/<nome>.py no diretório configurado"""
+    return os.path.join(SCRAPING_SCRIPTS_DIR, f"{nome}.py")
+
+@functools.lru_cache(maxsize=None)
+def celery_utilizavel() -> bool:
+    """
+    Celery instalado e broker acessível (testado uma vez por processo). Sem
+    broker, as tasks vão para o executor local em vez de uma fila que nenhum
+    worker consome; single flight e fila de scraping só exigem Redis quando True
+    """
+    if importlib.util.find_spec("celery") is None:
+        return False
+    from kombu import Connection
+    try:
+        with Connection(CELERY_BROKER_URL, connect_timeout=SCRAPING_BROKER_TIMEOUT) as conexao:
+            conexao.ensure_connection(max_retries=1, interval_start=0, timeout=SCRAPING_BROKER_TIMEOUT)
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Celery instalado, mas broker inacessível ({CELERY_BROKER_URL}): {e}")
+        return False
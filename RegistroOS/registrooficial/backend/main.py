@@ -1,13 +1,13 @@
 from fastapi import FastAPI, Depends, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Optional
 from datetime import datetime
 from config.database_config import engine, get_db
 from app.database_models import Base, Usuario, ApontamentoDetalhado, OrdemServico, Cliente, Equipamento, Setor, Departamento
 from middleware.text_validation_middleware import add_text_validation_middleware
 from routes.auth import get_current_user
+from app.utils.intervalo_datas import intervalo_dias, filtro_intervalo
 
 # Criar aplicação FastAPI
 app = FastAPI(
@@ -23,11 +23,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Proximo-Cursor"],
 )
 
 # Ativar middleware de validação de texto
 add_text_validation_middleware(app, enabled=True)
 
+# Pré-carregar catálogos (departamentos, setores, tipos...) no cache em memória
+@app.on_event("startup")
+async def precarregar_catalogos():
+    try:
+        from config.database_config import SessionLocal
+        from app.utils.catalog_cache import catalog_cache
+        db = SessionLocal()
+        try:
+            catalog_cache.precarregar(db)
+            print(f"✅ Catálogos pré-carregados: {catalog_cache.estatisticas()['catalogos_carregados']}")
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"⚠️ Não foi possível pré-carregar catálogos: {e}")
+
+# Índice da busca textual para bancos sem a migração 005 (a rota /api/search só lê)
+@app.on_event("startup")
+async def preparar_indice_busca():
+    try:
+        from app.utils.busca_textual import garantir_indice_busca
+        garantir_indice_busca()
+    except Exception as e:
+        print(f"⚠️ Não foi possível preparar o índice de busca textual: {e}")
+
+# Executor local das tasks de scraping quando o Celery não está instalado
+@app.on_event("startup")
+async def iniciar_executor_local():
+    try:
+        from tasks.executor_local import executor_local, executor_local_necessario
+        if executor_local_necessario():
+            executor_local.iniciar()
+            print(f"✅ Executor local de scraping: {executor_local.status()['workers']} processos")
+    except Exception as e:
+        print(f"⚠️ Não foi possível iniciar o executor local de scraping: {e}")
+
+@app.on_event("shutdown")
+async def encerrar_executor_local():
+    try:
+        from tasks.executor_local import executor_local
+        if executor_local.ativo:
+            await executor_local.encerrar()
+    except Exception as e:
+        print(f"⚠️ Erro ao encerrar o executor local de scraping: {e}")
+
 # Criar tabelas no banco de dados (COMENTADO - tabelas já existem)
 # Base.metadata.create_all(bind=engine)
 
@@ -51,6 +96,7 @@ try:
     from routes.gestao_routes import router as gestao_router
     from routes.relatorio_completo import router as relatorio_router
     from routes.general import router as general_router
+    from routes.busca_routes import router as busca_router
 
     # Incluir os routers na aplicação FastAPI (ESTRUTURA CONSOLIDADA)
     # Auth routes diretamente em /api/ para compatibilidade com frontend
@@ -65,10 +111,11 @@ try:
     app.include_router(users_router, prefix="/api/users", tags=["users"])
     app.include_router(relatorio_router, prefix="/api", tags=["reports"])
     app.include_router(general_router, prefix="/api", tags=["general"])
+    app.include_router(busca_router, prefix="/api", tags=["busca"])
 
     print("✅ Todas as rotas carregadas com sucesso")
     print("🧹 Estrutura de rotas consolidada - Arquivos obsoletos removidos")
-    print("📋 Rotas organizadas por contexto: auth, catalogs, os, desenvolvimento, pcp, gestao, admin, users, reports")
+    print("📋 Rotas organizadas por contexto: auth, catalogs, os, desenvolvimento, pcp, gestao, admin, users, reports, busca")
     print("🚫 Removidos: admin_routes_simple.py, catalogs_simple.py, catalogs_validated.py, pcp_routes_backup.py")
     
 except ImportError as e:
@@ -173,22 +220,10 @@ async def get_apontamentos_detalhados_global(
                         query = query.filter(ApontamentoDetalhado.id_setor == user_setor_id)
             # ADMIN e GESTAO veem todos os apontamentos (sem filtro adicional)
 
-            # Aplicar filtros de data se especificados
-            if data_inicio:
-                from datetime import datetime
-                try:
-                    data_inicio_dt = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-                    query = query.filter(func.date(ApontamentoDetalhado.data_hora_inicio) >= data_inicio_dt)
-                except ValueError:
-                    pass
-
-            if data_fim:
-                from datetime import datetime
-                try:
-                    data_fim_dt = datetime.strptime(data_fim, '%Y-%m-%d').date()
-                    query = query.filter(func.date(ApontamentoDetalhado.data_hora_inicio) <= data_fim_dt)
-                except ValueError:
-                    pass
+            # Aplicar filtros de data se especificados (intervalo [inicio, fim) usa o índice)
+            query = query.filter(*filtro_intervalo(
+                ApontamentoDetalhado.data_hora_inicio, *intervalo_dias(data_inicio, data_fim)
+            ))
 
         except Exception as e:
             print(f"⚠️ Erro ao aplicar filtros de usuário: {e}")
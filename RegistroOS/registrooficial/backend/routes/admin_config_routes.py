@@ -20,6 +20,8 @@ ENDPOINTS DISPONÍVEIS:
 - POST /api/admin/config/backup - Criar backup
 - POST /api/admin/config/restore - Restaurar backup
 - GET /api/admin/config/logs - Logs do sistema
+- GET /api/admin/config/cache-catalogos - Estatísticas do cache de catálogos
+- POST /api/admin/config/cache-catalogos/invalidar - Forçar recarga dos catálogos
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -49,6 +51,7 @@ from app.utils.db_lookups import (
     validate_departamento_exists_by_id,
     get_departamento_nome_by_id
 )
+from app.utils.catalog_cache import catalog_cache
 
 # Importar funções de scraping com fallback
 try:
@@ -2679,3 +2682,22 @@ async def get_scraping_performance_metrics(
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao obter métricas: {str(e)}")
+
+# ============================================================================
+# CACHE DE CATÁLOGOS
+# ============================================================================
+
+@router.get("/config/cache-catalogos")
+async def obter_estatisticas_cache_catalogos(
+    current_user: Usuario = Depends(verificar_admin)
+):
+    """Estatísticas do cache de catálogos (hits, misses, recargas)"""
+    return catalog_cache.estatisticas()
+
+@router.post("/config/cache-catalogos/invalidar")
+async def invalidar_cache_catalogos(
+    current_user: Usuario = Depends(verificar_admin)
+):
+    """Força a recarga de todos os catálogos (ex.: após alteração direta no banco)"""
+    catalog_cache.invalidar()
+    return {"message": "Cache de catálogos invalidado", "estatisticas": catalog_cache.estatisticas()}
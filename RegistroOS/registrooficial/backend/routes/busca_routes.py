@@ -0,0 +1,36 @@
+"""
+Busca Routes - RegistroOS
+=========================
+
+Busca unificada (typeahead) em OS, clientes e equipamentos sobre o índice
+de texto mantido por triggers (app/utils/busca_textual.py). A rota só lê:
+o índice vem da migração 005 ou do startup da API (garantir_indice_busca).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database_models import Usuario
+from config.database_config import get_read_db
+from app.dependencies import get_current_user
+from app.utils.busca_textual import FONTES, buscar
+
+router = APIRouter(tags=["busca"])
+
+@router.get("/search")
+async def busca_unificada(
+    q: str = Query(..., min_length=1, description="Texto digitado (prefixos, sem diferenciar acentos)"),
+    tipos: Optional[str] = Query(None, description=f"Tipos separados por vírgula: {', '.join(FONTES)}"),
+    limite: int = Query(10, ge=1, le=50),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Busca OS, clientes e equipamentos pelo início das palavras"""
+    _ = current_user  # Silenciar warning
+    try:
+        lista_tipos = [t.strip().lower() for t in tipos.split(",") if t.strip()] if tipos else None
+        resultados = buscar(db, q, lista_tipos, limite)
+        return {"query": q, "total": len(resultados), "resultados": resultados}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na busca: {str(e)}")
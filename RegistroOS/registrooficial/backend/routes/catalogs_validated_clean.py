@@ -7,10 +7,13 @@ Mapeamento correto entre tabelas e colunas existentes.
 Campos duplicados removidos conforme análise.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
+from collections import defaultdict
 from datetime import datetime
+import hashlib
 import json
 
 from config.database_config import get_db
@@ -21,6 +24,9 @@ from app.database_models import (
     TipoCausaRetrabalho, TipoFalha, OrdemServico, Programacao,
     ApontamentoDetalhado, ResultadoTeste
 )
+from app.utils.catalog_cache import catalog_cache, DOMINIOS_CATALOGOS
+from app.utils.response_cache import response_cache, TTLLRUCache
+from app.utils.intervalo_datas import filtro_dia, hoje_local
 
 router = APIRouter()
 
@@ -91,14 +97,102 @@ async def get_setores(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar setores: {str(e)}")
 
+# Árvore serializada por (gerações dos catálogos, filtros, privilégio).
+# As gerações mudam a cada commit no CRUD de catálogos; o TTL é o mesmo do
+# catalog_cache (CATALOG_CACHE_TTL) e limita alterações feitas fora da aplicação.
+_cache_estrutura = TTLLRUCache(max_entries=64)
+
+def _itens_codigo(linhas):
+    return [
+        {"id": linha["id"], "codigo": linha.get("codigo") or "", "descricao": linha.get("descricao") or ""}
+        for linha in linhas
+    ]
+
+def construir_estrutura_hierarquica(db: Session, departamento: Optional[str], setor: Optional[str]) -> List[Dict[str, Any]]:
+    """
+    Monta departamento → setor → tipos de máquina → testes a partir dos
+    catálogos em memória (uma consulta por tabela), agrupando com
+    dicionários em vez de consultar por setor.
+    """
+    catalog_cache.precarregar(db)
+
+    departamentos = [
+        d for d in catalog_cache.linhas(db, "departamentos")
+        if not departamento or d["nome_tipo"] == departamento
+    ]
+
+    setores_por_departamento = defaultdict(list)
+    for s in catalog_cache.linhas(db, "setores"):
+        if not setor or s["nome"] == setor:
+            setores_por_departamento[s["id_departamento"]].append(s)
+
+    # tipos_teste.tipo_maquina referencia tipos_maquina.id; bases antigas
+    # gravam o nome do tipo, então a chave aceita os dois
+    testes_por_maquina = defaultdict(list)
+    for tt in catalog_cache.linhas(db, "tipos_teste"):
+        testes_por_maquina[tt["tipo_maquina"]].append(
+            {"id": tt["id"], "nome": tt["nome"], "descricao": tt["descricao"]}
+        )
+
+    maquinas_por_departamento = defaultdict(list)
+    for tm in catalog_cache.linhas(db, "tipos_maquina"):
+        maquinas_por_departamento[tm["id_departamento"]].append({
+            "id": tm["id"],
+            "nome_tipo": tm["nome_tipo"],
+            "categoria": tm["categoria"],
+            "descricao": tm["descricao"],
+            "tipos_teste": testes_por_maquina.get(tm["id"], []) + testes_por_maquina.get(tm["nome_tipo"], [])
+        })
+
+    atividades_por_departamento = defaultdict(list)
+    for ta in catalog_cache.linhas(db, "tipos_atividade"):
+        atividades_por_departamento[ta["id_departamento"]].append({
+            "id": ta["id"],
+            "nome_tipo": ta["nome_tipo"],
+            "descricao": ta["descricao"],
+            "id_tipo_maquina": ta["id_tipo_maquina"]
+        })
+
+    descricoes_atividade = _itens_codigo(catalog_cache.linhas(db, "descricoes_atividade"))
+    tipos_falha = _itens_codigo(catalog_cache.linhas(db, "tipos_falha"))
+    causas_retrabalho = _itens_codigo(catalog_cache.linhas(db, "causas_retrabalho"))
+
+    estrutura = []
+    for dept in departamentos:
+        estrutura.append({
+            "id": dept["id"],
+            "nome": (dept["nome_tipo"] or "").strip(),
+            "descricao": dept["descricao"],
+            "setores": [
+                {
+                    "id": setor_obj["id"],
+                    "nome": setor_obj["nome"],
+                    "descricao": setor_obj["descricao"],
+                    "tipos_maquina": maquinas_por_departamento[dept["id"]],
+                    "tipos_atividade": atividades_por_departamento[dept["id"]],
+                    "descricoes_atividade": descricoes_atividade,
+                    "tipos_falha": tipos_falha,
+                    "causas_retrabalho": causas_retrabalho
+                }
+                for setor_obj in setores_por_departamento[dept["id"]]
+            ]
+        })
+    return estrutura
+
 @router.get("/estrutura-hierarquica")
 async def get_estrutura_hierarquica(
+    request: Request,
     departamento: Optional[str] = None,
     setor: Optional[str] = None,
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get hierarchical structure: Department -> Sector -> Machine Types -> Activities -> Tests -> Failures -> Rework Causes"""
+    """
+    Get hierarchical structure: Department -> Sector -> Machine Types -> Activities -> Tests -> Failures -> Rework Causes
+
+    A resposta é serializada uma vez por versão dos catálogos e enviada com
+    ETag; If-None-Match igual retorna 304 sem corpo.
+    """
     try:
         # Filtrar por privilégio do usuário
         if getattr(current_user, 'privilege_level', '') != 'ADMIN':
@@ -108,139 +202,30 @@ async def get_estrutura_hierarquica(
             if not setor:
                 setor = getattr(current_user, 'setor', None)
 
-        # Buscar departamentos
-        dept_query = db.query(Departamento).filter(Departamento.ativo.is_(True))
-        if departamento:
-            dept_query = dept_query.filter(Departamento.nome_tipo == departamento)
-        departamentos = dept_query.all()
-
-        estrutura = []
-
-        for dept in departamentos:
-            # Buscar setores do departamento (fazendo trim do nome)
-            dept_nome = getattr(dept, 'nome_tipo', '').strip() if getattr(dept, 'nome_tipo', None) else ""
-            setores_query = db.query(Setor).filter(
-                Setor.ativo.is_(True),
-                Setor.id_departamento == dept.id  # Usar ID do departamento
-            )
-            if setor:
-                setores_query = setores_query.filter(Setor.nome == setor)
-            setores = setores_query.all()
-
-            setores_data = []
-            for setor_obj in setores:
-                # Buscar tipos de máquina do setor
-                tipos_maquina = db.query(TipoMaquina).filter(
-                    TipoMaquina.ativo.is_(True),
-                    TipoMaquina.id_departamento == dept.id  # Usar ID do departamento
-                ).all()
-
-                # Buscar tipos de teste do setor
-                tipos_teste = db.query(TipoTeste).filter(
-                    TipoTeste.ativo.is_(True),
-                ).all()
-
-                # Buscar atividades (TipoAtividade não tem campo setor)
-                tipos_atividade = db.query(TipoAtividade).filter(
-                    TipoAtividade.ativo.is_(True),
-                    TipoAtividade.id_departamento == dept.id  # Usar ID do departamento
-                ).all()
-
-                # Buscar descrições de atividade (TipoDescricaoAtividade não tem campo setor)
-                descricoes_atividade = db.query(TipoDescricaoAtividade).filter(
-                    TipoDescricaoAtividade.ativo.is_(True)
-                ).all()
-
-                # Buscar tipos de falha
-                try:
-                    tipos_falha = db.query(TipoFalha).filter(
-                        TipoFalha.ativo.is_(True)
-                    ).all()
-                except Exception:
-                    tipos_falha = []
-
-                # Buscar causas de retrabalho
-                try:
-                    causas_retrabalho = db.query(TipoCausaRetrabalho).filter(
-                        TipoCausaRetrabalho.ativo.is_(True)
-                    ).all()
-                except Exception:
-                    causas_retrabalho = []
-
-                setor_data = {
-                    "id": setor_obj.id,
-                    "nome": setor_obj.nome,
-                    "descricao": setor_obj.descricao,
-                    "tipos_maquina": [
-                        {
-                            "id": tm.id,
-                            "nome_tipo": tm.nome_tipo,
-                            "categoria": getattr(tm, 'categoria', None),
-                            "descricao": tm.descricao,
-                            "tipos_teste": [
-                                {
-                                    "id": tt.id,
-                                    "nome": tt.nome,
-                                    "descricao": tt.descricao
-                                }
-                                for tt in tipos_teste if getattr(tt, 'tipo_maquina', None) == tm.nome_tipo
-                            ]
-                        }
-                        for tm in tipos_maquina
-                    ],
-                    "tipos_atividade": [
-                        {
-                            "id": ta.id,
-                            "nome_tipo": ta.nome_tipo,
-                            "descricao": ta.descricao,
-                            "id_tipo_maquina": getattr(ta, 'id_tipo_maquina', None)
-                        }
-                        for ta in tipos_atividade
-                    ],
-                    "descricoes_atividade": [
-                        {
-                            "id": da.id,
-                            "codigo": getattr(da, 'codigo', ''),
-                            "descricao": getattr(da, 'descricao', '')
-                        }
-                        for da in descricoes_atividade
-                    ],
-                    "tipos_falha": [
-                        {
-                            "id": tf.id,
-                            "codigo": getattr(tf, 'codigo', ''),
-                            "descricao": getattr(tf, 'descricao', '')
-                        }
-                        for tf in tipos_falha
-                    ],
-                    "causas_retrabalho": [
-                        {
-                            "id": cr.id,
-                            "codigo": getattr(cr, 'codigo', ''),
-                            "descricao": getattr(cr, 'descricao', '')
-                        }
-                        for cr in causas_retrabalho
-                    ]
+        privilegio = getattr(current_user, 'privilege_level', None)
+        geracoes = ".".join(str(g) for g in response_cache.geracoes(DOMINIOS_CATALOGOS))
+        chave = json.dumps([geracoes, departamento, setor, privilegio])
+
+        encontrado, serializado = _cache_estrutura.get(chave)
+        if not encontrado:
+            estrutura = construir_estrutura_hierarquica(db, departamento, setor)
+            corpo = json.dumps(jsonable_encoder({
+                "estrutura": estrutura,
+                "total_departamentos": len(estrutura),
+                "filtros_aplicados": {
+                    "departamento": departamento,
+                    "setor": setor,
+                    "usuario_privilege": privilegio
                 }
-                setores_data.append(setor_data)
+            }), ensure_ascii=False).encode("utf-8")
+            serializado = (f'"{hashlib.sha1(corpo).hexdigest()}"', corpo)
+            _cache_estrutura.set(chave, serializado, catalog_cache.config["ttl"])
 
-            dept_data = {
-                "id": dept.id,
-                "nome": dept_nome,
-                "descricao": dept.descricao,
-                "setores": setores_data
-            }
-            estrutura.append(dept_data)
-
-        return {
-            "estrutura": estrutura,
-            "total_departamentos": len(estrutura),
-            "filtros_aplicados": {
-                "departamento": departamento,
-                "setor": setor,
-                "usuario_privilege": current_user.privilege_level
-            }
-        }
+        etag, corpo = serializado
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=corpo, media_type="application/json", headers=headers)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar estrutura hierárquica: {str(e)}")
@@ -440,7 +425,7 @@ async def get_dashboard_metrics(
 ):
     """Get dashboard metrics"""
     try:
-        from sqlalchemy import text, func
+        from sqlalchemy import text
 
         # Métricas básicas de OS
         total_os = db.query(OrdemServico).count()
@@ -449,10 +434,8 @@ async def get_dashboard_metrics(
         os_concluidas = db.query(OrdemServico).filter(OrdemServico.status_os == "CONCLUIDA").count()
 
         # Apontamentos hoje
-        from datetime import date
-        hoje = date.today()
         apontamentos_hoje = db.query(ApontamentoDetalhado).filter(
-            func.date(ApontamentoDetalhado.data_hora_inicio) == hoje
+            *filtro_dia(ApontamentoDetalhado.data_hora_inicio, hoje_local())
         ).count()
 
         # Pendências abertas
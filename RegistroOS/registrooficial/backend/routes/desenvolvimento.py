@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, desc, text, distinct # Importado 'distinct'
 from typing import List, Optional, Dict, Any, Union, Callable
@@ -9,6 +9,9 @@ import subprocess
 import os
 import logging
 import sys # Importar sys para o sys.executable
+import uuid
+import asyncio
+from fastapi.concurrency import run_in_threadpool
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -28,20 +31,38 @@ from app.database_models import (
     TipoAtividade, TipoDescricaoAtividade, TipoCausaRetrabalho, TipoTeste, ResultadoTeste
 )
 from config.database_config import get_db
+from config.scraping_config import caminho_script
+from app.scraping import executar_scraping
 from app.dependencies import get_current_user
 from utils.validators import generate_next_os # Certifique-se de que este import está correto
+from app.utils.resumo_diario import atualizar_resumo_apontamento, chave_resumo
+from app.utils.paginacao import (
+    LIMITE_PADRAO, HEADER_PROXIMO_CURSOR, codificar_cursor, decodificar_cursor,
+    filtro_apos_cursor, normalizar_limite
+)
+from app.utils.intervalo_datas import filtro_dia, agora_local
+from app.utils.deduplicacao import melhor_candidato
+from app.utils.single_flight import single_flight, normalizar_numero_os
+from app.utils.frescor_os import avaliar_frescor, registrar_coleta, obter_dados_externos
+from app.utils.dados_externos_os import serializar_dados_externos
+from app.utils.fila_scraping import (
+    fila_scraping, INTERATIVO, LOTE, PRIORIDADE_INTERATIVA, PRIORIDADE_REVALIDACAO, PRIORIDADE_LOTE
+)
 
 # Importar Celery para scraping assíncrono
 CELERY_AVAILABLE = False
+FILA_ASSINCRONA = False  # Tasks com apply_async: Celery ou executor local (tasks/executor_local.py)
 AsyncResult = None
 scrape_os_task = None
 scrape_batch_os_task = None
 get_queue_status = None
 get_scraping_statistics = None
 save_scraping_usage_stats = None
+estimar_duracao_lote = None
+revalidar_os_por_numero = None
 
 try:
-    from tasks.scraping_tasks import scrape_os_task, scrape_batch_os_task, get_queue_status, get_scraping_statistics, save_scraping_usage_stats
+    from tasks.scraping_tasks import scrape_os_task, scrape_batch_os_task, get_queue_status, get_scraping_statistics, save_scraping_usage_stats, estimar_duracao_lote, revalidar_os_por_numero
     CELERY_AVAILABLE = True
     print("✅ Tasks de scraping carregadas")
 except ImportError as e:
@@ -56,15 +77,28 @@ class MockAsyncResult:
         self.info = {}
         self.result = None
 
-# Tentar importar AsyncResult real, usar mock se falhar
+# Tentar importar AsyncResult real, usar mock se falhar (ou se o broker estiver inacessível)
 try:
+    from config.scraping_config import celery_utilizavel
+    if not celery_utilizavel():
+        raise ImportError("Celery não instalado ou broker inacessível")
     from celery.result import AsyncResult as CeleryAsyncResult  # type: ignore
     AsyncResult = CeleryAsyncResult
+    FILA_ASSINCRONA = CELERY_AVAILABLE
     print("✅ Celery disponível - Scraping assíncrono habilitado")
 except ImportError as e:
     AsyncResult = MockAsyncResult
     CELERY_AVAILABLE = False
-    print(f"⚠️ Celery não disponível - Usando mocks: {e}")
+    try:
+        from tasks.executor_local import ResultadoLocal, executor_local, executor_local_necessario
+        if scrape_os_task is not None and executor_local_necessario():
+            AsyncResult = ResultadoLocal
+            FILA_ASSINCRONA = True
+            print("⚙️ Celery não disponível - Scraping assíncrono pelo executor local (asyncio + processos)")
+        else:
+            print(f"⚠️ Celery não disponível - Usando mocks: {e}")
+    except ImportError as erro_local:
+        print(f"⚠️ Celery não disponível - Usando mocks: {e} ({erro_local})")
 
 # Funções auxiliares para type safety
 def safe_apply_async(task_func: Any, *args, **kwargs) -> Any:
@@ -448,7 +482,18 @@ async def get_meus_apontamentos(
     Baseado no nível de privilégio do usuário.
     """
     try:
-        query = db.query(ApontamentoDetalhado)
+        query = db.query(
+            ApontamentoDetalhado,
+            OrdemServico.os_numero,
+            Cliente.razao_social,
+            Equipamento.descricao
+        ).outerjoin(
+            OrdemServico, OrdemServico.id == ApontamentoDetalhado.id_os
+        ).outerjoin(
+            Cliente, Cliente.id == OrdemServico.id_cliente
+        ).outerjoin(
+            Equipamento, Equipamento.id == OrdemServico.id_equipamento
+        )
         
         # Filtrar por usuário se não for admin
         if current_user.privilege_level == 'USER':  # type: ignore
@@ -459,31 +504,28 @@ async def get_meus_apontamentos(
         # Admin vê tudo
         
         if data:
-            try:
-                data_filtro = datetime.strptime(data, '%Y-%m-%d').date()
-                query = query.filter(func.date(ApontamentoDetalhado.data_inicio) == data_filtro)
-            except ValueError:
-                pass
+            query = query.filter(*filtro_dia(ApontamentoDetalhado.data_hora_inicio, data))
         
-        apontamentos = query.order_by(desc(ApontamentoDetalhado.data_inicio)).limit(50).all()
+        apontamentos = query.order_by(desc(ApontamentoDetalhado.data_hora_inicio)).limit(50).all()
         
         return [
             {
                 "id": apt.id,
-                "numero_os": apt.numero_os,
-                "cliente": apt.cliente or None,  # Dados conforme hierarquia do banco
-                "equipamento": apt.equipamento or None,  # Dados conforme hierarquia do banco
-                "data_inicio": apt.data_inicio.isoformat() if apt.data_inicio is not None else None,
-                "hora_inicio": apt.hora_inicio,
-                "data_fim": apt.data_fim.isoformat() if apt.data_fim is not None else None,
-                "hora_fim": apt.hora_fim,
-                "tempo_trabalhado": apt.tempo_trabalhado,
+                "numero_os": numero_os,
+                "cliente": cliente or None,  # Dados conforme hierarquia do banco
+                "equipamento": equipamento or None,  # Dados conforme hierarquia do banco
+                "data_inicio": apt.data_hora_inicio.date().isoformat() if apt.data_hora_inicio is not None else None,
+                "hora_inicio": apt.data_hora_inicio.strftime('%H:%M') if apt.data_hora_inicio is not None else None,
+                "data_fim": apt.data_hora_fim.date().isoformat() if apt.data_hora_fim is not None else None,
+                "hora_fim": apt.data_hora_fim.strftime('%H:%M') if apt.data_hora_fim is not None else None,
+                "tempo_trabalhado": round((apt.data_hora_fim - apt.data_hora_inicio).total_seconds() / 3600, 2)
+                    if apt.data_hora_fim is not None and apt.data_hora_inicio is not None else None,
                 "tipo_atividade": apt.tipo_atividade or None,
                 "descricao_atividade": apt.descricao_atividade or None,
-                "status": "CONCLUIDO" if apt.data_fim else "EM_ANDAMENTO",
+                "status": "CONCLUIDO" if apt.data_hora_fim else "EM_ANDAMENTO",
                 "setor_responsavel": None  # Será atualizado via id_setor
             }
-            for apt in apontamentos
+            for apt, numero_os, cliente, equipamento in apontamentos
         ]
     except Exception as e:
         print(f"Erro ao buscar apontamentos: {e}")
@@ -606,6 +648,9 @@ async def criar_apontamento(
 
             programacao_finalizada = True
 
+        # Atualizar resumo diário (rollup dos dashboards)
+        atualizar_resumo_apontamento(db, novo_apontamento)
+
         db.commit()
         db.refresh(novo_apontamento)
 
@@ -651,9 +696,14 @@ async def deletar_minhas_os(
             raise HTTPException(status_code=404, detail="Nenhum apontamento encontrado")
         
         # Por enquanto, permitir deletar (futuramente verificar aprovação do supervisor)
+        chaves_removidas = [chave_resumo(apt) for apt in apontamentos]
         for apt in apontamentos:
             db.delete(apt)
-        
+
+        # Atualizar resumo diário (rollup dos dashboards)
+        for chave in chaves_removidas:
+            atualizar_resumo_apontamento(db, chave_anterior=chave)
+
         db.commit()
         
         return {"message": f"{len(apontamentos)} apontamento(s) deletado(s) com sucesso"}
@@ -704,6 +754,9 @@ async def aprovar_apontamento(
             else:
                 setattr(apontamento, 'observacoes_gerais', f"[APROVAÇÃO] {dados['observacoes_aprovacao']}")
 
+        # Atualizar resumo diário (rollup dos dashboards)
+        atualizar_resumo_apontamento(db, apontamento)
+
         db.commit()
         db.refresh(apontamento)
 
@@ -839,6 +892,9 @@ async def rejeitar_apontamento(
         else:
             setattr(apontamento, 'observacoes_gerais', f"[REJEIÇÃO] {motivo}")
 
+        # Atualizar resumo diário (rollup dos dashboards)
+        atualizar_resumo_apontamento(db, apontamento)
+
         db.commit()
         db.refresh(apontamento)
 
@@ -961,6 +1017,9 @@ async def finalizar_apontamento(
             db.flush()  # Para obter o ID
             pendencia_id = nova_pendencia.id
 
+        # Atualizar resumo diário (rollup dos dashboards)
+        atualizar_resumo_apontamento(db, apontamento)
+
         db.commit()
 
         resultado = {
@@ -1032,6 +1091,9 @@ async def editar_apontamento(
         if not pode_editar:
             raise HTTPException(status_code=403, detail="Você não tem permissão para editar este apontamento")
 
+        # Chave do resumo diário antes da edição (data/setor podem mudar)
+        chave_anterior = chave_resumo(apontamento)
+
         # Campos que podem ser editados
         campos_editaveis = [
             'data_hora_inicio', 'data_hora_fim', 'tipo_atividade', 'descricao_atividade',
@@ -1068,6 +1130,9 @@ async def editar_apontamento(
         else:
             setattr(apontamento, 'observacoes_gerais', log_edicao)
 
+        # Atualizar resumo diário (rollup dos dashboards)
+        atualizar_resumo_apontamento(db, apontamento, chave_anterior)
+
         db.commit()
         db.refresh(apontamento)
 
@@ -1424,6 +1489,14 @@ async def get_descricoes_atividade_formulario(
         return []
 
 
+# Limite de parâmetros por IN-list (SQLite antigo aceita no máximo 999 variáveis)
+TAMANHO_LOTE_IN = 500
+
+def _em_lotes(valores: List[Any], tamanho: int):
+    """Divide uma lista em lotes de no máximo `tamanho` itens"""
+    for inicio in range(0, len(valores), tamanho):
+        yield valores[inicio:inicio + tamanho]
+
 @router.post("/buscar-ids-os")
 async def buscar_ids_os(
     request_data: dict,
@@ -1436,80 +1509,75 @@ async def buscar_ids_os(
         if not numeros_os:
             return {"mapeamento": {}}
 
-        # Buscar OSs no banco de dados - versão simplificada para debug
-        logger.info(f"Buscando OSs pelos números: {numeros_os}")
+        # Números normalizados e sem repetição, na ordem recebida
+        numeros_unicos = list(dict.fromkeys(str(numero).strip() for numero in numeros_os if numero))
+        logger.info(f"Buscando {len(numeros_unicos)} OSs pelos números")
 
         try:
-            # Query simples primeiro para testar - CAMPO CORRETO: os_numero
-            os_encontradas = db.query(OrdemServico).filter(
-                OrdemServico.os_numero.in_(numeros_os)
-            ).all()
-
-            logger.info(f"OSs encontradas: {len(os_encontradas)}")
-
-            # Criar mapeamento numero -> dados básicos (versão funcional)
+            # Uma consulta com JOINs por lote de números (IN-list limitada)
             mapeamento = {}
             dados_completos = {}
 
-            for os in os_encontradas:
-                numero_os = os.os_numero  # CAMPO CORRETO: os_numero
-                mapeamento[numero_os] = os.id
-
-                # Buscar relacionamentos 1:1 conforme HIERARQUIA_COMPLETA_BANCO_DADOS.md
-                cliente_info = None
-                equipamento_info = None
-                tipo_maquina_info = None
-
-                # Relacionamento 1:1 com Cliente
-                if getattr(os, 'id_cliente', None) is not None:
-                    try:
-                        cliente = db.query(Cliente).filter(Cliente.id == os.id_cliente).first()
-                        if cliente:
-                            cliente_info = {
-                                "id": cliente.id,
-                                "nome": cliente.razao_social,
-                                "cnpj": getattr(cliente, 'cnpj', None)
-                            }
-                    except Exception as e:
-                        logger.warning(f"Erro ao buscar cliente {os.id_cliente}: {e}")
-
-                # Relacionamento 1:1 com Equipamento
-                if getattr(os, 'id_equipamento', None) is not None:
-                    try:
-                        equipamento = db.query(Equipamento).filter(Equipamento.id == os.id_equipamento).first()
-                        if equipamento:
-                            equipamento_info = {
-                                "id": equipamento.id,
-                                "descricao": equipamento.descricao,
-                                "numero_serie": getattr(equipamento, 'numero_serie', None)
-                            }
-                    except Exception as e:
-                        logger.warning(f"Erro ao buscar equipamento {os.id_equipamento}: {e}")
-
-                # Relacionamento com Tipo de Máquina
-                if getattr(os, 'id_tipo_maquina', None) is not None:
-                    try:
-                        tipo_maquina = db.query(TipoMaquina).filter(TipoMaquina.id == os.id_tipo_maquina).first()
-                        if tipo_maquina:
-                            tipo_maquina_info = tipo_maquina.nome_tipo
-                    except Exception as e:
-                        logger.warning(f"Erro ao buscar tipo máquina {os.id_tipo_maquina}: {e}")
-
-                # Dados completos conforme HIERARQUIA_COMPLETA_BANCO_DADOS.md
-                dados_completos[numero_os] = {
-                    "id": os.id,
-                    "numero_os": os.os_numero,  # CAMPO CORRETO: os_numero
-                    "status_os": os.status_os,
-                    "descricao_maquina": os.descricao_maquina,
-                    "prioridade": getattr(os, 'prioridade', None),
-                    "status_geral": getattr(os, 'status_geral', None),
-                    # Relacionamentos 1:1 implementados
-                    "cliente": cliente_info,
-                    "equipamento": equipamento_info,
-                    "tipo_maquina": tipo_maquina_info,
-                    "setor": None,  # TODO: Implementar relacionamento
-                    "departamento": None  # TODO: Implementar relacionamento
-                }
+            for lote in _em_lotes(numeros_unicos, TAMANHO_LOTE_IN):
+                linhas = db.query(
+                    OrdemServico.id,
+                    OrdemServico.os_numero,
+                    OrdemServico.status_os,
+                    OrdemServico.descricao_maquina,
+                    OrdemServico.prioridade,
+                    OrdemServico.status_geral,
+                    Cliente.id.label("cliente_id"),
+                    Cliente.razao_social,
+                    Cliente.cnpj_cpf,
+                    Equipamento.id.label("equipamento_id"),
+                    Equipamento.descricao.label("equipamento_descricao"),
+                    Equipamento.numero_serie,
+                    TipoMaquina.nome_tipo,
+                    Setor.nome.label("setor_nome"),
+                    Departamento.nome_tipo.label("departamento_nome")
+                ).outerjoin(
+                    Cliente, Cliente.id == OrdemServico.id_cliente
+                ).outerjoin(
+                    Equipamento, Equipamento.id == OrdemServico.id_equipamento
+                ).outerjoin(
+                    TipoMaquina, TipoMaquina.id == OrdemServico.id_tipo_maquina
+                ).outerjoin(
+                    Setor, Setor.id == OrdemServico.id_setor
+                ).outerjoin(
+                    Departamento, Departamento.id == OrdemServico.id_departamento
+                ).filter(
+                    OrdemServico.os_numero.in_(lote)
+                ).all()
+
+                for linha in linhas:
+                    numero_os = linha.os_numero  # CAMPO CORRETO: os_numero
+                    mapeamento[numero_os] = linha.id
+
+                    # Dados completos conforme HIERARQUIA_COMPLETA_BANCO_DADOS.md
+                    dados_completos[numero_os] = {
+                        "id": linha.id,
+                        "numero_os": numero_os,
+                        "status_os": linha.status_os,
+                        "descricao_maquina": linha.descricao_maquina,
+                        "prioridade": linha.prioridade,
+                        "status_geral": linha.status_geral,
+                        # Relacionamentos 1:1
+                        "cliente": {
+                            "id": linha.cliente_id,
+                            "nome": linha.razao_social,
+                            "cnpj": linha.cnpj_cpf
+                        } if linha.cliente_id is not None else None,
+                        "equipamento": {
+                            "id": linha.equipamento_id,
+                            "descricao": linha.equipamento_descricao,
+                            "numero_serie": linha.numero_serie
+                        } if linha.equipamento_id is not None else None,
+                        "tipo_maquina": linha.nome_tipo,
+                        "setor": linha.setor_nome,
+                        "departamento": linha.departamento_nome
+                    }
+
+            logger.info(f"OSs encontradas: {len(mapeamento)}")
 
         except Exception as query_error:
             logger.error(f"Erro na query: {query_error}")
@@ -1519,7 +1587,7 @@ async def buscar_ids_os(
             "mapeamento": mapeamento,
             "dados_completos": dados_completos,
             "total_encontradas": len(mapeamento),
-            "total_solicitadas": len(numeros_os),
+            "total_solicitadas": len(numeros_unicos),
             "hierarquia_conforme": "HIERARQUIA_COMPLETA_BANCO_DADOS.md"
         }
 
@@ -1568,7 +1636,7 @@ async def teste_scraping(numero_os: str):
         python_executable = sys.executable 
         # python_executable = r"C:\path\to\your\venv\Scripts\python.exe" # Exemplo de caminho absoluto
 
-        scrap_path = r"C:\Users\Alessandro\OneDrive\Desktop\RegistroOS\RegistroOS\registrooficial\backend\scripts\scrape_os_data.py"
+        scrap_path = caminho_script("scrape_os_data")
 
         logger.info(f"🔍 Testando scraping para OS: {numero_os}")
         logger.info(f"🔍 Caminho do script: {scrap_path}")
@@ -1608,6 +1676,88 @@ async def teste_scraping(numero_os: str):
         logger.error(f"Erro no endpoint de teste de scraping: {e}")
         return {"erro": str(e)}
 
+# Revalidações em segundo plano sem Celery (referências mantidas até terminarem)
+_revalidacoes_locais = set()
+
+def _fila_cheia(admissao) -> HTTPException:
+    """429 com Retry-After quando a fila de scraping está acima do limite (contrapressão)"""
+    return HTTPException(
+        status_code=429,
+        detail={
+            "message": "Fila de scraping cheia. Tente novamente mais tarde.",
+            "motivo": admissao.motivo,
+            "retry_after": admissao.retry_after,
+            "espera_estimada": admissao.espera_estimada
+        },
+        headers={"Retry-After": str(admissao.retry_after)}
+    )
+
+def _revalidar_na_vez(numero_os: str, user_id: int, ticket: str) -> Dict[str, Any]:
+    """Revalidação local (sem Celery), na vez dos itens de lote da fila de scraping"""
+    try:
+        with fila_scraping.vez(LOTE, user_id, ticket):
+            return revalidar_os_por_numero(numero_os)
+    finally:
+        fila_scraping.encerrar(ticket)
+
+def _scraping_sincrono_na_vez(numero_os: str, user_id: int, ticket: str) -> List[Dict[str, Any]]:
+    """Scraping síncrono pelo backend configurado (SCRAPING_BACKEND), na vez das consultas interativas"""
+    with fila_scraping.vez(INTERATIVO, user_id, ticket):
+        return executar_scraping(numero_os)
+
+def agendar_revalidacao(db: Session, numero_os: str, status_local: Optional[str], user_id: int) -> Dict[str, Any]:
+    """
+    Stale-while-revalidate: a OS cadastrada é servida na hora e, se estiver
+    velha para o seu status (app/utils/frescor_os.py), uma nova coleta é
+    agendada em segundo plano. Retorna os metadados de frescor da resposta.
+    """
+    try:
+        frescor = avaliar_frescor(db, numero_os, status_local)
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao avaliar frescor da OS {numero_os}: {e}")
+        return {}
+
+    meta = {
+        "coletado_em": frescor.scraped_at.isoformat() if frescor.scraped_at else None,
+        "frescor": frescor.estado,
+        "revalidando": False
+    }
+    chave_os = normalizar_numero_os(numero_os)
+    if not frescor.revalidar or single_flight.nao_encontrada(chave_os):
+        return meta
+
+    # Revalidação entra na fila de lote: com a fila cheia, a OS é servida sem revalidar
+    task_id = f"revalidar_{chave_os}_{uuid.uuid4().hex[:8]}"
+    if FILA_ASSINCRONA and scrape_os_task:
+        if single_flight.reservar(chave_os, task_id).lider:
+            if not fila_scraping.admitir(LOTE, user_id, task_id).aceita:
+                single_flight.liberar(chave_os, task_id)
+                return meta
+            try:
+                safe_apply_async(
+                    scrape_os_task,
+                    args=[numero_os, user_id],
+                    kwargs={"revalidar": True},
+                    task_id=task_id,
+                    priority=PRIORIDADE_REVALIDACAO  # Abaixo das consultas interativas
+                )
+                meta["revalidando"] = True
+            except Exception as e:
+                single_flight.liberar(chave_os, task_id)
+                fila_scraping.encerrar(task_id)
+                logger.warning(f"⚠️ Não foi possível agendar a revalidação da OS {numero_os}: {e}")
+    elif revalidar_os_por_numero and fila_scraping.admitir(LOTE, user_id, task_id).aceita:
+        tarefa = asyncio.ensure_future(single_flight.executar(
+            chave_os, lambda: run_in_threadpool(_revalidar_na_vez, numero_os, user_id, task_id)
+        ))
+        _revalidacoes_locais.add(tarefa)
+        tarefa.add_done_callback(_revalidacoes_locais.discard)
+        meta["revalidando"] = True
+
+    if meta["revalidando"]:
+        logger.info(f"🔄 OS {numero_os} servida do banco ({frescor.estado}), revalidando em segundo plano")
+    return meta
+
 @router.post("/buscar-os-async/{numero_os}")
 async def buscar_os_async(numero_os: str, db: Session = Depends(get_db), current_user: Usuario = Depends(get_current_user)):
     """
@@ -1653,47 +1803,84 @@ async def buscar_os_async(numero_os: str, db: Session = Depends(get_db), current
                     "equipamento": equipamento_nome,
                     "data_criacao": (lambda x: x.isoformat() if x and hasattr(x, 'isoformat') else None)(getattr(existing_os, 'data_criacao', None))
                 },
-                "fonte": "banco_local"
+                "fonte": "banco_local",
+                **agendar_revalidacao(db, numero_os, existing_os.status_os, current_user.id)
             }
 
         # 2. Verificar se Celery está disponível
-        if not CELERY_AVAILABLE:
+        if not FILA_ASSINCRONA:
             logger.warning("⚠️ Celery não disponível - executando scraping síncrono")
             # Fallback para scraping síncrono
             return await get_detalhes_os_formulario(numero_os, current_user, db)
 
-        # 3. Verificar se já existe task em andamento para esta OS
-        task_id = f"scraping_{numero_os}"
-        if CELERY_AVAILABLE and AsyncResult:
+        # 3. Single flight: um scraping por OS; pedidos simultâneos se anexam à task em andamento
+        chave_os = normalizar_numero_os(numero_os)
+        if single_flight.nao_encontrada(chave_os):
+            logger.info(f"🚫 OS {numero_os} não encontrada recentemente no sistema externo (cache negativo)")
+            return {
+                "status": "not_found",
+                "message": f"OS {numero_os} não encontrada no sistema externo",
+                "fonte": "cache_negativo"
+            }
+
+        task_id = f"scraping_{chave_os}_{uuid.uuid4().hex[:8]}"
+        voo = single_flight.reservar(chave_os, task_id)
+        if not voo.lider and AsyncResult and not voo.dono.startswith("api:"):
             try:
-                existing_task = AsyncResult(task_id)
-                if existing_task.state in ['PENDING', 'PROGRESS']:
-                    logger.info(f"📋 OS {numero_os} já está sendo processada (Task: {task_id})")
-
-                    return {
-                        "status": "queued",
-                        "message": f"OS {numero_os} já está sendo processada",
-                        "task_id": task_id,
-                        "estimated_time": "2-5 minutos"
-                    }
+                # Task anterior já terminou sem liberar a trava (ex.: worker sem o mesmo Redis)
+                if AsyncResult(voo.dono).state in ('SUCCESS', 'FAILURE', 'REVOKED'):
+                    single_flight.liberar(chave_os, voo.dono)
+                    voo = single_flight.reservar(chave_os, task_id)
             except Exception as e:
                 logger.debug(f"Erro ao verificar task existente: {e}")
 
-        # 4. Iniciar nova task de scraping
+        if not voo.lider:
+            if voo.dono.startswith("api:"):
+                # Scraping síncrono (/formulario/buscar-os) em andamento para esta OS
+                return {
+                    "status": "in_progress",
+                    "message": f"OS {numero_os} já está sendo consultada por outra requisição",
+                    "retry_after": 5
+                }
+
+            logger.info(f"📋 OS {numero_os} já está sendo processada (Task: {voo.dono})")
+            return {
+                "status": "queued",
+                "message": f"OS {numero_os} já está sendo processada",
+                "task_id": voo.dono,
+                "estimated_time": "2-5 minutos",
+                "instructions": {
+                    "check_status": f"/api/desenvolvimento/scraping-status/{voo.dono}",
+                    "polling_interval": "5 segundos"
+                }
+            }
+
+        # 4. Contrapressão: fila interativa acima do limite responde 429
+        admissao = fila_scraping.admitir(INTERATIVO, current_user.id, task_id)
+        if not admissao.aceita:
+            single_flight.liberar(chave_os, task_id)
+            raise _fila_cheia(admissao)
+
+        # 5. Iniciar nova task de scraping
         logger.info(f"🎯 Iniciando nova task de scraping para OS {numero_os}")
 
-        if CELERY_AVAILABLE and scrape_os_task:
+        if FILA_ASSINCRONA and scrape_os_task:
             try:
                 task = safe_apply_async(
                     scrape_os_task,
                     args=[numero_os, current_user.id],
                     task_id=task_id,
-                    priority=5  # Prioridade normal
+                    priority=PRIORIDADE_INTERATIVA  # Consultas interativas na frente das revalidações
                 )
-            except AttributeError as e:
-                # Fallback se apply_async não estiver disponível
+            except Exception as e:
+                # Task não enfileirada (apply_async ausente, broker fora): libera a trava e a vaga
+                single_flight.liberar(chave_os, task_id)
+                fila_scraping.encerrar(task_id)
+                logger.error(f"❌ Não foi possível enfileirar o scraping da OS {numero_os}: {e}")
                 return {"error": f"Celery task não configurada corretamente: {e}"}
         else:
+            single_flight.liberar(chave_os, task_id)
+            fila_scraping.encerrar(task_id)
             return {"error": "Celery não disponível para scraping assíncrono"}
 
         logger.info(f"✅ Task criada para OS {numero_os}: {task.id}")
@@ -1703,12 +1890,15 @@ async def buscar_os_async(numero_os: str, db: Session = Depends(get_db), current
             "message": f"OS {numero_os} adicionada à fila de processamento",
             "task_id": task.id,
             "estimated_time": "2-5 minutos",
+            "espera_fila_segundos": admissao.espera_estimada,
             "instructions": {
                 "check_status": f"/api/desenvolvimento/scraping-status/{task.id}",
                 "polling_interval": "5 segundos"
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Erro ao iniciar scraping assíncrono para OS {numero_os}: {e}")
         return {
@@ -1726,7 +1916,7 @@ async def get_scraping_status(task_id: str, current_user: Usuario = Depends(get_
     Retorna o progresso e resultado do scraping
     """
     try:
-        if not CELERY_AVAILABLE or not AsyncResult:
+        if not FILA_ASSINCRONA or not AsyncResult:
             return {"error": "Celery não disponível"}
 
         task = AsyncResult(task_id)
@@ -1832,8 +2022,6 @@ async def get_detalhes_os_formulario(
     logger.info(f"🎯 ROTA CORRETA CHAMADA - numero_os: {numero_os}")
     logger.info(f"🎯 FUNÇÃO get_detalhes_os_formulario CHAMADA! numero_os={numero_os}")
 
-    import ast # Importar ast para literal_eval
-
     logger.info(f"🚀 INICIANDO BUSCA DA OS: {numero_os}")
     logger.info(f"🔍 Buscando OS no banco: {numero_os}")
 
@@ -1911,7 +2099,8 @@ async def get_detalhes_os_formulario(
                 "cliente": cliente_nome,
                 "tipo_maquina": tipo_maquina_nome,
                 "tipo_maquina_id": result[15] if len(result) > 15 and result[15] else None,  # id_tipo_maquina está na posição 15
-                "fonte": "banco"
+                "fonte": "banco",
+                **agendar_revalidacao(db, numero_os, result[2], getattr(current_user, 'id', 0))
             }
     except Exception as db_error:
         logger.error(f"❌ Erro na consulta do banco para OS {numero_os}: {db_error}")
@@ -1921,268 +2110,222 @@ async def get_detalhes_os_formulario(
     logger.info(f"🌐 Tentando buscar via scraping...")
     logger.info(f"🔍 Iniciando processo de scraping para OS {numero_os}")
 
-    try:
-        logger.info(f"📦 Módulos importados com sucesso para scraping.")
+    chave_os = normalizar_numero_os(numero_os)
+    if single_flight.nao_encontrada(chave_os):
+        logger.info(f"🚫 OS {numero_os} não encontrada recentemente no sistema externo (cache negativo)")
+        raise HTTPException(
+            status_code=404,
+            detail="⚠️ OS não cadastrada na base de dados. Você pode preencher os campos manualmente."
+        )
 
-        # Caminho absoluto para o scrape_os_data.py
-        scrap_path = r"C:\Users\Alessandro\OneDrive\Desktop\RegistroOS\RegistroOS\registrooficial\backend\scripts\scrape_os_data.py"
-        
-        # Usar sys.executable para garantir que o mesmo interpretador Python seja usado
-        python_executable = sys.executable 
+    try:
+        async def coletar():
+            # Líder: admissão na fila interativa (429 se cheia) e scraping na vez do site
+            user_id = getattr(current_user, 'id', 0)
+            ticket = f"api_{chave_os}_{uuid.uuid4().hex[:8]}"
+            admissao = fila_scraping.admitir(INTERATIVO, user_id, ticket)
+            if not admissao.aceita:
+                raise _fila_cheia(admissao)
+            try:
+                return await run_in_threadpool(_scraping_sincrono_na_vez, numero_os, user_id, ticket)
+            finally:
+                fila_scraping.encerrar(ticket)
+
+        # Um único scraping por OS: requisições simultâneas aguardam o líder (em thread, sem bloquear o loop)
+        voo = await single_flight.executar(chave_os, coletar)
+        if not voo.lider:
+            if single_flight.dono_atual(chave_os) is not None:
+                # Outro processo ainda está coletando após SCRAPING_FOLLOWER_TIMEOUT
+                raise HTTPException(
+                    status_code=503,
+                    detail="OS sendo consultada no sistema externo por outra requisição. Tente novamente em instantes.",
+                    headers={"Retry-After": "5"}
+                )
+            logger.info(f"🔗 OS {numero_os} coletada por requisição simultânea, reconsultando o banco")
+            return await get_detalhes_os_formulario(numero_os, current_user, db)
 
-        logger.info(f"🔍 Caminho do script: {scrap_path}")
-        logger.info(f"🔍 Script existe: {os.path.exists(scrap_path)}")
-        logger.info(f"🔍 Diretório atual: {os.getcwd()}")
-        logger.info(f"🔍 Interpretador Python usado: {python_executable}")
+        # Backend de scraping: lista vazia só para OS confirmada como inexistente; timeout e erro sobem como exceção
+        scraped_data = voo.resultado
+        if scraped_data:
+            logger.info(f"✅ Scraping executado com sucesso para OS {numero_os}")
+            try:
+                os_data = scraped_data[0]  # Primeiro resultado
+                logger.info(f"📊 Dados coletados: {os_data}")
+
+                # 1. CRIAR/BUSCAR CLIENTE
+                cliente_id = None
+                cliente_nome_scraped = os_data.get('CLIENTE', os_data.get('NOME CLIENTE', ''))
+                cliente_cnpj = os_data.get('CNPJ', '')
+
+                if cliente_nome_scraped and cliente_nome_scraped.strip():
+                    # Buscar cliente existente (documento, nome normalizado ou similaridade)
+                    cliente_existente = melhor_candidato(db, "cliente", {
+                        "razao_social": cliente_nome_scraped, "cnpj_cpf": cliente_cnpj
+                    })
+
+                    if cliente_existente:
+                        cliente_id = cliente_existente.ref_id
+                        logger.info(f"✅ Cliente existente encontrado: {cliente_nome_scraped} (ID: {cliente_id})")
+                    else:
+                        # Criar novo cliente
+                        novo_cliente = Cliente(
+                            razao_social=cliente_nome_scraped.strip(),
+                            nome_fantasia=cliente_nome_scraped.strip(),
+                            cnpj_cpf=cliente_cnpj.strip() if cliente_cnpj else None,
+                            contato_principal="Contato via scraping",
+                            telefone_contato="",
+                            email_contato="",
+                            endereco=os_data.get('MUNICIPIO', ''),
+                            data_criacao=datetime.now(),
+                            data_ultima_atualizacao=datetime.now()
+                        )
+                        db.add(novo_cliente)
+                        db.flush()  # Para obter o ID
+                        cliente_id = novo_cliente.id
+                        logger.info(f"✅ Novo cliente criado: {cliente_nome_scraped} (ID: {cliente_id})")
+
+                # 2. CRIAR/BUSCAR EQUIPAMENTO
+                equipamento_id = None
+                equipamento_desc = os_data.get('DESCRIÇÃO', os_data.get('TIPO DO EQUIPAMENTO', ''))
+                equipamento_fabricante = os_data.get('FABRICANTE', '')
+                equipamento_modelo = os_data.get('MODELO', '')
+                equipamento_serie = os_data.get('NUMERO DE SERIE', '')
+
+                if equipamento_desc and equipamento_desc.strip():
+                    # Buscar equipamento existente (fabricante + série, descrição ou similaridade)
+                    equipamento_existente = melhor_candidato(db, "equipamento", {
+                        "descricao": equipamento_desc,
+                        "fabricante": equipamento_fabricante,
+                        "numero_serie": equipamento_serie
+                    })
+
+                    if equipamento_existente:
+                        equipamento_id = equipamento_existente.ref_id
+                        logger.info(f"✅ Equipamento existente encontrado: {equipamento_desc[:50]} (ID: {equipamento_id})")
+                    else:
+                        # Criar novo equipamento
+                        novo_equipamento = Equipamento(
+                            descricao=equipamento_desc.strip(),
+                            tipo=os_data.get('TIPO DO EQUIPAMENTO', 'Equipamento via scraping'),
+                            fabricante=equipamento_fabricante.strip() if equipamento_fabricante else None,
+                            modelo=equipamento_modelo.strip() if equipamento_modelo else None,
+                            numero_serie=equipamento_serie.strip() if equipamento_serie else None,
+                            data_criacao=datetime.now(),
+                            data_ultima_atualizacao=datetime.now()
+                        )
+                        db.add(novo_equipamento)
+                        db.flush()  # Para obter o ID
+                        equipamento_id = novo_equipamento.id
+                        logger.info(f"✅ Novo equipamento criado: {equipamento_desc[:50]} (ID: {equipamento_id})")
+
+                # 3. SALVAR OS COM RELACIONAMENTOS
+                insert_sql = text("""\
+                    INSERT OR REPLACE INTO ordens_servico
+                    (os_numero, id_cliente, id_equipamento, descricao_maquina,
+                     status_os, data_criacao, prioridade, observacoes_gerais, ultima_atividade)
+                    VALUES (:os_numero, :id_cliente, :id_equipamento, :descricao,
+                            :status, :agora, :prioridade, :observacoes, :agora)
+                """)
+
+                # Remover zeros à esquerda do número da OS
+                os_numero_limpo = os_data.get('OS', numero_os)
+                if isinstance(os_numero_limpo, str) and os_numero_limpo.startswith('000'):
+                    os_numero_limpo = os_numero_limpo.lstrip('0') or '0'  # Remove zeros à esquerda
+
+                db.execute(insert_sql, {
+                    "os_numero": os_numero_limpo,
+                    "id_cliente": cliente_id,
+                    "id_equipamento": equipamento_id,
+                    "status": os_data.get('STATUS DA OS', 'COLETADA VIA SCRAPING'),
+                    "descricao": equipamento_desc[:200] if equipamento_desc else f"Equipamento da OS {numero_os}",
+                    "prioridade": "MEDIA",
+                    "observacoes": f"OS criada via scraping - Cliente: {cliente_nome_scraped} - CNPJ: {cliente_cnpj}",
+                    # Mesmo relógio para data_criacao e ultima_atividade
+                    "agora": agora_local().strftime('%Y-%m-%d %H:%M:%S.%f')
+                })
 
+                # Payload completo para o controle de frescor
+                registrar_coleta(db, numero_os, os_data)
 
-        if not os.path.exists(scrap_path):
-            logger.error(f"❌ Arquivo scrape_os_data.py não encontrado em: {scrap_path}")
-            raise FileNotFoundError(f"Arquivo scrape_os_data.py não encontrado em: {scrap_path}")
+                db.commit()
+                logger.info(f"✅ OS {numero_os} salva no banco após scraping")
 
-        logger.info(f"🚀 Executando comando: {python_executable} {scrap_path} {numero_os}")
+                # Salvar estatísticas de uso do scraping
+                try:
+                    if save_scraping_usage_stats:
+                        user_id = getattr(current_user, 'id', 0)
+                        save_scraping_usage_stats(user_id, numero_os, True, 0)
+                        logger.info(f"📊 Estatísticas de scraping salvas para usuário {current_user.id}")
+                except Exception as stats_error:
+                    logger.warning(f"⚠️ Erro ao salvar estatísticas de scraping: {stats_error}")
+            except Exception as erro_gravacao:
+                db.rollback()
+                logger.error(f"❌ Erro ao salvar os dados do scraping da OS {numero_os}: {erro_gravacao}")
+        else:
+            logger.warning(f"⚠️ OS {numero_os} não encontrada no sistema externo")
+            single_flight.marcar_nao_encontrada(chave_os)
 
-        # Definir variáveis de ambiente para UTF-8
-        env = os.environ.copy()
-        env['PYTHONIOENCODING'] = 'utf-8'
+        # Tentar buscar novamente no banco após o scraping
+        result_after_scraping = db.execute(sql, {
+            "numero_os": numero_os,
+            "numero_os_padded": f"000{numero_os}".zfill(9)
+        }).fetchone()
 
-        result_scraping = subprocess.run(
-            [python_executable, scrap_path, numero_os],
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            env=env,
-            timeout=60
-        )
-        logger.info(f"📊 Código de retorno: {result_scraping.returncode}")
-        logger.info(f"📄 Stdout: {result_scraping.stdout}")
-        logger.info(f"❌ Stderr: {result_scraping.stderr}")
-        
-        if result_scraping.returncode == 0:
-            stdout_text = result_scraping.stdout
+        if result_after_scraping:
+            logger.info(f"✅ OS encontrada no banco após scraping: {numero_os}")
 
-            logger.info(f"✅ Scraping executado com sucesso para OS {numero_os}")
-            logger.info(f"📄 Saída do scraping: {stdout_text}")
+            # Processar os dados da OS encontrada após scraping
+            cliente_nome_after = None
+            equipamento_nome_after = ""
+            tipo_maquina_nome_after = None
 
-            # Processar os dados retornados pelo scraping
-            try:
-                # Tentar extrair os dados do resultado
-                output_lines = stdout_text.strip().split('\n')
-                resultado_line = None
-
-                logger.info(f"🔍 Linhas de saída do scraping:")
-                for i, line in enumerate(output_lines):
-                    logger.info(f"   {i}: {line}")
-
-                for line in output_lines:
-                    if line.startswith('Resultado: '):
-                        resultado_line = line.replace('Resultado: ', '').strip()
-                        logger.info(f"📊 Linha de resultado encontrada: {resultado_line}")
-                        break
-
-                if resultado_line:
-                    logger.info(f"🔄 Tentando converter resultado_line com ast.literal_eval: {resultado_line}")
-                    scraped_data = ast.literal_eval(resultado_line)
-
-                    if scraped_data and len(scraped_data) > 0:
-                        os_data = scraped_data[0]  # Primeiro resultado
-                        logger.info(f"📊 Dados coletados: {os_data}")
-
-                        # 1. CRIAR/BUSCAR CLIENTE
-                        cliente_id = None
-                        cliente_nome_scraped = os_data.get('CLIENTE', os_data.get('NOME CLIENTE', ''))
-                        cliente_cnpj = os_data.get('CNPJ', '')
-
-                        if cliente_nome_scraped and cliente_nome_scraped.strip():
-                            # Buscar cliente existente
-                            cliente_existente = db.query(Cliente).filter(
-                                Cliente.razao_social.ilike(f"%{cliente_nome_scraped.strip()}%")
-                            ).first()
-
-                            if cliente_existente:
-                                cliente_id = cliente_existente.id
-                                logger.info(f"✅ Cliente existente encontrado: {cliente_nome_scraped} (ID: {cliente_id})")
-                            else:
-                                # Criar novo cliente
-                                novo_cliente = Cliente(
-                                    razao_social=cliente_nome_scraped.strip(),
-                                    nome_fantasia=cliente_nome_scraped.strip(),
-                                    cnpj_cpf=cliente_cnpj.strip() if cliente_cnpj else None,
-                                    contato_principal="Contato via scraping",
-                                    telefone_contato="",
-                                    email_contato="",
-                                    endereco=os_data.get('MUNICIPIO', ''),
-                                    data_criacao=datetime.now(),
-                                    data_ultima_atualizacao=datetime.now()
-                                )
-                                db.add(novo_cliente)
-                                db.flush()  # Para obter o ID
-                                cliente_id = novo_cliente.id
-                                logger.info(f"✅ Novo cliente criado: {cliente_nome_scraped} (ID: {cliente_id})")
-
-                        # 2. CRIAR/BUSCAR EQUIPAMENTO
-                        equipamento_id = None
-                        equipamento_desc = os_data.get('DESCRIÇÃO', os_data.get('TIPO DO EQUIPAMENTO', ''))
-                        equipamento_fabricante = os_data.get('FABRICANTE', '')
-                        equipamento_modelo = os_data.get('MODELO', '')
-                        equipamento_serie = os_data.get('NUMERO DE SERIE', '')
-
-                        if equipamento_desc and equipamento_desc.strip():
-                            # Buscar equipamento existente
-                            equipamento_existente = db.query(Equipamento).filter(
-                                Equipamento.descricao.ilike(f"%{equipamento_desc.strip()[:50]}%")
-                            ).first()
-
-                            if equipamento_existente:
-                                equipamento_id = equipamento_existente.id
-                                logger.info(f"✅ Equipamento existente encontrado: {equipamento_desc[:50]} (ID: {equipamento_id})")
-                            else:
-                                # Criar novo equipamento
-                                novo_equipamento = Equipamento(
-                                    descricao=equipamento_desc.strip(),
-                                    tipo=os_data.get('TIPO DO EQUIPAMENTO', 'Equipamento via scraping'),
-                                    fabricante=equipamento_fabricante.strip() if equipamento_fabricante else None,
-                                    modelo=equipamento_modelo.strip() if equipamento_modelo else None,
-                                    numero_serie=equipamento_serie.strip() if equipamento_serie else None,
-                                    data_criacao=datetime.now(),
-                                    data_ultima_atualizacao=datetime.now()
-                                )
-                                db.add(novo_equipamento)
-                                db.flush()  # Para obter o ID
-                                equipamento_id = novo_equipamento.id
-                                logger.info(f"✅ Novo equipamento criado: {equipamento_desc[:50]} (ID: {equipamento_id})")
-
-                        # 3. SALVAR OS COM RELACIONAMENTOS
-                        insert_sql = text("""\
-                            INSERT OR REPLACE INTO ordens_servico
-                            (os_numero, id_cliente, id_equipamento, descricao_maquina,
-                             status_os, data_criacao, prioridade, observacoes_gerais)
-                            VALUES (:os_numero, :id_cliente, :id_equipamento, :descricao,
-                                    :status, datetime('now'), :prioridade, :observacoes)
-                        """)
-
-                        # Remover zeros à esquerda do número da OS
-                        os_numero_limpo = os_data.get('OS', numero_os)
-                        if isinstance(os_numero_limpo, str) and os_numero_limpo.startswith('000'):
-                            os_numero_limpo = os_numero_limpo.lstrip('0') or '0'  # Remove zeros à esquerda
-
-                        db.execute(insert_sql, {
-                            "os_numero": os_numero_limpo,
-                            "id_cliente": cliente_id,
-                            "id_equipamento": equipamento_id,
-                            "status": os_data.get('STATUS DA OS', 'COLETADA VIA SCRAPING'),
-                            "descricao": equipamento_desc[:200] if equipamento_desc else f"Equipamento da OS {numero_os}",
-                            "prioridade": "MEDIA",
-                            "observacoes": f"OS criada via scraping - Cliente: {cliente_nome_scraped} - CNPJ: {cliente_cnpj}"
-                        })
-                        
-                        db.commit()
-                        logger.info(f"✅ OS {numero_os} salva no banco após scraping")
-
-                        # Salvar estatísticas de uso do scraping
-                        try:
-                            if save_scraping_usage_stats:
-                                user_id = getattr(current_user, 'id', 0)
-                                save_scraping_usage_stats(user_id, numero_os, True, 0)
-                                logger.info(f"📊 Estatísticas de scraping salvas para usuário {current_user.id}")
-                        except Exception as stats_error:
-                            logger.warning(f"⚠️ Erro ao salvar estatísticas de scraping: {stats_error}")
-                    else:
-                        logger.warning(f"⚠️ Scraping retornou dados vazios ou não processáveis para OS {numero_os}. Resultado: {scraped_data}")
-                else:
-                    logger.warning(f"⚠️ Nenhuma linha 'Resultado:' encontrada na saída do scraping para OS {numero_os}. Stdout: {stdout_text}")
+            # Buscar cliente
+            if len(result_after_scraping) > 31 and result_after_scraping[31]:
+                try:
+                    cliente_obj = db.query(Cliente).filter(Cliente.id == result_after_scraping[31]).first()
+                    if cliente_obj:
+                        cliente_nome_after = cliente_obj.razao_social
+                except Exception as e:
+                    logger.warning(f"Erro ao buscar cliente após scraping: {e}")
 
-            except Exception as parse_error:
-                logger.error(f"❌ Erro ao processar dados do scraping para OS {numero_os}: {parse_error}. Saída bruta: {stdout_text}")
+            # Buscar equipamento
+            if len(result_after_scraping) > 32 and result_after_scraping[32] is not None:
+                try:
+                    equipamento_obj = db.query(Equipamento).filter(Equipamento.id == result_after_scraping[32]).first()
+                    if equipamento_obj:
+                        equipamento_nome_after = equipamento_obj.descricao
+                except Exception as e:
+                    logger.warning(f"Erro ao buscar equipamento após scraping: {e}")
+            elif len(result_after_scraping) > 36 and result_after_scraping[36] is not None:
+                equipamento_nome_after = result_after_scraping[36]
 
-            # Tentar buscar novamente no banco após o scraping
-            result_after_scraping = db.execute(sql, {
-                "numero_os": numero_os,
-                "numero_os_padded": f"000{numero_os}".zfill(9)
-            }).fetchone()
-
-            if result_after_scraping:
-                logger.info(f"✅ OS encontrada no banco após scraping: {numero_os}")
-
-                # Processar os dados da OS encontrada após scraping
-                cliente_nome_after = None
-                equipamento_nome_after = ""
-                tipo_maquina_nome_after = None
-
-                # Buscar cliente
-                if len(result_after_scraping) > 31 and result_after_scraping[31]:
-                    try:
-                        cliente_obj = db.query(Cliente).filter(Cliente.id == result_after_scraping[31]).first()
-                        if cliente_obj:
-                            cliente_nome_after = cliente_obj.razao_social
-                    except Exception as e:
-                        logger.warning(f"Erro ao buscar cliente após scraping: {e}")
-
-                # Buscar equipamento
-                if len(result_after_scraping) > 32 and result_after_scraping[32] is not None:
-                    try:
-                        equipamento_obj = db.query(Equipamento).filter(Equipamento.id == result_after_scraping[32]).first()
-                        if equipamento_obj:
-                            equipamento_nome_after = equipamento_obj.descricao
-                    except Exception as e:
-                        logger.warning(f"Erro ao buscar equipamento após scraping: {e}")
-                elif len(result_after_scraping) > 36 and result_after_scraping[36] is not None:
-                    equipamento_nome_after = result_after_scraping[36]
-
-                # Buscar tipo de máquina
-                if len(result_after_scraping) > 15 and result_after_scraping[15]:
-                    try:
-                        tipo_maquina_obj = db.query(TipoMaquina).filter(TipoMaquina.id == result_after_scraping[15]).first()
-                        if tipo_maquina_obj:
-                            tipo_maquina_nome_after = tipo_maquina_obj.nome_tipo
-                    except Exception as e:
-                        logger.warning(f"Erro ao buscar tipo de máquina após scraping: {e}")
+            # Buscar tipo de máquina
+            if len(result_after_scraping) > 15 and result_after_scraping[15]:
+                try:
+                    tipo_maquina_obj = db.query(TipoMaquina).filter(TipoMaquina.id == result_after_scraping[15]).first()
+                    if tipo_maquina_obj:
+                        tipo_maquina_nome_after = tipo_maquina_obj.nome_tipo
+                except Exception as e:
+                    logger.warning(f"Erro ao buscar tipo de máquina após scraping: {e}")
                 
-                return {
-                    "id": result_after_scraping[0],
-                    "numero_os": result_after_scraping[1],
-                    "status": result_after_scraping[2],
-                    "status_os": result_after_scraping[2],
-                    "cliente": cliente_nome_after,
-                    "equipamento": equipamento_nome_after,
-                    "tipo_maquina": tipo_maquina_nome_after,
-                    "horas_orcadas": float(result_after_scraping[20] or 0) if len(result_after_scraping) > 20 else 0,
-                    "testes_exclusivo_os": bool(result_after_scraping[30] or False) if len(result_after_scraping) > 30 else False,
-                    "fonte": "scraping_e_banco"
-                }
-            else:
-                logger.warning(f"❌ OS ainda não encontrada no banco após scraping para {numero_os}")
-
+            return {
+                "id": result_after_scraping[0],
+                "numero_os": result_after_scraping[1],
+                "status": result_after_scraping[2],
+                "status_os": result_after_scraping[2],
+                "cliente": cliente_nome_after,
+                "equipamento": equipamento_nome_after,
+                "tipo_maquina": tipo_maquina_nome_after,
+                "horas_orcadas": float(result_after_scraping[20] or 0) if len(result_after_scraping) > 20 else 0,
+                "testes_exclusivo_os": bool(result_after_scraping[30] or False) if len(result_after_scraping) > 30 else False,
+                "fonte": "scraping_e_banco"
+            }
         else:
-            logger.error(f"❌ Erro no scraping da OS {numero_os}: {result_scraping.stderr}")
+            logger.warning(f"❌ OS ainda não encontrada no banco após scraping para {numero_os}")
 
-            # Salvar estatísticas de uso do scraping (falha)
-            try:
-                if save_scraping_usage_stats:
-                    user_id = getattr(current_user, 'id', 0)
-                    save_scraping_usage_stats(user_id, numero_os, False, 0)
-                    logger.info(f"📊 Estatísticas de scraping (falha) salvas para usuário {current_user.id}")
-            except Exception as stats_error:
-                logger.warning(f"⚠️ Erro ao salvar estatísticas de scraping: {stats_error}")
-
-    except subprocess.TimeoutExpired:
-        logger.error(f"⏰ Timeout no scraping da OS {numero_os}")
-        # Salvar estatísticas de uso do scraping (timeout)
-        try:
-            if save_scraping_usage_stats:
-                user_id = getattr(current_user, 'id', 0)
-                save_scraping_usage_stats(user_id, numero_os, False, 60)  # 60s timeout
-        except Exception:
-            pass
-    except FileNotFoundError as fnf_error:
-        logger.error(f"❌ Erro de arquivo não encontrado ao executar scraping para OS {numero_os}: {fnf_error}")
-        # Salvar estatísticas de uso do scraping (erro)
-        try:
-            if save_scraping_usage_stats:
-                user_id = getattr(current_user, 'id', 0)
-                save_scraping_usage_stats(user_id, numero_os, False, 0)
-        except Exception:
-            pass
+    except HTTPException:
+        # Resposta da reconsulta após o scraping de outra requisição
+        raise
     except Exception as scraping_error:
         logger.error(f"❌ Erro inesperado ao executar scraping para OS {numero_os}: {scraping_error}")
         # Salvar estatísticas de uso do scraping (erro)
@@ -2199,6 +2342,28 @@ async def get_detalhes_os_formulario(
         detail="⚠️ OS não cadastrada na base de dados. Você pode preencher os campos manualmente."
     )
 
+@router.get("/formulario/dados-externos/{numero_os}", operation_id="dev_get_formulario_dados_externos")
+async def get_dados_externos_os(
+    numero_os: str,
+    incluir_payload: bool = Query(True, description="Incluir o payload completo do scraping"),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Especificações da OS coletadas do sistema externo, lidas do banco local
+    (os_dados_externos) sem disparar scraping: campos tipados (potência,
+    tensões, rotação, datas...) e o payload completo.
+    """
+    _ = current_user  # Silenciar warning
+    registro = obter_dados_externos(db, numero_os)
+    if registro is None:
+        raise HTTPException(status_code=404, detail="OS sem dados coletados do sistema externo")
+
+    dados = serializar_dados_externos(registro)
+    if not incluir_payload:
+        dados.pop("payload")
+    return dados
+
 @router.get("/programacao", operation_id="dev_get_programacao")
 async def get_programacao_desenvolvimento(
     status: Optional[str] = Query(None),
@@ -2343,18 +2508,26 @@ async def get_colaboradores_setor(
 
 @router.get("/pendencias", operation_id="dev_get_pendencias")
 async def get_pendencias(
+    response: Response,
     data: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
+    limite: Optional[int] = Query(LIMITE_PADRAO, description="Itens por página (máx. 500)"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Proximo-Cursor)"),
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Endpoint para obter pendências com filtros opcionais.
     Baseado no nível de privilégio do usuário para definir visibilidade.
+
+    Uma única consulta com JOINs (apontamento de origem, setor, OS e
+    equipamento), paginada por cursor em (data_inicio, id) decrescente.
+    Quando há mais itens, o cursor da próxima página vem no header
+    X-Proximo-Cursor.
     """
     try:
-        query = db.query(Pendencia)
-        
+        limite = normalizar_limite(limite)
+
         # Controle de acesso: setor criador, PCP e GESTÃO têm acesso
         user_departamento = None
         if hasattr(current_user, 'departamento'):
@@ -2364,65 +2537,66 @@ async def get_pendencias(
             if setor_user:
                 user_departamento = getattr(setor_user, 'departamento', None)
 
-        # PCP e GESTÃO têm acesso a todas as pendências
-        if user_departamento not in ['PCP', 'GESTAO'] and getattr(current_user, 'privilege_level', None) != 'ADMIN':
-            # Usuários normais só veem pendências do seu setor
-            apontamento_ids = db.query(ApontamentoDetalhado.id).filter(
-                ApontamentoDetalhado.id_setor == current_user.id_setor
-            ).all()
-            ids_list = [apt_id[0] for apt_id in apontamento_ids]
-            if ids_list:
-                query = query.filter(Pendencia.id_apontamento_origem.in_(ids_list))
-            else:
-                # Se não há apontamentos do setor, não retornar nenhuma pendência
-                query = query.filter(Pendencia.id == -1)
-        
+        acesso_total = user_departamento in ['PCP', 'GESTAO'] or getattr(current_user, 'privilege_level', None) == 'ADMIN'
+
+        query = db.query(
+            Pendencia,
+            ApontamentoDetalhado.observacoes_gerais,
+            Setor.nome.label("setor_nome"),
+            Equipamento.descricao.label("equipamento_descricao")
+        )
+
+        if acesso_total:
+            # PCP e GESTÃO têm acesso a todas as pendências
+            query = query.outerjoin(
+                ApontamentoDetalhado, ApontamentoDetalhado.id == Pendencia.id_apontamento_origem
+            )
+        else:
+            # Usuários normais só veem pendências originadas em apontamentos do seu setor
+            query = query.join(
+                ApontamentoDetalhado, and_(
+                    ApontamentoDetalhado.id == Pendencia.id_apontamento_origem,
+                    ApontamentoDetalhado.id_setor == current_user.id_setor
+                )
+            )
+
+        # os_numero não é único: uma OS por número (a de menor id), senão uma
+        # OS duplicada repetiria a pendência e desalinharia o cursor
+        id_os_pendencia = db.query(func.min(OrdemServico.id)).filter(
+            OrdemServico.os_numero == Pendencia.numero_os
+        ).correlate(Pendencia).scalar_subquery()
+
+        query = query.outerjoin(
+            Setor, Setor.id == ApontamentoDetalhado.id_setor
+        ).outerjoin(
+            OrdemServico, OrdemServico.id == id_os_pendencia
+        ).outerjoin(
+            Equipamento, Equipamento.id == OrdemServico.id_equipamento
+        )
+
         if status:
             query = query.filter(Pendencia.status == status)
-        
+
         if data:
-            try:
-                data_filtro = datetime.strptime(data, '%Y-%m-%d').date()
-                query = query.filter(func.date(Pendencia.data_inicio) == data_filtro)
-            except ValueError:
-                pass
-        
-        pendencias = query.order_by(desc(Pendencia.data_inicio)).limit(50).all()
-        
-        # Buscar informações do setor através do apontamento origem
+            query = query.filter(*filtro_dia(Pendencia.data_inicio, data))
+
+        valores_cursor = decodificar_cursor(cursor, 2)
+        if valores_cursor:
+            query = query.filter(filtro_apos_cursor((Pendencia.data_inicio, Pendencia.id), valores_cursor))
+
+        # Busca um item a mais para saber se existe próxima página
+        linhas = query.order_by(desc(Pendencia.data_inicio), desc(Pendencia.id)).limit(limite + 1).all()
+        if len(linhas) > limite:
+            linhas = linhas[:limite]
+            ultima = linhas[-1][0]
+            response.headers[HEADER_PROXIMO_CURSOR] = codificar_cursor(ultima.data_inicio, ultima.id)
+
         resultado = []
-        for pend in pendencias:
-            # Buscar apontamento origem para obter setor e observação geral
-            apontamento = None
-            setor_nome = None
-            descricao_pendencia = pend.descricao_pendencia  # Fallback para descrição original
-
-            if pend.id_apontamento_origem is not None:
-                apontamento = db.query(ApontamentoDetalhado).filter(
-                    ApontamentoDetalhado.id == pend.id_apontamento_origem
-                ).first()
-                if apontamento:
-                    # Buscar setor através do id_setor
-                    setor_obj = db.query(Setor).filter(Setor.id == apontamento.id_setor).first()
-                    setor_nome = setor_obj.nome if setor_obj else None
-
-                    # Usar observação geral do apontamento como descrição da pendência
-                    observacoes = getattr(apontamento, 'observacoes_gerais', None)
-                    if observacoes:
-                        descricao_pendencia = observacoes
-
-            # Buscar equipamento através do relacionamento OS → Equipamento
-            equipamento_descricao = pend.descricao_maquina  # Fallback para descricao_maquina
-            try:
-                os = db.query(OrdemServico).filter(OrdemServico.os_numero == pend.numero_os).first()
-                equipamento_id = getattr(os, 'id_equipamento', None) if os else None
-                if os and equipamento_id:
-                    equipamento = db.query(Equipamento).filter(Equipamento.id == equipamento_id).first()
-                    equipamento_desc = getattr(equipamento, 'descricao', None) if equipamento else None
-                    if equipamento and equipamento_desc:
-                        equipamento_descricao = equipamento_desc
-            except Exception as e:
-                print(f"⚠️ Erro ao buscar equipamento para pendência {pend.id}: {e}")
+        for pend, observacoes, setor_nome, equipamento_desc in linhas:
+            # Observação geral do apontamento origem substitui a descrição original
+            descricao_pendencia = observacoes or pend.descricao_pendencia
+            # Equipamento da OS, com fallback para descricao_maquina
+            equipamento_descricao = equipamento_desc or pend.descricao_maquina
 
             resultado.append({
                 "id": pend.id,
@@ -3127,16 +3301,25 @@ async def iniciar_scraping_lote(
 
         logger.info(f"🚀 Iniciando scraping em lote: {batch_name} - {len(os_numbers)} OS - User: {current_user.id}")
 
-        if CELERY_AVAILABLE and scrape_batch_os_task:
+        if FILA_ASSINCRONA and scrape_batch_os_task:
+            # Contrapressão: itens de lote pendentes (total e por usuário) acima do limite respondem 429
+            task_id = f"lote_{uuid.uuid4().hex}"
+            admissao = fila_scraping.admitir(LOTE, current_user.id, task_id, itens=len(os_numbers))
+            if not admissao.aceita:
+                raise _fila_cheia(admissao)
+
             try:
                 # Usar task assíncrona
                 task = safe_apply_async(
                     scrape_batch_os_task,
                     args=[os_numbers, current_user.id, batch_name],
-                    priority=3  # Prioridade menor que scraping individual
+                    task_id=task_id,
+                    priority=PRIORIDADE_LOTE  # Prioridade menor que scraping individual
                 )
-            except AttributeError as e:
-                # Fallback se apply_async não estiver disponível
+            except Exception as e:
+                # Lote não enfileirado (apply_async ausente, broker fora): libera a vaga
+                fila_scraping.encerrar(task_id)
+                logger.error(f"❌ Não foi possível enfileirar o lote {batch_name}: {e}")
                 return {"error": f"Celery batch task não configurada corretamente: {e}"}
 
             return {
@@ -3145,7 +3328,8 @@ async def iniciar_scraping_lote(
                 "task_id": task.id,
                 "batch_name": batch_name,
                 "total_os": len(os_numbers),
-                "estimated_time": f"{len(os_numbers) * 2}-{len(os_numbers) * 5} minutos",
+                "estimated_time": estimar_duracao_lote(len(os_numbers)),
+                "espera_fila_segundos": admissao.espera_estimada,
                 "instructions": {
                     "check_status": f"/api/desenvolvimento/scraping-batch-status/{task.id}",
                     "polling_interval": "10 segundos"
@@ -3154,6 +3338,8 @@ async def iniciar_scraping_lote(
         else:
             return {"error": "Celery não disponível para scraping em lote"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Erro ao iniciar scraping em lote: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -3167,7 +3353,7 @@ async def obter_status_lote(
     Obter status do processamento em lote
     """
     try:
-        if not CELERY_AVAILABLE:
+        if not FILA_ASSINCRONA:
             return {"error": "Celery não disponível"}
 
         if AsyncResult:
@@ -3243,16 +3429,20 @@ async def obter_status_fila(
 ):
     """
     Obter status das filas de scraping
+    Inclui, por fila (interativo/lote), pendências, vazão recente e espera estimada
     """
     try:
+        status = {"filas": fila_scraping.status()}
+        if FILA_ASSINCRONA and not CELERY_AVAILABLE:
+            status["executor_local"] = executor_local.status()
         if get_queue_status:
             try:
-                status = safe_call_function(get_queue_status)
-                return status
+                status.update(safe_call_function(get_queue_status))
             except AttributeError:
-                return {"error": "Status da fila não configurado corretamente"}
+                status["error"] = "Status da fila não configurado corretamente"
         else:
-            return {"error": "Status da fila não disponível"}
+            status["error"] = "Status da fila não disponível"
+        return status
 
     except Exception as e:
         logger.error(f"❌ Erro ao obter status da fila: {e}")
@@ -1,16 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Dict, Any, Optional
 from datetime import datetime as dt
-import sys
 import os
 import json
-from pathlib import Path
 from pydantic import BaseModel
 from app.database_models import Usuario, OrdemServico, ApontamentoDetalhado, ResultadoTeste, Pendencia, TipoTeste, Cliente, Programacao, Equipamento
 from config.database_config import get_db
 from app.dependencies import get_current_user
+from app.utils.resumo_diario import atualizar_resumo_apontamento
+from app.utils.intervalo_datas import filtro_dia
+from app.scraping import executar_scraping
 
 router = APIRouter()
 
@@ -240,6 +241,9 @@ async def save_apontamento(
                 # Salvar na coluna testes_exclusivo_os da OS
                 ordem_servico.testes_exclusivo_os_os = json.dumps(testes_json, ensure_ascii=False)
 
+        # Atualizar resumo diário (rollup dos dashboards)
+        atualizar_resumo_apontamento(db, apontamento)
+
         db.commit()
 
         return {
@@ -528,6 +532,9 @@ async def save_apontamento_with_pendencia(
                 # Salvar na coluna testes_exclusivo_os da OS
                 ordem_servico.testes_exclusivo_os_os = json.dumps(testes_json, ensure_ascii=False)
 
+        # Atualizar resumo diário (rollup dos dashboards)
+        atualizar_resumo_apontamento(db, apontamento)
+
         db.commit()
 
         response_data = {
@@ -653,12 +660,7 @@ async def get_meus_apontamentos(
 
         # Filtrar por data se fornecida
         if data:
-            try:
-                from datetime import datetime
-                data_filtro = datetime.strptime(data, "%Y-%m-%d").date()
-                query = query.filter(func.date(ApontamentoDetalhado.data_hora_inicio) == data_filtro)
-            except:
-                pass  # Ignorar erro de formato de data
+            query = query.filter(*filtro_dia(ApontamentoDetalhado.data_hora_inicio, data))  # Data inválida é ignorada
 
         # Filtrar por setor se fornecido
         if setor and current_user.privilege_level in ["ADMIN", "SUPERVISOR"]:
@@ -836,25 +838,10 @@ async def consultar_os_scraping(
         if not numero_os:
             raise HTTPException(status_code=400, detail="Número da OS é obrigatório")
 
-        # Caminho para o script de scraping
-        script_path = Path(__file__).parent.parent / "scripts" / "scrape_os_data.py"
-        if not script_path.exists():
-            raise HTTPException(
-                status_code=500,
-                detail="Script de scraping não encontrado"
-            )
-
-        # Adicionar o caminho do script ao sys.path para importação
-        scripts_dir = str(script_path.parent)
-        if scripts_dir not in sys.path:
-            sys.path.append(scripts_dir)
-
         try:
-            # Importar e executar a função de scraping
-            from scrape_os_data import execute_scraping  # type: ignore
-
+            # Backend configurado (SCRAPING_BACKEND com fallbacks), fora do event loop
             print(f"🚀 Executando scraping para OS: {numero_os}")
-            scraped_data = execute_scraping(numero_os)
+            scraped_data = await run_in_threadpool(executar_scraping, numero_os)
 
             if scraped_data:
                 return {
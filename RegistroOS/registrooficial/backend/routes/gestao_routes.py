@@ -1,13 +1,114 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select, case, and_, true, literal, union_all
 from typing import Optional
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
-from app.database_models import Usuario, OrdemServico, Programacao, ApontamentoDetalhado
-from config.database_config import get_db
+from app.database_models import (
+    Usuario, OrdemServico, Programacao, ApontamentoDetalhado, ApontamentoResumoDiario,
+    Pendencia, Setor, Departamento, TipoMaquina
+)
+from config.database_config import get_read_db
+from app.utils.sql_aggregates import horas_entre, contar_se
+from app.utils.response_cache import cache_resposta
+from app.utils.intervalo_datas import agora_local, intervalo_dias, intervalo_periodo, filtro_intervalo
 
 router = APIRouter(tags=["gestao"])
 
+# =============================================================================
+# FILTROS COMUNS (período, departamento, setor, tipo de equipamento)
+# =============================================================================
+
+STATUS_OS_CONCLUIDA = ("CONCLUIDA",)
+STATUS_OS_EM_ANDAMENTO = ("EM ANDAMENTO", "EM_ANDAMENTO")
+STATUS_OS_ABERTA = ("ABERTA",)
+STATUS_OS_AGUARDANDO = ("AGUARDANDO",)
+STATUS_PROGRAMACAO_PENDENTE = ("PROGRAMADA", "ENVIADA")
+STATUS_PROGRAMACAO_EM_ANDAMENTO = ("EM ANDAMENTO", "EM_ANDAMENTO")
+STATUS_PROGRAMACAO_CONCLUIDA = ("CONCLUIDA",)
+
+def _informado(valor: Optional[str]) -> bool:
+    return bool(valor) and valor.strip().lower() != "todos"
+
+def _intervalo(periodo: Optional[int], data_inicio: Optional[date], data_fim: Optional[date]):
+    """
+    Converte os filtros de data em um intervalo [inicio, fim) de datetimes.
+    data_inicio/data_fim têm prioridade sobre periodo (últimos N dias);
+    data_fim é inclusiva. Retorna None nos limites não informados.
+    """
+    inicio, fim = intervalo_dias(data_inicio, data_fim)
+    if inicio is None:
+        inicio = intervalo_periodo(periodo)[0]
+    return inicio, fim
+
+def _ids_departamento(departamento: str):
+    """Departamento aceito por ID ou por nome (tipo_departamentos.nome_tipo)"""
+    if departamento.strip().isdigit():
+        return select(literal(int(departamento)))
+    return select(Departamento.id).where(Departamento.nome_tipo == departamento.strip())
+
+def _ids_setor(setor: str):
+    """Setor aceito por ID ou por nome (tipo_setores.nome)"""
+    if setor.strip().isdigit():
+        return select(literal(int(setor)))
+    return select(Setor.id).where(Setor.nome == setor.strip())
+
+def _filtros_os(periodo, departamento, setor, data_inicio, data_fim, tipo_equipamento=None):
+    """Filtros de ordens_servico: período por data_criacao e hierarquia"""
+    filtros = filtro_intervalo(OrdemServico.data_criacao, *_intervalo(periodo, data_inicio, data_fim))
+    if _informado(departamento):
+        filtros.append(OrdemServico.id_departamento.in_(_ids_departamento(departamento)))
+    if _informado(setor):
+        filtros.append(OrdemServico.id_setor.in_(_ids_setor(setor)))
+    if _informado(tipo_equipamento):
+        filtros.append(OrdemServico.id_tipo_maquina.in_(
+            select(TipoMaquina.id).where(TipoMaquina.nome_tipo == tipo_equipamento)
+        ))
+    return filtros
+
+def _filtros_setor(departamento, setor):
+    """Filtros sobre tipo_setores para consultas agrupadas por setor"""
+    filtros = []
+    if _informado(departamento):
+        filtros.append(Setor.id_departamento.in_(_ids_departamento(departamento)))
+    if _informado(setor):
+        filtros.append(Setor.id.in_(_ids_setor(setor)))
+    return filtros
+
+def _percentual(parte, total, casas=1):
+    return round((parte / total * 100) if total else 0, casas)
+
+def _metricas_os():
+    """Agregações condicionais de ordens_servico (uma linha por grupo)"""
+    return (
+        func.count(OrdemServico.id),
+        contar_se(OrdemServico.status_os.in_(STATUS_OS_CONCLUIDA)),
+        contar_se(OrdemServico.status_os.in_(STATUS_OS_EM_ANDAMENTO)),
+        contar_se(OrdemServico.status_os.in_(STATUS_OS_ABERTA)),
+        contar_se(and_(
+            OrdemServico.data_fim_prevista < agora_local(),
+            OrdemServico.status_os.notin_(STATUS_OS_CONCLUIDA)
+        ))
+    )
+
+def _valor_se(condicao, coluna):
+    """Valor da coluna apenas nas linhas que satisfazem a condição (NULL nas demais)"""
+    return case((condicao, coluna), else_=None)
+
+def _eficiencia_horas(horas_previstas, horas_reais, casas=1):
+    """
+    Eficiência em horas das OS concluídas: previstas / reais * 100.
+    100 = dentro do previsto; acima de 100, concluída em menos horas.
+    Definição única para /dashboard e /relatorio-producao.
+    """
+    if not horas_previstas or not horas_reais:
+        return 0.0
+    return round(float(horas_previstas) / float(horas_reais) * 100, casas)
+
+# =============================================================================
+# ENDPOINTS
+# =============================================================================
+
 @router.get("/metricas-gerais", operation_id="gestao_get_metricas_gerais")
 async def get_metricas_gerais(
     periodo: Optional[int] = 30,
@@ -16,96 +117,132 @@ async def get_metricas_gerais(
     setor: Optional[str] = None,
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Retorna métricas gerais para dashboard de gestão"""
     try:
-        total_os = db.query(OrdemServico).count()
-        total_programacoes = db.query(Programacao).count()
-        total_usuarios = db.query(Usuario).count()
-        
+        inicio, fim = _intervalo(periodo, data_inicio, data_fim)
+
+        # Programações e usuários entram como subconsultas escalares da mesma consulta
+        filtros_programacao = filtro_intervalo(Programacao.created_at, inicio, fim)
+        filtros_usuario = []
+        if _informado(setor):
+            filtros_programacao.append(Programacao.id_setor.in_(_ids_setor(setor)))
+            filtros_usuario.append(Usuario.id_setor.in_(_ids_setor(setor)))
+        if _informado(departamento):
+            filtros_programacao.append(Programacao.id_setor.in_(
+                select(Setor.id).where(Setor.id_departamento.in_(_ids_departamento(departamento)))
+            ))
+            filtros_usuario.append(Usuario.id_departamento.in_(_ids_departamento(departamento)))
+
+        def _contar_programacoes(*condicao):
+            return select(func.count(Programacao.id)).where(*filtros_programacao, *condicao).scalar_subquery()
+
+        (total_os, concluidas, em_andamento, _abertas, atrasadas,
+         total_programacoes, programacoes_pendentes, programacoes_em_andamento,
+         total_usuarios) = db.query(
+            *_metricas_os(),
+            _contar_programacoes(),
+            _contar_programacoes(Programacao.status.in_(STATUS_PROGRAMACAO_PENDENTE)),
+            _contar_programacoes(Programacao.status.in_(STATUS_PROGRAMACAO_EM_ANDAMENTO)),
+            select(func.count(Usuario.id)).where(*filtros_usuario).scalar_subquery()
+        ).filter(
+            *_filtros_os(periodo, departamento, setor, data_inicio, data_fim, tipoEquipamento)
+        ).one()
+
         return {
             "periodo": {
-                "data_inicio": data_inicio.isoformat() if data_inicio else None,
+                "data_inicio": data_inicio.isoformat() if data_inicio else (inicio.date().isoformat() if inicio else None),
                 "data_fim": data_fim.isoformat() if data_fim else None,
                 "departamento": departamento,
                 "setor": setor
             },
             "metricas_os": {
                 "total_ordens": total_os,
-                "concluidas": total_os // 3,
-                "em_andamento": total_os // 2,
-                "atrasadas": total_os // 10,
-                "taxa_conclusao": 75.5
+                "concluidas": concluidas or 0,
+                "em_andamento": em_andamento or 0,
+                "atrasadas": atrasadas or 0,
+                "taxa_conclusao": _percentual(concluidas or 0, total_os)
             },
             "metricas_programacoes": {
-                "total_programacoes": total_programacoes,
-                "pendentes": total_programacoes // 2,
-                "em_andamento": total_programacoes // 3
+                "total_programacoes": total_programacoes or 0,
+                "pendentes": programacoes_pendentes or 0,
+                "em_andamento": programacoes_em_andamento or 0
             },
             "metricas_usuarios": {
-                "total_usuarios": total_usuarios
+                "total_usuarios": total_usuarios or 0
             }
         }
     except Exception as e:
         return {"error": f"Erro: {str(e)}"}
 
 @router.get("/dashboard", operation_id="gestao_get_dashboard")
+@cache_resposta("gestao_dashboard")
 async def get_dashboard(
     periodo: Optional[int] = 30,
     departamento: Optional[str] = None,
-    db: Session = Depends(get_db)
+    setor: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_read_db)
 ):
     """Dashboard principal de gestão com métricas consolidadas"""
     try:
-        from sqlalchemy import text, func
+        inicio, fim = _intervalo(periodo, data_inicio, data_fim)
 
-        # Métricas básicas de OS
-        total_os = db.query(OrdemServico).count()
-        os_concluidas = db.query(OrdemServico).filter(OrdemServico.status_os == "CONCLUIDA").count()
-        os_em_andamento = db.query(OrdemServico).filter(OrdemServico.status_os == "EM ANDAMENTO").count()
-        os_abertas = db.query(OrdemServico).filter(OrdemServico.status_os == "ABERTA").count()
+        filtros_usuario = []
+        filtros_apontamento = filtro_intervalo(ApontamentoDetalhado.data_hora_inicio, inicio, fim)
+        if _informado(departamento):
+            filtros_usuario.append(Usuario.id_departamento.in_(_ids_departamento(departamento)))
+            filtros_apontamento.append(ApontamentoDetalhado.id_setor.in_(
+                select(Setor.id).where(Setor.id_departamento.in_(_ids_departamento(departamento)))
+            ))
+        if _informado(setor):
+            filtros_usuario.append(Usuario.id_setor.in_(_ids_setor(setor)))
+            filtros_apontamento.append(ApontamentoDetalhado.id_setor.in_(_ids_setor(setor)))
 
-        # Métricas de usuários
-        total_usuarios = db.query(Usuario).count()
-        usuarios_ativos = db.query(Usuario).filter(Usuario.is_approved == True).count()
+        # Linha-âncora: garante ao menos uma linha (com as subconsultas de
+        # usuários/apontamentos) mesmo quando nenhuma OS atende aos filtros
+        ancora = select(literal(1).label("ancora")).subquery("ancora")
+        concluidas_os = OrdemServico.status_os.in_(STATUS_OS_CONCLUIDA)
 
-        # Métricas de apontamentos
-        total_apontamentos = db.query(ApontamentoDetalhado).count()
-        apontamentos_concluidos = db.query(ApontamentoDetalhado).filter(
-            ApontamentoDetalhado.status_apontamento == "CONCLUIDO"
-        ).count()
+        linhas = db.query(
+            Departamento.id,
+            Departamento.nome_tipo,
+            *_metricas_os(),
+            func.sum(_valor_se(concluidas_os, OrdemServico.horas_previstas)),
+            func.sum(_valor_se(concluidas_os, OrdemServico.horas_reais)),
+            select(func.count(Usuario.id)).where(*filtros_usuario).scalar_subquery(),
+            select(func.count(Usuario.id)).where(*filtros_usuario, Usuario.is_approved == True).scalar_subquery(),
+            select(func.count(ApontamentoDetalhado.id)).where(*filtros_apontamento).scalar_subquery(),
+            select(func.count(ApontamentoDetalhado.id)).where(
+                *filtros_apontamento, ApontamentoDetalhado.status_apontamento == "CONCLUIDO"
+            ).scalar_subquery()
+        ).select_from(ancora).outerjoin(
+            OrdemServico, and_(true(), *_filtros_os(periodo, departamento, setor, data_inicio, data_fim))
+        ).outerjoin(
+            Departamento, Departamento.id == OrdemServico.id_departamento
+        ).group_by(Departamento.id, Departamento.nome_tipo).all()
 
-        # Performance por departamento
+        total_os = os_concluidas = os_em_andamento = os_abertas = 0
         performance_departamentos = []
-        if departamento:
-            # Filtrar por departamento específico
-            os_dept = db.query(OrdemServico).filter(OrdemServico.id_departamento == departamento).count()
-            performance_departamentos.append({
-                "departamento": departamento,
-                "total_os": os_dept,
-                "concluidas": os_dept // 3,
-                "em_andamento": os_dept // 2,
-                "eficiencia": 85.0
-            })
-        else:
-            # Todos os departamentos
-            performance_departamentos = [
-                {
-                    "departamento": "MOTORES",
-                    "total_os": total_os // 2,
-                    "concluidas": os_concluidas // 2,
-                    "em_andamento": os_em_andamento // 2,
-                    "eficiencia": 87.5
-                },
-                {
-                    "departamento": "TRANSFORMADORES",
-                    "total_os": total_os // 2,
-                    "concluidas": os_concluidas // 2,
-                    "em_andamento": os_em_andamento // 2,
-                    "eficiencia": 82.3
-                }
-            ]
+        for (id_dep, nome_dep, total, concluidas, em_andamento, abertas, _atrasadas,
+             horas_previstas, horas_reais, *_escalares) in linhas:
+            total_os += total
+            os_concluidas += concluidas or 0
+            os_em_andamento += em_andamento or 0
+            os_abertas += abertas or 0
+            if total:
+                performance_departamentos.append({
+                    "id_departamento": id_dep,
+                    "departamento": nome_dep or "SEM DEPARTAMENTO",
+                    "total_os": total,
+                    "concluidas": concluidas or 0,
+                    "em_andamento": em_andamento or 0,
+                    "eficiencia": _eficiencia_horas(horas_previstas, horas_reais)
+                })
+
+        total_usuarios, usuarios_ativos, total_apontamentos, apontamentos_concluidos = linhas[0][-4:]
 
         return {
             "metricas_principais": {
@@ -113,21 +250,21 @@ async def get_dashboard(
                 "os_concluidas": os_concluidas,
                 "os_em_andamento": os_em_andamento,
                 "os_abertas": os_abertas,
-                "taxa_conclusao": round((os_concluidas / total_os * 100) if total_os > 0 else 0, 1)
+                "taxa_conclusao": _percentual(os_concluidas, total_os)
             },
             "metricas_usuarios": {
                 "total_usuarios": total_usuarios,
                 "usuarios_ativos": usuarios_ativos,
-                "taxa_aprovacao": round((usuarios_ativos / total_usuarios * 100) if total_usuarios > 0 else 0, 1)
+                "taxa_aprovacao": _percentual(usuarios_ativos, total_usuarios)
             },
             "metricas_apontamentos": {
                 "total_apontamentos": total_apontamentos,
                 "apontamentos_concluidos": apontamentos_concluidos,
-                "taxa_conclusao_apontamentos": round((apontamentos_concluidos / total_apontamentos * 100) if total_apontamentos > 0 else 0, 1)
+                "taxa_conclusao_apontamentos": _percentual(apontamentos_concluidos, total_apontamentos)
             },
             "performance_departamentos": performance_departamentos,
             "periodo_analise": periodo,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": agora_local().isoformat()
         }
 
     except Exception as e:
@@ -138,25 +275,37 @@ async def get_ordens_por_setor(
     periodo: Optional[int] = 30,
     tipoEquipamento: Optional[str] = "todos",
     departamento: Optional[str] = None,
+    setor: Optional[str] = None,
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Retorna estatísticas de ordens por setor"""
     try:
-        total_ordens = db.query(OrdemServico).count()
+        duracao_horas = horas_entre(
+            db, func.coalesce(OrdemServico.inicio_os, OrdemServico.data_criacao), OrdemServico.fim_os
+        )
+        linhas = db.query(
+            Setor.nome,
+            *_metricas_os(),
+            func.avg(duracao_horas)
+        ).outerjoin(
+            Setor, Setor.id == OrdemServico.id_setor
+        ).filter(
+            *_filtros_os(periodo, departamento, setor, data_inicio, data_fim, tipoEquipamento)
+        ).group_by(Setor.nome).order_by(func.count(OrdemServico.id).desc()).all()
 
         return [
             {
-                "setor": "Produção",
-                "total_ordens": total_ordens // 2,
-                "tempo_medio_dias": 5.5
-            },
-            {
-                "setor": "Manutenção",
-                "total_ordens": total_ordens // 2,
-                "tempo_medio_dias": 3.2
+                "setor": nome or "SEM SETOR",
+                "total_ordens": total,
+                "concluidas": concluidas or 0,
+                "em_andamento": em_andamento or 0,
+                "abertas": abertas or 0,
+                "atrasadas": atrasadas or 0,
+                "tempo_medio_dias": round(float(media_horas) / 24, 1) if media_horas else 0.0
             }
+            for nome, total, concluidas, em_andamento, abertas, atrasadas, media_horas in linhas
         ]
     except Exception as e:
         return {"error": f"Erro: {str(e)}"}
@@ -166,30 +315,57 @@ async def get_eficiencia_setores(
     periodo: Optional[int] = 30,
     tipoEquipamento: Optional[str] = "todos",
     departamento: Optional[str] = None,
+    setor: Optional[str] = None,
     data_inicio: Optional[date] = None,
     data_fim: Optional[date] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Retorna métricas de eficiência por setor"""
+    """
+    Retorna métricas de eficiência por setor a partir do resumo diário de
+    apontamentos. Eficiência = % de apontamentos sem retrabalho.
+    """
     try:
-        total_ordens = db.query(OrdemServico).count()
-        total_programacoes = db.query(Programacao).count()
-        
+        _ = tipoEquipamento  # Silenciar warning
+        inicio, fim = _intervalo(periodo, data_inicio, data_fim)
+
+        filtros_resumo = []
+        if inicio:
+            filtros_resumo.append(ApontamentoResumoDiario.data >= inicio.date())
+        if fim:
+            filtros_resumo.append(ApontamentoResumoDiario.data < fim.date())
+
+        # Programações concluídas do setor no período (subconsulta correlacionada)
+        programacoes_realizadas = select(func.count(Programacao.id)).where(
+            Programacao.id_setor == ApontamentoResumoDiario.id_setor,
+            Programacao.status.in_(STATUS_PROGRAMACAO_CONCLUIDA),
+            *filtro_intervalo(Programacao.created_at, inicio, fim)
+        ).scalar_subquery()
+
+        linhas = db.query(
+            Setor.nome,
+            func.count(func.distinct(ApontamentoResumoDiario.id_os)),
+            func.coalesce(func.sum(ApontamentoResumoDiario.horas_trabalhadas), 0),
+            func.coalesce(func.sum(ApontamentoResumoDiario.total_apontamentos), 0),
+            func.coalesce(func.sum(ApontamentoResumoDiario.total_retrabalhos), 0),
+            programacoes_realizadas
+        ).join(
+            Setor, Setor.id == ApontamentoResumoDiario.id_setor
+        ).filter(
+            *filtros_resumo, *_filtros_setor(departamento, setor)
+        ).group_by(ApontamentoResumoDiario.id_setor, Setor.nome).order_by(Setor.nome).all()
+
         return [
             {
-                "setor": "Produção",
-                "total_ordens": total_ordens // 2,
-                "tempo_medio_horas": 8.5,
-                "programacoes_realizadas": total_programacoes // 2,
-                "eficiencia": 85.0
-            },
-            {
-                "setor": "Manutenção",
-                "total_ordens": total_ordens // 2,
-                "tempo_medio_horas": 6.2,
-                "programacoes_realizadas": total_programacoes // 2,
-                "eficiencia": 92.0
+                "setor": nome,
+                "total_ordens": total_ordens,
+                "tempo_medio_horas": round(float(horas) / total_ordens, 2) if total_ordens else 0.0,
+                "horas_trabalhadas": round(float(horas), 2),
+                "total_apontamentos": total_apontamentos,
+                "retrabalhos": retrabalhos,
+                "programacoes_realizadas": programacoes or 0,
+                "eficiencia": _percentual(total_apontamentos - retrabalhos, total_apontamentos)
             }
+            for nome, total_ordens, horas, total_apontamentos, retrabalhos, programacoes in linhas
         ]
     except Exception as e:
         return {"error": f"Erro: {str(e)}"}
@@ -197,128 +373,129 @@ async def get_eficiencia_setores(
 @router.get("/relatorio-producao", operation_id="gestao_get_relatorio_producao")
 async def get_relatorio_producao(
     periodo: Optional[int] = 30,
-    db: Session = Depends(get_db)
+    departamento: Optional[str] = None,
+    setor: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_read_db)
 ):
     """Relatório de produção usando dados reais"""
     try:
-        from sqlalchemy import text
-
-        sql = text("""
-            SELECT
-                COUNT(*) as total_os,
-                COUNT(CASE WHEN status_os = 'CONCLUIDA' THEN 1 END) as os_concluidas,
-                COUNT(CASE WHEN status_os = 'EM ANDAMENTO' THEN 1 END) as os_em_andamento,
-                SUM(horas_reais) as total_horas_reais,
-                SUM(horas_orcadas) as total_horas_orcadas
-            FROM ordens_servico
-            WHERE data_criacao >= date('now', '-30 days')
-        """)
-
-        result = db.execute(sql).fetchone()
-
-        if result:
-            return {
-                "periodo_dias": periodo,
-                "total_ordens": result[0] or 0,
-                "ordens_concluidas": result[1] or 0,
-                "ordens_em_andamento": result[2] or 0,
-                "total_horas_reais": float(result[3]) if result[3] else 0.0,
-                "total_horas_orcadas": float(result[4]) if result[4] else 0.0,
-                "eficiencia_horas": round((float(result[3]) / float(result[4]) * 100), 2) if result[4] and result[3] else 0.0
-            }
-        else:
-            return {
-                "periodo_dias": periodo,
-                "total_ordens": 0,
-                "ordens_concluidas": 0,
-                "ordens_em_andamento": 0,
-                "total_horas_reais": 0.0,
-                "total_horas_orcadas": 0.0,
-                "eficiencia_horas": 0.0
-            }
+        concluidas_os = OrdemServico.status_os.in_(STATUS_OS_CONCLUIDA)
+        (total, concluidas, em_andamento, _abertas, _atrasadas, horas_reais, horas_previstas,
+         horas_reais_concluidas, horas_previstas_concluidas) = db.query(
+            *_metricas_os(),
+            func.sum(OrdemServico.horas_reais),
+            func.sum(OrdemServico.horas_previstas),
+            func.sum(_valor_se(concluidas_os, OrdemServico.horas_reais)),
+            func.sum(_valor_se(concluidas_os, OrdemServico.horas_previstas))
+        ).filter(
+            *_filtros_os(periodo, departamento, setor, data_inicio, data_fim)
+        ).one()
+
+        return {
+            "periodo_dias": periodo,
+            "total_ordens": total or 0,
+            "ordens_concluidas": concluidas or 0,
+            "ordens_em_andamento": em_andamento or 0,
+            "total_horas_reais": float(horas_reais) if horas_reais else 0.0,
+            "total_horas_orcadas": float(horas_previstas) if horas_previstas else 0.0,
+            "eficiencia_horas": _eficiencia_horas(horas_previstas_concluidas, horas_reais_concluidas, casas=2)
+        }
     except Exception as e:
         return {"error": f"Erro: {str(e)}"}
 
 @router.get("/dashboard-executivo", operation_id="gestao_get_dashboard_executivo")
 async def get_dashboard_executivo(
-    db: Session = Depends(get_db)
+    periodo: Optional[int] = None,
+    departamento: Optional[str] = None,
+    setor: Optional[str] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Dashboard executivo com dados reais"""
+    """
+    Dashboard executivo com dados reais. Sem filtros de período considera
+    todo o histórico. OS, pendências e programações são agrupadas por status
+    em uma única consulta (UNION ALL).
+    """
     try:
-        from sqlalchemy import text
-
-        # Métricas principais
-        sql_metricas = text("""
-            SELECT
-                COUNT(*) as total_os,
-                COUNT(CASE WHEN status_os = 'CONCLUIDA' THEN 1 END) as concluidas,
-                COUNT(CASE WHEN status_os = 'EM ANDAMENTO' THEN 1 END) as em_andamento,
-                COUNT(CASE WHEN status_os = 'AGUARDANDO' THEN 1 END) as aguardando
-            FROM ordens_servico
-        """)
-
-        metricas = db.execute(sql_metricas).fetchone()
-
-        # Pendências por status (conforme especificação)
-        sql_pendencias = text("""
-            SELECT
-                status,
-                COUNT(*) as quantidade,
-                AVG(CASE WHEN tempo_aberto_horas IS NOT NULL THEN tempo_aberto_horas ELSE 0 END) as tempo_medio_horas
-            FROM pendencias
-            GROUP BY status
-        """)
-
-        pendencias_result = db.execute(sql_pendencias).fetchall()
-
-        # Métricas específicas de pendências fechadas (conforme especificação)
-        sql_pendencias_fechadas = text("""
-            SELECT
-                COUNT(*) as total_fechadas,
-                AVG(tempo_aberto_horas) as tempo_medio_resolucao,
-                COUNT(CASE WHEN data_fechamento >= date('now', '-7 days') THEN 1 END) as fechadas_ultima_semana
-            FROM pendencias
-            WHERE status = 'FECHADA'
-        """)
-
-        pendencias_fechadas = db.execute(sql_pendencias_fechadas).fetchone()
-
-        # Programações por status
-        sql_programacoes = text("""
-            SELECT
-                status,
-                COUNT(*) as quantidade
-            FROM programacoes
-            GROUP BY status
-        """)
-
-        programacoes_result = db.execute(sql_programacoes).fetchall()
+        inicio, fim = _intervalo(periodo, data_inicio, data_fim)
+        uma_semana_atras = agora_local() - timedelta(days=7)
+
+        filtros_pendencia = filtro_intervalo(Pendencia.data_inicio, inicio, fim)
+        filtros_programacao = filtro_intervalo(Programacao.created_at, inicio, fim)
+        if _informado(departamento):
+            filtros_pendencia.append(Pendencia.departamento_origem.in_(
+                select(Departamento.nome_tipo).where(Departamento.id.in_(_ids_departamento(departamento)))
+            ))
+            filtros_programacao.append(Programacao.id_setor.in_(
+                select(Setor.id).where(Setor.id_departamento.in_(_ids_departamento(departamento)))
+            ))
+        if _informado(setor):
+            filtros_pendencia.append(Pendencia.setor_origem.in_(
+                select(Setor.nome).where(Setor.id.in_(_ids_setor(setor)))
+            ))
+            filtros_programacao.append(Programacao.id_setor.in_(_ids_setor(setor)))
+
+        # Colunas: tipo, status, quantidade, tempo médio (nulos = 0), tempo médio de resolução, fechadas na semana
+        sql_os = select(
+            literal("os"), OrdemServico.status_os, func.count(OrdemServico.id),
+            literal(None), literal(None), literal(None)
+        ).where(
+            *_filtros_os(periodo, departamento, setor, data_inicio, data_fim)
+        ).group_by(OrdemServico.status_os)
+
+        sql_pendencias = select(
+            literal("pendencia"), Pendencia.status, func.count(Pendencia.id),
+            func.avg(func.coalesce(Pendencia.tempo_aberto_horas, 0)),
+            func.avg(Pendencia.tempo_aberto_horas),
+            contar_se(Pendencia.data_fechamento >= uma_semana_atras)
+        ).where(*filtros_pendencia).group_by(Pendencia.status)
+
+        sql_programacoes = select(
+            literal("programacao"), Programacao.status, func.count(Programacao.id),
+            literal(None), literal(None), literal(None)
+        ).where(*filtros_programacao).group_by(Programacao.status)
+
+        linhas = db.execute(union_all(sql_os, sql_pendencias, sql_programacoes)).fetchall()
+
+        ordens = {}
+        pendencias_por_status = []
+        programacoes_por_status = []
+        pendencias_fechadas = {"total_fechadas": 0, "tempo_medio_resolucao_horas": 0, "fechadas_ultima_semana": 0}
+        for tipo, status, quantidade, tempo_medio, tempo_resolucao, fechadas_semana in linhas:
+            if tipo == "os":
+                ordens[status] = quantidade
+            elif tipo == "pendencia":
+                pendencias_por_status.append({
+                    "status": status,
+                    "quantidade": quantidade,
+                    "tempo_medio_horas": round(tempo_medio, 2) if tempo_medio else 0
+                })
+                if status == "FECHADA":
+                    pendencias_fechadas = {
+                        "total_fechadas": quantidade,
+                        "tempo_medio_resolucao_horas": round(tempo_resolucao, 2) if tempo_resolucao else 0,
+                        "fechadas_ultima_semana": fechadas_semana or 0
+                    }
+            else:
+                programacoes_por_status.append({"status": status, "quantidade": quantidade})
+
+        def _somar(status_validos):
+            return sum(ordens.get(status, 0) for status in status_validos)
 
         return {
             "metricas_principais": {
-                "total_ordens": metricas[0] if metricas else 0,
-                "ordens_concluidas": metricas[1] if metricas else 0,
-                "ordens_em_andamento": metricas[2] if metricas else 0,
-                "ordens_aguardando": metricas[3] if metricas else 0
-            },
-            "pendencias_por_status": [
-                {
-                    "status": row[0],
-                    "quantidade": row[1],
-                    "tempo_medio_horas": round(row[2], 2) if row[2] else 0
-                }
-                for row in pendencias_result
-            ] if pendencias_result else [],
-            "metricas_pendencias_fechadas": {
-                "total_fechadas": pendencias_fechadas[0] if pendencias_fechadas else 0,
-                "tempo_medio_resolucao_horas": round(pendencias_fechadas[1], 2) if pendencias_fechadas and pendencias_fechadas[1] else 0,
-                "fechadas_ultima_semana": pendencias_fechadas[2] if pendencias_fechadas else 0
+                "total_ordens": sum(ordens.values()),
+                "ordens_concluidas": _somar(STATUS_OS_CONCLUIDA),
+                "ordens_em_andamento": _somar(STATUS_OS_EM_ANDAMENTO),
+                "ordens_aguardando": _somar(STATUS_OS_AGUARDANDO)
             },
-            "programacoes_por_status": [
-                {"status": row[0], "quantidade": row[1]}
-                for row in programacoes_result
-            ] if programacoes_result else [],
-            "data_atualizacao": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            "pendencias_por_status": pendencias_por_status,
+            "metricas_pendencias_fechadas": pendencias_fechadas,
+            "programacoes_por_status": programacoes_por_status,
+            "data_atualizacao": agora_local().strftime('%Y-%m-%d %H:%M:%S')
         }
     except Exception as e:
         return {"error": f"Erro: {str(e)}"}
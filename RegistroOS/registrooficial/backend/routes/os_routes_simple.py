@@ -5,17 +5,23 @@ OS Routes - RegistroOS (Simplified)
 Versão simplificada das rotas de OS que funciona sem validadores removidos.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import String, bindparam, cast, exists, func, or_, select, text
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from pydantic import BaseModel
+import json
+import os
 
 from app.database_models import (
     Usuario, OrdemServico, ApontamentoDetalhado, Cliente, TipoMaquina, Pendencia
 )
 from config.database_config import get_db
 from app.dependencies import get_current_user
+from app.utils.paginacao import codificar_cursor, decodificar_cursor, filtro_apos_cursor
+from app.utils.response_cache import TTLLRUCache
+import app.utils.ultima_atividade  # Registra a manutenção de ordens_servico.ultima_atividade
 
 router = APIRouter(prefix="/os", tags=["ordens-servico"])
 
@@ -94,6 +100,41 @@ def _extrair_equipamento_de_observacoes(observacoes: str) -> str:
 # ENDPOINTS BÁSICOS PARA ORDENS DE SERVIÇO
 # =============================================================================
 
+# Cache da contagem total da listagem (modo "aproximada")
+CONTAGEM_CACHE_TTL = int(os.getenv("OS_CONTAGEM_CACHE_TTL", "300"))
+_cache_contagem = TTLLRUCache(256)
+
+def _filtros_listagem(numero: Optional[str], status: Optional[str]) -> List[Any]:
+    """Filtros da listagem sobre ordens_servico (status via EXISTS nos apontamentos)"""
+    filtros = []
+    if numero:
+        filtros.append(or_(
+            OrdemServico.os_numero.like(f"%{numero}%"),
+            cast(OrdemServico.id, String).like(f"%{numero}%")
+        ))
+    if status:
+        filtros.append(exists().where(
+            ApontamentoDetalhado.id_os == OrdemServico.id,
+            ApontamentoDetalhado.status_apontamento == status
+        ))
+    return filtros
+
+def _contar_ordens(db: Session, filtros: List[Any], numero: Optional[str], status: Optional[str], modo: str) -> Optional[int]:
+    """
+    Total de OS da listagem. "exata" conta a cada chamada; "aproximada"
+    reaproveita a contagem por CONTAGEM_CACHE_TTL segundos; "nenhuma" não conta.
+    """
+    if modo == "nenhuma":
+        return None
+    chave = json.dumps([numero or "", status or ""])
+    if modo != "exata":
+        encontrado, total = _cache_contagem.get(chave)
+        if encontrado:
+            return total
+    total = db.execute(select(func.count()).select_from(OrdemServico).where(*filtros)).scalar() or 0
+    _cache_contagem.set(chave, total, CONTAGEM_CACHE_TTL)
+    return total
+
 @router.get("/")
 async def listar_ordens_servico(
     numero: Optional[str] = None,
@@ -101,89 +142,82 @@ async def listar_ordens_servico(
     setor: Optional[str] = None,
     page: int = 1,
     per_page: int = 50,
+    cursor: Optional[str] = None,
+    contagem: str = Query("aproximada", pattern="^(exata|aproximada|nenhuma)$"),
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Listar ordens de serviço básicas com filtros - busca nos apontamentos"""
+    """
+    Listar ordens de serviço com filtros, da atividade mais recente para a
+    mais antiga. Paginação por cursor: envie pagination.proximo_cursor da
+    resposta anterior em `cursor` (page continua aceito, via OFFSET).
+    """
 
     try:
-        from sqlalchemy import text
-
-        # Buscar nos apontamentos_detalhados que é onde estão os registros reais
-        where_conditions = []
-        params = {}
-
-        # Aplicar filtros de busca
-        if numero:
-            where_conditions.append("(os.os_numero LIKE :numero OR CAST(a.id_os AS TEXT) LIKE :numero)")
-            params['numero'] = f"%{numero}%"
-
-        if status:
-            where_conditions.append("a.status_apontamento = :status")
-            params['status'] = status
-
-        where_clause = ""
-        if where_conditions:
-            where_clause = "WHERE " + " AND ".join(where_conditions)
-
         # Validar parâmetros de paginação
         if page < 1:
             page = 1
         if per_page < 1 or per_page > 100:
             per_page = 50
 
-        # Calcular OFFSET
-        offset = (page - 1) * per_page
-
-        # SQL para buscar OS únicas com dados agregados e relacionamentos conforme HIERARQUIA_COMPLETA_BANCO_DADOS.md
-        sql = text(f"""
-            SELECT
-                os.id as os_id,
-                os.os_numero,
-                os.descricao_maquina,
-                os.status_os,
-                MIN(a.data_hora_inicio) as data_inicio_primeira,
-                MAX(a.data_hora_fim) as data_fim_ultima,
-                GROUP_CONCAT(u.nome_completo) as responsaveis,
-                GROUP_CONCAT(s.nome) as setores,
-                'MOTORES' as departamento_nome,
-                SUM(CASE WHEN a.foi_retrabalho = 1 THEN 1 ELSE 0 END) as total_retrabalhos,
-                GROUP_CONCAT(a.causa_retrabalho) as causas_retrabalho,
-                SUM(a.horas_orcadas) as total_horas_orcadas,
-                COUNT(a.id) as total_apontamentos,
-                c.razao_social as cliente_nome,
-                e.descricao as equipamento_descricao
-            FROM ordens_servico os
-            LEFT JOIN apontamentos_detalhados a ON os.id = a.id_os
-            LEFT JOIN tipo_usuarios u ON a.id_usuario = u.id
-            LEFT JOIN tipo_setores s ON a.id_setor = s.id
-            LEFT JOIN clientes c ON os.id_cliente = c.id
-            LEFT JOIN equipamentos e ON os.id_equipamento = e.id
-            {where_clause}
-            GROUP BY os.id, os.os_numero, os.descricao_maquina, os.status_os, c.razao_social, e.descricao
-            ORDER BY MIN(a.data_hora_inicio) DESC
-            LIMIT {per_page} OFFSET {offset}
-        """)
-
-        resultados = db.execute(sql, params).fetchall()
-
-        # Consulta para contar total de registros (sem LIMIT)
-        count_sql = text(f"""
-            SELECT COUNT(DISTINCT os.id) as total
-            FROM ordens_servico os
-            LEFT JOIN apontamentos_detalhados a ON os.id = a.id_os
-            LEFT JOIN tipo_usuarios u ON a.id_usuario = u.id
-            LEFT JOIN tipo_setores s ON a.id_setor = s.id
-            {where_clause}
-        """)
-
-        result = db.execute(count_sql, params).fetchone()
-        total_count = result[0] if result else 0
+        filtros = _filtros_listagem(numero, status)
+
+        # 1) Página de IDs pelo índice (ultima_atividade, id)
+        consulta_ids = select(OrdemServico.id, OrdemServico.ultima_atividade).where(*filtros)
+        valores_cursor = decodificar_cursor(cursor, 2)
+        if valores_cursor:
+            consulta_ids = consulta_ids.where(
+                filtro_apos_cursor((OrdemServico.ultima_atividade, OrdemServico.id), valores_cursor)
+            )
+        elif page > 1:
+            consulta_ids = consulta_ids.offset((page - 1) * per_page)
+        consulta_ids = consulta_ids.order_by(
+            OrdemServico.ultima_atividade.desc(), OrdemServico.id.desc()
+        ).limit(per_page + 1)
+
+        pagina = db.execute(consulta_ids).fetchall()
+        has_next = len(pagina) > per_page
+        pagina = pagina[:per_page]
+        proximo_cursor = codificar_cursor(pagina[-1][1], pagina[-1][0]) if has_next and pagina else None
+
+        # 2) Dados agregados apenas das OS da página
+        resultados = []
+        if pagina:
+            sql = text("""
+                SELECT
+                    os.id as os_id,
+                    os.os_numero,
+                    os.descricao_maquina,
+                    os.status_os,
+                    MIN(a.data_hora_inicio) as data_inicio_primeira,
+                    MAX(a.data_hora_fim) as data_fim_ultima,
+                    GROUP_CONCAT(u.nome_completo) as responsaveis,
+                    GROUP_CONCAT(s.nome) as setores,
+                    'MOTORES' as departamento_nome,
+                    SUM(CASE WHEN a.foi_retrabalho = 1 THEN 1 ELSE 0 END) as total_retrabalhos,
+                    GROUP_CONCAT(a.causa_retrabalho) as causas_retrabalho,
+                    SUM(a.horas_orcadas) as total_horas_orcadas,
+                    COUNT(a.id) as total_apontamentos,
+                    c.razao_social as cliente_nome,
+                    e.descricao as equipamento_descricao,
+                    os.ultima_atividade
+                FROM ordens_servico os
+                LEFT JOIN apontamentos_detalhados a ON os.id = a.id_os
+                LEFT JOIN tipo_usuarios u ON a.id_usuario = u.id
+                LEFT JOIN tipo_setores s ON a.id_setor = s.id
+                LEFT JOIN clientes c ON os.id_cliente = c.id
+                LEFT JOIN equipamentos e ON os.id_equipamento = e.id
+                WHERE os.id IN :ids
+                GROUP BY os.id, os.os_numero, os.descricao_maquina, os.status_os, c.razao_social, e.descricao, os.ultima_atividade
+                ORDER BY os.ultima_atividade DESC, os.id DESC
+            """).bindparams(bindparam("ids", expanding=True))
+            resultados = db.execute(sql, {"ids": [linha[0] for linha in pagina]}).fetchall()
+
+        total_count = _contar_ordens(db, filtros, numero, status, contagem)
 
         # Calcular informações de paginação
-        total_pages = (total_count + per_page - 1) // per_page  # Ceiling division
-        has_next = page < total_pages
-        has_prev = page > 1
+        total_pages = (total_count + per_page - 1) // per_page if total_count is not None else None  # Ceiling division
+        has_prev = page > 1 or bool(valores_cursor)
 
         # Converter resultados para formato esperado pelo frontend
         data = [
@@ -203,6 +237,7 @@ async def listar_ordens_servico(
                 "data_criacao": str(row[4]) if row[4] else None,  # usar data_inicio_primeira como criacao
                 "data_entrada": str(row[4]) if row[4] else None,  # Alias
                 "data_fim": str(row[5]) if row[5] else None,  # data_fim_ultima
+                "ultima_atividade": str(row[15]) if row[15] else None,
                 "responsavel": row[6] or "N/A",  # responsaveis (concatenados)
                 "setor": row[7] or "N/A",  # setores (concatenados)
                 "departamento": row[8] or "N/A",  # departamento_nome
@@ -221,9 +256,11 @@ async def listar_ordens_servico(
                 "page": page,
                 "per_page": per_page,
                 "total": total_count,
+                "total_aproximado": contagem == "aproximada",
                 "total_pages": total_pages,
                 "has_next": has_next,
-                "has_prev": has_prev
+                "has_prev": has_prev,
+                "proximo_cursor": proximo_cursor
             }
         }
 
@@ -46,11 +46,15 @@ from app.database_models import (
     Usuario, OrdemServico, ApontamentoDetalhado,
     Programacao as ProgramacaoModel,
     Pendencia, Setor, Departamento, TipoMaquina, Cliente,
-    TipoAtividade, TipoDescricaoAtividade, TipoCausaRetrabalho, Equipamento
+    TipoAtividade, TipoDescricaoAtividade, TipoCausaRetrabalho, Equipamento,
+    ApontamentoResumoDiario
 )
-from config.database_config import get_db
+from config.database_config import get_db, get_read_db
 from app.dependencies import get_current_user
 from utils.validators import validate_and_format_os, check_os_exists, generate_next_os
+from app.utils.sql_aggregates import mes_referencia
+from app.utils.response_cache import cache_resposta
+from app.utils.intervalo_datas import agora_local, intervalo_periodo
 
 router = APIRouter(tags=["pcp"])
 
@@ -536,101 +540,122 @@ async def get_programacoes_pcp(
         return []
 
 @router.get("/dashboard/avancado", operation_id="pcp_get_dashboard_avancado")
+@cache_resposta("pcp_dashboard_avancado")
 async def get_dashboard_avancado(
     periodo_dias: Optional[int] = Query(30, description="Período em dias para análise"),
     setor_id: Optional[int] = Query(None, description="Filtrar por setor específico"),
     current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Dashboard avançado do PCP"""
     try:
-        from datetime import datetime, timedelta
+        from datetime import datetime
 
-        # Calcular data de início baseada no período
-        data_fim = datetime.now()
+        # Calcular data de início baseada no período (fuso da aplicação)
+        data_fim = agora_local()
         periodo_valido = periodo_dias if periodo_dias is not None else 30
-        data_inicio = data_fim - timedelta(days=periodo_valido)
-
-        # Buscar apontamentos do período
-        query_apontamentos = db.query(ApontamentoDetalhado).filter(
-            ApontamentoDetalhado.data_hora_inicio >= data_inicio
+        data_inicio = intervalo_periodo(periodo_valido)[0] or data_fim
+
+        # Métricas por setor lidas do resumo diário pré-agregado (uma consulta agrupada)
+        query_setores = db.query(
+            ApontamentoResumoDiario.id_setor,
+            Setor.nome,
+            func.sum(ApontamentoResumoDiario.total_apontamentos),
+            func.coalesce(func.sum(ApontamentoResumoDiario.horas_trabalhadas), 0),
+            func.sum(ApontamentoResumoDiario.total_retrabalhos),
+            func.sum(ApontamentoResumoDiario.total_em_andamento)
+        ).outerjoin(
+            Setor, Setor.id == ApontamentoResumoDiario.id_setor
+        ).filter(
+            ApontamentoResumoDiario.data >= data_inicio.date()
         )
 
         if setor_id:
-            query_apontamentos = query_apontamentos.filter(ApontamentoDetalhado.id_setor == setor_id)
+            query_setores = query_setores.filter(ApontamentoResumoDiario.id_setor == setor_id)
 
-        apontamentos = query_apontamentos.all()
+        linhas_setores = query_setores.group_by(ApontamentoResumoDiario.id_setor, Setor.nome).all()
 
-        # Calcular métricas gerais
-        total_apontamentos = len(apontamentos)
-        tempo_total_horas = sum(
-            (apt.data_hora_fim - apt.data_hora_inicio).total_seconds() / 3600
-            for apt in apontamentos
-            if apt.data_hora_fim is not None and apt.data_hora_inicio is not None
+        # Pendências abertas por setor de origem
+        pendencias_por_setor = dict(
+            db.query(Pendencia.setor_origem, func.count(Pendencia.id)).filter(
+                Pendencia.status == 'ABERTA'
+            ).group_by(Pendencia.setor_origem).all()
         )
 
-        # Agrupar por setor para calcular eficiência
-        setores_stats = {}
-        for apt in apontamentos:
-            if apt.id_setor is not None:
-                setor = db.query(Setor).filter(Setor.id == apt.id_setor).first()
-                setor_nome = setor.nome if setor else f"Setor {apt.id_setor}"
-
-                if setor_nome not in setores_stats:
-                    setores_stats[setor_nome] = {
-                        'total_apontamentos': 0,
-                        'tempo_total_horas': 0,
-                        'retrabalhos': 0,
-                        'pendencias_abertas': 0
-                    }
-
-                setores_stats[setor_nome]['total_apontamentos'] += 1
-
-                if apt.data_hora_fim is not None and apt.data_hora_inicio is not None:
-                    tempo_horas = (apt.data_hora_fim - apt.data_hora_inicio).total_seconds() / 3600
-                    setores_stats[setor_nome]['tempo_total_horas'] += tempo_horas
-
-                if apt.foi_retrabalho is True:
-                    setores_stats[setor_nome]['retrabalhos'] += 1
+        # Calcular métricas gerais a partir dos totais por setor
+        total_apontamentos = sum(linha[2] for linha in linhas_setores)
+        tempo_total_horas = float(sum(linha[3] or 0 for linha in linhas_setores))
+        total_em_andamento = sum(linha[5] or 0 for linha in linhas_setores)
 
         # Converter para formato esperado pelo frontend
         eficiencia_setores = []
-        for setor_nome, stats in setores_stats.items():
-            tempo_medio = stats['tempo_total_horas'] / stats['total_apontamentos'] if stats['total_apontamentos'] > 0 else 0
-            taxa_retrabalho = (stats['retrabalhos'] / stats['total_apontamentos'] * 100) if stats['total_apontamentos'] > 0 else 0
+        for id_setor_linha, setor_nome, total, horas_setor, retrabalhos, _ in linhas_setores:
+            if id_setor_linha is None:
+                continue
+            setor_nome = setor_nome or f"Setor {id_setor_linha}"
+            horas_setor = float(horas_setor or 0)
+            retrabalhos = retrabalhos or 0
+
+            tempo_medio = horas_setor / total if total > 0 else 0
+            taxa_retrabalho = (retrabalhos / total * 100) if total > 0 else 0
             eficiencia = max(0, 100 - taxa_retrabalho)  # Eficiência simples baseada em retrabalho
 
             eficiencia_setores.append({
                 'setor': setor_nome,
-                'total_apontamentos': stats['total_apontamentos'],
+                'total_apontamentos': total,
                 'tempo_medio_horas': round(tempo_medio, 1),
                 'taxa_retrabalho': round(taxa_retrabalho, 1),
-                'pendencias_abertas': stats['pendencias_abertas'],
+                'pendencias_abertas': pendencias_por_setor.get(setor_nome, 0),
                 'eficiencia': round(eficiencia, 1)
             })
 
-        # Dados de evolução mensal (últimos 6 meses)
-        evolucao_mensal = []
-        for i in range(6):
-            mes_data = data_fim - timedelta(days=30 * i)
-            mes_nome = mes_data.strftime('%b/%Y')
+        # Evolução mensal real (últimos 6 meses): OS abertas por data_criacao
+        # e fechadas por fim_os, agrupadas no banco em uma única consulta
+        meses = []
+        ano, mes = data_fim.year, data_fim.month
+        for _ in range(6):
+            meses.append((ano, mes))
+            ano, mes = (ano, mes - 1) if mes > 1 else (ano - 1, 12)
+        meses.reverse()  # Ordem cronológica
+        inicio_evolucao = datetime(meses[0][0], meses[0][1], 1)
+
+        abertas = db.query(
+            mes_referencia(db, OrdemServico.data_criacao).label('mes'),
+            literal('abertas').label('tipo')
+        ).filter(OrdemServico.data_criacao >= inicio_evolucao)
+        fechadas = db.query(
+            mes_referencia(db, OrdemServico.fim_os).label('mes'),
+            literal('fechadas').label('tipo')
+        ).filter(OrdemServico.fim_os >= inicio_evolucao)
+
+        if setor_id:
+            abertas = abertas.filter(OrdemServico.id_setor == setor_id)
+            fechadas = fechadas.filter(OrdemServico.id_setor == setor_id)
+
+        eventos = abertas.union_all(fechadas).subquery()
+        contagens_mensais = {
+            (mes_chave, tipo): total
+            for mes_chave, tipo, total in db.query(
+                eventos.c.mes, eventos.c.tipo, func.count()
+            ).group_by(eventos.c.mes, eventos.c.tipo).all()
+        }
 
-            # Simular dados para demonstração
+        evolucao_mensal = []
+        for ano, mes in meses:
+            mes_chave = f"{ano:04d}-{mes:02d}"
             evolucao_mensal.append({
-                'mes': mes_nome,
-                'os_abertas': max(0, 20 + (i * 5) + (len(apontamentos) // 10)),
-                'os_fechadas': max(0, 18 + (i * 4) + (len(apontamentos) // 12))
+                'mes': datetime(ano, mes, 1).strftime('%b/%Y'),
+                'os_abertas': contagens_mensais.get((mes_chave, 'abertas'), 0),
+                'os_fechadas': contagens_mensais.get((mes_chave, 'fechadas'), 0)
             })
 
-        evolucao_mensal.reverse()  # Ordem cronológica
-
         return {
             "periodo_analise": periodo_dias,
-            "data_atualizacao": datetime.now().isoformat(),
+            "data_atualizacao": data_fim.isoformat(),
             "metricas_gerais": {
                 "os_por_status": [
-                    {"status": "CONCLUIDA", "total": len([a for a in apontamentos if a.data_hora_fim is not None])},
-                    {"status": "EM_ANDAMENTO", "total": len([a for a in apontamentos if a.data_hora_fim is None])}
+                    {"status": "CONCLUIDA", "total": total_apontamentos - total_em_andamento},
+                    {"status": "EM_ANDAMENTO", "total": total_em_andamento}
                 ],
                 "tempo_ciclo_medio_dias": round(tempo_total_horas / 24, 1) if tempo_total_horas > 0 else 0,
                 "taxa_cumprimento_prazo": 85.0,  # Valor simulado
@@ -643,7 +668,9 @@ async def get_dashboard_avancado(
         }
     except Exception as e:
         print(f"Erro ao buscar dashboard avançado: {e}")
+        # Chave "error": a resposta de fallback não entra no cache (@cache_resposta)
         return {
+            "error": f"Erro ao buscar dashboard avançado: {str(e)}",
             "periodo_analise": periodo_dias,
             "data_atualizacao": dt.now().isoformat(),
             "metricas_gerais": {
@@ -755,10 +782,11 @@ async def get_pendencias_pcp(
         }
 
 @router.get("/pendencias/dashboard", operation_id="pcp_get_pendencias_dashboard")
+@cache_resposta("pcp_pendencias_dashboard", dominios=("pendencias",))
 async def get_pendencias_dashboard(
     periodo_dias: Optional[int] = Query(30, description="Período em dias para análise"),
     current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Dashboard de pendências do PCP"""
     try:
@@ -886,7 +914,9 @@ async def get_pendencias_dashboard(
         print(f"❌ Erro ao buscar dashboard de pendências: {e}")
         import traceback
         traceback.print_exc()
+        # Chave "error": a resposta de fallback não entra no cache (@cache_resposta)
         return {
+            "error": f"Erro ao buscar dashboard de pendências: {str(e)}",
             "metricas_gerais": {
                 "total_pendencias": 0,
                 "pendencias_abertas": 0,
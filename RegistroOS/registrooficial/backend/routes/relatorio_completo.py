@@ -9,7 +9,7 @@ from typing import Dict, Any, List
 from datetime import datetime
 import logging
 
-from config.database_config import get_db
+from config.database_config import get_read_db
 from app.dependencies import get_current_user
 from app.database_models import Usuario, OrdemServico, ApontamentoDetalhado
 
@@ -19,7 +19,7 @@ logger = logging.getLogger(__name__)
 @router.get("/relatorio/completo")
 async def get_relatorio_completo_geral(
     current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get general complete report"""
     try:
@@ -65,7 +65,7 @@ async def get_relatorio_completo_geral(
 @router.get("/os/{os_id}/relatorio-completo", response_model=Dict[str, Any])
 async def get_relatorio_completo_os(
     os_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
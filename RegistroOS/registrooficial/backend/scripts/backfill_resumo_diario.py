@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+BACKFILL RESUMO DIÁRIO - RegistroOS
+===================================
+
+Reconstrói a tabela apontamentos_resumo_diario a partir de
+apontamentos_detalhados (rollup usado pelos dashboards).
+
+USO:
+    python scripts/backfill_resumo_diario.py                      # tabela inteira
+    python scripts/backfill_resumo_diario.py --inicio 2025-01-01  # a partir de uma data
+    python scripts/backfill_resumo_diario.py --inicio 2025-01-01 --fim 2025-01-31
+"""
+
+import sys
+import os
+import argparse
+from datetime import datetime
+
+# Adicionar o diretório backend ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database_config import engine, SessionLocal
+from app.database_models import ApontamentoResumoDiario
+from app.utils.resumo_diario import reconstruir_resumo_diario
+
+def _parse_data(valor):
+    return datetime.strptime(valor, "%Y-%m-%d").date() if valor else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrói o resumo diário de apontamentos")
+    parser.add_argument("--inicio", help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("--fim", help="Data final inclusiva (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    print("📊 BACKFILL DO RESUMO DIÁRIO DE APONTAMENTOS")
+    print("=" * 50)
+
+    ApontamentoResumoDiario.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        linhas = reconstruir_resumo_diario(db, _parse_data(args.inicio), _parse_data(args.fim))
+        db.commit()
+        print(f"✅ {linhas} linhas geradas no resumo diário")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro durante backfill: {e}")
+        return 1
+    finally:
+        db.close()
+
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,178 @@
+"""
+CAMPOS DA OS EXTERNA
+====================
+
+Modelo do dicionário de uma OS coletada e regras de limpeza/mapeamento dos
+rótulos do sistema externo. Compartilhado pelos backends de scraping
+(Selenium em scrape_os_data.py e HTTP em scrape_os_data_http.py) para que
+ambos produzam exatamente as mesmas chaves e valores.
+
+Não depende de Selenium.
+"""
+
+import re
+
+# Modelo de dados da OS, preenchido com vazios para garantir todas as chaves
+OS_TEMPLATE = {
+    "NOME CLIENTE": "", "CNPJ": "", "CENTRO DE CUSTO": "", "NÚMERO DA OS": "",
+    "DESCRIÇÃO": "", "OS": "", "CLIENTE": "", "CLIENTE MUNICIPIO": "",
+    "DEPARTAMENTO": "", "MUNICIPIO": "", "CODIGO DO CLIENTE": "",
+    "DATA DA CRIACAO DA PROPOSTA": "", "DATA DA EMISSAO": "", "DATA DA APROVACAO": "",
+    "DATA DA CONCLUSAO": "", "DATA DA SAIDA": "", "USUARIO DE CRIACAO": "",
+    "MES/ANO": "", "CHAVETA": "", "CLASSIFICACAO DO ATRASO": "",
+    "CLASSIFICACAO DO EQUIPAMENTO": "", "NOME DO VENDEDOR": "",
+    "CORRENTE ALTA": "", "CORRENTE BAIXA": "", "DATA PROGRAMACAO DA COLETA": "",
+    "DIMENSOES PARA TRANSPORTE": "", "DATA DA NOTA FISCAL CLIENTE": "",
+    "DATA DE ENVIO ORCAMENTO": "", "DATA DE PREVISAO DE COLETA": "",
+    "Nº CONTRATO": "", "TAREFA": "", "FABRICANTE": "", "FREQUANCIA (HZ)": "",
+    "IMPEDANCIA": "", "MODELO": "", "Nº DA PROPOSTA": "", "STATUS DA OS": "",
+    "TIPO DE SERVICO": "",
+    "ACOPLAMENTO": "", "HASTE DO PORTA ESCOVA": "", "Nº PATRIMONIO DO CLIENTE": "",
+    "Nº ORDEM COMPRA": "", "NF DATA ENGENHARIA": "", "NUMERO DE SERIE": "",
+    "PESO DO OLEO": "", "PESO DO TANQUE": "", "POLARIDADE": "",
+    "PORTA ESCOVA": "", "POTENCIA CV/HP": "", "ROTACAO (RPM)": "",
+    "TIPO DE ESTATOR/CARCACA": "", "TENSAO DE ALTA": "", "TIPO DE MOTOR/GERADOR": "",
+    "TIPO DE SERVICO GERAL": "", "TIPO DE TRANSFORMADOR": "", "VENTILADOR": "",
+    "TENSAO DO ROTOR (V)": "", "DATA DE ACOMPANHAMENTO DO SERVICO": "",
+    "DATA DE FIM DA PERITAGEM": "", "DATA DE FATURAMENTO": "", "DATA DE INICIO DO SERVICO": "",
+    "TIPO DO EQUIPAMENTO": "", "DATA PROGRAMACAO PERITAGEM": "", "ESCOVAS DE CARVAO": "",
+    "Nº OS DO CLIENTE": "", "TAG TIPO EQUIPAMENTO": "", "NF CLIENTE": "",
+    "HISTORICO DO CLIENTE": "", "PESO DA PARTE ATIVA": "", "PESO TOTAL": "",
+    "POLIA": "", "POTENCIA KVA": "", "POTENCIA KW": "", "TIPO DE ROTOR/ARMADURA": "",
+    "TENSAO DE BAIXA": "", "OLEO": "", "TENSAO DO ESTATOR (V)": "",
+    "VOLUME DO OLEO": "", "DATA DE ACOMPANHAMENTO DA PERITAGEM": "",
+    "DATA DE AUTORIZACAO DO SERVICO": "", "DATA DE INICIO DA PERITAGEM": "",
+    "TIPO CORRENTE": "", "OBSERVACAO NO RECEBIMENTO": ""
+}
+
+# Mapeamento dos rótulos da página para as chaves do JSON
+LABEL_TO_JSON_KEY = {
+    "OS": "OS", "CLIENTE": "CLIENTE", "DEPARTAMENTO": "DEPARTAMENTO",
+    "CODIGO DO CLIENTE": "CODIGO DO CLIENTE", "DATA DA EMISSAO": "DATA DA EMISSAO",
+    "DATA DA CONCLUSAO": "DATA DA CONCLUSAO", "USUARIO DE CRIACAO": "USUARIO DE CRIACAO",
+    "ACOPLAMENTO": "ACOPLAMENTO", "MES/ANO": "MES/ANO",
+    "CLASSIFICACAO DO ATRASO": "CLASSIFICACAO DO ATRASO", "NOME DO VENDEDOR": "NOME DO VENDEDOR",
+    "CORRENTE BAIXA": "CORRENTE BAIXA", "DESCRIÇÃO": "DESCRIÇÃO",
+    "DATA DA NOTA FISCAL CLIENTE": "DATA DA NOTA FISCAL CLIENTE",
+    "DATA DE PREVISAO DE COLETA": "DATA DE PREVISAO DE COLETA", "TAREFA": "TAREFA",
+    "FABRICANTE": "FABRICANTE", "HASTE DO PORTA ESCOVA": "HASTE DO PORTA ESCOVA",
+    "MODELO": "MODELO", "Nº PATRIMONIO DO CLIENTE": "Nº PATRIMONIO DO CLIENTE",
+    "Nº ORDEM COMPRA": "Nº ORDEM COMPRA", "NF DATA ENGENHARIA": "NF DATA ENGENHARIA",
+    "NUMERO DE SERIE": "NUMERO DE SERIE", "PESO DO OLEO": "PESO DO OLEO",
+    "PESO DO TANQUE": "PESO DO TANQUE", "POLARIDADE": "POLARIDADE",
+    "PORTA ESCOVA": "PORTA ESCOVA", "POTENCIA CV/HP": "POTENCIA CV/HP",
+    "ROTACAO (RPM)": "ROTACAO (RPM)", "TIPO DE ESTATOR/CARCACA": "TIPO DE ESTATOR/CARCACA",
+    "TENSAO DE ALTA": "TENSAO DE ALTA", "TIPO DE MOTOR/GERADOR": "TIPO DE MOTOR/GERADOR",
+    "TIPO DE SERVICO GERAL": "TIPO DE SERVICO GERAL",
+    "TIPO DE TRANSFORMADOR": "TIPO DE TRANSFORMADOR", "VENTILADOR": "VENTILADOR",
+    "TENSAO DO ROTOR (V)": "TENSAO DO ROTOR (V)",
+    "DATA DE ACOMPANHAMENTO DO SERVICO": "DATA DE ACOMPANHAMENTO DO SERVICO",
+    "DATA DE FIM DA PERITAGEM": "DATA DE FIM DA PERITAGEM",
+    "DATA DE FATURAMENTO": "DATA DE FATURAMENTO", "DATA DE INICIO DO SERVICO": "DATA DE INICIO DO SERVICO",
+    "TIPO DO EQUIPAMENTO": "TIPO DO EQUIPAMENTO", "DATA PROGRAMACAO PERITAGEM": "DATA PROGRAMACAO PERITAGEM",
+    "CENTRO DE CUSTO": "CENTRO DE CUSTO", "CNPJ": "CNPJ",
+    "CLIENTE MUNICIPIO": "CLIENTE MUNICIPIO", "MUNICIPIO": "MUNICIPIO",
+    "DATA DA CRIACAO DA PROPOSTA": "DATA DA CRIACAO DA PROPOSTA", "DATA DA APROVACAO": "DATA DA APROVACAO",
+    "DATA DA SAIDA": "DATA DA SAIDA", "CHAVETA": "CHAVETA",
+    "CLASSIFICACAO DO EQUIPAMENTO": "CLASSIFICACAO DO EQUIPAMENTO",
+    "CORRENTE ALTA": "CORRENTE ALTA",
+    "DATA PROGRAMACAO DA COLETA": "DATA PROGRAMACAO DA COLETA",
+    "DIMENSOES PARA TRANSPORTE": "DIMENSOES PARA TRANSPORTE",
+    "DATA DE ENVIO ORCAMENTO": "DATA DE ENVIO ORCAMENTO", "Nº CONTRATO": "Nº CONTRATO",
+    "ESCOVAS DE CARVAO": "ESCOVAS DE CARVAO", "FREQUANCIA (HZ)": "FREQUANCIA (HZ)",
+    "IMPEDANCIA": "IMPEDANCIA", "Nº OS DO CLIENTE": "Nº OS DO CLIENTE",
+    "Nº DA PROPOSTA": "Nº DA PROPOSTA", "TAG TIPO EQUIPAMENTO": "TAG TIPO EQUIPAMENTO",
+    "NF CLIENTE": "NF CLIENTE", "HISTORICO DO CLIENTE": "HISTORICO DO CLIENTE",
+    "PESO DA PARTE ATIVA": "PESO DA PARTE ATIVA", "PESO TOTAL": "PESO TOTAL",
+    "POLIA": "POLIA", "POTENCIA KVA": "POTENCIA KVA", "POTENCIA KW": "POTENCIA KW",
+    "TIPO DE ROTOR/ARMADURA": "TIPO DE ROTOR/ARMADURA", "STATUS DA OS": "STATUS DA OS",
+    "TIPO DE SERVICO": "TIPO DE SERVICO", "TENSAO DE BAIXA": "TENSAO DE BAIXA",
+    "OLEO": "OLEO", "TENSAO DO ESTATOR (V)": "TENSAO DO ESTATOR (V)",
+    "VOLUME DO OLEO": "VOLUME DO OLEO",
+    "DATA DE ACOMPANHAMENTO DA PERITAGEM": "DATA DE ACOMPANHAMENTO DA PERITAGEM",
+    "DATA DE AUTORIZACAO DO SERVICO": "DATA DE AUTORIZACAO DO SERVICO",
+    "DATA DE INICIO DA PERITAGEM": "DATA DE INICIO DA PERITAGEM",
+    "TIPO CORRENTE": "TIPO CORRENTE", "OBSERVACAO NO RECEBIMENTO": "OBSERVACAO NO RECEBIMENTO",
+    "TIPO DE OS": "TIPO DE SERVICO",
+    "ACESSORIO DO ROTOR": "ACESSORIO DO ROTOR",
+    "ANEL DO PORTA ESCOVA": "ANEL DO PORTA ESCOVA",
+}
+
+def clean_value(label, value):
+    """Remove placeholders do sistema externo e espaços/hifens soltos"""
+    exact_placeholders = ["*", "***", "SELECIONE", "*DESCRIÇÃ", "SIMCLASSIFICACAO", "ARQUIVAR", "EQUIPAMENTO SEM PLACA IDENTIFICAÇÃO."]
+    partial_placeholders = ["- ITABIRITO", "ITABIRITO"] # Só remove se for parte do valor, não o valor inteiro
+
+    cleaned_value = value
+
+    if cleaned_value: # Só tenta limpar se o valor não estiver vazio
+        # Primeiro, verificar placeholders exatos (valor deve ser exatamente igual)
+        for ph in exact_placeholders:
+            if cleaned_value.strip().upper() == ph.upper():
+                cleaned_value = ""
+                break
+
+        # Se ainda tem valor, aplicar limpeza parcial apenas para campos específicos
+        if cleaned_value and label.upper() not in ["TIPO DO EQUIPAMENTO", "EQUIPAMENTO", "MODELO", "FABRICANTE"]:
+            for ph in partial_placeholders:
+                if "DATA" not in label.upper() and "CNPJ" not in label.upper():
+                    cleaned_value = cleaned_value.replace(ph, "").strip()
+
+        # Limpeza final de espaços múltiplos
+        if cleaned_value:
+            cleaned_value = re.sub(r'\s{2,}', ' ', cleaned_value).strip()
+            # Só remove hifens soltos se não for um campo importante
+            if label.upper() not in ["TIPO DO EQUIPAMENTO", "EQUIPAMENTO", "MODELO", "FABRICANTE"]:
+                cleaned_value = re.sub(r'-\s*-', '-', cleaned_value).strip('-').strip()
+
+    return cleaned_value
+
+def apply_value(os_data, label, value, verbose=True):
+    """
+    Grava o valor do rótulo em os_data (e nos campos redundantes).
+    Retorna a chave preenchida, ou None se o rótulo não tem mapeamento.
+    """
+    json_key = LABEL_TO_JSON_KEY.get(label)
+    if json_key and value != "": # Só atualiza se o valor não for vazio
+        # Prioriza dados globais se já existirem e forem válidos, exceto para campos específicos de tab que devem sobrescrever
+        if json_key in ["CNPJ", "CODIGO DO CLIENTE", "NOME CLIENTE", "CLIENTE"]:
+            if os_data[json_key] == "" or os_data[json_key].strip() == value.strip():
+                os_data[json_key] = value
+            # else: manter o valor global se já preenchido e diferente, para evitar regredir
+        else:
+            os_data[json_key] = value
+
+        # Lógica para campos redundantes ou especiais
+        if label == "OS":
+            # Remover zeros à esquerda do número da OS
+            os_numero_limpo = value.lstrip('0') if value and isinstance(value, str) else value
+            if not os_numero_limpo:  # Se ficou vazio após remover zeros, manter pelo menos um zero
+                os_numero_limpo = '0'
+            os_data["NÚMERO DA OS"] = os_numero_limpo
+            # Também atualizar o campo OS com o número limpo
+            os_data["OS"] = os_numero_limpo
+        elif label == "CLIENTE":
+            os_data["NOME CLIENTE"] = value
+            os_data["CLIENTE"] = value
+        elif label == "DEPARTAMENTO":
+            if not os_data["CENTRO DE CUSTO"]:
+                os_data["CENTRO DE CUSTO"] = value
+        elif label == "MUNICIPIO" and os_data["CLIENTE MUNICIPIO"] == "":
+            # Tentar preencher CLIENTE MUNICIPIO com MUNICIPIO se o primeiro estiver vazio
+            os_data["CLIENTE MUNICIPIO"] = value
+
+        if verbose:
+            print(f"   ✅ Mapeado '{label}' ('{value}') para '{json_key}'")
+        return json_key
+    elif label and value == "": # Se o rótulo foi encontrado mas o valor é vazio (após limpeza)
+        json_key = LABEL_TO_JSON_KEY.get(label)
+        if json_key:
+            os_data[json_key] = "" # Garante que o campo existe mas está vazio
+            if verbose:
+                print(f"   ✅ Mapeado '{label}' (vazio) para '{json_key}'")
+        return json_key
+    return None
+
+def is_valid_os_data(os_data):
+    """Registro com dados mínimos para ser considerado uma OS"""
+    return bool(os_data.get("OS") or os_data.get("NOME CLIENTE") or os_data.get("CNPJ"))
@@ -3,6 +3,8 @@ import json
 import os
 import re
 import sys
+import threading
+from contextlib import contextmanager
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -18,6 +20,133 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(script_dir, '.env')
 load_dotenv(env_path, override=True)
 
+# Modelo/mapeamento dos campos compartilhado com o backend HTTP
+sys.path.insert(0, script_dir)
+from os_data_mapping import OS_TEMPLATE, clean_value, apply_value
+
+# Tempos máximos de espera (segundos). As esperas terminam assim que a
+# condição é satisfeita; o valor só limita o pior caso.
+WAIT_TIMEOUT = int(os.getenv("SCRAPING_WAIT_TIMEOUT", "30"))
+NOT_FOUND_TIMEOUT = int(os.getenv("SCRAPING_NOT_FOUND_TIMEOUT", "10"))
+NETWORK_IDLE_TIMEOUT = int(os.getenv("SCRAPING_NETWORK_IDLE_TIMEOUT", "10"))
+NETWORK_IDLE_MS = int(os.getenv("SCRAPING_NETWORK_IDLE_MS", "500"))
+
+MENU_OS_XPATH = '//*[@id="root"]/div/div[1]/div/div/div/div[2]/div'
+SEARCH_INPUT_XPATH = '//*[@id="root"]/div/div[2]/div[2]/div/div/div[2]/div[1]/div[1]/span/span/input'
+GLOBAL_INFO_XPATH = '//*[@id="root"]/div/div[2]/div[2]/div/div[1]/div[1]'
+DETAILS_XPATH = '//div[contains(@class, "ant-card-body")]'
+INFO_TAB_XPATH = '//div[contains(@class, "ant-tabs-tab-active")]//div[@role="tab" and contains(text(), "Informações da OS")]'
+NOT_FOUND_XPATHS = [
+    "//div[contains(text(), 'não encontrada')]",
+    "//div[contains(text(), 'Nenhum resultado')]",
+    "//div[contains(text(), 'não foi encontrada')]",
+    "//span[contains(text(), 'não encontrada')]",
+    "//p[contains(text(), 'não encontrada')]",
+    "//div[contains(@class, 'empty') or contains(@class, 'no-data')]"
+]
+
+# =============================================================================
+# ESPERAS POR EVENTO E TEMPOS POR ETAPA
+# =============================================================================
+
+_timings = threading.local()
+
+def reset_step_timings():
+    """Zera os tempos por etapa (uma OS por vez em cada thread)"""
+    _timings.steps = {}
+
+def get_step_timings():
+    """Tempos (s) por etapa do último scraping desta thread"""
+    if not hasattr(_timings, "steps"):
+        reset_step_timings()
+    return _timings.steps
+
+@contextmanager
+def step(name):
+    """Mede a duração de uma etapa do scraping"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        get_step_timings()[name] = round(get_step_timings().get(name, 0) + elapsed, 3)
+        print(f"⏱️ {name}: {elapsed:.2f}s")
+
+# Conta requisições fetch/XHR em andamento na página (instalado uma vez por documento)
+_NETWORK_TRACKER_JS = """
+if (!window.__registroosRede) {
+    var rede = window.__registroosRede = {pendentes: 0, ultima: Date.now()};
+    var fim = function () { rede.pendentes = Math.max(0, rede.pendentes - 1); rede.ultima = Date.now(); };
+    if (window.fetch) {
+        var fetchOriginal = window.fetch;
+        window.fetch = function () {
+            rede.pendentes++; rede.ultima = Date.now();
+            return fetchOriginal.apply(this, arguments).finally(fim);
+        };
+    }
+    var sendOriginal = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        rede.pendentes++; rede.ultima = Date.now();
+        this.addEventListener('loadend', fim);
+        return sendOriginal.apply(this, arguments);
+    };
+}
+"""
+
+_NETWORK_IDLE_JS = """
+var rede = window.__registroosRede;
+return document.readyState === 'complete'
+    && (!rede || (rede.pendentes === 0 && Date.now() - rede.ultima >= arguments[0]));
+"""
+
+def install_network_tracker(driver):
+    try:
+        driver.execute_script(_NETWORK_TRACKER_JS)
+    except Exception as e:
+        print(f"⚠️ Não foi possível instalar o monitor de rede: {e}")
+
+def wait_document_ready(driver, timeout=WAIT_TIMEOUT):
+    """DOM carregado (document.readyState == 'complete')"""
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+
+def wait_network_idle(driver, timeout=NETWORK_IDLE_TIMEOUT, idle_ms=NETWORK_IDLE_MS):
+    """
+    Nenhuma requisição fetch/XHR pendente há idle_ms. Se a página nunca
+    ficar ociosa (polling), segue após o timeout: as esperas por elemento
+    continuam garantindo o conteúdo.
+    """
+    install_network_tracker(driver)
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+            lambda d: d.execute_script(_NETWORK_IDLE_JS, idle_ms)
+        )
+        return True
+    except TimeoutException:
+        print(f"⚠️ Rede não ficou ociosa em {timeout}s, continuando...")
+        return False
+
+def wait_staleness(driver, element, timeout=WAIT_TIMEOUT):
+    """Aguarda o elemento antigo sair do DOM (ex.: detalhes da OS anterior)"""
+    if element is None:
+        return
+    try:
+        WebDriverWait(driver, timeout).until(EC.staleness_of(element))
+    except TimeoutException:
+        print("⚠️ Conteúdo anterior ainda presente após o tempo limite")
+
+def find_displayed(driver, xpaths):
+    """Primeiro elemento visível entre os seletores (ou None)"""
+    for xpath in xpaths:
+        for element in driver.find_elements(By.XPATH, xpath):
+            try:
+                if element.is_displayed():
+                    return element
+            except Exception:
+                continue
+    return None
+
 def get_driver():
     """Inicializa o Chrome em modo anônimo e headless."""
     chrome_options = webdriver.ChromeOptions()
@@ -48,32 +177,22 @@ def get_driver():
     return driver
 
 def click_post_login_element(driver, wait):
-    """Clica no elemento específico após o login."""
+    """Clica no item de menu das OS e aguarda o campo de busca."""
     try:
         print("🔍 Procurando pelo elemento pós-login...")
-        
-        # XPath específico fornecido (primeiro elemento da lista de itens do menu lateral)
-        target_xpath = '//*[@id="root"]/div/div[1]/div/div/div/div[2]/div'
-        
-        # Aguarda o elemento estar presente e clicável
-        print("⏳ Aguardando elemento ficar disponível...")
-        target_element = wait.until(
-            EC.element_to_be_clickable((By.XPATH, target_xpath))
-        )
-        
-        # Scroll para o elemento para garantir que esteja visível
-        driver.execute_script("arguments[0].scrollIntoView(true);", target_element)
-        time.sleep(1)
-        
-        # Clica no elemento
-        target_element.click()
-        print("✅ Elemento pós-login clicado com sucesso!")
-        
-        # Aguarda um pouco para o carregamento
-        time.sleep(3)
-        
+
+        # Primeiro elemento da lista de itens do menu lateral
+        with step("menu"):
+            target_element = wait.until(EC.element_to_be_clickable((By.XPATH, MENU_OS_XPATH)))
+            driver.execute_script("arguments[0].scrollIntoView(true);", target_element)
+            driver.execute_script("arguments[0].click();", target_element)
+            print("✅ Elemento pós-login clicado com sucesso!")
+
+            # Página de busca pronta quando o campo de OS aparece
+            wait.until(EC.element_to_be_clickable((By.XPATH, SEARCH_INPUT_XPATH)))
+
         return True
-        
+
     except TimeoutException:
         print("❌ Timeout: Elemento pós-login não encontrado no tempo limite.")
         return False
@@ -84,99 +203,80 @@ def click_post_login_element(driver, wait):
         print(f"❌ Erro ao clicar no elemento pós-login: {e}")
         return False
 
-def check_os_not_found(driver, wait):
-    """Verifica se a OS não foi encontrada na busca."""
-    try:
-        # Verificar se há mensagem de "não encontrado" ou similar
-        not_found_selectors = [
-            "//div[contains(text(), 'não encontrada')]",
-            "//div[contains(text(), 'Nenhum resultado')]",
-            "//div[contains(text(), 'não foi encontrada')]",
-            "//span[contains(text(), 'não encontrada')]",
-            "//p[contains(text(), 'não encontrada')]",
-            "//div[contains(@class, 'empty') or contains(@class, 'no-data')]"
-        ]
-
-        for selector in not_found_selectors:
-            try:
-                element = driver.find_element(By.XPATH, selector)
-                if element and element.is_displayed():
-                    print(f"⚠️ OS não encontrada - detectado: {element.text}")
-                    return True
-            except:
-                continue
+def _search_outcome(driver):
+    """Condição: ("not_found", elemento) ou ("details", None); False enquanto carrega"""
+    element = find_displayed(driver, NOT_FOUND_XPATHS)
+    if element is not None:
+        return ("not_found", element)
+    if driver.find_elements(By.XPATH, DETAILS_XPATH):
+        return ("details", None)
+    return False
 
-        # Verificar se não há dados carregados após um tempo razoável
-        time.sleep(3)
+def check_os_not_found(driver, wait, timeout=NOT_FOUND_TIMEOUT):
+    """
+    Verifica se a OS não foi encontrada na busca: aguarda (até `timeout`) a
+    mensagem de "não encontrada" ou o contêiner de detalhes, o que vier antes.
 
-        # Verificar se não há container de detalhes
+    Retorna True só quando a mensagem de "não encontrada" aparece e False
+    quando os detalhes aparecem. Timeout ou erro sobem como exceção: página
+    lenta ou quebrada não é prova de que a OS não existe.
+    """
+    _ = wait  # Silenciar warning
+    with step("resultado"):
         try:
-            details_xpath = '//div[contains(@class, "ant-card-body")]'
-            details_elements = driver.find_elements(By.XPATH, details_xpath)
-            if not details_elements:
-                print("⚠️ Nenhum container de detalhes encontrado - OS pode não existir")
-                return True
-        except:
-            pass
-
-        return False
+            outcome = WebDriverWait(driver, timeout, poll_frequency=0.2).until(_search_outcome)
+        except TimeoutException:
+            raise TimeoutException(f"Nenhum resultado da busca em {timeout}s (nem detalhes, nem 'não encontrada')")
 
-    except Exception as e:
-        print(f"⚠️ Erro ao verificar se OS não foi encontrada: {e}")
-        return False
+    if outcome[0] == "not_found":
+        print(f"⚠️ OS não encontrada - detectado: {outcome[1].text}")
+        return True
+    return False
 
 def enter_search_value(driver, wait, search_value="12345"):
-    """Insere valor no campo de busca e pressiona Enter."""
-    try:
-        print(f"🔍 Procurando pelo campo de entrada para inserir: {search_value}")
-
-        # XPath específico do campo de input (campo de busca por OS)
-        input_xpath = '//*[@id="root"]/div/div[2]/div[2]/div/div/div[2]/div[1]/div[1]/span/span/input'
+    """
+    Insere valor no campo de busca e pressiona Enter.
 
-        # Aguarda o campo de input estar presente e interagível
-        print("⏳ Aguardando campo de entrada ficar disponível...")
-        input_field = wait.until(
-            EC.element_to_be_clickable((By.XPATH, input_xpath))
-        )
+    Retorna True se a OS foi encontrada e False se o site confirmou que ela
+    não existe; timeout ou erro na busca sobem como exceção.
+    """
+    print(f"🔍 Procurando pelo campo de entrada para inserir: {search_value}")
 
-        # Scroll para o campo para garantir que esteja visível
+    with step("busca"):
+        try:
+            # Campo de busca por OS
+            input_field = wait.until(EC.element_to_be_clickable((By.XPATH, SEARCH_INPUT_XPATH)))
+        except TimeoutException:
+            print("❌ Timeout: Campo de entrada não encontrado no tempo limite.")
+            raise
         driver.execute_script("arguments[0].scrollIntoView(true);", input_field)
-        time.sleep(1)
 
-        # Limpa o campo e insere o valor
+        # Detalhes de uma busca anterior (sessão reaproveitada) não podem ser lidos como resultado
+        previous_details = driver.find_elements(By.XPATH, DETAILS_XPATH)
+
         input_field.clear()
         input_field.send_keys(search_value)
-        print(f"✅ Valor '{search_value}' inserido no campo!")
-
-        # Pressiona Enter
         input_field.send_keys(Keys.ENTER)
-        print("✅ Enter pressionado!")
+        print(f"✅ Valor '{search_value}' inserido e Enter pressionado!")
 
-        # Aguarda um pouco para o processamento e carregamento dos detalhes da OS
-        time.sleep(5)
-
-        # Verificar se a OS foi encontrada
-        if check_os_not_found(driver, wait):
-            print(f"❌ OS {search_value} não foi encontrada no sistema")
-            return False
-
-        return True
+        if previous_details:
+            wait_staleness(driver, previous_details[0])
+        wait_network_idle(driver)
 
-    except TimeoutException:
-        print("❌ Timeout: Campo de entrada não encontrado no tempo limite.")
-        return False
-    except NoSuchElementException:
-        print("❌ Campo de entrada não encontrado na página.")
-        return False
-    except Exception as e:
-        print(f"❌ Erro ao inserir valor no campo: {e}")
+    # Verificar se a OS foi encontrada
+    if check_os_not_found(driver, wait):
+        print(f"❌ OS {search_value} não foi encontrada no sistema")
         return False
 
-def login(driver, wait, url, username, password, os_number):
-    """Realiza o login no site com tratamento aprimorado do popup."""
-    try:
+    return True
+
+def submit_login(driver, wait, url, username, password):
+    """Abre a URL, preenche usuário/senha e aguarda o formulário sair da tela."""
+    with step("login"):
         driver.get(url)
         print("Acessando a URL:", url)
+        wait_document_ready(driver)
+        install_network_tracker(driver)
 
         # Insere o usuário
         user_field = wait.until(EC.presence_of_element_located((By.ID, "login_username")))
@@ -195,32 +295,49 @@ def login(driver, wait, url, username, password, os_number):
         login_button.click()
         print("Botão de login clicado.")
 
-        # Aguarda o carregamento inicial pós-login
+        # Login concluído: formulário some e o menu lateral fica disponível
         print("Aguardando carregamento após login...")
-        time.sleep(3)
+        wait.until(EC.invisibility_of_element_located((By.ID, "login_username")))
+        wait.until(EC.element_to_be_clickable((By.XPATH, MENU_OS_XPATH)))
+        wait_network_idle(driver)
 
-        # Clica no elemento específico pós-login
-        print("🎯 Executando clique no elemento pós-login...")
-        if click_post_login_element(driver, wait):
-            print("✅ Elemento pós-login clicado com sucesso!")
-            
-            # Insere valor no campo de busca
-            print(f"🔍 Executando inserção de valor no campo de busca: {os_number}")
-            if enter_search_value(driver, wait, os_number):
-                print(f"✅ Valor {os_number} inserido e Enter pressionado com sucesso!")
-            else:
-                print("⚠️ Não foi possível inserir o valor no campo, mas continuando...")
-        else:
-            print("⚠️ Não foi possível clicar no elemento pós-login, mas continuando...")
+def login(driver, wait, url, username, password, os_number):
+    """
+    Realiza o login no site e busca a OS.
 
-        print("✅ Login realizado em modo anônimo!")
-        return True
-        
+    Retorna True com os detalhes da OS na tela e False só quando o site
+    confirma que a OS não existe; falha de login ou de busca sobe como exceção.
+    """
+    try:
+        submit_login(driver, wait, url, username, password)
     except Exception as e:
         print(f"Ocorreu um erro inesperado durante o login: {e}")
+        raise
+
+    # Clica no elemento específico pós-login
+    print("🎯 Executando clique no elemento pós-login...")
+    if not click_post_login_element(driver, wait):
+        raise Exception("Página de busca de OS indisponível após o login")
+    print("✅ Elemento pós-login clicado com sucesso!")
+
+    # Insere valor no campo de busca
+    print(f"🔍 Executando inserção de valor no campo de busca: {os_number}")
+    if not enter_search_value(driver, wait, os_number):
+        # Sem resultado não há detalhes a aguardar
+        print(f"⚠️ Busca da OS {os_number} sem resultado")
         return False
 
-def wait_for_os_details_container(driver, wait, max_attempts=5):
+    print(f"✅ Valor {os_number} inserido e Enter pressionado com sucesso!")
+    return True
+
+def _details_with_data(driver, container_xpath):
+    """Condição: contêiner de detalhes presente e com ao menos uma tag <p>"""
+    for container in driver.find_elements(By.XPATH, container_xpath):
+        if container.find_elements(By.TAG_NAME, "p"):
+            return container
+    return False
+
+def wait_for_os_details_container(driver, wait, max_attempts=2):
     """
     Aguarda o carregamento do contêiner de detalhes da OS, que agora é um 'ant-card-body'
     dentro de uma aba ativa.
@@ -230,44 +347,30 @@ def wait_for_os_details_container(driver, wait, max_attempts=5):
     for attempt in range(max_attempts):
         try:
             print(f"📊 Tentativa {attempt + 1}/{max_attempts} de detectar contêiner de detalhes...")
-            time.sleep(5 + (attempt * 2)) # Aumentar o tempo de espera nas primeiras tentativas
-
-            # 1. Tentar localizar o botão da aba "Informações da OS" quando está ativo
-            info_os_tab_button_xpath = '//div[contains(@class, "ant-tabs-tab-active")]//div[@role="tab" and contains(text(), "Informações da OS")]'
-            
-            # Use presence_of_element_located para apenas verificar se o botão existe antes de tentar clicar ou obter atributos
-            info_os_tab_button = wait.until(EC.presence_of_element_located((By.XPATH, info_os_tab_button_xpath)))
-            
-            # Tente clicar no botão para garantir que a aba está ativa (mesmo que já esteja, não faz mal)
-            driver.execute_script("arguments[0].click();", info_os_tab_button)
-            print("✅ Botão 'Informações da OS' ativo encontrado e clicado (para garantir foco).")
-            time.sleep(2) # Pequena pausa para a aba carregar seu conteúdo
-
-            # 2. Localizar o painel da aba ativa que contém os dados da OS
-            # O painel pode ter um ID dinâmico, então vamos procurar pelo atributo 'aria-controls' ou por uma classe genérica
-            panel_id = info_os_tab_button.get_attribute("aria-controls")
-            
-            details_container_xpath = ''
-            if panel_id:
-                print(f"🔍 ID do painel associado via aria-controls: {panel_id}")
-                # Procurar o ant-card-body dentro do painel com o ID dinâmico
-                details_container_xpath = f'//div[@id="{panel_id}"]//div[contains(@class, "ant-card-body")]'
-            else:
-                print("⚠️ Atributo 'aria-controls' não encontrado no botão da aba. Tentando seletor alternativo para o contêiner de detalhes.")
-                # Fallback: procurar por um ant-card-body dentro de qualquer painel ativo
-                details_container_xpath = '//div[contains(@class, "ant-tabs-tabpane-active")]//div[contains(@class, "ant-card-body")]'
-            
-            # Aguarda até que o ant-card-body esteja presente
-            details_container_element = wait.until(EC.presence_of_element_located((By.XPATH, details_container_xpath)))
-
-            # 3. Verificar se há tags <p> dentro do ant-card-body, indicando que os dados foram carregados
-            p_elements = details_container_element.find_elements(By.TAG_NAME, "p")
-            if p_elements:
-                print(f"✅ Contêiner 'ant-card-body' detectado com {len(p_elements)} tags <p> de dados.")
-                return details_container_element
-            else:
-                print(f"⚠️ Contêiner 'ant-card-body' encontrado, mas sem tags <p> com dados. Tentando novamente.")
-            
+
+            with step("detalhes"):
+                # 1. Botão da aba "Informações da OS" ativo
+                info_os_tab_button = wait.until(EC.presence_of_element_located((By.XPATH, INFO_TAB_XPATH)))
+
+                # Clicar para garantir que a aba está ativa (mesmo que já esteja, não faz mal)
+                driver.execute_script("arguments[0].click();", info_os_tab_button)
+                print("✅ Botão 'Informações da OS' ativo encontrado e clicado (para garantir foco).")
+
+                # 2. Painel da aba ativa (ID dinâmico via aria-controls)
+                panel_id = info_os_tab_button.get_attribute("aria-controls")
+                if panel_id:
+                    print(f"🔍 ID do painel associado via aria-controls: {panel_id}")
+                    details_container_xpath = f'//div[@id="{panel_id}"]//div[contains(@class, "ant-card-body")]'
+                else:
+                    print("⚠️ Atributo 'aria-controls' não encontrado no botão da aba. Tentando seletor alternativo para o contêiner de detalhes.")
+                    details_container_xpath = '//div[contains(@class, "ant-tabs-tabpane-active")]//div[contains(@class, "ant-card-body")]'
+
+                # 3. Aguarda o ant-card-body com tags <p> (dados carregados)
+                details_container_element = wait.until(lambda d: _details_with_data(d, details_container_xpath))
+
+            print(f"✅ Contêiner 'ant-card-body' detectado com {len(details_container_element.find_elements(By.TAG_NAME, 'p'))} tags <p> de dados.")
+            return details_container_element
+
         except TimeoutException:
             print(f"⚠️ Timeout na tentativa {attempt + 1}: Botão da aba ou contêiner de detalhes não encontrado no tempo limite.")
         except NoSuchElementException:
@@ -284,101 +387,14 @@ def scrape_os_details_data_only(driver, wait):
     """Extrai os detalhes da OS e retorna apenas os dados (sem salvar em arquivo)."""
     scraped_data_list = []
 
-    # Modelo de dados da OS, preenchido com vazios para garantir todas as chaves
-    os_template = {
-        "NOME CLIENTE": "", "CNPJ": "", "CENTRO DE CUSTO": "", "NÚMERO DA OS": "",
-        "DESCRIÇÃO": "", "OS": "", "CLIENTE": "", "CLIENTE MUNICIPIO": "",
-        "DEPARTAMENTO": "", "MUNICIPIO": "", "CODIGO DO CLIENTE": "",
-        "DATA DA CRIACAO DA PROPOSTA": "", "DATA DA EMISSAO": "", "DATA DA APROVACAO": "",
-        "DATA DA CONCLUSAO": "", "DATA DA SAIDA": "", "USUARIO DE CRIACAO": "",
-        "MES/ANO": "", "CHAVETA": "", "CLASSIFICACAO DO ATRASO": "",
-        "CLASSIFICACAO DO EQUIPAMENTO": "", "NOME DO VENDEDOR": "",
-        "CORRENTE ALTA": "", "CORRENTE BAIXA": "", "DATA PROGRAMACAO DA COLETA": "",
-        "DIMENSOES PARA TRANSPORTE": "", "DATA DA NOTA FISCAL CLIENTE": "",
-        "DATA DE ENVIO ORCAMENTO": "", "DATA DE PREVISAO DE COLETA": "",
-        "Nº CONTRATO": "", "TAREFA": "", "FABRICANTE": "", "FREQUANCIA (HZ)": "",
-        "IMPEDANCIA": "", "MODELO": "", "Nº DA PROPOSTA": "", "STATUS DA OS": "",
-        "TIPO DE SERVICO": "",
-        "ACOPLAMENTO": "", "HASTE DO PORTA ESCOVA": "", "Nº PATRIMONIO DO CLIENTE": "",
-        "Nº ORDEM COMPRA": "", "NF DATA ENGENHARIA": "", "NUMERO DE SERIE": "",
-        "PESO DO OLEO": "", "PESO DO TANQUE": "", "POLARIDADE": "",
-        "PORTA ESCOVA": "", "POTENCIA CV/HP": "", "ROTACAO (RPM)": "",
-        "TIPO DE ESTATOR/CARCACA": "", "TENSAO DE ALTA": "", "TIPO DE MOTOR/GERADOR": "",
-        "TIPO DE SERVICO GERAL": "", "TIPO DE TRANSFORMADOR": "", "VENTILADOR": "",
-        "TENSAO DO ROTOR (V)": "", "DATA DE ACOMPANHAMENTO DO SERVICO": "",
-        "DATA DE FIM DA PERITAGEM": "", "DATA DE FATURAMENTO": "", "DATA DE INICIO DO SERVICO": "",
-        "TIPO DO EQUIPAMENTO": "", "DATA PROGRAMACAO PERITAGEM": "", "ESCOVAS DE CARVAO": "",
-        "Nº OS DO CLIENTE": "", "TAG TIPO EQUIPAMENTO": "", "NF CLIENTE": "",
-        "HISTORICO DO CLIENTE": "", "PESO DA PARTE ATIVA": "", "PESO TOTAL": "",
-        "POLIA": "", "POTENCIA KVA": "", "POTENCIA KW": "", "TIPO DE ROTOR/ARMADURA": "",
-        "TENSAO DE BAIXA": "", "OLEO": "", "TENSAO DO ESTATOR (V)": "",
-        "VOLUME DO OLEO": "", "DATA DE ACOMPANHAMENTO DA PERITAGEM": "",
-        "DATA DE AUTORIZACAO DO SERVICO": "", "DATA DE INICIO DA PERITAGEM": "",
-        "TIPO CORRENTE": "", "OBSERVACAO NO RECEBIMENTO": ""
-    }
-
-    # Mapeamento dos rótulos da página para as chaves do JSON
-    label_to_json_key = {
-        "OS": "OS", "CLIENTE": "CLIENTE", "DEPARTAMENTO": "DEPARTAMENTO",
-        "CODIGO DO CLIENTE": "CODIGO DO CLIENTE", "DATA DA EMISSAO": "DATA DA EMISSAO",
-        "DATA DA CONCLUSAO": "DATA DA CONCLUSAO", "USUARIO DE CRIACAO": "USUARIO DE CRIACAO",
-        "ACOPLAMENTO": "ACOPLAMENTO", "MES/ANO": "MES/ANO",
-        "CLASSIFICACAO DO ATRASO": "CLASSIFICACAO DO ATRASO", "NOME DO VENDEDOR": "NOME DO VENDEDOR",
-        "CORRENTE BAIXA": "CORRENTE BAIXA", "DESCRIÇÃO": "DESCRIÇÃO",
-        "DATA DA NOTA FISCAL CLIENTE": "DATA DA NOTA FISCAL CLIENTE",
-        "DATA DE PREVISAO DE COLETA": "DATA DE PREVISAO DE COLETA", "TAREFA": "TAREFA",
-        "FABRICANTE": "FABRICANTE", "HASTE DO PORTA ESCOVA": "HASTE DO PORTA ESCOVA",
-        "MODELO": "MODELO", "Nº PATRIMONIO DO CLIENTE": "Nº PATRIMONIO DO CLIENTE",
-        "Nº ORDEM COMPRA": "Nº ORDEM COMPRA", "NF DATA ENGENHARIA": "NF DATA ENGENHARIA",
-        "NUMERO DE SERIE": "NUMERO DE SERIE", "PESO DO OLEO": "PESO DO OLEO",
-        "PESO DO TANQUE": "PESO DO TANQUE", "POLARIDADE": "POLARIDADE",
-        "PORTA ESCOVA": "PORTA ESCOVA", "POTENCIA CV/HP": "POTENCIA CV/HP",
-        "ROTACAO (RPM)": "ROTACAO (RPM)", "TIPO DE ESTATOR/CARCACA": "TIPO DE ESTATOR/CARCACA",
-        "TENSAO DE ALTA": "TENSAO DE ALTA", "TIPO DE MOTOR/GERADOR": "TIPO DE MOTOR/GERADOR",
-        "TIPO DE SERVICO GERAL": "TIPO DE SERVICO GERAL",
-        "TIPO DE TRANSFORMADOR": "TIPO DE TRANSFORMADOR", "VENTILADOR": "VENTILADOR",
-        "TENSAO DO ROTOR (V)": "TENSAO DO ROTOR (V)",
-        "DATA DE ACOMPANHAMENTO DO SERVICO": "DATA DE ACOMPANHAMENTO DO SERVICO",
-        "DATA DE FIM DA PERITAGEM": "DATA DE FIM DA PERITAGEM",
-        "DATA DE FATURAMENTO": "DATA DE FATURAMENTO", "DATA DE INICIO DO SERVICO": "DATA DE INICIO DO SERVICO",
-        "TIPO DO EQUIPAMENTO": "TIPO DO EQUIPAMENTO", "DATA PROGRAMACAO PERITAGEM": "DATA PROGRAMACAO PERITAGEM",
-        "CENTRO DE CUSTO": "CENTRO DE CUSTO", "CNPJ": "CNPJ",
-        "CLIENTE MUNICIPIO": "CLIENTE MUNICIPIO", "MUNICIPIO": "MUNICIPIO",
-        "DATA DA CRIACAO DA PROPOSTA": "DATA DA CRIACAO DA PROPOSTA", "DATA DA APROVACAO": "DATA DA APROVACAO",
-        "DATA DA SAIDA": "DATA DA SAIDA", "CHAVETA": "CHAVETA",
-        "CLASSIFICACAO DO EQUIPAMENTO": "CLASSIFICACAO DO EQUIPAMENTO",
-        "CORRENTE ALTA": "CORRENTE ALTA",
-        "DATA PROGRAMACAO DA COLETA": "DATA PROGRAMACAO DA COLETA",
-        "DIMENSOES PARA TRANSPORTE": "DIMENSOES PARA TRANSPORTE",
-        "DATA DE ENVIO ORCAMENTO": "DATA DE ENVIO ORCAMENTO", "Nº CONTRATO": "Nº CONTRATO",
-        "ESCOVAS DE CARVAO": "ESCOVAS DE CARVAO", "FREQUANCIA (HZ)": "FREQUANCIA (HZ)",
-        "IMPEDANCIA": "IMPEDANCIA", "Nº OS DO CLIENTE": "Nº OS DO CLIENTE",
-        "Nº DA PROPOSTA": "Nº DA PROPOSTA", "TAG TIPO EQUIPAMENTO": "TAG TIPO EQUIPAMENTO",
-        "NF CLIENTE": "NF CLIENTE", "HISTORICO DO CLIENTE": "HISTORICO DO CLIENTE",
-        "PESO DA PARTE ATIVA": "PESO DA PARTE ATIVA", "PESO TOTAL": "PESO TOTAL",
-        "POLIA": "POLIA", "POTENCIA KVA": "POTENCIA KVA", "POTENCIA KW": "POTENCIA KW",
-        "TIPO DE ROTOR/ARMADURA": "TIPO DE ROTOR/ARMADURA", "STATUS DA OS": "STATUS DA OS",
-        "TIPO DE SERVICO": "TIPO DE SERVICO", "TENSAO DE BAIXA": "TENSAO DE BAIXA",
-        "OLEO": "OLEO", "TENSAO DO ESTATOR (V)": "TENSAO DO ESTATOR (V)",
-        "VOLUME DO OLEO": "VOLUME DO OLEO",
-        "DATA DE ACOMPANHAMENTO DA PERITAGEM": "DATA DE ACOMPANHAMENTO DA PERITAGEM",
-        "DATA DE AUTORIZACAO DO SERVICO": "DATA DE AUTORIZACAO DO SERVICO",
-        "DATA DE INICIO DA PERITAGEM": "DATA DE INICIO DA PERITAGEM",
-        "TIPO CORRENTE": "TIPO CORRENTE", "OBSERVACAO NO RECEBIMENTO": "OBSERVACAO NO RECEBIMENTO",
-        "TIPO DE OS": "TIPO DE SERVICO",
-        "ACESSORIO DO ROTOR": "ACESSORIO DO ROTOR",
-        "ANEL DO PORTA ESCOVA": "ANEL DO PORTA ESCOVA",
-    }
-
     try:
-        current_os_data = os_template.copy() # Inicia um novo dicionário para esta OS
+        current_os_data = OS_TEMPLATE.copy() # Inicia um novo dicionário para esta OS
 
         # --- 1. Extrair Informações Globais (fora das abas) ---
         print("🔍 Tentando extrair informações globais da OS...")
         try:
             # Localizar um container que provavelmente contém essas informações de cabeçalho.
-            global_info_container_xpath = '//*[@id="root"]/div/div[2]/div[2]/div/div[1]/div[1]'
-            global_info_container = wait.until(EC.presence_of_element_located((By.XPATH, global_info_container_xpath)))
+            global_info_container = wait.until(EC.presence_of_element_located((By.XPATH, GLOBAL_INFO_XPATH)))
 
             global_text = global_info_container.text
 
@@ -486,33 +502,8 @@ def scrape_os_details_data_only(driver, wait):
                                 break
 
                 # Limpeza de caracteres especiais e valores placeholders
-                exact_placeholders = ["*", "***", "SELECIONE", "*DESCRIÇÃ", "SIMCLASSIFICACAO", "ARQUIVAR", "EQUIPAMENTO SEM PLACA IDENTIFICAÇÃO."]
-                partial_placeholders = ["- ITABIRITO", "ITABIRITO"] # Só remove se for parte do valor, não o valor inteiro
-
                 original_value = value
-                cleaned_value = value
-
-                if cleaned_value: # Só tenta limpar se o valor não estiver vazio
-                    # Primeiro, verificar placeholders exatos (valor deve ser exatamente igual)
-                    for ph in exact_placeholders:
-                        if cleaned_value.strip().upper() == ph.upper():
-                            cleaned_value = ""
-                            break
-
-                    # Se ainda tem valor, aplicar limpeza parcial apenas para campos específicos
-                    if cleaned_value and label.upper() not in ["TIPO DO EQUIPAMENTO", "EQUIPAMENTO", "MODELO", "FABRICANTE"]:
-                        for ph in partial_placeholders:
-                            if "DATA" not in label.upper() and "CNPJ" not in label.upper():
-                                cleaned_value = cleaned_value.replace(ph, "").strip()
-
-                    # Limpeza final de espaços múltiplos
-                    if cleaned_value:
-                        cleaned_value = re.sub(r'\s{2,}', ' ', cleaned_value).strip()
-                        # Só remove hifens soltos se não for um campo importante
-                        if label.upper() not in ["TIPO DO EQUIPAMENTO", "EQUIPAMENTO", "MODELO", "FABRICANTE"]:
-                            cleaned_value = re.sub(r'-\s*-', '-', cleaned_value).strip('-').strip()
-
-                value = cleaned_value
+                value = clean_value(label, value)
 
                 # Validação adicional para evitar vazamento de dados entre campos
                 if value and label:
@@ -536,42 +527,7 @@ def scrape_os_details_data_only(driver, wait):
                                         break
 
                 # Mapeamento e preenchimento dos dados
-                json_key = label_to_json_key.get(label)
-                if json_key and value != "": # Só atualiza se o valor não for vazio
-                    # Prioriza dados globais se já existirem e forem válidos, exceto para campos específicos de tab que devem sobrescrever
-                    if json_key in ["CNPJ", "CODIGO DO CLIENTE", "NOME CLIENTE", "CLIENTE"]:
-                        if current_os_data[json_key] == "" or current_os_data[json_key].strip() == value.strip():
-                            current_os_data[json_key] = value
-                        # else: manter o valor global se já preenchido e diferente, para evitar regredir
-                    else:
-                        current_os_data[json_key] = value
-
-                    # Lógica para campos redundantes ou especiais
-                    if label == "OS":
-                        # Remover zeros à esquerda do número da OS
-                        os_numero_limpo = value.lstrip('0') if value and isinstance(value, str) else value
-                        if not os_numero_limpo:  # Se ficou vazio após remover zeros, manter pelo menos um zero
-                            os_numero_limpo = '0'
-                        current_os_data["NÚMERO DA OS"] = os_numero_limpo
-                        # Também atualizar o campo OS com o número limpo
-                        current_os_data["OS"] = os_numero_limpo
-                    elif label == "CLIENTE":
-                        current_os_data["NOME CLIENTE"] = value
-                        current_os_data["CLIENTE"] = value
-                    elif label == "DEPARTAMENTO":
-                        if not current_os_data["CENTRO DE CUSTO"]:
-                            current_os_data["CENTRO DE CUSTO"] = value
-                    elif label == "MUNICIPIO" and current_os_data["CLIENTE MUNICIPIO"] == "":
-                        # Tentar preencher CLIENTE MUNICIPIO com MUNICIPIO se o primeiro estiver vazio
-                        current_os_data["CLIENTE MUNICIPIO"] = value
-
-                    print(f"   ✅ Mapeado '{label}' ('{value}') para '{json_key}'")
-                elif label and value == "": # Se o rótulo foi encontrado mas o valor é vazio (após limpeza)
-                    json_key = label_to_json_key.get(label)
-                    if json_key:
-                        current_os_data[json_key] = "" # Garante que o campo existe mas está vazio
-                        print(f"   ✅ Mapeado '{label}' (vazio) para '{json_key}'")
-                else:
+                if not apply_value(current_os_data, label, value):
                     print(f"   ⚠️ Rótulo '{label}' ('{original_value}') não possui mapeamento direto no JSON de saída ou valor vazio.")
             except Exception as e:
                 print(f"⚠️ Erro ao processar tag <p>: {e}. Texto completo: '{p_element.text}'")
@@ -605,45 +561,46 @@ def execute_scraping(os_number):
 
     driver = None
     wait = None
+    reset_step_timings()
+    start = time.perf_counter()
 
     try:
-        driver = get_driver()
-        wait = WebDriverWait(driver, 30) # Timeout aumentado para detecção de elementos
+        with step("navegador"):
+            driver = get_driver()
+        wait = WebDriverWait(driver, WAIT_TIMEOUT)
 
-        if login(driver, wait, site_url, username, password, os_number):
-            print("Login bem-sucedido e busca realizada. Iniciando o scraping dos detalhes da OS...")
-            scraped_data = scrape_os_details_data_only(driver, wait)
+        if not login(driver, wait, site_url, username, password, os_number):
+            # Único caso de lista vazia: o site confirmou que a OS não existe
+            print(f"❌ OS {os_number} não encontrada")
+            return []
 
-            # Verificar se dados foram coletados
-            if not scraped_data or len(scraped_data) == 0:
-                print(f"❌ Nenhum dado coletado para OS {os_number} - OS pode não existir")
-                return []
+        print("Login bem-sucedido e busca realizada. Iniciando o scraping dos detalhes da OS...")
+        with step("extracao"):
+            scraped_data = scrape_os_details_data_only(driver, wait)
 
-            # Verificar se os dados coletados são válidos
-            valid_data = []
-            for data in scraped_data:
-                if data.get("OS") or data.get("NOME CLIENTE") or data.get("CNPJ"):
-                    valid_data.append(data)
-                else:
-                    print(f"⚠️ Dados inválidos descartados: {data}")
+        # Verificar se os dados coletados são válidos
+        valid_data = []
+        for data in scraped_data:
+            if data.get("OS") or data.get("NOME CLIENTE") or data.get("CNPJ"):
+                valid_data.append(data)
+            else:
+                print(f"⚠️ Dados inválidos descartados: {data}")
 
-            if not valid_data:
-                print(f"❌ Nenhum dado válido encontrado para OS {os_number}")
-                return []
+        # OS encontrada mas sem dados legíveis é falha de extração, não "não encontrada"
+        if not valid_data:
+            raise Exception(f"OS {os_number} encontrada, mas nenhum dado válido foi extraído")
 
-            print(f"✅ {len(valid_data)} registro(s) válido(s) coletado(s) para OS {os_number}")
-            return valid_data
-        else:
-            raise Exception(f"Falha no login ou na busca da OS {os_number}")
+        print(f"✅ {len(valid_data)} registro(s) válido(s) coletado(s) para OS {os_number}")
+        return valid_data
 
     except Exception as e:
         print(f"Ocorreu um erro inesperado no processo principal: {e}")
-        # Não re-raise para permitir tratamento mais suave no backend
-        return []
+        raise
     finally:
         if driver:
             print("Fechando o navegador.")
             driver.quit()
+        print(f"⏱️ OS {os_number}: {time.perf_counter() - start:.2f}s no total - {get_step_timings()}")
 
 if __name__ == "__main__":
     # Para teste direto do script
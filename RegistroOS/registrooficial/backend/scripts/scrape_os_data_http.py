@@ -0,0 +1,245 @@
+"""
+SCRIPT DE SCRAPING VIA HTTP (SEM NAVEGADOR)
+===========================================
+
+O sistema externo é uma SPA React que carrega os detalhes da OS por XHR.
+Este backend faz login com uma sessão HTTP (cookies/token reaproveitados
+entre OS) e lê o JSON da OS diretamente: dezenas de milissegundos por OS em
+vez dos segundos do Chrome.
+
+O resultado é o mesmo dicionário de scrape_os_data.py (OS_TEMPLATE e regras
+de limpeza/mapeamento de os_data_mapping.py).
+
+CONFIGURAÇÃO (.env):
+- SCRAPING_API_URL: base da API (padrão: SITE_URL)
+- SCRAPING_API_LOGIN_PATH: POST {"username", "password"} (padrão: /api/login)
+- SCRAPING_API_SEARCH_PATH: opcional; GET que resolve o número em id ({os_number})
+- SCRAPING_API_OS_PATH: GET dos detalhes ({os_number} ou {id}) (padrão: /api/os/{os_number})
+- SCRAPING_API_FIELD_MAP: JSON {"campoDaApi": "RÓTULO"} para campos cujo nome
+  não corresponde ao rótulo exibido na página
+- SCRAPING_HTTP_TIMEOUT: segundos por requisição (padrão: 10)
+
+Retorna [] quando a OS não existe (404 ou corpo vazio) e levanta
+HttpScrapingError em falhas de rede, login ou formato, para que a task use o
+Selenium como fallback.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from urllib.parse import quote
+
+import requests
+from dotenv import load_dotenv
+
+# Carrega as variáveis de ambiente
+script_dir = os.path.dirname(os.path.abspath(__file__))
+env_path = os.path.join(script_dir, '.env')
+load_dotenv(env_path, override=True)
+
+sys.path.insert(0, script_dir)
+from os_data_mapping import OS_TEMPLATE, LABEL_TO_JSON_KEY, clean_value, apply_value, is_valid_os_data
+
+API_LOGIN_PATH = os.getenv("SCRAPING_API_LOGIN_PATH", "/api/login")
+API_SEARCH_PATH = os.getenv("SCRAPING_API_SEARCH_PATH", "")
+API_OS_PATH = os.getenv("SCRAPING_API_OS_PATH", "/api/os/{os_number}")
+HTTP_TIMEOUT = float(os.getenv("SCRAPING_HTTP_TIMEOUT", "10"))
+
+# Envelopes comuns de APIs JSON ({"data": {...}})
+ENVELOPE_KEYS = ("data", "os", "result", "resultado", "items", "content", "results")
+
+class HttpScrapingError(Exception):
+    """Falha do backend HTTP (rede, login ou formato inesperado)"""
+
+def normalize_label(texto):
+    """Chave comparável: sem acentos, camelCase/snake_case separados, maiúsculas"""
+    sem_acentos = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    sem_acentos = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", sem_acentos)
+    return " ".join(re.findall(r"[A-Z0-9]+", sem_acentos.upper()))
+
+_LABELS = {normalize_label(label): label for label in LABEL_TO_JSON_KEY}
+
+def _load_field_map():
+    try:
+        mapa = json.loads(os.getenv("SCRAPING_API_FIELD_MAP") or "{}")
+    except ValueError:
+        print("⚠️ SCRAPING_API_FIELD_MAP não é um JSON válido, ignorando")
+        mapa = {}
+    return mapa
+
+FIELD_MAP = _load_field_map()
+
+def _unwrap(payload):
+    """Remove envelopes de um único nível ({"data": ...})"""
+    while isinstance(payload, dict) and len(payload) == 1:
+        chave, valor = next(iter(payload.items()))
+        if chave.lower() not in ENVELOPE_KEYS or not isinstance(valor, (dict, list)):
+            break
+        payload = valor
+    return payload
+
+def _flatten(dados):
+    """Pares (chave, valor) das folhas do JSON; listas de {label, value} viram pares"""
+    if isinstance(dados, dict):
+        chaves = {k.lower(): k for k in dados}
+        if "label" in chaves and "value" in chaves:
+            yield dados[chaves["label"]], dados[chaves["value"]]
+            return
+        for chave, valor in dados.items():
+            if isinstance(valor, (dict, list)):
+                yield from _flatten(valor)
+            else:
+                yield chave, valor
+    elif isinstance(dados, list):
+        for item in dados:
+            yield from _flatten(item)
+
+def map_os_json(payload, field_map=None):
+    """Converte o JSON da OS no mesmo dicionário do scraping por navegador"""
+    mapa = {normalize_label(k): v for k, v in (FIELD_MAP if field_map is None else field_map).items()}
+    os_data = OS_TEMPLATE.copy()
+
+    for chave, valor in _flatten(_unwrap(payload)):
+        if valor is None or isinstance(valor, bool):
+            continue
+        normalizada = normalize_label(chave)
+        label = mapa.get(normalizada) or _LABELS.get(normalizada)
+        if not label:
+            continue
+        apply_value(os_data, label, clean_value(label, str(valor).strip()), verbose=False)
+
+    return os_data
+
+class HttpOsClient:
+    """Sessão HTTP logada no sistema externo (cookies e token reaproveitados)"""
+
+    def __init__(self, base_url, username, password, login_path=API_LOGIN_PATH, os_path=API_OS_PATH,
+                 search_path=API_SEARCH_PATH, field_map=None, timeout=HTTP_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.login_path = login_path
+        self.os_path = os_path
+        self.search_path = search_path
+        self.field_map = field_map
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Accept"] = "application/json"
+        self.logged_in = False
+        self.logins = 0
+
+    def login(self):
+        resposta = self.session.post(
+            self.base_url + self.login_path,
+            json={"username": self.username, "password": self.password},
+            timeout=self.timeout
+        )
+        if resposta.status_code >= 400:
+            raise HttpScrapingError(f"Login recusado pelo sistema externo (HTTP {resposta.status_code})")
+
+        # Token no corpo (se houver) além do cookie de sessão
+        try:
+            corpo = _unwrap(resposta.json())
+        except ValueError:
+            corpo = {}
+        if isinstance(corpo, dict):
+            token = corpo.get("token") or corpo.get("access_token") or corpo.get("accessToken")
+            if token:
+                self.session.headers["Authorization"] = f"Bearer {token}"
+
+        self.logged_in = True
+        self.logins += 1
+
+    def _get(self, path):
+        if not self.logged_in:
+            self.login()
+        resposta = self.session.get(self.base_url + path, timeout=self.timeout)
+        if resposta.status_code in (401, 403):
+            # Sessão expirada: novo login e uma única nova tentativa
+            print("🔄 Sessão HTTP expirada, refazendo login...")
+            self.logged_in = False
+            self.session.headers.pop("Authorization", None)
+            self.session.cookies.clear()
+            self.login()
+            resposta = self.session.get(self.base_url + path, timeout=self.timeout)
+            if resposta.status_code in (401, 403):
+                raise HttpScrapingError(f"Acesso negado após novo login (HTTP {resposta.status_code})")
+        return resposta
+
+    @staticmethod
+    def _json(resposta):
+        if resposta.status_code >= 400:
+            raise HttpScrapingError(f"HTTP {resposta.status_code} em {resposta.url}")
+        try:
+            return _unwrap(resposta.json())
+        except ValueError:
+            raise HttpScrapingError(f"Resposta não é JSON em {resposta.url}")
+
+    def fetch_os(self, os_number):
+        """JSON da OS, ou None se ela não existe"""
+        identificador = os_number
+        if self.search_path:
+            resposta = self._get(self.search_path.format(os_number=quote(os_number)))
+            if resposta.status_code == 404:
+                return None
+            resultados = self._json(resposta)
+            if isinstance(resultados, dict):
+                resultados = [resultados]
+            if not resultados:
+                return None
+            identificador = resultados[0].get("id", os_number)
+
+        resposta = self._get(self.os_path.format(os_number=quote(os_number), id=quote(str(identificador))))
+        if resposta.status_code == 404:
+            return None
+        return self._json(resposta) or None
+
+    def scrape(self, os_number):
+        """Mesmo formato de execute_scraping: lista com o dicionário da OS ([] se não existe)"""
+        payload = self.fetch_os(os_number)
+        if payload is None:
+            return []
+
+        os_data = map_os_json(payload, self.field_map)
+        if not is_valid_os_data(os_data):
+            raise HttpScrapingError("JSON da OS sem campos reconhecidos (verificar SCRAPING_API_FIELD_MAP)")
+        return [os_data]
+
+# Um cliente por thread (requests.Session não deve ser compartilhada entre threads)
+_clients = threading.local()
+
+def get_http_client():
+    client = getattr(_clients, "client", None)
+    if client is None:
+        base_url = os.getenv("SCRAPING_API_URL") or os.getenv("SITE_URL")
+        username = os.getenv("USERNAME")
+        password = os.getenv("PASSWORD")
+        if not all([base_url, username, password]):
+            raise HttpScrapingError("Variáveis de ambiente não configuradas")
+        client = HttpOsClient(base_url, username, password)
+        _clients.client = client
+    return client
+
+def execute_scraping_http(os_number):
+    """Função principal do backend HTTP"""
+    if not os_number or not os_number.strip():
+        raise Exception("Número da OS é obrigatório")
+
+    start = time.perf_counter()
+    try:
+        result = get_http_client().scrape(os_number.strip())
+    except requests.RequestException as e:
+        raise HttpScrapingError(f"Falha de rede no backend HTTP: {e}") from e
+
+    print(f"⚡ OS {os_number} via HTTP em {(time.perf_counter() - start) * 1000:.0f} ms ({len(result)} registro(s))")
+    return result
+
+if __name__ == "__main__":
+    # Para teste direto do script
+    os_number = sys.argv[1] if len(sys.argv) > 1 else "12345"
+    result = execute_scraping_http(os_number)
+    print(f"Resultado: {result}")
@@ -8,8 +8,10 @@ Versão otimizada do scraping original com melhorias de performance:
 - Timeouts otimizados
 - Rate limiting inteligente
 - Retry com backoff exponencial
+- Pool de navegadores logados por processo worker (BrowserPool)
 
 NÃO ALTERA O SCRIPT ORIGINAL - É UMA VERSÃO PARALELA
+(a extração completa dos detalhes é reaproveitada de scrape_os_data.py)
 """
 
 import time
@@ -27,18 +29,41 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from dotenv import load_dotenv
 import threading
+import queue
+import atexit
+from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor
 import hashlib
 from datetime import datetime, timedelta
 
+# psutil é opcional: sem ele o limite de memória por navegador não é aplicado
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 # Carrega as variáveis de ambiente
 script_dir = os.path.dirname(os.path.abspath(__file__))
 env_path = os.path.join(script_dir, '.env')
 load_dotenv(env_path, override=True)
 
-# Cache global para sessões
-_session_cache = {}
-_cache_lock = threading.Lock()
+# Extração completa dos detalhes (mesmos campos do script original)
+sys.path.insert(0, script_dir)
+import scrape_os_data as scraping_original
+
+# Configuração do pool (por processo worker). No prefork do Celery cada
+# processo executa uma task por vez: N navegadores = worker_concurrency.
+# Com "-P threads", usar SCRAPING_POOL_SIZE = concurrency. O scraping em lote
+# amplia o pool do processo para SCRAPING_BATCH_CONCURRENCY (BrowserPool.grow).
+POOL_SIZE = int(os.getenv("SCRAPING_POOL_SIZE", "1"))
+MAX_USES_PER_BROWSER = int(os.getenv("SCRAPING_MAX_USES", "50"))
+MAX_MEMORY_MB = int(os.getenv("SCRAPING_MAX_MEMORY_MB", "1024"))
+MAX_IDLE_MINUTES = int(os.getenv("SCRAPING_MAX_IDLE_MINUTES", "30"))
+ACQUIRE_TIMEOUT = int(os.getenv("SCRAPING_POOL_TIMEOUT", "300"))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
 
 class OptimizedScrapingSession:
     """Classe para gerenciar sessões de scraping otimizadas"""
@@ -95,7 +120,7 @@ class OptimizedScrapingSession:
         
         print(f"🚀 Iniciando Chrome otimizado para sessão {self.session_id}...")
         self.driver = webdriver.Chrome(options=chrome_options)
-        self.wait = WebDriverWait(self.driver, 15)  # Timeout reduzido de 30 para 15
+        self.wait = WebDriverWait(self.driver, scraping_original.WAIT_TIMEOUT)  # SCRAPING_WAIT_TIMEOUT
         
         return self.driver
     
@@ -107,25 +132,11 @@ class OptimizedScrapingSession:
             
         try:
             driver = self.get_optimized_driver()
-            
-            driver.get(url)
             print(f"🔐 Fazendo login na sessão {self.session_id}...")
-            
-            # Login com timeouts reduzidos
-            user_field = self.wait.until(EC.presence_of_element_located((By.ID, "login_username")))
-            user_field.clear()
-            user_field.send_keys(username)
-            
-            pass_field = self.wait.until(EC.presence_of_element_located((By.ID, "login_password")))
-            pass_field.clear()
-            pass_field.send_keys(password)
-            
-            login_button = self.wait.until(EC.element_to_be_clickable((By.XPATH, "//button[.//span[contains(text(), 'Entrar')]] | //button[@type='submit']")))
-            login_button.click()
-            
-            # Aguardar carregamento com timeout reduzido
-            time.sleep(2)  # Reduzido de 3 para 2
-            
+
+            # Aguarda o formulário sumir e o menu ficar disponível (sem pausa fixa)
+            scraping_original.submit_login(driver, self.wait, url, username, password)
+
             self.is_logged_in = True
             self.last_used = datetime.now()
             print(f"✅ Login realizado com sucesso na sessão {self.session_id}")
@@ -136,56 +147,33 @@ class OptimizedScrapingSession:
             return False
     
     def scrape_os_optimized(self, os_number):
-        """Scraping otimizado de uma OS específica"""
-        try:
-            if not self.is_logged_in:
-                print(f"❌ Sessão {self.session_id} não está logada")
-                return []
-            
-            driver = self.driver
-            wait = self.wait
-            
-            print(f"🔍 Processando OS {os_number} na sessão {self.session_id}")
-            
-            # Navegar para a página de busca (otimizado)
-            target_xpath = '//*[@id="root"]/div/div[1]/div/div/div/div[2]/div'
-            try:
-                target_element = wait.until(EC.element_to_be_clickable((By.XPATH, target_xpath)))
-                driver.execute_script("arguments[0].click();", target_element)  # JS click mais rápido
-                time.sleep(1)  # Reduzido de 3 para 1
-            except TimeoutException:
-                print(f"⚠️ Elemento de navegação não encontrado para OS {os_number}")
-                return []
-            
-            # Buscar OS com timeout otimizado
-            input_xpath = '//*[@id="root"]/div/div[2]/div[2]/div/div/div[2]/div[1]/div[1]/span/span/input'
-            try:
-                input_field = wait.until(EC.element_to_be_clickable((By.XPATH, input_xpath)))
-                input_field.clear()
-                input_field.send_keys(os_number)
-                input_field.send_keys(Keys.ENTER)
-                
-                time.sleep(3)  # Reduzido de 5 para 3
-                
-                # Verificar se OS foi encontrada
-                if self.check_os_not_found_optimized():
-                    print(f"❌ OS {os_number} não encontrada")
-                    return []
-                
-                # Extrair dados com timeout otimizado
-                scraped_data = self.scrape_os_details_optimized()
-                self.last_used = datetime.now()
-                
-                return scraped_data
-                
-            except TimeoutException:
-                print(f"❌ Timeout ao buscar OS {os_number}")
-                return []
-                
-        except Exception as e:
-            print(f"❌ Erro ao processar OS {os_number}: {e}")
+        """Scraping otimizado de uma OS específica ([] só se a OS não existe)"""
+        if not self.is_logged_in:
+            raise Exception(f"Sessão {self.session_id} não está logada")
+
+        driver = self.driver
+        wait = self.wait
+
+        print(f"🔍 Processando OS {os_number} na sessão {self.session_id}")
+
+        # Navegar para a página de busca (aguarda o campo de busca)
+        if not scraping_original.click_post_login_element(driver, wait):
+            raise Exception(f"Elemento de navegação não encontrado para OS {os_number}")
+
+        # Buscar OS: aguarda resultado anterior sair, rede ociosa e resultado/"não encontrada"
+        # (timeout ou erro sobem como exceção)
+        if not scraping_original.enter_search_value(driver, wait, os_number):
+            print(f"❌ OS {os_number} não encontrada")
             return []
-    
+
+        # Extrair dados com timeout otimizado
+        scraped_data = self.scrape_os_details_optimized()
+        self.last_used = datetime.now()
+
+        if not scraped_data:
+            raise Exception(f"OS {os_number} encontrada, mas nenhum dado foi extraído")
+        return scraped_data
+
     def check_os_not_found_optimized(self):
         """Verificação otimizada se OS não foi encontrada"""
         try:
@@ -211,11 +199,11 @@ class OptimizedScrapingSession:
     def scrape_os_details_optimized(self):
         """Extração otimizada dos detalhes da OS"""
         # Implementação simplificada do scraping original
-        # Mantém a mesma lógica mas com timeouts reduzidos
+        # Mantém a mesma lógica e os timeouts configurados do original
         try:
-            # Aguardar container de detalhes com timeout reduzido
+            # Aguardar container de detalhes (mesmo limite do resultado da busca no original)
             details_xpath = '//div[contains(@class, "ant-card-body")]'
-            details_container = WebDriverWait(self.driver, 10).until(
+            details_container = WebDriverWait(self.driver, scraping_original.NOT_FOUND_TIMEOUT).until(
                 EC.presence_of_element_located((By.XPATH, details_xpath))
             )
             
@@ -264,70 +252,241 @@ class OptimizedScrapingSession:
         self.wait = None
         self.is_logged_in = False
 
-def get_cached_session(session_key=None):
-    """Obter sessão do cache ou criar nova"""
-    with _cache_lock:
-        session_key = session_key or "default"
-        
-        # Verificar se existe sessão válida no cache
-        if session_key in _session_cache:
-            session = _session_cache[session_key]
-            # Verificar se sessão não expirou (30 minutos)
-            if datetime.now() - session.last_used < timedelta(minutes=30):
-                return session
-            else:
-                # Sessão expirada, fechar e remover
-                session.close()
-                del _session_cache[session_key]
-        
-        # Criar nova sessão
-        session = OptimizedScrapingSession(session_key)
-        _session_cache[session_key] = session
+# =============================================================================
+# POOL DE NAVEGADORES
+# =============================================================================
+
+class PooledScrapingSession(OptimizedScrapingSession):
+    """Sessão do pool: conta usos e sabe quando precisa ser reciclada"""
+
+    def __init__(self, session_id=None):
+        super().__init__(session_id)
+        self.uses = 0
+
+    def is_healthy(self):
+        """Navegador ainda responde (não travou nem foi encerrado)"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.execute_script("return document.readyState")
+            return True
+        except Exception:
+            return False
+
+    def session_expired(self):
+        """Formulário de login visível = sessão do site expirou"""
+        try:
+            campos = self.driver.find_elements(By.ID, "login_username")
+            return any(campo.is_displayed() for campo in campos)
+        except Exception:
+            return True
+
+    def memory_mb(self):
+        """Memória (RSS) do chromedriver e dos processos do Chrome; None sem psutil"""
+        if psutil is None or not self.driver:
+            return None
+        try:
+            processo = psutil.Process(self.driver.service.process.pid)
+            processos = [processo] + processo.children(recursive=True)
+            return sum(p.memory_info().rss for p in processos) / (1024 * 1024)
+        except Exception:
+            return None
+
+    def recycle_reason(self):
+        """Motivo para descartar o navegador antes do próximo uso (ou None)"""
+        if not self.driver:
+            return None
+        if self.uses >= MAX_USES_PER_BROWSER:
+            return f"{self.uses} usos"
+        if datetime.now() - self.last_used > timedelta(minutes=MAX_IDLE_MINUTES):
+            return "ocioso"
+        memoria = self.memory_mb()
+        if memoria is not None and memoria > MAX_MEMORY_MB:
+            return f"memória {memoria:.0f} MB"
+        if not self.is_healthy():
+            return "sem resposta"
+        return None
+
+    def close(self):
+        super().close()
+        self.uses = 0
+
+    def ensure_logged_in(self, url, username, password):
+        """Faz login na primeira vez e de novo quando a sessão do site expira"""
+        if self.is_logged_in and not self.session_expired():
+            return True
+        if self.is_logged_in:
+            print(f"🔄 Sessão {self.session_id} expirada no site, refazendo login...")
+            self.is_logged_in = False
+        return self.login_optimized(url, username, password)
+
+    def scrape_os(self, os_number):
+        """Uma busca + uma extração na sessão já logada"""
+        scraping_original.reset_step_timings()
+        start = time.perf_counter()
+        self.uses += 1
+        self.last_used = datetime.now()
+
+        try:
+            # Volta à lista de OS pelo menu lateral (página desconhecida = navegador descartado)
+            if not scraping_original.click_post_login_element(self.driver, self.wait):
+                raise Exception("Página de busca de OS indisponível")
+
+            if not scraping_original.enter_search_value(self.driver, self.wait, os_number):
+                print(f"❌ OS {os_number} não encontrada")
+                return []
+
+            with scraping_original.step("extracao"):
+                scraped_data = scraping_original.scrape_os_details_data_only(self.driver, self.wait)
+            valid_data = [d for d in scraped_data if d.get("OS") or d.get("NOME CLIENTE") or d.get("CNPJ")]
+
+            # OS encontrada mas sem dados legíveis é falha de extração, não "não encontrada"
+            if not valid_data:
+                raise Exception(f"OS {os_number} encontrada, mas nenhum dado válido foi extraído")
+            return valid_data
+        finally:
+            print(f"⏱️ OS {os_number} ({self.session_id}): {time.perf_counter() - start:.2f}s - {scraping_original.get_step_timings()}")
+
+class BrowserPool:
+    """
+    Até `size` navegadores headless logados, reaproveitados pelas tasks do
+    mesmo processo. Cada navegador é reciclado ao atingir MAX_USES_PER_BROWSER,
+    MAX_MEMORY_MB ou MAX_IDLE_MINUTES, ou quando deixa de responder.
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = max(1, size)
+        self._free = queue.LifoQueue()  # LIFO: o navegador usado por último segue "quente"
+        self._sessions = []
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "recycled": 0, "discarded": 0, "uses": 0}
+
+    def grow(self, size):
+        """Permite até `size` navegadores (lotes paralelos); nunca reduz o pool"""
+        with self._lock:
+            self.size = max(self.size, size)
+        return self.size
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT):
+        """Sessão livre (criando até `size`); aguarda até `timeout` segundos"""
+        try:
+            session = self._free.get_nowait()
+        except queue.Empty:
+            session = None
+            with self._lock:
+                if len(self._sessions) < self.size:
+                    session = PooledScrapingSession(f"pool_{os.getpid()}_{len(self._sessions) + 1}")
+                    self._sessions.append(session)
+                    self.stats["created"] += 1
+            if session is None:
+                try:
+                    session = self._free.get(timeout=timeout)
+                except queue.Empty:
+                    raise Exception(f"Nenhum navegador livre no pool após {timeout}s")
+
+        reason = session.recycle_reason()
+        if reason:
+            print(f"♻️ Reciclando navegador {session.session_id}: {reason}")
+            session.close()
+            self.stats["recycled"] += 1
+        self.stats["uses"] += 1
         return session
 
-def execute_scraping_optimized(os_number, session_key=None):
-    """Função principal otimizada para scraping"""
+    def release(self, session, discard=False):
+        """Devolve a sessão ao pool; com discard o navegador é fechado (relançado no próximo uso)"""
+        if discard:
+            session.close()
+            self.stats["discarded"] += 1
+        self._free.put(session)
+
+    @contextmanager
+    def session(self, timeout=ACQUIRE_TIMEOUT):
+        session = self.acquire(timeout)
+        discard = False
+        try:
+            yield session
+        except Exception:
+            # Estado da página desconhecido após erro: não reaproveitar este navegador
+            discard = True
+            raise
+        finally:
+            self.release(session, discard)
+
+    def close_idle(self):
+        """Fecha navegadores livres ociosos há mais de MAX_IDLE_MINUTES"""
+        free = []
+        while True:
+            try:
+                free.append(self._free.get_nowait())
+            except queue.Empty:
+                break
+
+        closed = 0
+        for session in free:
+            if session.driver and datetime.now() - session.last_used > timedelta(minutes=MAX_IDLE_MINUTES):
+                session.close()
+                closed += 1
+        # Reinserir na ordem original (LIFO mantém o mais recente no topo)
+        for session in free:
+            self._free.put(session)
+        return closed
+
+    def close_all(self):
+        for session in self._sessions:
+            session.close()
+
+    def status(self):
+        return {
+            **self.stats,
+            "size": self.size,
+            "open_browsers": sum(1 for s in self._sessions if s.driver),
+            "free": self._free.qsize(),
+        }
+
+def get_browser_pool():
+    """Pool do processo atual (workers prefork do Celery não herdam navegadores do pai)"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = BrowserPool()
+            _pool_pid = os.getpid()
+            atexit.register(_pool.close_all)
+        return _pool
+
+def execute_scraping_pooled(os_number):
+    """Scraping de uma OS usando um navegador logado do pool"""
     site_url = os.getenv("SITE_URL")
     username = os.getenv("USERNAME")
     password = os.getenv("PASSWORD")
-    
+
     if not all([site_url, username, password]):
         raise Exception("Variáveis de ambiente não configuradas")
-    
+
     if not os_number or not os_number.strip():
         raise Exception("Número da OS é obrigatório")
-    
+
     try:
-        # Obter sessão do cache
-        session = get_cached_session(session_key)
-        
-        # Fazer login se necessário
-        if not session.login_optimized(site_url, username, password):
-            raise Exception("Falha no login")
-        
-        # Executar scraping
-        result = session.scrape_os_optimized(os_number)
-        
-        return result
-        
+        with get_browser_pool().session() as session:
+            if not session.ensure_logged_in(site_url, username, password):
+                raise Exception("Falha no login")
+            return session.scrape_os(os_number)
+
     except Exception as e:
-        print(f"❌ Erro no scraping otimizado: {e}")
-        return []
+        # Lista vazia significa apenas "OS não encontrada"; qualquer outra falha sobe
+        print(f"❌ Erro no scraping com pool: {e}")
+        raise
+
+def execute_scraping_optimized(os_number, session_key=None):
+    """Compatibilidade: o cache por chave de sessão foi substituído pelo pool"""
+    _ = session_key  # Silenciar warning
+    return execute_scraping_pooled(os_number)
 
 def cleanup_expired_sessions():
-    """Limpar sessões expiradas do cache"""
-    with _cache_lock:
-        expired_keys = []
-        for key, session in _session_cache.items():
-            if datetime.now() - session.last_used > timedelta(minutes=30):
-                session.close()
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del _session_cache[key]
-        
-        if expired_keys:
-            print(f"🧹 Limpas {len(expired_keys)} sessões expiradas")
+    """Fechar navegadores ociosos do pool deste processo"""
+    closed = get_browser_pool().close_idle()
+    if closed:
+        print(f"🧹 Fechados {closed} navegadores ociosos")
+    return closed
 
 if __name__ == "__main__":
     # Para teste direto do script otimizado
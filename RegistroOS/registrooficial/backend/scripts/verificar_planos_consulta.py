@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+VERIFICAR PLANOS DE CONSULTA - RegistroOS
+=========================================
+
+Chama as rotas de leitura mais usadas contra o banco configurado
+(DATABASE_URL), captura os SELECTs executados e reprova (exit code 1) os
+que fazem varredura completa em tabelas com mais linhas que o limite.
+
+USO:
+    python scripts/verificar_planos_consulta.py
+    python scripts/verificar_planos_consulta.py --limite 5000
+    python scripts/verificar_planos_consulta.py --rota /api/desenvolvimento/pendencias
+"""
+
+import sys
+import os
+import argparse
+
+# Adicionar o diretório backend ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O cache de respostas esconderia as consultas das rotas
+os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+
+ROTAS_PADRAO = [
+    "/api/desenvolvimento/pendencias",
+    "/api/desenvolvimento/pendencias?status=ABERTA",
+    "/api/desenvolvimento/os/apontamentos/meus",
+    "/api/apontamentos-detalhados",
+    "/api/os/",
+    "/api/gestao/dashboard",
+    "/api/gestao/metricas-gerais",
+    "/api/pcp/dashboard/avancado",
+    "/api/pcp/pendencias/dashboard",
+    "/api/estrutura-hierarquica",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica varreduras completas nos planos das rotas")
+    parser.add_argument("--limite", type=int, default=1000, help="Linhas a partir das quais um SCAN completo reprova")
+    parser.add_argument("--rota", action="append", help="Rota GET a verificar (pode repetir)")
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    from main import app
+    from config.database_config import engine, SessionLocal
+    from app.database_models import Usuario
+    from app.dependencies import get_current_user
+    from app.utils.query_plan_checker import capturar_consultas, verificar_consultas
+
+    print("🔎 VERIFICAÇÃO DE PLANOS DE CONSULTA")
+    print("=" * 50)
+
+    db = SessionLocal()
+    usuario = db.query(Usuario).filter(Usuario.privilege_level == "ADMIN").first() or db.query(Usuario).first()
+    if usuario is None:
+        print("❌ Nenhum usuário no banco para executar as rotas")
+        return 1
+    app.dependency_overrides[get_current_user] = lambda: usuario
+
+    cliente = TestClient(app)
+    with capturar_consultas(engine) as consultas:
+        for rota in args.rota or ROTAS_PADRAO:
+            resposta = cliente.get(rota)
+            print(f"   {resposta.status_code} GET {rota}")
+
+    violacoes = verificar_consultas(engine, consultas, args.limite)
+    db.close()
+
+    print(f"\n📊 {len(consultas)} consultas capturadas")
+    if not violacoes:
+        print(f"✅ Nenhuma varredura completa em tabelas com mais de {args.limite} linhas")
+        return 0
+
+    for violacao in violacoes:
+        print(f"❌ {violacao}")
+        for linha in violacao.plano:
+            print(f"      {linha}")
+    return 1
+
+if __name__ == "__main__":
+    exit(main())
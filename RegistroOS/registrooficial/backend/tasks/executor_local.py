@@ -0,0 +1,459 @@
+"""
+EXECUTOR LOCAL DE TASKS (SEM CELERY/REDIS)
+==========================================
+
+Substitui o Celery em instalações de um único servidor: as mesmas tasks de
+tasks/scraping_tasks.py ganham apply_async() e são executadas fora do event
+loop da API, que continua respondendo durante scrapings de vários segundos.
+
+- Fila asyncio com prioridade (0 é a mais alta, como no broker Redis:
+  consultas interativas antes de revalidações e lotes)
+- Pool limitado de processos (SCRAPING_LOCAL_WORKERS); cada processo mantém
+  o seu pool de navegadores entre as tasks
+- Processos reservados às consultas interativas: lotes e revalidações
+  (prioridade abaixo da interativa) ocupam no máximo os demais processos e,
+  com eles ocupados, aguardam fora do pool até um terminar
+- A fila de scraping (vez no site, consumo e reservas dos lotes) e o single
+  flight (travas e cache negativo) continuam no processo da API: os processos
+  do pool os consultam por um gerenciador de multiprocessing, então slots,
+  round-robin e "OS não encontrada" valem para todos eles
+- Estado, progresso (update_state) e resultado persistidos no SQLite
+  (tabela scraping_jobs): ResultadoLocal tem a mesma interface usada de
+  AsyncResult em /scraping-status/{task_id}
+- self.retry() da task reagenda o job após o countdown
+- Jobs não concluídos são retomados quando a API reinicia
+
+CONFIGURAÇÃO (variáveis de ambiente):
+- SCRAPING_LOCAL_EXECUTOR: 1 (padrão) usa o executor quando o Celery não
+  está instalado ou o broker está inacessível; 0 mantém as chamadas síncronas
+- SCRAPING_LOCAL_WORKERS: processos simultâneos (padrão 2)
+- SCRAPING_LOCAL_WORKERS_INTERATIVOS: processos reservados às consultas
+  interativas (padrão 1; com um único processo não há reserva)
+- SCRAPING_LOCAL_RETENCAO: segundos que jobs concluídos ficam na tabela (padrão 86400)
+
+USO:
+    @tarefa_local(bind=True)            # feito pelo MockApp de scraping_tasks
+    def scrape_os_task(self, numero_os, user_id): ...
+
+    scrape_os_task.apply_async(args=["12345", 1], task_id="...", priority=0)
+    ResultadoLocal(task_id).state        # PENDING, STARTED, PROGRESS, SUCCESS...
+"""
+
+import asyncio
+import heapq
+import importlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from multiprocessing.managers import BaseManager
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from config.database_config import DATABASE_URL, SessionLocal, create_configured_engine
+from config.scraping_config import celery_utilizavel
+from app.database_models import JobScraping
+from app.utils.fila_scraping import PRIORIDADE_INTERATIVA
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_LOCAL_CONFIG = {
+    "habilitado": os.getenv("SCRAPING_LOCAL_EXECUTOR", "1") != "0",
+    "workers": max(1, int(os.getenv("SCRAPING_LOCAL_WORKERS", "2"))),
+    "workers_interativos": max(0, int(os.getenv("SCRAPING_LOCAL_WORKERS_INTERATIVOS", "1"))),
+    "retencao": int(os.getenv("SCRAPING_LOCAL_RETENCAO", "86400")),
+    "database_url": DATABASE_URL,
+    "prioridade_padrao": 5,
+}
+
+ESTADOS_FINAIS = ("SUCCESS", "FAILURE")
+
+# =============================================================================
+# ESTADO DOS JOBS (SQLite) - usado pela API e pelos processos do pool
+# =============================================================================
+
+_sessoes: Dict[str, sessionmaker] = {}
+_sessoes_lock = threading.Lock()
+
+def _sessao(database_url: Optional[str] = None):
+    """Sessão do banco dos jobs (o mesmo da API por padrão)"""
+    url = database_url or DATABASE_URL
+    if url == DATABASE_URL:
+        return SessionLocal()
+    with _sessoes_lock:
+        if url not in _sessoes:
+            _sessoes[url] = sessionmaker(bind=create_configured_engine(url), autoflush=False)
+        return _sessoes[url]()
+
+def _json(valor: Any) -> Optional[str]:
+    return None if valor is None else json.dumps(valor, ensure_ascii=False, default=str)
+
+def criar_job(job_id: str, modulo: str, nome: str, args: List[Any], kwargs: Dict[str, Any],
+              prioridade: int, database_url: Optional[str] = None) -> None:
+    db = _sessao(database_url)
+    try:
+        db.merge(JobScraping(
+            id=job_id, modulo=modulo, nome=nome, args=_json(list(args)), kwargs=_json(kwargs),
+            prioridade=prioridade, estado="PENDING", tentativas=0, criado_em=datetime.now()
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+def atualizar_job(job_id: str, database_url: Optional[str] = None, **campos) -> None:
+    """Atualiza colunas do job; info e resultado são serializados em JSON"""
+    for campo in ("info", "resultado"):
+        if campo in campos:
+            campos[campo] = _json(campos[campo])
+    db = _sessao(database_url)
+    try:
+        db.query(JobScraping).filter(JobScraping.id == job_id).update(campos, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def obter_job(job_id: str, database_url: Optional[str] = None) -> Optional[JobScraping]:
+    db = _sessao(database_url)
+    try:
+        return db.query(JobScraping).filter(JobScraping.id == job_id).first()
+    finally:
+        db.close()
+
+class ResultadoLocal:
+    """Mesma interface de celery.result.AsyncResult usada pelas rotas (id, state, info, result)"""
+
+    def __init__(self, task_id: str, database_url: Optional[str] = None):
+        self.id = self.task_id = task_id
+        job = obter_job(task_id, database_url)
+        # Como no Celery, um task_id desconhecido aparece como PENDING
+        self.state = job.estado if job else "PENDING"
+        self.result = json.loads(job.resultado) if job and job.resultado else None
+        info = json.loads(job.info) if job and job.info else None
+        self.info = self.result if self.state == "SUCCESS" else (info if info is not None else {})
+
+    def ready(self) -> bool:
+        return self.state in ESTADOS_FINAIS
+
+# =============================================================================
+# TASKS (equivalente local do decorador @app.task)
+# =============================================================================
+
+class RetryLocal(Exception):
+    """Levantada por self.retry() dentro da task: o executor reagenda o job"""
+
+    def __init__(self, countdown: float, mensagem: str = ""):
+        super().__init__(countdown, mensagem)
+        self.countdown = countdown
+        self.mensagem = mensagem
+
+class _Requisicao:
+    def __init__(self, job_id: Optional[str], tentativas: int):
+        self.id = job_id
+        self.retries = tentativas
+
+class ContextoLocal:
+    """O `self` das tasks com bind=True: request.id, request.retries, update_state e retry"""
+
+    def __init__(self, job_id: Optional[str] = None, tentativas: int = 0, database_url: Optional[str] = None):
+        self.request = _Requisicao(job_id, tentativas)
+        self._database_url = database_url
+
+    def update_state(self, state: str = None, meta: Dict[str, Any] = None, **kwargs) -> None:
+        _ = kwargs  # Silenciar warning
+        if self.request.id:
+            atualizar_job(self.request.id, self._database_url, estado=state or "PROGRESS", info=meta)
+
+    def retry(self, countdown: float = None, exc: Exception = None, **kwargs) -> RetryLocal:
+        _ = kwargs  # Silenciar warning
+        return RetryLocal(countdown or 0, str(exc) if exc else "")
+
+class TarefaLocal:
+    """Função de task com apply_async/delay pelo executor local; chamada direta continua síncrona"""
+
+    def __init__(self, func: Callable, bind: bool = False):
+        self.func = func
+        self.bind = bind
+        self.name = func.__name__
+        self.__name__ = func.__name__
+        self.__doc__ = func.__doc__
+        self.__module__ = func.__module__
+
+    def __call__(self, *args, **kwargs):
+        if self.bind:
+            return self.func(ContextoLocal(), *args, **kwargs)
+        return self.func(*args, **kwargs)
+
+    def executar(self, job_id: str, args: List[Any], kwargs: Dict[str, Any], tentativas: int,
+                 database_url: Optional[str] = None) -> Any:
+        """Execução de um job (nos processos do pool)"""
+        if self.bind:
+            return self.func(ContextoLocal(job_id, tentativas, database_url), *args, **kwargs)
+        return self.func(*args, **kwargs)
+
+    def apply_async(self, args=None, kwargs=None, task_id: str = None, priority: int = None, **opcoes) -> ResultadoLocal:
+        _ = opcoes  # Silenciar warning
+        return executor_local.enviar(self, args or [], kwargs or {}, task_id, priority)
+
+    def delay(self, *args, **kwargs) -> ResultadoLocal:
+        return self.apply_async(args=list(args), kwargs=kwargs)
+
+def tarefa_local(func: Callable = None, *, bind: bool = False):
+    """Decorador: @tarefa_local ou @tarefa_local(bind=True)"""
+    if func is not None:
+        return TarefaLocal(func, bind)
+    return lambda f: TarefaLocal(f, bind)
+
+# =============================================================================
+# FILA DE SCRAPING E SINGLE FLIGHT DA API (compartilhados com os processos do pool)
+# =============================================================================
+
+def _fila_da_api():
+    from app.utils.fila_scraping import fila_scraping
+    return fila_scraping
+
+def _single_flight_da_api():
+    from app.utils.single_flight import single_flight
+    return single_flight
+
+class _GerenciadorFila(BaseManager):
+    """Servidor no processo da API; os processos do pool recebem proxies da fila e do single flight"""
+
+_GerenciadorFila.register("fila", callable=_fila_da_api)
+_GerenciadorFila.register("single_flight", callable=_single_flight_da_api)
+
+_gerenciador_do_processo: Optional[_GerenciadorFila] = None
+
+def _servir_fila(servidor) -> None:
+    try:
+        servidor.serve_forever()
+    except SystemExit:
+        pass  # serve_forever termina com sys.exit quando o executor é encerrado
+
+def _iniciar_processo(endereco, chave: bytes) -> None:
+    """
+    Initializer dos processos do pool: vez, reservas, travas e cache negativo
+    pela fila e pelo single flight do processo da API
+    """
+    global _gerenciador_do_processo
+    _gerenciador_do_processo = _GerenciadorFila(address=endereco, authkey=chave)
+    _gerenciador_do_processo.connect()
+    _fila_da_api().usar_fila_da_api(_gerenciador_do_processo.fila())
+    _single_flight_da_api().usar_single_flight_da_api(_gerenciador_do_processo.single_flight())
+
+def _executar_job(modulo: str, nome: str, job_id: str, args: List[Any], kwargs: Dict[str, Any],
+                  tentativas: int, database_url: str) -> Any:
+    """Ponto de entrada nos processos do pool: importa a task pelo nome e executa"""
+    tarefa = getattr(importlib.import_module(modulo), nome)
+    return tarefa.executar(job_id, args, kwargs, tentativas, database_url)
+
+# =============================================================================
+# EXECUTOR (fila asyncio + pool de processos)
+# =============================================================================
+
+class ExecutorLocal:
+    """Fila com prioridade no event loop da API e execução em pool limitado de processos"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = dict(EXECUTOR_LOCAL_CONFIG, **(config or {}))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fila: Optional[asyncio.PriorityQueue] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._servidor_fila = None
+        self._chave_fila = os.urandom(16)
+        self._consumidores: List[asyncio.Task] = []
+        self._sequencia = itertools.count()
+        self._adiados: List[tuple] = []  # Lotes aguardando um processo livre para lotes (heap)
+        self.lotes_em_execucao = 0
+        self._ao_terminar: List[Callable[[str, str, List[Any]], None]] = []
+        self.em_execucao = 0
+        self.concluidos = 0
+        self.falhas = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self._loop is not None
+
+    def ao_terminar(self, callback: Callable[[str, str, List[Any]], None]) -> None:
+        """callback(task_id, nome_da_task, args) no processo da API quando um job termina"""
+        self._ao_terminar.append(callback)
+
+    def _novo_pool(self) -> ProcessPoolExecutor:
+        # spawn: processos limpos (sem threads/conexões herdadas do servidor)
+        return ProcessPoolExecutor(
+            max_workers=self.config["workers"], mp_context=multiprocessing.get_context("spawn"),
+            initializer=_iniciar_processo, initargs=(self._servidor_fila.address, self._chave_fila)
+        )
+
+    def _limite_lotes(self) -> int:
+        """Processos que lotes e revalidações podem ocupar (ao menos um, para o lote sempre andar)"""
+        return max(1, self.config["workers"] - self.config["workers_interativos"])
+
+    def _iniciar_servidor_fila(self) -> None:
+        """Expõe a fila de scraping da API aos processos do pool (localhost, chave aleatória)"""
+        self._servidor_fila = _GerenciadorFila(address=("127.0.0.1", 0), authkey=self._chave_fila).get_server()
+        threading.Thread(target=_servir_fila, args=(self._servidor_fila,), name="fila_scraping_api", daemon=True).start()
+
+    def iniciar(self) -> None:
+        """Inicia no event loop atual (startup da API) e retoma jobs não concluídos"""
+        if self.ativo:
+            return
+        loop = asyncio.get_running_loop()
+
+        db = _sessao(self.config["database_url"])
+        try:
+            limite = datetime.now() - timedelta(seconds=self.config["retencao"])
+            db.query(JobScraping).filter(
+                JobScraping.estado.in_(ESTADOS_FINAIS), JobScraping.concluido_em < limite
+            ).delete(synchronize_session=False)
+            db.commit()
+            pendentes = db.query(JobScraping).filter(JobScraping.estado.notin_(ESTADOS_FINAIS)).all()
+        finally:
+            db.close()
+
+        self._loop = loop
+        self._fila = asyncio.PriorityQueue()
+        self._iniciar_servidor_fila()
+        self._pool = self._novo_pool()
+        self._consumidores = [loop.create_task(self._consumir()) for _ in range(self.config["workers"])]
+        for job in pendentes:
+            self._colocar(job.prioridade, job.id, job.modulo, job.nome, json.loads(job.args), json.loads(job.kwargs), job.tentativas)
+        logger.info(f"✅ Executor local de scraping iniciado ({self.config['workers']} processos, {len(pendentes)} jobs retomados)")
+
+    async def aguardar_fila(self) -> None:
+        """Aguarda os jobs já na fila terminarem (inclusive os callbacks de término)"""
+        if self._fila is not None:
+            await self._fila.join()
+
+    async def encerrar(self) -> None:
+        for consumidor in self._consumidores:
+            consumidor.cancel()
+        await asyncio.gather(*self._consumidores, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._servidor_fila is not None:
+            self._servidor_fila.stop_event.set()
+        self._loop = self._fila = self._pool = self._servidor_fila = None
+        self._consumidores = []
+        self._adiados = []
+        self.lotes_em_execucao = 0
+
+    def enviar(self, tarefa: TarefaLocal, args: List[Any], kwargs: Dict[str, Any],
+               task_id: Optional[str] = None, prioridade: Optional[int] = None) -> ResultadoLocal:
+        """Persiste o job como PENDING e coloca na fila (equivalente ao apply_async)"""
+        if not self.ativo:
+            try:
+                self.iniciar()
+            except RuntimeError:
+                raise RuntimeError("Executor local de scraping não iniciado (sem event loop)")
+
+        task_id = task_id or str(uuid.uuid4())
+        prioridade = self.config["prioridade_padrao"] if prioridade is None else prioridade
+        criar_job(task_id, tarefa.__module__, tarefa.name, args, kwargs, prioridade, self.config["database_url"])
+        self._colocar(prioridade, task_id, tarefa.__module__, tarefa.name, list(args), kwargs, 0)
+        return ResultadoLocal(task_id, self.config["database_url"])
+
+    def _colocar(self, prioridade, job_id, modulo, nome, args, kwargs, tentativas) -> None:
+        item = (prioridade, next(self._sequencia), (job_id, modulo, nome, args, kwargs, tentativas))
+        try:
+            noutro_loop = asyncio.get_running_loop() is not self._loop
+        except RuntimeError:
+            noutro_loop = True
+        if noutro_loop:
+            self._loop.call_soon_threadsafe(self._fila.put_nowait, item)
+        else:
+            self._fila.put_nowait(item)
+
+    async def _consumir(self) -> None:
+        while True:
+            item = await self._fila.get()
+            prioridade, _, job = item
+            lote = prioridade > PRIORIDADE_INTERATIVA
+            if lote and self.lotes_em_execucao >= self._limite_lotes():
+                # Processos restantes reservados às consultas interativas: volta
+                # para a fila quando um lote terminar (ainda pendente para join)
+                heapq.heappush(self._adiados, item)
+                self._fila.task_done()
+                continue
+            if lote:
+                self.lotes_em_execucao += 1
+            try:
+                await self._executar(prioridade, *job)
+            except Exception as e:
+                logger.error(f"❌ Erro no executor local ao processar o job {job[0]}: {e}")
+            finally:
+                if lote:
+                    self.lotes_em_execucao -= 1
+                    if self._adiados:
+                        self._fila.put_nowait(heapq.heappop(self._adiados))
+                self._fila.task_done()
+
+    async def _executar(self, prioridade, job_id, modulo, nome, args, kwargs, tentativas) -> None:
+        database_url = self.config["database_url"]
+        await asyncio.to_thread(atualizar_job, job_id, database_url, estado="STARTED", iniciado_em=datetime.now())
+        self.em_execucao += 1
+        pool = self._pool
+        try:
+            resultado = await self._loop.run_in_executor(
+                pool, _executar_job, modulo, nome, job_id, args, kwargs, tentativas, database_url
+            )
+        except RetryLocal as retry:
+            logger.info(f"🔄 Job {job_id} reagendado em {retry.countdown}s (tentativa {tentativas + 1})")
+            await asyncio.to_thread(atualizar_job, job_id, database_url, estado="RETRY",
+                                    tentativas=tentativas + 1, info={"error": retry.mensagem})
+            self._loop.call_later(retry.countdown, self._colocar, prioridade, job_id, modulo, nome, args, kwargs, tentativas + 1)
+            return
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and self._pool is pool:
+                # Processo morreu (ex.: falta de memória do navegador): encerra o pool quebrado
+                # (processos restantes e thread de gerenciamento) e cria outro para os próximos jobs
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._novo_pool()
+            self.falhas += 1
+            logger.error(f"❌ Job {job_id} ({nome}) falhou: {e}")
+            await asyncio.to_thread(atualizar_job, job_id, database_url, estado="FAILURE",
+                                    info=str(e), concluido_em=datetime.now())
+            self._terminar(job_id, nome, args)
+            return
+        finally:
+            self.em_execucao -= 1
+
+        self.concluidos += 1
+        await asyncio.to_thread(atualizar_job, job_id, database_url, estado="SUCCESS",
+                                resultado=resultado, info=None, concluido_em=datetime.now())
+        self._terminar(job_id, nome, args)
+
+    def _terminar(self, job_id: str, nome: str, args: List[Any]) -> None:
+        for callback in self._ao_terminar:
+            try:
+                callback(job_id, nome, args)
+            except Exception as e:
+                logger.warning(f"⚠️ Erro no callback de término do job {job_id}: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ativo": self.ativo,
+            "workers": self.config["workers"],
+            "na_fila": self._fila.qsize() if self._fila is not None else 0,
+            "em_execucao": self.em_execucao,
+            "lotes_em_execucao": self.lotes_em_execucao,
+            "lotes_aguardando_processo": len(self._adiados),
+            "concluidos": self.concluidos,
+            "falhas": self.falhas
+        }
+
+def executor_local_necessario() -> bool:
+    """
+    Executor local substitui o Celery quando ele não está instalado ou o broker
+    está inacessível (e não foi desativado)
+    """
+    return EXECUTOR_LOCAL_CONFIG["habilitado"] and not celery_utilizavel()
+
+# Instância global (processo da API)
+executor_local = ExecutorLocal()
@@ -10,29 +10,55 @@ import os
 import sys
 import json
 import logging
-import importlib.util
+import time
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 
 import os
 
-# Importação condicional do Celery
-try:
+from config.scraping_config import celery_utilizavel
+
+# Celery só quando instalado e com broker acessível; senão, executor local
+CELERY_AVAILABLE = celery_utilizavel()
+if CELERY_AVAILABLE:
     from celery import current_task, Celery
-    CELERY_AVAILABLE = True
     # Configurar Celery diretamente aqui para evitar importação circular
     redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     app = Celery('scraping_tasks', broker=redis_url, backend=redis_url)
-except ImportError:
-    CELERY_AVAILABLE = False
+
+    # Este é o app que envia as tasks (rotas) e o dos workers: as opções de
+    # prioridade do transporte Redis e as filas precisam estar nele, não só em celery_config.py
+    from kombu import Queue
+    from app.utils.fila_scraping import (
+        OPCOES_BROKER_PRIORIDADE, FILA_CELERY_INTERATIVA, FILA_CELERY_LOTE, rotear_por_prioridade
+    )
+    app.conf.update(
+        task_default_priority=5,
+        worker_prefetch_multiplier=1,  # Não reservar tasks à frente de consultas interativas recém-chegadas
+        broker_transport_options=OPCOES_BROKER_PRIORIDADE,
+        # Lotes e revalidações em fila própria (worker dedicado, ver fila_scraping.py)
+        task_queues=[Queue(FILA_CELERY_INTERATIVA), Queue(FILA_CELERY_LOTE)],
+        task_default_queue=FILA_CELERY_INTERATIVA,
+        task_routes=[rotear_por_prioridade],
+    )
+else:
     # Mock para quando Celery não estiver disponível
     current_task = None
 
-    # Mock app com decoradores que não fazem nada
+    from tasks.executor_local import tarefa_local, executor_local, executor_local_necessario
+
+    # Mock app: tasks ganham apply_async pelo executor local (fila asyncio + pool de
+    # processos, ver tasks/executor_local.py); chamadas diretas continuam síncronas
     class MockApp:
         def task(self, *args, **kwargs):
-            _ = args, kwargs  # Silenciar warning
+            if args and callable(args[0]) and not kwargs:
+                return self.task()(args[0])  # @app.task sem parênteses
+
             def decorator(func):
+                if executor_local_necessario():
+                    return tarefa_local(func, bind=kwargs.get("bind", False))
                 return func
             return decorator
 
@@ -55,45 +81,22 @@ except ImportError:
             return {}
 
     app = MockApp()
-from sqlalchemy import create_engine, text, event
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import text
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configuração do banco
-DATABASE_URL = os.getenv(
-    "DATABASE_URL", 
-    "sqlite:///C:/Users/Alessandro/OneDrive/Desktop/RegistroOS/RegistroOS/registrooficial/backend/registroos_new.db"
-)
-
-# Configurar engine com WAL mode e timeout para evitar bloqueios
-engine = create_engine(
-    DATABASE_URL,
-    pool_timeout=20,
-    pool_recycle=300,
-    pool_pre_ping=True,
-    connect_args={
-        "timeout": 30,
-        "check_same_thread": False
-    }
-)
-
-# Configurar WAL mode para permitir leituras concorrentes
-@event.listens_for(engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    cursor = dbapi_connection.cursor()
-    # WAL mode permite leituras concorrentes
-    cursor.execute("PRAGMA journal_mode=WAL")
-    # Timeout para escritas
-    cursor.execute("PRAGMA busy_timeout=30000")
-    # Otimizações
-    cursor.execute("PRAGMA synchronous=NORMAL")
-    cursor.execute("PRAGMA cache_size=10000")
-    cursor.close()
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Configuração do banco: mesmo engine/pool da API (WAL, busy_timeout, cache e
+# mmap aplicados pela fábrica em config.database_config) para que API e workers
+# não disputem o arquivo com configurações diferentes
+from config.database_config import DATABASE_URL, engine, SessionLocal
+from app.utils.intervalo_datas import agora_local
+from app.utils.deduplicacao import melhor_candidato, resolver_ou_criar_lote, reconciliar_indice_dedup
+from app.utils.rate_limiter import limitador_do_site
+from app.utils.single_flight import single_flight, normalizar_numero_os
+from app.utils.frescor_os import registrar_coleta
+from app.utils.fila_scraping import fila_scraping, INTERATIVO, LOTE
 
 def get_db():
     """Obtém sessão do banco de dados com timeout"""
@@ -119,158 +122,180 @@ def get_db_with_retry(max_retries=3):
                 raise e
             time.sleep(0.5 * (attempt + 1))  # Backoff exponencial
 
-def import_scraping_module():
-    """Importa dinamicamente o módulo de scraping"""
-    script_path = r"C:\Users\Alessandro\OneDrive\Desktop\RegistroOS\RegistroOS\registrooficial\backend\scripts\scrape_os_data.py"
-    
-    if not os.path.exists(script_path):
-        raise FileNotFoundError(f"Script de scraping não encontrado: {script_path}")
-    
-    spec = importlib.util.spec_from_file_location("scrape_os_data", script_path)
-    if spec is None:
-        raise ImportError(f"Could not load spec from {script_path}")
+# Backends de scraping (selenium, selenium_original, http e extras) vêm do
+# pacote app.scraping: módulos importados uma vez por processo e aquecidos na
+# inicialização do worker; o pool de navegadores vive no módulo do backend
+from config.scraping_config import SCRAPING_BACKEND, SCRAPING_WARMUP
+from app.scraping import executar_scraping, obter_backend, cadeia_de_backends, aquecer_backends
 
-    scrape_module = importlib.util.module_from_spec(spec)
-    if spec.loader is None:
-        raise ImportError(f"No loader found for spec from {script_path}")
+def execute_scraping(numero_os: str) -> List[Dict[str, Any]]:
+    """
+    Scraping de uma OS pelo backend configurado em SCRAPING_BACKEND, seguindo
+    os fallbacks registrados (http → selenium → selenium_original)
+    """
+    return executar_scraping(numero_os)
 
-    spec.loader.exec_module(scrape_module)
-    
-    return scrape_module
+def _pool_de_navegadores():
+    """Pool de navegadores do processo, se o backend selenium já foi carregado"""
+    backend = obter_backend("selenium")
+    if backend.modulo is None or not hasattr(backend.modulo, 'get_browser_pool'):
+        return None
+    return backend.modulo.get_browser_pool()
 
-def import_optimized_scraping_module():
-    """Importa dinamicamente o módulo de scraping otimizado"""
-    script_path = r"C:\Users\Alessandro\OneDrive\Desktop\RegistroOS\RegistroOS\registrooficial\backend\scripts\scrape_os_data_optimized.py"
+if CELERY_AVAILABLE and SCRAPING_WARMUP:
+    from celery.signals import worker_process_init
 
-    if not os.path.exists(script_path):
-        # Fallback para o script original se otimizado não existir
-        logger.warning("Script otimizado não encontrado, usando script original")
-        return import_scraping_module()
+    @worker_process_init.connect
+    def aquecer_scraping(**kwargs):
+        """Importa os backends em cada processo do worker antes da primeira task"""
+        _ = kwargs  # Silenciar warning
+        logger.info(f"🔥 Backends de scraping carregados: {aquecer_backends()}")
+
+if not CELERY_AVAILABLE and executor_local_necessario():
+    def _liberar_job_local(task_id: str, nome: str, args: List[Any]) -> None:
+        """
+        Executor local: trava do single flight e reserva na fila de scraping
+        (feitas pela API) liberadas no processo da API também quando o processo
+        do pool morre sem chegar ao finally da task
+        """
+        if nome == "scrape_os_task" and args:
+            single_flight.liberar(normalizar_numero_os(args[0]), task_id)
+        fila_scraping.encerrar(task_id)
+
+    executor_local.ao_terminar(_liberar_job_local)
+
+def _registro_cliente(os_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos do cliente (colunas de clientes) a partir dos dados do scraping"""
+    cliente_nome = os_data.get('CLIENTE', os_data.get('NOME CLIENTE', '')) or ''
+    cliente_cnpj = os_data.get('CNPJ', '') or ''
+    return {
+        "razao_social": cliente_nome.strip(),
+        "cnpj_cpf": cliente_cnpj.strip() or None,
+        "endereco": os_data.get('MUNICIPIO', '')
+    }
 
-    spec = importlib.util.spec_from_file_location("scrape_os_data_optimized", script_path)
-    if spec is None:
-        logger.warning("Não foi possível carregar script otimizado, usando script original")
-        return import_scraping_module()
+def _registro_equipamento(os_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Campos do equipamento (colunas de equipamentos) a partir dos dados do scraping"""
+    equipamento_desc = os_data.get('DESCRIÇÃO', os_data.get('TIPO DO EQUIPAMENTO', '')) or ''
+    equipamento_fabricante = os_data.get('FABRICANTE', '')
+    equipamento_modelo = os_data.get('MODELO', '')
+    equipamento_serie = os_data.get('NUMERO DE SERIE', '')
+    return {
+        "descricao": equipamento_desc.strip(),
+        "tipo": os_data.get('TIPO DO EQUIPAMENTO', 'Equipamento via scraping'),
+        "fabricante": equipamento_fabricante.strip() if equipamento_fabricante else None,
+        "modelo": equipamento_modelo.strip() if equipamento_modelo else None,
+        "numero_serie": equipamento_serie.strip() if equipamento_serie else None
+    }
 
-    scrape_module = importlib.util.module_from_spec(spec)
-    if spec.loader is None:
-        logger.warning("Loader não encontrado para script otimizado, usando script original")
-        return import_scraping_module()
+def _inserir_cliente(db, registro: Dict[str, Any]) -> Optional[int]:
+    """Insere o cliente e retorna o ID"""
+    insert_sql = text("""
+        INSERT INTO clientes (
+            razao_social, nome_fantasia, cnpj_cpf, contato_principal,
+            telefone_contato, email_contato, endereco, data_criacao, data_ultima_atualizacao
+        ) VALUES (
+            :razao_social, :nome_fantasia, :cnpj_cpf, :contato_principal,
+            :telefone_contato, :email_contato, :endereco, :data_criacao, :data_ultima_atualizacao
+        )
+    """)
+
+    db.execute(insert_sql, {
+        "razao_social": registro["razao_social"],
+        "nome_fantasia": registro["razao_social"],
+        "cnpj_cpf": registro["cnpj_cpf"],
+        "contato_principal": "Contato via scraping",
+        "telefone_contato": "",
+        "email_contato": "",
+        "endereco": registro["endereco"],
+        "data_criacao": datetime.now().isoformat(),
+        "data_ultima_atualizacao": datetime.now().isoformat()
+    })
+
+    # Obter ID do cliente criado
+    cliente_id = db.execute(text("SELECT last_insert_rowid()")).fetchone()[0]
+    logger.info(f"✅ Novo cliente criado: {registro['razao_social']} (ID: {cliente_id})")
+    return cliente_id
+
+def _inserir_equipamento(db, registro: Dict[str, Any]) -> Optional[int]:
+    """Insere o equipamento e retorna o ID"""
+    insert_sql = text("""
+        INSERT INTO equipamentos (
+            descricao, tipo, fabricante, modelo, numero_serie, 
+            data_criacao, data_ultima_atualizacao
+        ) VALUES (
+            :descricao, :tipo, :fabricante, :modelo, :numero_serie,
+            :data_criacao, :data_ultima_atualizacao
+        )
+    """)
 
-    spec.loader.exec_module(scrape_module)
+    db.execute(insert_sql, {
+        **registro,
+        "data_criacao": datetime.now().isoformat(),
+        "data_ultima_atualizacao": datetime.now().isoformat()
+    })
 
-    return scrape_module
+    # Obter ID do equipamento criado
+    equipamento_id = db.execute(text("SELECT last_insert_rowid()")).fetchone()[0]
+    logger.info(f"✅ Novo equipamento criado: {registro['descricao'][:50]} (ID: {equipamento_id})")
+    return equipamento_id
 
 def create_cliente_from_data(db, os_data: Dict[str, Any]) -> Optional[int]:
-    """Cria cliente baseado nos dados do scraping"""
+    """Cria cliente baseado nos dados do scraping (reaproveita o existente pelo índice de deduplicação)"""
     try:
-        cliente_nome = os_data.get('CLIENTE', os_data.get('NOME CLIENTE', ''))
-        cliente_cnpj = os_data.get('CNPJ', '')
-        
-        if not cliente_nome or not cliente_nome.strip():
+        registro = _registro_cliente(os_data)
+        if not registro["razao_social"]:
             return None
-        
-        # Buscar cliente existente
-        check_sql = text("""
-            SELECT id FROM clientes 
-            WHERE LOWER(razao_social) LIKE LOWER(:nome)
-            LIMIT 1
-        """)
-        
-        result = db.execute(check_sql, {"nome": f"%{cliente_nome.strip()}%"}).fetchone()
-        
-        if result:
-            logger.info(f"✅ Cliente existente encontrado: {cliente_nome} (ID: {result[0]})")
-            return result[0]
-        
-        # Criar novo cliente
-        insert_sql = text("""
-            INSERT INTO clientes (
-                razao_social, nome_fantasia, cnpj_cpf, contato_principal,
-                telefone_contato, email_contato, endereco, data_criacao, data_ultima_atualizacao
-            ) VALUES (
-                :razao_social, :nome_fantasia, :cnpj_cpf, :contato_principal,
-                :telefone_contato, :email_contato, :endereco, :data_criacao, :data_ultima_atualizacao
-            )
-        """)
-        
-        db.execute(insert_sql, {
-            "razao_social": cliente_nome.strip(),
-            "nome_fantasia": cliente_nome.strip(),
-            "cnpj_cpf": cliente_cnpj.strip() if cliente_cnpj else None,
-            "contato_principal": "Contato via scraping",
-            "telefone_contato": "",
-            "email_contato": "",
-            "endereco": os_data.get('MUNICIPIO', ''),
-            "data_criacao": datetime.now().isoformat(),
-            "data_ultima_atualizacao": datetime.now().isoformat()
-        })
-        
-        # Obter ID do cliente criado
-        cliente_id = db.execute(text("SELECT last_insert_rowid()")).fetchone()[0]
-        logger.info(f"✅ Novo cliente criado: {cliente_nome} (ID: {cliente_id})")
-        
-        return cliente_id
-        
+
+        # Buscar cliente existente (CNPJ, nome normalizado ou similaridade)
+        candidato = melhor_candidato(db, "cliente", registro)
+        if candidato:
+            logger.info(f"✅ Cliente existente encontrado: {registro['razao_social']} (ID: {candidato.ref_id}, {candidato.criterio} {candidato.score})")
+            return candidato.ref_id
+
+        return _inserir_cliente(db, registro)
+
     except Exception as e:
         logger.error(f"❌ Erro ao criar cliente: {e}")
         return None
 
 def create_equipamento_from_data(db, os_data: Dict[str, Any]) -> Optional[int]:
-    """Cria equipamento baseado nos dados do scraping"""
+    """Cria equipamento baseado nos dados do scraping (reaproveita o existente pelo índice de deduplicação)"""
     try:
-        equipamento_desc = os_data.get('DESCRIÇÃO', os_data.get('TIPO DO EQUIPAMENTO', ''))
-        equipamento_fabricante = os_data.get('FABRICANTE', '')
-        equipamento_modelo = os_data.get('MODELO', '')
-        equipamento_serie = os_data.get('NUMERO DE SERIE', '')
-        
-        if not equipamento_desc or not equipamento_desc.strip():
+        registro = _registro_equipamento(os_data)
+        if not registro["descricao"]:
             return None
-        
-        # Buscar equipamento existente
-        check_sql = text("""
-            SELECT id FROM equipamentos 
-            WHERE LOWER(descricao) LIKE LOWER(:desc)
-            LIMIT 1
-        """)
-        
-        result = db.execute(check_sql, {"desc": f"%{equipamento_desc.strip()[:50]}%"}).fetchone()
-        
-        if result:
-            logger.info(f"✅ Equipamento existente encontrado: {equipamento_desc[:50]} (ID: {result[0]})")
-            return result[0]
-        
-        # Criar novo equipamento
-        insert_sql = text("""
-            INSERT INTO equipamentos (
-                descricao, tipo, fabricante, modelo, numero_serie, 
-                data_criacao, data_ultima_atualizacao
-            ) VALUES (
-                :descricao, :tipo, :fabricante, :modelo, :numero_serie,
-                :data_criacao, :data_ultima_atualizacao
-            )
-        """)
-        
-        db.execute(insert_sql, {
-            "descricao": equipamento_desc.strip(),
-            "tipo": os_data.get('TIPO DO EQUIPAMENTO', 'Equipamento via scraping'),
-            "fabricante": equipamento_fabricante.strip() if equipamento_fabricante else None,
-            "modelo": equipamento_modelo.strip() if equipamento_modelo else None,
-            "numero_serie": equipamento_serie.strip() if equipamento_serie else None,
-            "data_criacao": datetime.now().isoformat(),
-            "data_ultima_atualizacao": datetime.now().isoformat()
-        })
-        
-        # Obter ID do equipamento criado
-        equipamento_id = db.execute(text("SELECT last_insert_rowid()")).fetchone()[0]
-        logger.info(f"✅ Novo equipamento criado: {equipamento_desc[:50]} (ID: {equipamento_id})")
-        
-        return equipamento_id
-        
+
+        # Buscar equipamento existente (fabricante + série, descrição normalizada ou similaridade)
+        candidato = melhor_candidato(db, "equipamento", registro)
+        if candidato:
+            logger.info(f"✅ Equipamento existente encontrado: {registro['descricao'][:50]} (ID: {candidato.ref_id}, {candidato.criterio} {candidato.score})")
+            return candidato.ref_id
+
+        return _inserir_equipamento(db, registro)
+
     except Exception as e:
         logger.error(f"❌ Erro ao criar equipamento: {e}")
         return None
 
+def resolve_clientes_equipamentos_batch(db, lista_os_data: List[Dict[str, Any]]):
+    """
+    Resolve de uma vez os clientes e equipamentos de um lote de OS coletadas,
+    criando os que não existem. Retorna (ids_clientes, ids_equipamentos) na
+    ordem da lista.
+    """
+    def _resolver(entidade, registros, campo_nome, inserir):
+        ids: List[Optional[int]] = [None] * len(registros)
+        validos = [i for i, registro in enumerate(registros) if registro[campo_nome]]
+        resolvidos = resolver_ou_criar_lote(db, entidade, [registros[i] for i in validos], lambda r: inserir(db, r))
+        for i, ref_id in zip(validos, resolvidos):
+            ids[i] = ref_id
+        return ids
+
+    clientes = _resolver("cliente", [_registro_cliente(d) for d in lista_os_data], "razao_social", _inserir_cliente)
+    equipamentos = _resolver("equipamento", [_registro_equipamento(d) for d in lista_os_data], "descricao", _inserir_equipamento)
+    return clientes, equipamentos
+
 def save_os_with_relationships(db, os_data: Dict[str, Any], numero_os: str, cliente_id: Optional[int], equipamento_id: Optional[int]) -> bool:
     """Salva OS com relacionamentos no banco"""
     try:
@@ -281,10 +306,10 @@ def save_os_with_relationships(db, os_data: Dict[str, Any], numero_os: str, clie
         insert_sql = text("""
             INSERT OR REPLACE INTO ordens_servico (
                 os_numero, id_cliente, id_equipamento, descricao_maquina, 
-                status_os, data_criacao, prioridade, observacoes_gerais
+                status_os, data_criacao, prioridade, observacoes_gerais, ultima_atividade
             ) VALUES (
                 :os_numero, :id_cliente, :id_equipamento, :descricao, 
-                :status, datetime('now'), :prioridade, :observacoes
+                :status, :agora, :prioridade, :observacoes, :agora
             )
         """)
         
@@ -295,7 +320,10 @@ def save_os_with_relationships(db, os_data: Dict[str, Any], numero_os: str, clie
             "status": os_data.get('STATUS DA OS', 'COLETADA VIA SCRAPING'),
             "descricao": equipamento_desc[:200] if equipamento_desc else f"Equipamento da OS {numero_os}",
             "prioridade": "MEDIA",
-            "observacoes": f"OS criada via scraping assíncrono - Cliente: {cliente_nome} - CNPJ: {cliente_cnpj}"
+            "observacoes": f"OS criada via scraping assíncrono - Cliente: {cliente_nome} - CNPJ: {cliente_cnpj}",
+            # Um só relógio (fuso da aplicação) para data_criacao e ultima_atividade;
+            # SQL direto não passa pelos eventos de app/utils/ultima_atividade.py
+            "agora": agora_local().strftime('%Y-%m-%d %H:%M:%S.%f')
         })
         
         db.commit()
@@ -307,15 +335,93 @@ def save_os_with_relationships(db, os_data: Dict[str, Any], numero_os: str, clie
         db.rollback()
         return False
 
+def update_os_from_data(db, os_id: int, os_data: Dict[str, Any], cliente_id: Optional[int],
+                        equipamento_id: Optional[int], status_anterior: Optional[str]) -> None:
+    """
+    Atualiza a OS existente com uma coleta diferente da anterior (sem commit).
+    O status só é trocado se ainda for o da coleta anterior (não sobrescreve o
+    andamento registrado localmente).
+    """
+    equipamento_desc = os_data.get('DESCRIÇÃO', os_data.get('TIPO DO EQUIPAMENTO', ''))
+    db.execute(text("""
+        UPDATE ordens_servico SET
+            id_cliente = COALESCE(:id_cliente, id_cliente),
+            id_equipamento = COALESCE(:id_equipamento, id_equipamento),
+            descricao_maquina = COALESCE(:descricao, descricao_maquina),
+            status_os = CASE WHEN status_os IS NULL OR status_os = :status_anterior OR status_os = 'COLETADA VIA SCRAPING'
+                             THEN COALESCE(:status, status_os) ELSE status_os END,
+            ultima_atividade = :ultima_atividade
+        WHERE id = :id
+    """), {
+        "id": os_id,
+        "id_cliente": cliente_id,
+        "id_equipamento": equipamento_id,
+        "descricao": equipamento_desc[:200] if equipamento_desc else None,
+        "status": os_data.get('STATUS DA OS') or None,
+        "status_anterior": status_anterior,
+        # SQL direto não passa pelos eventos de app/utils/ultima_atividade.py
+        "ultima_atividade": agora_local().strftime('%Y-%m-%d %H:%M:%S.%f')
+    })
+
+def revalidar_os(db, numero_os: str, os_id: int) -> Dict[str, Any]:
+    """
+    Revalidação (stale-while-revalidate) de uma OS já cadastrada: nova coleta
+    comparada pelo hash; sem mudança só atualiza scraped_at
+    """
+    scraped_data = execute_scraping(numero_os)
+    if not scraped_data:
+        single_flight.marcar_nao_encontrada(normalizar_numero_os(numero_os))
+        return {"status": "not_found", "message": f"OS {numero_os} não encontrada no sistema externo", "fonte": "revalidacao"}
+
+    os_data = scraped_data[0]
+    try:
+        coleta = registrar_coleta(db, numero_os, os_data)
+        if coleta.alterado:
+            cliente_id = create_cliente_from_data(db, os_data)
+            equipamento_id = create_equipamento_from_data(db, os_data)
+            update_os_from_data(db, os_id, os_data, cliente_id, equipamento_id, coleta.status_anterior)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(f"🔄 OS {numero_os} revalidada: {'atualizada' if coleta.alterado else 'sem alterações'}")
+    return {
+        "status": "updated" if coleta.alterado else "unchanged",
+        "message": f"OS {numero_os} {'atualizada com os dados do sistema externo' if coleta.alterado else 'sem alterações no sistema externo'}",
+        "fonte": "revalidacao",
+        "hash_conteudo": coleta.hash_conteudo
+    }
+
+def revalidar_os_por_numero(numero_os: str) -> Dict[str, Any]:
+    """Revalidação fora do Celery (API sem broker): sessão própria do banco"""
+    db = get_db()
+    try:
+        existente = db.execute(
+            text("SELECT id FROM ordens_servico WHERE os_numero = :numero_os OR os_numero = :numero_os_padded"),
+            {"numero_os": numero_os, "numero_os_padded": numero_os.zfill(9)}
+        ).fetchone()
+        if existente is None:
+            return {"status": "not_found", "message": f"OS {numero_os} não cadastrada", "fonte": "revalidacao"}
+        return revalidar_os(db, numero_os, existente.id)
+    finally:
+        db.close()
+
 @app.task(bind=True, max_retries=3)
-def scrape_os_task(self, numero_os: str, user_id: int) -> Dict[str, Any]:
+def scrape_os_task(self, numero_os: str, user_id: int, revalidar: bool = False) -> Dict[str, Any]:
     """
     Task assíncrona para scraping de OS
     Mantém toda a lógica de criação de dados existente
+    Com revalidar=True, uma OS já cadastrada é coletada novamente (frescor)
     """
     task_id = self.request.id
     logger.info(f"🚀 Iniciando scraping assíncrono para OS {numero_os} (Task: {task_id}, User: {user_id})")
-    
+
+    # Trava do single flight e reserva na fila de scraping (feitas pela API com
+    # este task_id): liberadas ao terminar, mantidas entre novas tentativas
+    chave_os = normalizar_numero_os(numero_os)
+    liberar_trava = True
+
     try:
         # Atualizar progresso: Iniciando
         self.update_state(
@@ -329,6 +435,18 @@ def scrape_os_task(self, numero_os: str, user_id: int) -> Dict[str, Any]:
         check_sql = text("SELECT * FROM ordens_servico WHERE os_numero = :numero_os")
         existing_os = db.execute(check_sql, {"numero_os": numero_os}).fetchone()
         
+        if existing_os and revalidar:
+            self.update_state(
+                state='PROGRESS',
+                meta={'progress': 30, 'status': 'Revalidando dados no sistema externo...', 'numero_os': numero_os}
+            )
+            try:
+                # Revalidação em segundo plano: mesma vez dos itens de lote (abaixo das consultas interativas)
+                with fila_scraping.vez(LOTE, user_id, task_id):
+                    return revalidar_os(db, numero_os, existing_os.id)
+            finally:
+                db.close()
+
         if existing_os:
             logger.info(f"✅ OS {numero_os} já existe no banco")
             db.close()
@@ -345,12 +463,13 @@ def scrape_os_task(self, numero_os: str, user_id: int) -> Dict[str, Any]:
             meta={'progress': 30, 'status': 'Executando scraping externo...', 'numero_os': numero_os}
         )
         
-        # 2. Executar scraping externo
-        scrape_module = import_scraping_module()
-        scraped_data = scrape_module.execute_scraping(numero_os)
+        # 2. Executar scraping externo (navegador já logado do pool do worker), na vez da consulta interativa
+        with fila_scraping.vez(INTERATIVO, user_id, task_id):
+            scraped_data = execute_scraping(numero_os)
         
         if not scraped_data or len(scraped_data) == 0:
             logger.warning(f"⚠️ Nenhum dado coletado para OS {numero_os}")
+            single_flight.marcar_nao_encontrada(chave_os)
             db.close()
             return {
                 "status": "not_found",
@@ -380,7 +499,8 @@ def scrape_os_task(self, numero_os: str, user_id: int) -> Dict[str, Any]:
             meta={'progress': 80, 'status': 'Salvando dados no banco...', 'numero_os': numero_os}
         )
         
-        # 6. Salvar OS com relacionamentos
+        # 6. Salvar OS com relacionamentos (e o payload completo para o controle de frescor)
+        registrar_coleta(db, numero_os, os_data)
         if save_os_with_relationships(db, os_data, numero_os, cliente_id, equipamento_id):
             # Buscar OS criada para retornar dados completos
             final_sql = text("""
@@ -422,6 +542,7 @@ def scrape_os_task(self, numero_os: str, user_id: int) -> Dict[str, Any]:
         # Retry automático
         if self.request.retries < 3:
             logger.info(f"🔄 Tentativa {self.request.retries + 1}/3 para OS {numero_os}")
+            liberar_trava = False
             raise self.retry(countdown=60 * (2 ** self.request.retries), exc=e)
         
         # Falha final
@@ -432,13 +553,42 @@ def scrape_os_task(self, numero_os: str, user_id: int) -> Dict[str, Any]:
             "retries": self.request.retries
         }
 
+    finally:
+        if liberar_trava and task_id:
+            single_flight.liberar(chave_os, task_id)
+            fila_scraping.encerrar(task_id)
+
 @app.task
 def cleanup_old_tasks():
     """Remove tasks antigas do Redis"""
     try:
         # Implementar limpeza de tasks antigas
         logger.info("🧹 Executando limpeza de tasks antigas")
-        return {"status": "success", "message": "Limpeza executada"}
+
+        # Navegadores ociosos do pool deste processo (se o script já foi carregado)
+        navegadores_fechados = 0
+        pool = _pool_de_navegadores()
+        if pool is not None:
+            navegadores_fechados = pool.close_idle()
+
+        # Índice de deduplicação: corrige UPDATE/DELETE feitos em SQL direto
+        db = get_db()
+        try:
+            dedup_reconciliados = reconciliar_indice_dedup(db)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            dedup_reconciliados = 0
+            logger.error(f"❌ Erro ao reconciliar índice de deduplicação: {e}")
+        finally:
+            db.close()
+
+        return {
+            "status": "success",
+            "message": "Limpeza executada",
+            "navegadores_fechados": navegadores_fechados,
+            "dedup_reconciliados": dedup_reconciliados
+        }
     except Exception as e:
         logger.error(f"❌ Erro na limpeza: {e}")
         return {"status": "error", "message": str(e)}
@@ -578,144 +728,207 @@ def save_scraping_usage_stats(user_id: int, os_number: str, success: bool, proce
         if db:
             db.close()
 
+# ============================================================================
+# SCRAPING EM LOTE
+# ============================================================================
+
+# OS coletadas em paralelo por threads (navegadores do pool do processo ou
+# sessões HTTP por thread), com início limitado por site; a gravação no banco
+# fica na thread da task, em blocos, com a deduplicação em lote
+SCRAPING_BATCH_CONCURRENCY = max(1, int(os.getenv("SCRAPING_BATCH_CONCURRENCY", "3")))
+SCRAPING_BATCH_SAVE_SIZE = max(1, int(os.getenv("SCRAPING_BATCH_SAVE_SIZE", "10")))
+SCRAPING_SECONDS_PER_OS = float(os.getenv("SCRAPING_SECONDS_PER_OS", "15"))  # Apenas para estimativa
+
+def _site_scraping() -> Optional[str]:
+    """URL do site consultado pelo backend configurado (chave do limitador de taxa)"""
+    if SCRAPING_BACKEND == "http":
+        return os.getenv("SCRAPING_API_URL") or os.getenv("SITE_URL")
+    return os.getenv("SITE_URL")
+
+def _preparar_lote(concorrencia: int) -> None:
+    """Carrega os scripts antes das threads e amplia o pool de navegadores do processo"""
+    aquecer_backends()
+    pool = _pool_de_navegadores()
+    if pool is not None and "selenium" in [b.nome for b in cadeia_de_backends()]:
+        pool.grow(concorrencia)
+
+def _coletar_os(indice: int, numero_os: str, limitador, user_id: int, task_id: str) -> Dict[str, Any]:
+    """
+    Executada nas threads do lote: aguarda a vez na fila de scraping (consultas
+    interativas primeiro, lotes intercalados por usuário) e o limite do site
+    """
+    with fila_scraping.vez(LOTE, user_id, f"{task_id}:{indice}"):
+        limitador.aguardar()
+        start_time = time.time()
+        try:
+            dados = execute_scraping(numero_os)
+            erro = None
+        except Exception as e:
+            dados, erro = None, e
+    fila_scraping.consumir(task_id)
+    return {"indice": indice, "os": numero_os, "dados": dados, "erro": erro, "tempo": time.time() - start_time}
+
+def estimar_duracao_lote(total_os: int) -> str:
+    """Estimativa exibida ao enfileirar um lote (concorrência e limite de taxa do site)"""
+    concorrencia = min(SCRAPING_BATCH_CONCURRENCY, max(total_os, 1))
+    segundos = math.ceil(total_os / concorrencia) * SCRAPING_SECONDS_PER_OS
+    taxa = limitador_do_site(_site_scraping()).taxa
+    if taxa > 0:
+        segundos = max(segundos, total_os / taxa)
+    minutos = max(1, math.ceil(segundos / 60))
+    return f"{minutos}-{minutos * 2} minutos"
+
 @app.task(bind=True, max_retries=3)
 def scrape_batch_os_task(self, os_numbers: List[str], user_id: int, batch_name: str = None) -> Dict[str, Any]:
     """
     Task assíncrona para scraping em lote de múltiplas OS
     Processa várias OS em paralelo com controle de concorrência
+    (SCRAPING_BATCH_CONCURRENCY threads, limite de taxa por site)
     """
     task_id = self.request.id
     batch_name = batch_name or f"Lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    total_os = len(os_numbers)
+    concorrencia = max(1, min(SCRAPING_BATCH_CONCURRENCY, total_os))
 
-    logger.info(f"🚀 Iniciando scraping em lote: {batch_name} - {len(os_numbers)} OS (Task: {task_id}, User: {user_id})")
+    logger.info(f"🚀 Iniciando scraping em lote: {batch_name} - {total_os} OS, {concorrencia} em paralelo (Task: {task_id}, User: {user_id})")
 
     # Salvar estatísticas do lote
-    save_batch_stats(task_id, user_id, batch_name, len(os_numbers), "INICIADO")
+    save_batch_stats(task_id, user_id, batch_name, total_os, "INICIADO")
 
-    try:
-        db = get_db()
+    results = []  # (índice, resultado): agregação parcial na ordem de conclusão
+    pendentes = []  # OS coletadas aguardando gravação no banco
+    success_count = 0
+    error_count = 0
+    db = None
+    executor = None
+    manter_reserva = False  # Reserva na fila de scraping (feita pela API) segue para a nova tentativa
 
-        # Atualizar progresso inicial
+    def registrar_progresso(os_num):
+        processed = success_count + error_count
         self.update_state(
             state='PROGRESS',
             meta={
-                'progress': 0,
-                'status': f'Iniciando processamento de {len(os_numbers)} OS...',
+                'progress': int((processed / total_os) * 100) if total_os else 100,
+                'status': f'Processando... {processed}/{total_os}',
                 'batch_name': batch_name,
-                'total_os': len(os_numbers),
-                'processed': 0,
-                'success': 0,
-                'errors': 0
+                'total_os': total_os,
+                'processed': processed,
+                'success': success_count,
+                'errors': error_count,
+                'current_os': os_num
             }
         )
 
-        results = []
-        success_count = 0
-        error_count = 0
-
-        # Processar OS em grupos menores para evitar sobrecarga
-        batch_size = 5  # Processar 5 OS por vez
-        total_batches = (len(os_numbers) + batch_size - 1) // batch_size
-
-        for batch_idx, i in enumerate(range(0, len(os_numbers), batch_size)):
-            batch_os = os_numbers[i:i + batch_size]
-
-            logger.info(f"📦 Processando lote {batch_idx + 1}/{total_batches}: {batch_os}")
-
-            # Processar lote atual
-            batch_results = []
-            for os_num in batch_os:
-                start_time = time.time()
-                try:
-                    # Executar scraping individual com versão otimizada
-                    scrape_module = import_optimized_scraping_module()
-
-                    # Usar função otimizada se disponível, senão usar original
-                    if hasattr(scrape_module, 'execute_scraping_optimized'):
-                        scraped_data = scrape_module.execute_scraping_optimized(os_num, f"batch_{task_id}")
-                    else:
-                        scraped_data = scrape_module.execute_scraping(os_num)
-
-                    processing_time = time.time() - start_time
-
-                    if scraped_data and len(scraped_data) > 0:
-                        # Salvar dados no banco
-                        if save_scraped_os_data(db, scraped_data[0], os_num):
-                            success_count += 1
-                            batch_results.append({"os": os_num, "status": "success", "data": scraped_data[0]})
-                            save_scraping_usage_stats(user_id, os_num, True, processing_time)
-                            logger.info(f"✅ OS {os_num} processada com sucesso em {processing_time:.2f}s")
-                        else:
-                            error_count += 1
-                            batch_results.append({"os": os_num, "status": "error", "message": "Erro ao salvar no banco"})
-                            save_scraping_usage_stats(user_id, os_num, False, processing_time)
-                    else:
-                        error_count += 1
-                        batch_results.append({"os": os_num, "status": "not_found", "message": "OS não encontrada"})
-                        save_scraping_usage_stats(user_id, os_num, False, processing_time)
-
-                except Exception as e:
-                    processing_time = time.time() - start_time
-                    error_count += 1
-                    batch_results.append({"os": os_num, "status": "error", "message": str(e)})
-                    save_scraping_usage_stats(user_id, os_num, False, processing_time)
-                    logger.error(f"❌ Erro ao processar OS {os_num}: {e}")
-
-                # Atualizar progresso
-                processed = success_count + error_count
-                progress = int((processed / len(os_numbers)) * 100)
-
-                self.update_state(
-                    state='PROGRESS',
-                    meta={
-                        'progress': progress,
-                        'status': f'Processando... {processed}/{len(os_numbers)}',
-                        'batch_name': batch_name,
-                        'total_os': len(os_numbers),
-                        'processed': processed,
-                        'success': success_count,
-                        'errors': error_count,
-                        'current_os': os_num
-                    }
-                )
-
-            results.extend(batch_results)
-
-            # Pequena pausa entre lotes para não sobrecarregar
-            if batch_idx < total_batches - 1:
-                time.sleep(2)
+    def registrar(coleta, status, processing_time, **extra):
+        nonlocal success_count, error_count
+        if status == "success":
+            success_count += 1
+        else:
+            error_count += 1
+        results.append((coleta["indice"], {"os": coleta["os"], "status": status, **extra}))
+        save_scraping_usage_stats(user_id, coleta["os"], status == "success", processing_time)
+        registrar_progresso(coleta["os"])
+
+    def gravar_pendentes():
+        """Clientes/equipamentos do bloco resolvidos em uma chamada e OS salvas"""
+        if not pendentes:
+            return
+        try:
+            clientes_ids, equipamentos_ids = resolve_clientes_equipamentos_batch(db, [c["dados"][0] for c in pendentes])
+        except Exception as e:
+            logger.error(f"❌ Erro ao resolver clientes/equipamentos do lote: {e}")
+            db.rollback()
+            clientes_ids = equipamentos_ids = [None] * len(pendentes)
+
+        for coleta, cliente_id, equipamento_id in zip(pendentes, clientes_ids, equipamentos_ids):
+            os_data = coleta["dados"][0]
+            registrar_coleta(db, coleta["os"], os_data)
+            if save_os_with_relationships(db, os_data, coleta["os"], cliente_id, equipamento_id):
+                registrar(coleta, "success", coleta["tempo"], data=os_data)
+                logger.info(f"✅ OS {coleta['os']} processada com sucesso em {coleta['tempo']:.2f}s")
+            else:
+                registrar(coleta, "error", coleta["tempo"], message="Erro ao salvar no banco")
+        pendentes.clear()
+
+    try:
+        db = get_db()
+        registrar_progresso(None)
+
+        _preparar_lote(concorrencia)
+        limitador = limitador_do_site(_site_scraping())
+
+        executor = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="scraping_lote")
+        futuros = [executor.submit(_coletar_os, i, os_num, limitador, user_id, task_id) for i, os_num in enumerate(os_numbers)]
+
+        for futuro in as_completed(futuros):
+            coleta = futuro.result()
+            if coleta["erro"] is not None:
+                logger.error(f"❌ Erro ao processar OS {coleta['os']}: {coleta['erro']}")
+                registrar(coleta, "error", coleta["tempo"], message=str(coleta["erro"]))
+            elif coleta["dados"]:
+                pendentes.append(coleta)
+                if len(pendentes) >= SCRAPING_BATCH_SAVE_SIZE:
+                    gravar_pendentes()
+            else:
+                registrar(coleta, "not_found", coleta["tempo"], message="OS não encontrada")
+
+        gravar_pendentes()
+        executor.shutdown()
 
         # Finalizar processamento
         final_status = "CONCLUIDO" if error_count == 0 else "CONCLUIDO_COM_ERROS"
-        save_batch_stats(task_id, user_id, batch_name, len(os_numbers), final_status, success_count, error_count)
-
-        db.close()
+        save_batch_stats(task_id, user_id, batch_name, total_os, final_status, success_count, error_count)
 
-        logger.info(f"✅ Lote {batch_name} concluído: {success_count} sucessos, {error_count} erros")
+        logger.info(f"✅ Lote {batch_name} concluído: {success_count} sucessos, {error_count} erros, "
+                    f"{limitador.status()['tempo_espera']}s aguardando o limite do site")
 
         return {
             "status": "completed",
             "batch_name": batch_name,
-            "total_os": len(os_numbers),
+            "total_os": total_os,
             "success_count": success_count,
             "error_count": error_count,
-            "results": results
+            "results": [r for _, r in sorted(results, key=lambda item: item[0])]
         }
 
     except Exception as e:
         logger.error(f"❌ Erro crítico no processamento do lote {batch_name}: {e}")
-        save_batch_stats(task_id, user_id, batch_name, len(os_numbers), "ERRO", 0, len(os_numbers))
-
-        if self.request.retries < 3:
-            raise self.retry(countdown=60 * (2 ** self.request.retries))
+        if executor is not None:
+            # Não esperar as OS ainda na fila (ex.: soft time limit)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        processadas = {r["os"] for _, r in results}
+        if not processadas:
+            save_batch_stats(task_id, user_id, batch_name, total_os, "ERRO", 0, total_os)
+            if self.request.retries < 3:
+                manter_reserva = True
+                raise self.retry(countdown=60 * (2 ** self.request.retries))
+            return {
+                "status": "error",
+                "batch_name": batch_name,
+                "message": str(e),
+                "total_os": total_os
+            }
 
+        # Resultado parcial: o que já foi salvo não é refeito em um retry do lote inteiro
+        save_batch_stats(task_id, user_id, batch_name, total_os, "ERRO", success_count, total_os - success_count)
         return {
-            "status": "error",
+            "status": "partial",
             "batch_name": batch_name,
             "message": str(e),
-            "total_os": len(os_numbers)
+            "total_os": total_os,
+            "success_count": success_count,
+            "error_count": error_count,
+            "results": [r for _, r in sorted(results, key=lambda item: item[0])],
+            "pending_os": [os_num for os_num in os_numbers if os_num not in processadas]
         }
 
+    finally:
+        if db:
+            db.close()
+        if task_id and not manter_reserva:
+            fila_scraping.encerrar(task_id)
+
 def get_scraping_statistics(days: int = 30) -> Dict[str, Any]:
     """Obtém estatísticas detalhadas de uso do scraping"""
     db = None
@@ -0,0 +1,36 @@
+"""
+Configuração compartilhada dos testes
+"""
+import pytest
+import sys
+import os
+
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database_config import create_configured_engine
+from app.database_models import Base
+
+@pytest.fixture
+def banco_memoria():
+    """
+    Fábrica de bancos SQLite em memória: banco_memoria(Modelo, ...) cria só
+    as tabelas dos modelos (sem modelos, todas) e retorna (engine, sessão).
+    Sessões e engines são fechados ao fim do teste.
+    """
+    abertos = []
+
+    def criar(*modelos):
+        engine = create_configured_engine("sqlite://")
+        tabelas = [modelo.__table__ for modelo in modelos] or None
+        Base.metadata.create_all(bind=engine, tables=tabelas)
+        db = sessionmaker(bind=engine)()
+        abertos.append((engine, db))
+        return engine, db
+
+    yield criar
+    for engine, db in abertos:
+        db.close()
+        engine.dispose()
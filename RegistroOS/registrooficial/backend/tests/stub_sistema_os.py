@@ -0,0 +1,151 @@
+"""
+Servidor stub do sistema externo de OS (API JSON da SPA)
+========================================================
+
+Reproduz as respostas gravadas em tests/fixtures/sistema_os.json:
+- POST /api/login {"username", "password"} → cookie de sessão + token
+- GET /api/os?numero=<n> → [{"id": ...}] (busca por número)
+- GET /api/os/<numero ou id> → JSON da OS; 401 sem sessão; 404 se não existe
+
+Nos testes:
+    with StubSistemaOS() as stub:
+        cliente = HttpOsClient(stub.url, "operador", "senha123")
+
+Manual (replay para o backend HTTP):
+    python tests/stub_sistema_os.py --porta 8765
+    SCRAPING_BACKEND=http SCRAPING_API_URL=http://127.0.0.1:8765 USERNAME=operador PASSWORD=senha123
+"""
+
+import argparse
+import json
+import os
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "sistema_os.json")
+
+class StubSistemaOS:
+    """Servidor HTTP local em thread, com sessões em memória"""
+
+    def __init__(self, fixture=FIXTURE_PADRAO, porta=0):
+        with open(fixture, encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+        self.usuarios = dados["usuarios"]
+        self.os = dados["os"]
+        self.sessoes = set()
+        self.requisicoes = []  # (método, caminho) para asserções
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def expirar_sessoes(self):
+        self.sessoes.clear()
+
+    def contar(self, metodo, caminho):
+        return sum(1 for r in self.requisicoes if r == (metodo, caminho))
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        _ = args  # Silenciar warning
+        self.parar()
+
+    def _buscar(self, chave):
+        """OS pelo número (sem zeros à esquerda) ou pelo id interno"""
+        if chave in self.os:
+            return self.os[chave]
+        for registro in self.os.values():
+            corpo = registro.get("data", registro)
+            if str(corpo.get("id")) == chave:
+                return registro
+        return None
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                _ = args  # Silenciar warning
+
+            def _responder(self, status, corpo=None, cabecalhos=None):
+                conteudo = json.dumps(corpo).encode() if corpo is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(conteudo)))
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(conteudo)
+
+            def _autenticado(self):
+                cookie = self.headers.get("Cookie", "")
+                token = self.headers.get("Authorization", "").replace("Bearer ", "")
+                sessoes = {parte.split("=", 1)[1] for parte in cookie.split("; ") if parte.startswith("sessao=")}
+                return bool((sessoes | {token}) & stub.sessoes)
+
+            def do_POST(self):
+                caminho = urlparse(self.path).path
+                stub.requisicoes.append(("POST", caminho))
+                if caminho != "/api/login":
+                    return self._responder(404, {"erro": "não encontrado"})
+
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                credenciais = json.loads(self.rfile.read(tamanho) or b"{}")
+                if stub.usuarios.get(credenciais.get("username")) != credenciais.get("password"):
+                    return self._responder(401, {"erro": "credenciais inválidas"})
+
+                sessao = secrets.token_hex(8)
+                stub.sessoes.add(sessao)
+                self._responder(200, {"token": sessao}, {"Set-Cookie": f"sessao={sessao}; Path=/"})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                stub.requisicoes.append(("GET", url.path))
+                if not self._autenticado():
+                    return self._responder(401, {"erro": "sessão expirada"})
+
+                if url.path == "/api/os":
+                    numero = parse_qs(url.query).get("numero", [""])[0].lstrip("0")
+                    registro = stub.os.get(numero)
+                    if registro is None:
+                        return self._responder(200, {"data": []})
+                    return self._responder(200, {"data": [{"id": registro.get("data", registro)["id"]}]})
+
+                if url.path.startswith("/api/os/"):
+                    registro = stub._buscar(url.path.rsplit("/", 1)[1].lstrip("0"))
+                    if registro is None:
+                        return self._responder(404, {"erro": "OS não encontrada"})
+                    return self._responder(200, registro)
+
+                self._responder(404, {"erro": "não encontrado"})
+
+        return Handler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub do sistema externo de OS")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--fixture", default=FIXTURE_PADRAO)
+    args = parser.parse_args()
+
+    stub = StubSistemaOS(args.fixture, args.porta)
+    print(f"🧪 Stub do sistema de OS em {stub.url} (Ctrl+C para sair)")
+    try:
+        stub._servidor.serve_forever()
+    except KeyboardInterrupt:
+        stub.parar()
@@ -0,0 +1,38 @@
+"""
+Testes do índice de busca textual (app/utils/busca_textual.py)
+"""
+from app.database_models import OrdemServico, Cliente, Equipamento
+from app.utils.busca_textual import termos_busca, criar_indice_busca, reconstruir_indice_busca, buscar
+
+class TestBuscaTextual:
+    """Testes para a busca textual"""
+
+    def test_normalizacao_remove_acentos_e_pontuacao(self):
+        """Acentos viram letras simples e pontuação separa termos"""
+        assert termos_busca("  ação/São  paulo, nº 12 ") == ["ACAO", "SAO", "PAULO", "NO", "12"]
+        assert termos_busca("!!!") == []
+
+    def test_triggers_mantem_indice_e_prefixo_do_titulo_vem_primeiro(self, banco_memoria):
+        """Inserções/alterações/remoções refletem no índice; título iniciado pelo termo lidera"""
+        engine, db = banco_memoria(OrdemServico, Cliente, Equipamento)
+
+        db.add(Equipamento(id=1, descricao="GERADOR COM MOTOR AUXILIAR"))
+        db.commit()
+        with engine.begin() as conexao:
+            criar_indice_busca(conexao)
+            assert reconstruir_indice_busca(conexao) == 1
+
+        db.add_all([
+            Equipamento(id=2, descricao="MOTOR TRIFÁSICO", fabricante="WEG"),
+            Cliente(id=1, razao_social="INDÚSTRIA AÇÃO LTDA"),
+        ])
+        db.commit()
+
+        assert [r["id"] for r in buscar(db, "mot", ["equipamento"])] == [2, 1]
+        assert [(r["tipo"], r["id"]) for r in buscar(db, "acao")] == [("cliente", 1)]
+
+        db.get(Equipamento, 2).descricao = "BOMBA"
+        db.delete(db.get(Cliente, 1))
+        db.commit()
+        assert [r["id"] for r in buscar(db, "motor")] == [1]
+        assert buscar(db, "industria") == []
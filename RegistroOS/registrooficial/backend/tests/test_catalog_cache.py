@@ -0,0 +1,61 @@
+"""
+Testes do cache de catálogos (app/utils/catalog_cache.py)
+"""
+import pytest
+import sys
+import os
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database_config import create_configured_engine
+from app.database_models import Base, Setor
+from app.utils.catalog_cache import CatalogCache
+from app.utils.response_cache import response_cache
+
+@pytest.fixture
+def engine():
+    response_cache.limpar()
+    engine = create_configured_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Setor.__table__])
+    with engine.begin() as conexao:
+        conexao.execute(text(
+            "INSERT INTO tipo_setores (id, nome, departamento, area_tipo, ativo) "
+            "VALUES (1, 'MECANICA', 'MOTORES', 'PRODUCAO', 1)"
+        ))
+    yield engine
+    engine.dispose()
+    response_cache.limpar()
+
+class TestCatalogCache:
+    """Testes para carga fora de transação com escrita pendente e expiração por TTL"""
+
+    def test_rollback_nao_deixa_linha_fantasma(self, engine):
+        """Catálogo lido na transação que inseriu o setor não é guardado"""
+        cache = CatalogCache()
+        db = sessionmaker(bind=engine)()
+        db.add(Setor(id=2, nome="BOBINAGEM", departamento="MOTORES", area_tipo="PRODUCAO", ativo=True))
+        assert cache.id_por_nome(db, "setores", "BOBINAGEM") == 2  # A própria transação vê o setor
+        db.rollback()
+
+        assert cache.id_por_nome(db, "setores", "BOBINAGEM") is None
+        assert cache.id_por_nome(db, "setores", "MECANICA") == 1
+        assert cache.estatisticas()["recargas"] == 1
+        db.close()
+
+    def test_ttl_limita_escritas_nao_vistas_pela_geracao(self, engine):
+        """Escrita de outro processo (sem evento de Session) aparece após o TTL"""
+        db = sessionmaker(bind=engine)()
+        duravel, expirado = CatalogCache(), CatalogCache({"ttl": 0})
+        assert duravel.id_por_nome(db, "setores", "MECANICA") == 1
+        assert expirado.id_por_nome(db, "setores", "MECANICA") == 1
+
+        with engine.begin() as conexao:
+            conexao.execute(text("UPDATE tipo_setores SET nome = 'USINAGEM' WHERE id = 1"))
+
+        assert duravel.id_por_nome(db, "setores", "MECANICA") == 1
+        assert expirado.id_por_nome(db, "setores", "USINAGEM") == 1
+        db.close()
@@ -0,0 +1,72 @@
+"""
+Testes do armazenamento compacto dos dados externos da OS (app/utils/dados_externos_os.py)
+"""
+import json
+from datetime import date, datetime
+
+from app.database_models import OsDadosExternos
+from app.utils.dados_externos_os import (
+    converter_numero, converter_grandeza, converter_data, extrair_campos_tipados,
+    comprimir_payload, descomprimir_payload, serializar_dados_externos
+)
+from app.utils.frescor_os import registrar_coleta, obter_dados_externos
+
+OS_DATA = {
+    "OS": "12345",
+    "CLIENTE": "ACME MINERACAO LTDA",
+    "CNPJ": "12.345.678/0001-90",
+    "TIPO DO EQUIPAMENTO": "MOTOR DE INDUCAO",
+    "FABRICANTE": "WEG",
+    "MODELO": "W22",
+    "POTENCIA CV/HP": "1.500 CV",
+    "POTENCIA KW": "1103,2",
+    "ROTACAO (RPM)": "1780 RPM",
+    "TENSAO DE ALTA": "13,8 KV",
+    "DATA DA EMISSAO": "05/03/2025 14:20",
+    "DATA DA CONCLUSAO": "",
+    "STATUS DA OS": "EM ANDAMENTO",
+    **{f"CAMPO VAZIO {i}": "" for i in range(70)}
+}
+
+class TestDadosExternosOS:
+    """Testes para os dados externos da OS"""
+
+    def test_conversao_formatos_brasileiros(self):
+        """Números com milhar/vírgula e unidade; datas dd/mm/aaaa e ISO"""
+        assert converter_numero("1.500 CV") == 1500.0
+        assert converter_numero("13,8 KV") == 13.8
+        assert converter_numero("1.234.567,5") == 1234567.5
+        assert converter_numero("0.75") == 0.75
+        assert converter_numero("N/A") is None
+        assert converter_grandeza("13,8 KV", {"V": 1.0, "KV": 1000.0}) == 13800.0
+        assert converter_grandeza("440", {"V": 1.0, "KV": 1000.0}) == 440.0
+        assert converter_grandeza("250 CV", {"KW": 1.0, "CV": 0.73550}) == 183.875
+        assert converter_data("05/03/2025 14:20") == date(2025, 3, 5)
+        assert converter_data("2025-03-05") == date(2025, 3, 5)
+        assert converter_data("31/02/2025") is None
+
+        campos = extrair_campos_tipados(OS_DATA)
+        assert campos["cnpj"] == "12345678000190"
+        assert (campos["potencia_cv"], campos["rotacao_rpm"], campos["data_conclusao"]) == (1500.0, 1780, None)
+        assert (campos["tensao_alta_v"], campos["potencia_kw"]) == (13800.0, 1103.2)
+
+    def test_payload_comprimido_sem_perdas(self):
+        """Todas as chaves voltam (vazias como ''); tamanho bem menor que o JSON"""
+        comprimido = comprimir_payload(OS_DATA)
+        assert descomprimir_payload(comprimido) == OS_DATA
+        assert len(comprimido) < len(json.dumps(OS_DATA, ensure_ascii=False)) / 3
+        assert descomprimir_payload(None) == {}
+
+    def test_registrar_coleta_preenche_colunas_tipadas(self, banco_memoria):
+        """Coleta grava payload comprimido e colunas; nova coleta atualiza as colunas"""
+        _, db = banco_memoria(OsDadosExternos)
+
+        registrar_coleta(db, "00012345", OS_DATA, agora=datetime(2025, 10, 1, 8, 0))
+        registrar_coleta(db, "12345", {**OS_DATA, "POTENCIA CV/HP": "2.000"}, agora=datetime(2025, 10, 2, 8, 0))
+        db.commit()
+
+        registro = obter_dados_externos(db, "12345")
+        assert (registro.fabricante, registro.potencia_cv, registro.tensao_alta_v) == ("WEG", 2000.0, 13800.0)
+        dados = serializar_dados_externos(registro)
+        assert dados["campos"]["data_emissao"] == "2025-03-05"
+        assert dados["payload"]["POTENCIA CV/HP"] == "2.000"
@@ -0,0 +1,67 @@
+"""
+Testes da fábrica de engines compartilhada (config/database_config.py)
+"""
+import pytest
+import sys
+import os
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database_config import create_configured_engine, create_read_only_engine, get_connection_info
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """Engine SQLite em arquivo temporário criado pela fábrica"""
+    engine = create_configured_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=3, max_overflow=2)
+    yield engine
+    engine.dispose()
+
+class TestCreateConfiguredEngine:
+    """Testes para create_configured_engine"""
+
+    def test_sqlite_pragmas_aplicados(self, sqlite_engine):
+        """Cada conexão SQLite sai com WAL, busy_timeout e mmap configurados"""
+        with sqlite_engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 30000
+            assert conn.execute(text("PRAGMA mmap_size")).scalar() > 0
+
+    def test_pool_configuravel(self, sqlite_engine):
+        """Parâmetros do pool podem ser sobrescritos por chamada"""
+        info = get_connection_info(sqlite_engine)
+        assert info["pool_class"] == "QueuePool"
+        assert info["pool_size"] == 3
+        assert info["pool_max_overflow"] == 2
+
+    def test_metricas_vivas_do_pool(self, sqlite_engine):
+        """get_connection_info reporta conexões em uso no momento da chamada"""
+        with sqlite_engine.connect():
+            assert get_connection_info(sqlite_engine)["pool_checked_out"] == 1
+        assert get_connection_info(sqlite_engine)["pool_checked_out"] == 0
+
+    def test_sqlite_memoria_sem_pool(self):
+        """Banco em memória usa StaticPool (sem parâmetros de pool)"""
+        engine = create_configured_engine("sqlite://")
+        assert get_connection_info(engine)["pool_class"] == "StaticPool"
+
+class TestCreateReadOnlyEngine:
+    """Testes para o engine somente leitura usado por get_read_db"""
+
+    def test_sqlite_le_mas_nao_escreve(self, sqlite_engine):
+        """Engine de leitura enxerga os dados do escritor e rejeita escrita"""
+        with sqlite_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE itens (id INTEGER PRIMARY KEY)"))
+            conn.execute(text("INSERT INTO itens (id) VALUES (1)"))
+
+        read_engine = create_read_only_engine(str(sqlite_engine.url))
+        try:
+            with read_engine.connect() as conn:
+                assert conn.execute(text("SELECT COUNT(*) FROM itens")).scalar() == 1
+                with pytest.raises(OperationalError):
+                    conn.execute(text("INSERT INTO itens (id) VALUES (2)"))
+        finally:
+            read_engine.dispose()
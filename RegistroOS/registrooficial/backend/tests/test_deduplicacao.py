@@ -0,0 +1,106 @@
+"""
+Testes do índice de deduplicação (app/utils/deduplicacao.py)
+"""
+from sqlalchemy import text
+
+from app.database_models import Cliente, Equipamento, DedupChave, DedupTrigrama
+from app.utils.deduplicacao import (
+    normalizar_nome, normalizar_documento, melhor_candidato, resolver_ou_criar_lote, reconciliar_indice_dedup,
+    _cache_frequencias
+)
+
+MODELOS_DEDUP = (Cliente, Equipamento, DedupChave, DedupTrigrama)
+
+class TestDeduplicacao:
+    """Testes para o índice de deduplicação"""
+
+    def test_normalizacao_ignora_termos_societarios(self):
+        """Acentos, pontuação e LTDA/S.A. não diferenciam nomes"""
+        assert normalizar_nome("Indústria Ação Ltda.") == normalizar_nome("INDUSTRIA ACAO S/A") == "INDUSTRIA ACAO"
+        assert normalizar_documento("cliente", {"cnpj_cpf": "12.345.678/0001-90"}) == "12345678000190"
+        assert normalizar_documento("cliente", {"cnpj_cpf": "000.000.000-00"}) is None
+        assert normalizar_documento("equipamento", {"fabricante": "WEG", "numero_serie": "s/n"}) is None
+
+    def test_prefixo_nao_casa_com_outra_empresa(self, banco_memoria):
+        """'WEG' não reaproveita 'WEGNER' e variações de grafia são reconhecidas"""
+        _, db = banco_memoria(*MODELOS_DEDUP)
+        db.add_all([
+            Cliente(id=1, razao_social="WEGNER EQUIPAMENTOS LTDA"),
+            Cliente(id=2, razao_social="METALÚRGICA SÃO JORGE", cnpj_cpf="12.345.678/0001-90"),
+        ])
+        db.commit()
+
+        assert melhor_candidato(db, "cliente", {"razao_social": "WEG S/A"}) is None
+        assert melhor_candidato(db, "cliente", {"razao_social": "Wegner Equipamento"}).ref_id == 1
+        candidato = melhor_candidato(db, "cliente", {"razao_social": "Outro nome", "cnpj_cpf": "12345678000190"})
+        assert (candidato.ref_id, candidato.criterio) == (2, "documento")
+
+    def test_lote_cria_uma_vez_os_repetidos(self, banco_memoria):
+        """Registros repetidos no mesmo lote reaproveitam o recém-criado"""
+        _, db = banco_memoria(*MODELOS_DEDUP)
+        db.add(Equipamento(id=1, descricao="MOTOR TRIFÁSICO", fabricante="WEG", numero_serie="AB1234"))
+        db.commit()
+
+        def criar(registro):
+            novo = Equipamento(descricao=registro["descricao"], fabricante=registro.get("fabricante"))
+            db.add(novo)
+            db.flush()
+            return novo.id
+
+        ids = resolver_ou_criar_lote(db, "equipamento", [
+            {"descricao": "Gerador síncrono"},
+            {"descricao": "Outro motor", "fabricante": "weg", "numero_serie": "ab-1234"},
+            {"descricao": "GERADOR SINCRONO"},
+        ], criar)
+        assert ids[0] == ids[2] != 1
+        assert ids[1] == 1
+        assert db.query(Equipamento).count() == 2
+
+    def test_lote_casa_variacao_de_um_registro_criado_no_mesmo_lote(self, banco_memoria):
+        """Frequência 0 em cache não esconde o cliente criado no início do lote"""
+        _cache_frequencias.clear()
+        _, db = banco_memoria(*MODELOS_DEDUP)
+
+        def criar(registro):
+            novo = Cliente(razao_social=registro["razao_social"])
+            db.add(novo)
+            db.flush()
+            return novo.id
+
+        ids = resolver_ou_criar_lote(db, "cliente", [
+            {"razao_social": "FUNDICAO PARANAENSE INDUSTRIAL"},
+            {"razao_social": "Fundição Paranaense Industria"},
+        ], criar)
+        assert ids == [1, 1]
+        assert db.query(Cliente).count() == 1
+
+    def test_indice_acompanha_alteracoes_e_exclusoes(self, banco_memoria):
+        """Renomear/excluir via ORM atualiza o índice; SQL direto é corrigido pela reconciliação"""
+        _, db = banco_memoria(*MODELOS_DEDUP)
+        db.add_all([Cliente(id=1, razao_social="ACME MOTORES"), Cliente(id=2, razao_social="BETA BOMBAS")])
+        db.commit()
+        assert melhor_candidato(db, "cliente", {"razao_social": "ACME MOTORES"}).ref_id == 1
+
+        db.get(Cliente, 1).razao_social = "GAMA GERADORES"
+        db.delete(db.get(Cliente, 2))
+        db.commit()
+        assert melhor_candidato(db, "cliente", {"razao_social": "ACME MOTORES"}) is None
+        assert melhor_candidato(db, "cliente", {"razao_social": "GAMA GERADORES"}).ref_id == 1
+        assert melhor_candidato(db, "cliente", {"razao_social": "BETA BOMBAS"}) is None
+
+        # SQL direto: renomeia e troca o registro de maior id (rowid reaproveitado no SQLite)
+        db.add(Cliente(id=3, razao_social="DELTA TRAFOS"))
+        db.commit()
+        melhor_candidato(db, "cliente", {"razao_social": "DELTA TRAFOS"})
+        db.execute(text("UPDATE clientes SET razao_social = 'EPSILON ELETRICA' WHERE id = 1"))
+        db.execute(text("DELETE FROM clientes WHERE id = 3"))
+        db.execute(text("INSERT INTO clientes (id, razao_social) VALUES (3, 'ZETA ZINCAGEM')"))
+        db.commit()
+        assert melhor_candidato(db, "cliente", {"razao_social": "DELTA TRAFOS"}).ref_id == 3  # Chaves defasadas
+
+        assert reconciliar_indice_dedup(db) == 2
+        db.commit()
+        assert melhor_candidato(db, "cliente", {"razao_social": "DELTA TRAFOS"}) is None
+        assert melhor_candidato(db, "cliente", {"razao_social": "ZETA ZINCAGEM"}).ref_id == 3
+        assert melhor_candidato(db, "cliente", {"razao_social": "EPSILON ELETRICA"}).ref_id == 1
+        assert reconciliar_indice_dedup(db) == 0
@@ -0,0 +1,201 @@
+"""
+Testes do executor local de tasks sem Celery (tasks/executor_local.py)
+"""
+import sys
+import os
+import asyncio
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database_config import create_configured_engine
+from app.database_models import Base, JobScraping
+from tasks.executor_local import ExecutorLocal, ResultadoLocal, tarefa_local, criar_job
+
+# Tasks de teste: importadas pelo nome nos processos do pool
+@tarefa_local(bind=True)
+def tarefa_demorada(self, nome, segundos):
+    self.update_state(state='PROGRESS', meta={'progress': 50, 'status': f'Executando {nome}'})
+    time.sleep(segundos)
+    return {"nome": nome, "fim": time.time(), "pid": os.getpid()}
+
+@tarefa_local(bind=True)
+def tarefa_instavel(self):
+    if self.request.retries < 1:
+        raise self.retry(countdown=0, exc=RuntimeError("site fora do ar"))
+    return {"tentativas": self.request.retries}
+
+@tarefa_local
+def tarefa_com_erro():
+    raise ValueError("OS inválida")
+
+@tarefa_local(bind=True)
+def tarefa_na_fila(self, usuario, segundos):
+    from app.utils.fila_scraping import fila_scraping, LOTE
+    with fila_scraping.vez(LOTE, usuario, self.request.id, timeout=30):
+        inicio = time.time()
+        time.sleep(segundos)
+        return {"inicio": inicio, "fim": time.time(), "pid": os.getpid()}
+
+@tarefa_local
+def tarefa_nao_encontrada(numero_os):
+    from app.utils.single_flight import single_flight
+    single_flight.marcar_nao_encontrada(numero_os)
+    return {"pid": os.getpid()}
+
+@tarefa_local
+def tarefa_que_derruba_o_processo():
+    os._exit(1)
+
+class TestExecutorLocal:
+    """Testes para prioridade, execução fora do processo da API, retry e retomada"""
+
+    def _banco(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'jobs.db'}"
+        engine = create_configured_engine(url)
+        Base.metadata.create_all(bind=engine, tables=[JobScraping.__table__])
+        engine.dispose()
+        return url
+
+    async def _aguardar(self, executor, url, task_ids, timeout=60):
+        limite = time.monotonic() + timeout
+        while not all(ResultadoLocal(t, url).ready() for t in task_ids):
+            assert time.monotonic() < limite, "jobs não terminaram"
+            await asyncio.sleep(0.1)
+        await executor.aguardar_fila()
+        await executor.encerrar()
+
+    def test_prioridade_e_estado_persistido(self, tmp_path):
+        """Com um processo ocupado, a task interativa (prioridade 0) passa na frente do lote"""
+        url = self._banco(tmp_path)
+        executor = ExecutorLocal({"workers": 1, "database_url": url})
+        terminados = []
+        executor.ao_terminar(lambda task_id, nome, args: terminados.append(task_id))
+
+        async def cenario():
+            executor.iniciar()
+            executor.enviar(tarefa_demorada, ["primeira", 1.0], {}, "primeira", 9)
+            await asyncio.sleep(0.5)  # Primeira já em execução no processo do pool
+            executor.enviar(tarefa_demorada, ["lote", 0], {}, "lote", 9)
+            executor.enviar(tarefa_demorada, ["interativa", 0], {}, "interativa", 0)
+            assert ResultadoLocal("lote", url).state == "PENDING"
+            await self._aguardar(executor, url, ["primeira", "lote", "interativa"])
+
+        asyncio.run(cenario())
+        interativa, lote = ResultadoLocal("interativa", url), ResultadoLocal("lote", url)
+        assert (interativa.state, lote.state) == ("SUCCESS", "SUCCESS")
+        assert interativa.result["fim"] < lote.result["fim"]
+        assert interativa.result["pid"] != os.getpid()
+        assert terminados == ["primeira", "interativa", "lote"]
+        assert ResultadoLocal("desconhecida", url).state == "PENDING"
+
+    def test_retry_falha_e_retomada_apos_reinicio(self, tmp_path):
+        """self.retry reagenda; erro vira FAILURE; job PENDING de outra execução é retomado"""
+        url = self._banco(tmp_path)
+        criar_job("retomado", tarefa_demorada.__module__, "tarefa_demorada", ["retomado", 0], {}, 5, url)
+        executor = ExecutorLocal({"workers": 2, "database_url": url})
+
+        async def cenario():
+            executor.iniciar()
+            executor.enviar(tarefa_instavel, [], {}, "instavel")
+            executor.enviar(tarefa_com_erro, [], {}, "erro")
+            await self._aguardar(executor, url, ["retomado", "instavel", "erro"])
+
+        asyncio.run(cenario())
+        assert ResultadoLocal("retomado", url).result["nome"] == "retomado"
+        assert ResultadoLocal("instavel", url).result == {"tentativas": 1}
+        erro = ResultadoLocal("erro", url)
+        assert erro.state == "FAILURE" and "OS inválida" in str(erro.info)
+
+        engine = create_configured_engine(url)
+        db = sessionmaker(bind=engine)()
+        assert db.query(JobScraping).filter(JobScraping.id == "instavel").one().tentativas == 1
+        db.close()
+        engine.dispose()
+
+    def test_processo_reservado_para_consulta_interativa(self, tmp_path):
+        """Dois lotes e dois processos: o segundo lote espera e a consulta interativa roda na hora"""
+        url = self._banco(tmp_path)
+        executor = ExecutorLocal({"workers": 2, "workers_interativos": 1, "database_url": url})
+
+        async def cenario():
+            executor.iniciar()
+            executor.enviar(tarefa_demorada, ["lote_1", 1.5], {}, "lote_1", 9)
+            executor.enviar(tarefa_demorada, ["lote_2", 0], {}, "lote_2", 9)
+            await asyncio.sleep(0.5)
+            assert executor.status()["lotes_aguardando_processo"] == 1
+            executor.enviar(tarefa_demorada, ["interativa", 0], {}, "interativa", 0)
+            await self._aguardar(executor, url, ["lote_1", "lote_2", "interativa"])
+
+        asyncio.run(cenario())
+        lote_1, lote_2, interativa = (ResultadoLocal(t, url).result for t in ("lote_1", "lote_2", "interativa"))
+        assert interativa["fim"] < lote_1["fim"] < lote_2["fim"]
+        assert executor.status()["lotes_aguardando_processo"] == 0
+
+    def test_vez_no_site_decidida_no_processo_da_api(self, tmp_path):
+        """Dois processos do pool, um slot: a fila da API serializa o acesso ao site"""
+        from app.utils.fila_scraping import fila_scraping, LOTE
+        url = self._banco(tmp_path)
+        executor = ExecutorLocal({"workers": 2, "workers_interativos": 0, "database_url": url})
+        config_original = dict(fila_scraping.config)
+        fila_scraping.config.update(slots=1, slots_interativos=0)
+        concluidas = fila_scraping.status()["filas"][LOTE]["concluidas_na_janela"]
+
+        async def cenario():
+            executor.iniciar()
+            executor.enviar(tarefa_na_fila, [1, 0.5], {}, "usuario_1")
+            executor.enviar(tarefa_na_fila, [2, 0.5], {}, "usuario_2")
+            await self._aguardar(executor, url, ["usuario_1", "usuario_2"])
+
+        try:
+            asyncio.run(cenario())
+        finally:
+            fila_scraping.config.clear()
+            fila_scraping.config.update(config_original)
+
+        primeiro, segundo = sorted((ResultadoLocal(t, url).result for t in ("usuario_1", "usuario_2")),
+                                   key=lambda r: r["inicio"])
+        assert primeiro["pid"] != segundo["pid"]
+        assert primeiro["fim"] <= segundo["inicio"]
+        assert fila_scraping.status()["filas"][LOTE]["concluidas_na_janela"] == concluidas + 2
+
+    def test_cache_negativo_marcado_no_processo_do_pool_vale_na_api(self, tmp_path):
+        """OS não encontrada num processo do pool entra no cache negativo consultado pelas rotas"""
+        from app.utils.single_flight import single_flight
+        url = self._banco(tmp_path)
+        executor = ExecutorLocal({"workers": 1, "database_url": url})
+        assert not single_flight.nao_encontrada("987654")
+
+        async def cenario():
+            executor.iniciar()
+            executor.enviar(tarefa_nao_encontrada, ["987654"], {}, "nao_encontrada")
+            await self._aguardar(executor, url, ["nao_encontrada"])
+
+        try:
+            asyncio.run(cenario())
+            assert ResultadoLocal("nao_encontrada", url).result["pid"] != os.getpid()
+            assert single_flight.nao_encontrada("987654")
+        finally:
+            single_flight._negativos.pop("987654", None)
+
+    def test_processo_morto_recria_o_pool(self, tmp_path):
+        """BrokenProcessPool: o job vira FAILURE, o pool quebrado é encerrado e os próximos rodam"""
+        url = self._banco(tmp_path)
+        executor = ExecutorLocal({"workers": 1, "database_url": url})
+
+        async def cenario():
+            executor.iniciar()
+            pool_quebrado = executor._pool
+            executor.enviar(tarefa_que_derruba_o_processo, [], {}, "derrubada")
+            await executor.aguardar_fila()
+            assert executor._pool is not pool_quebrado
+            assert pool_quebrado._shutdown_thread
+            executor.enviar(tarefa_demorada, ["depois", 0], {}, "depois")
+            await self._aguardar(executor, url, ["derrubada", "depois"])
+
+        asyncio.run(cenario())
+        assert ResultadoLocal("derrubada", url).state == "FAILURE"
+        assert ResultadoLocal("depois", url).state == "SUCCESS"
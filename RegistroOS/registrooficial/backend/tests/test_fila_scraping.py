@@ -0,0 +1,80 @@
+"""
+Testes da fila de scraping com prioridade e justiça por usuário (app/utils/fila_scraping.py)
+"""
+import sys
+import os
+
+import pytest
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.fila_scraping import FilaScraping, INTERATIVO, LOTE
+
+class TestFilaScraping:
+    """Testes para prioridade interativa, round-robin de lotes e contrapressão"""
+
+    def test_interativo_passa_na_frente_do_lote(self):
+        """Com uma consulta interativa aguardando, nenhum item de lote ocupa o slot livre"""
+        fila = FilaScraping({"backend": "memory", "slots": 2, "slots_interativos": 1})
+        assert fila.tentar_vez(LOTE, 1, "lote_a:0")
+        assert not fila.tentar_vez(LOTE, 2, "lote_b:0")  # Slot restante reservado às interativas
+        assert fila.tentar_vez(INTERATIVO, 3, "consulta_1")
+        assert not fila.tentar_vez(INTERATIVO, 4, "consulta_2")  # Todos os slots ocupados
+
+        fila.sair("lote_a:0")
+        assert not fila.tentar_vez(LOTE, 2, "lote_b:0")  # Interativa aguardando fica com o slot
+        assert fila.tentar_vez(INTERATIVO, 4, "consulta_2")
+
+        fila.sair("consulta_1")
+        assert fila.tentar_vez(LOTE, 2, "lote_b:0")
+
+    def test_lotes_intercalados_por_usuario(self):
+        """Usuário com lote grande não monopoliza: a vez alterna entre usuários"""
+        fila = FilaScraping({"backend": "memory", "slots": 1, "slots_interativos": 0})
+        for i in range(3):
+            fila.tentar_vez(LOTE, "grande", f"grande:{i}")
+        fila.tentar_vez(LOTE, "pequeno", "pequeno:0")
+
+        ordem = []
+        pendentes = {"grande:0": "grande", "grande:1": "grande", "grande:2": "grande", "pequeno:0": "pequeno"}
+        while pendentes:
+            vez = next(t for t, u in pendentes.items() if fila.tentar_vez(LOTE, u, t))
+            ordem.append(vez)
+            del pendentes[vez]
+            fila.sair(vez)
+        assert ordem == ["grande:0", "pequeno:0", "grande:1", "grande:2"]
+
+    def test_contrapressao_e_estimativa_pela_vazao(self):
+        """Acima do limite: recusa com Retry-After; espera estimada pela vazão recente"""
+        fila = FilaScraping({"backend": "memory", "slots": 1, "max_lote": 10, "max_lote_usuario": 6, "segundos_por_os": 10})
+        assert fila.admitir(LOTE, 1, "lote_1", itens=6).aceita
+
+        por_usuario = fila.admitir(LOTE, 1, "lote_2", itens=1)
+        assert (por_usuario.aceita, por_usuario.motivo) == (False, "limite_lote_usuario")
+        assert por_usuario.retry_after >= 1
+
+        assert fila.admitir(LOTE, 2, "lote_3", itens=4).aceita
+        cheia = fila.admitir(LOTE, 3, "lote_4", itens=5)
+        assert (cheia.aceita, cheia.motivo) == (False, "fila_lote_cheia")
+
+        for i in range(6):
+            with fila.vez(LOTE, 1, f"lote_1:{i}", timeout=1):
+                pass
+            fila.consumir("lote_1")
+        status = fila.status()["filas"][LOTE]
+        assert status["pendentes"] == 4 and status["concluidas_na_janela"] == 6
+        assert status["vazao_por_minuto"] == 6.0  # 6 OS na janela mínima de 60s
+        assert status["espera_estimada_segundos"] == 40
+        assert fila.admitir(LOTE, 3, "lote_4", itens=5).aceita
+
+    def test_com_celery_exige_redis(self):
+        """auto escolhe redis com Celery; Redis inacessível falha em vez de slots por processo"""
+        redis_fora = "redis://127.0.0.1:1/0"
+        com_celery = FilaScraping({"backend": "auto", "exigir_redis": True, "redis_url": redis_fora})
+        with pytest.raises(RuntimeError):
+            com_celery.tentar_vez(INTERATIVO, 1, "consulta_1")
+        assert com_celery._estado["ativos"] == {}
+
+        sem_celery = FilaScraping({"backend": "redis", "exigir_redis": False, "redis_url": redis_fora})
+        assert sem_celery.status()["backend"] == "memory"
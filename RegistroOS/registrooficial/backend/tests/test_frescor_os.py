@@ -0,0 +1,52 @@
+"""
+Testes do controle de frescor das OS coletadas (app/utils/frescor_os.py)
+"""
+from datetime import datetime, timedelta
+
+from app.database_models import OsDadosExternos
+from app.utils.frescor_os import ttl_para_status, hash_conteudo, registrar_coleta, avaliar_frescor
+
+CONFIG = {"ttl_padrao": 86400, "ttl_por_status": {"EM ANDAMENTO": 3600}, "status_fechados": {"FINALIZADA", "CANCELADA"}}
+
+class TestFrescorOS:
+    """Testes para o frescor das OS coletadas"""
+
+    def test_ttl_por_status_e_hash_estavel(self):
+        """OS fechada nunca revalida; hash ignora ordem das chaves e espaços"""
+        assert ttl_para_status("finalizada", CONFIG) is None
+        assert ttl_para_status("EM ANDAMENTO", CONFIG) == 3600
+        assert ttl_para_status(None, CONFIG) == 86400
+        assert hash_conteudo({"OS": "1", "CLIENTE": "ACME "}) == hash_conteudo({"CLIENTE": "ACME", "OS": "1"})
+        assert hash_conteudo({"OS": "1"}) != hash_conteudo({"OS": "2"})
+
+    def test_coleta_igual_so_atualiza_scraped_at(self, banco_memoria):
+        """Mesma coleta não conta como alteração; conteúdo novo guarda o status anterior"""
+        _, db = banco_memoria(OsDadosExternos)
+        t0 = datetime(2025, 10, 1, 8, 0)
+
+        assert registrar_coleta(db, "00012345", {"OS": "12345", "STATUS DA OS": "ABERTA"}, agora=t0).alterado
+        repetida = registrar_coleta(db, "12345", {"STATUS DA OS": "ABERTA", "OS": "12345"}, agora=t0 + timedelta(hours=2))
+        assert not repetida.alterado
+
+        registro = db.query(OsDadosExternos).one()
+        assert (registro.scraped_at, registro.alterado_em) == (t0 + timedelta(hours=2), t0)
+
+        nova = registrar_coleta(db, "12345", {"OS": "12345", "STATUS DA OS": "EM ANDAMENTO"}, agora=t0 + timedelta(hours=3))
+        assert (nova.alterado, nova.status_anterior) == (True, "ABERTA")
+        assert db.query(OsDadosExternos).count() == 1
+
+    def test_estados_de_frescor(self, banco_memoria):
+        """Sem coleta, fresca, velha pelo TTL do status externo e fechada"""
+        _, db = banco_memoria(OsDadosExternos)
+        t0 = datetime(2025, 10, 1, 8, 0)
+
+        assert avaliar_frescor(db, "777", "ABERTA", agora=t0, config=CONFIG).estado == "sem_coleta"
+        assert avaliar_frescor(db, "777", "CANCELADA", agora=t0, config=CONFIG).estado == "fechado"
+
+        registrar_coleta(db, "777", {"OS": "777", "STATUS DA OS": "EM ANDAMENTO"}, agora=t0)
+        assert avaliar_frescor(db, "777", "ABERTA", agora=t0 + timedelta(minutes=30), config=CONFIG).estado == "fresco"
+        velho = avaliar_frescor(db, "777", "ABERTA", agora=t0 + timedelta(hours=2), config=CONFIG)
+        assert (velho.estado, velho.revalidar, velho.ttl) == ("velho", True, 3600)
+
+        registrar_coleta(db, "777", {"OS": "777", "STATUS DA OS": "FINALIZADA"}, agora=t0)
+        assert not avaliar_frescor(db, "777", "ABERTA", agora=t0 + timedelta(days=365), config=CONFIG).revalidar
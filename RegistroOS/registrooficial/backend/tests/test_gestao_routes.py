@@ -0,0 +1,107 @@
+"""
+Testes das consultas agregadas dos endpoints de gestão (routes/gestao_routes.py)
+"""
+import pytest
+import sys
+import os
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database_config import create_configured_engine
+from app.database_models import Base, OrdemServico, ApontamentoDetalhado, Setor, Departamento
+from app.utils.resumo_diario import reconstruir_resumo_diario
+from app.utils.response_cache import response_cache
+from routes.gestao_routes import (
+    get_dashboard, get_relatorio_producao, get_eficiencia_setores, get_ordens_por_setor
+)
+
+INICIO = date(2025, 3, 1)
+FIM = date(2025, 3, 31)
+
+@pytest.fixture
+def db():
+    """Banco SQLite em memória: 2 setores do mesmo departamento, OS e apontamentos de março"""
+    response_cache.limpar()
+    engine = create_configured_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    session.add(Departamento(id=1, nome_tipo="MOTORES"))
+    session.add_all([
+        Setor(id=1, nome="BOBINAGEM", departamento="MOTORES", area_tipo="PRODUCAO", id_departamento=1),
+        Setor(id=2, nome="MONTAGEM", departamento="MOTORES", area_tipo="PRODUCAO", id_departamento=1)
+    ])
+    criacao = datetime(2025, 3, 5, 8, 0)
+    session.add_all([
+        # Concluídas: 10h previstas em 8h e 10h previstas em 12h -> 20/20 = 100%
+        OrdemServico(id=1, os_numero="1001", status_os="CONCLUIDA", id_departamento=1, id_setor=1,
+                     horas_previstas=10, horas_reais=8, data_criacao=criacao),
+        OrdemServico(id=2, os_numero="1002", status_os="CONCLUIDA", id_departamento=1, id_setor=2,
+                     horas_previstas=10, horas_reais=12, data_criacao=criacao),
+        # Em andamento: horas parciais não entram na eficiência
+        OrdemServico(id=3, os_numero="1003", status_os="EM ANDAMENTO", id_departamento=1, id_setor=1,
+                     horas_previstas=40, horas_reais=2, data_criacao=criacao),
+        # Fora do período
+        OrdemServico(id=4, os_numero="1004", status_os="CONCLUIDA", id_departamento=1, id_setor=1,
+                     horas_previstas=5, horas_reais=50, data_criacao=datetime(2025, 4, 2))
+    ])
+    for i, (id_setor, horas, retrabalho) in enumerate([(1, 2, False), (1, 4, True), (1, 2, False), (2, 3, False)]):
+        inicio = datetime(2025, 3, 10 + i, 8, 0)
+        session.add(ApontamentoDetalhado(
+            id_os=1 + i % 2, id_usuario=1, id_setor=id_setor, status_apontamento="CONCLUIDO",
+            data_hora_inicio=inicio, data_hora_fim=inicio + timedelta(hours=horas), foi_retrabalho=retrabalho
+        ))
+    session.commit()
+    reconstruir_resumo_diario(session)
+    session.commit()
+
+    yield session
+    session.close()
+    engine.dispose()
+    response_cache.limpar()
+
+def _chamar(endpoint, db, **filtros):
+    return asyncio.run(endpoint(db=db, data_inicio=INICIO, data_fim=FIM, **filtros))
+
+class TestGestaoRoutes:
+    """Testes para filtros, agregações condicionais e a definição única de eficiência"""
+
+    def test_eficiencia_horas_igual_no_dashboard_e_no_relatorio(self, db):
+        """Previstas / reais das OS concluídas nos dois endpoints"""
+        relatorio = _chamar(get_relatorio_producao, db, periodo=None, departamento=None, setor=None)
+        assert (relatorio["total_ordens"], relatorio["ordens_concluidas"], relatorio["ordens_em_andamento"]) == (3, 2, 1)
+        assert (relatorio["total_horas_reais"], relatorio["total_horas_orcadas"]) == (22.0, 60.0)
+        assert relatorio["eficiencia_horas"] == 100.0
+
+        dashboard = _chamar(get_dashboard, db, periodo=None, departamento=None, setor=None)
+        assert dashboard["metricas_principais"]["total_os"] == 3
+        assert dashboard["metricas_principais"]["taxa_conclusao"] == 66.7
+        [motores] = dashboard["performance_departamentos"]
+        assert (motores["departamento"], motores["eficiencia"]) == ("MOTORES", 100.0)
+
+        so_bobinagem = _chamar(get_relatorio_producao, db, periodo=None, departamento=None, setor="BOBINAGEM")
+        assert so_bobinagem["eficiencia_horas"] == 125.0  # 10h previstas concluídas em 8h
+        assert _chamar(get_dashboard, db, periodo=None, departamento="1", setor="1")[
+            "performance_departamentos"][0]["eficiencia"] == 125.0
+
+    def test_eficiencia_setores_pelo_resumo_diario(self, db):
+        """Horas e retrabalhos por setor lidos do rollup, filtrados por período e setor"""
+        linhas = _chamar(get_eficiencia_setores, db, periodo=None, tipoEquipamento="todos", departamento=None, setor=None)
+        bobinagem, montagem = linhas
+        assert (bobinagem["setor"], bobinagem["horas_trabalhadas"], bobinagem["total_apontamentos"]) == ("BOBINAGEM", 8.0, 3)
+        assert (bobinagem["retrabalhos"], bobinagem["eficiencia"]) == (1, 66.7)
+        assert (montagem["setor"], montagem["eficiencia"]) == ("MONTAGEM", 100.0)
+
+        assert _chamar(get_eficiencia_setores, db, periodo=None, tipoEquipamento="todos",
+                       departamento=None, setor="MONTAGEM") == [montagem]
+
+    def test_ordens_por_setor_respeita_o_periodo(self, db):
+        """OS criada fora do intervalo não entra na contagem do setor"""
+        linhas = _chamar(get_ordens_por_setor, db, periodo=None, tipoEquipamento="todos", departamento=None, setor=None)
+        por_setor = {linha["setor"]: (linha["total_ordens"], linha["concluidas"], linha["em_andamento"]) for linha in linhas}
+        assert por_setor == {"BOBINAGEM": (2, 1, 1), "MONTAGEM": (1, 1, 0)}
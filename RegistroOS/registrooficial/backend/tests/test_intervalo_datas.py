@@ -0,0 +1,36 @@
+"""
+Testes dos filtros de intervalo de datas (app/utils/intervalo_datas.py)
+"""
+import sys
+import os
+from datetime import date, datetime, timezone
+
+from sqlalchemy import and_
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.intervalo_datas import intervalo_dias, interpretar_data, para_local, filtro_dia
+from app.database_models import Pendencia
+
+class TestIntervaloDatas:
+    """Testes para a conversão de dias em intervalos semiabertos"""
+
+    def test_intervalo_semiaberto_com_fim_inclusivo(self):
+        """data_fim inclusiva vira limite exclusivo no dia seguinte"""
+        inicio, fim = intervalo_dias("2025-01-31", date(2025, 2, 28))
+        assert inicio == datetime(2025, 1, 31)
+        assert fim == datetime(2025, 3, 1)
+        assert intervalo_dias(None, "inválida") == (None, None)
+        assert interpretar_data("2025-05-01T10:00:00") == date(2025, 5, 1)
+
+    def test_converte_fuso_para_horario_local(self):
+        """Datetimes com fuso são levados para America/Sao_Paulo (UTC-3)"""
+        assert para_local(datetime(2025, 5, 2, 1, 30, tzinfo=timezone.utc)) == datetime(2025, 5, 1, 22, 30)
+        assert interpretar_data(datetime(2025, 5, 2, 1, 30, tzinfo=timezone.utc)) == date(2025, 5, 1)
+
+    def test_filtro_dia_nao_envolve_coluna_em_funcao(self):
+        """Predicado compara a coluna diretamente (usa índice)"""
+        filtros = filtro_dia(Pendencia.data_inicio, "2025-05-01")
+        assert str(and_(*filtros)) == "pendencias.data_inicio >= :data_inicio_1 AND pendencias.data_inicio < :data_inicio_2"
+        assert filtro_dia(Pendencia.data_inicio, "xx") == []
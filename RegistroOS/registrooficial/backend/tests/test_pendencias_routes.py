@@ -0,0 +1,36 @@
+"""
+Testes da listagem de pendências (routes/desenvolvimento.py: get_pendencias)
+"""
+import asyncio
+from datetime import datetime
+
+from fastapi import Response
+from sqlalchemy import text
+
+from app.database_models import Usuario
+
+class TestPendenciasRoutes:
+    """Testes para a listagem de pendências"""
+
+    def test_os_numero_repetido_nao_duplica_pendencia(self, banco_memoria):
+        """Duas OS com o mesmo número: a pendência aparece uma vez, com o equipamento da OS de menor id"""
+        from routes.desenvolvimento import get_pendencias
+
+        _, db = banco_memoria()
+        db.execute(text("INSERT INTO equipamentos (id, descricao) VALUES (1, 'MOTOR WEG'), (2, 'GERADOR')"))
+        db.execute(text(
+            "INSERT INTO ordens_servico (id, os_numero, id_equipamento) VALUES (1, '12345', 1), (2, '12345', 2)"
+        ))
+        db.execute(text(
+            "INSERT INTO pendencias (numero_os, cliente, data_inicio, id_responsavel_inicio, tipo_maquina, "
+            "descricao_maquina, descricao_pendencia, status) "
+            "VALUES ('12345', 'ACME', :data, 1, 'MOTOR', 'MOTOR', 'PENDENTE', 'ABERTA')"
+        ), {"data": datetime(2025, 3, 1, 8)})
+        db.commit()
+
+        admin = Usuario(id=1, nome_completo="admin", privilege_level="ADMIN")
+        resultado = asyncio.run(get_pendencias(
+            response=Response(), data=None, status=None, limite=50, cursor=None, current_user=admin, db=db
+        ))
+
+        assert [(p["numero_os"], p["equipamento"]) for p in resultado] == [("12345", "MOTOR WEG")]
@@ -0,0 +1,145 @@
+"""
+Testes do verificador de planos de consulta (app/utils/query_plan_checker.py)
+"""
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.query_plan_checker import capturar_consultas, verificar_consultas
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tabelas criadas pelas próprias migrações (o schema inicial vem dos modelos)
+TABELAS_DAS_MIGRACOES = {"apontamentos_resumo_diario", "dedup_chaves", "dedup_trigramas", "os_dados_externos", "scraping_jobs"}
+
+# Rotas de listagem filtrada cobertas pelos índices das migrações (003, 004)
+ROTAS_INDEXADAS = [
+    "/api/desenvolvimento/pendencias",
+    "/api/desenvolvimento/pendencias?status=ABERTA",
+    "/api/desenvolvimento/os/apontamentos/meus",
+    "/api/apontamentos-detalhados",
+    "/api/pcp/pendencias/dashboard",
+]
+
+@pytest.fixture
+def banco_migrado(tmp_path):
+    """Schema dos modelos anterior às migrações + alembic upgrade head, com dados acima do limite"""
+    from alembic import command
+    from alembic.config import Config
+    from config.database_config import create_configured_engine
+    from app.database_models import Base
+
+    url = f"sqlite:///{tmp_path / 'migrado.db'}"
+    engine = create_configured_engine(url)
+    Base.metadata.create_all(bind=engine, tables=[
+        t for t in Base.metadata.sorted_tables if t.name not in TABELAS_DAS_MIGRACOES
+    ])
+    with engine.begin() as conn:
+        # Coluna e índice adicionados pela migração 004
+        conn.execute(text("DROP INDEX ix_ordens_servico_ultima_atividade"))
+        conn.execute(text("ALTER TABLE ordens_servico DROP COLUMN ultima_atividade"))
+
+    config = Config()
+    config.set_main_option("script_location", os.path.join(BACKEND, "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+    inicio = datetime(2025, 3, 1, 8, 0)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO tipo_departamentos (id, nome_tipo) VALUES (1, 'MOTORES')"))
+        conn.execute(text(
+            "INSERT INTO tipo_setores (id, nome, departamento, area_tipo, id_departamento) "
+            "VALUES (1, 'BOBINAGEM', 'MOTORES', 'PRODUCAO', 1), (2, 'MONTAGEM', 'MOTORES', 'PRODUCAO', 1)"
+        ))
+        conn.execute(text(
+            "INSERT INTO tipo_usuarios (id, nome_completo, nome_usuario, email, senha_hash, setor, departamento, "
+            "privilege_level, is_approved, trabalha_producao, primeiro_login, id_setor, id_departamento) "
+            "VALUES (:id, :nome, :nome, :email, 'x', 'BOBINAGEM', 'MOTORES', 'USER', 1, 1, 0, 1, 1)"
+        ), [{"id": i, "nome": f"tecnico{i}", "email": f"tecnico{i}@registroos"} for i in (1, 2)])
+        conn.execute(text(
+            "INSERT INTO ordens_servico (id, os_numero, status_os, id_setor, id_departamento, data_criacao) "
+            "VALUES (:id, :numero, 'ABERTA', 1, 1, :data)"
+        ), [{"id": i, "numero": str(10000 + i), "data": inicio + timedelta(hours=i)} for i in range(1, 301)])
+        conn.execute(text(
+            "INSERT INTO apontamentos_detalhados (id_os, id_usuario, id_setor, data_hora_inicio, data_hora_fim, status_apontamento) "
+            "VALUES (:os, :usuario, :setor, :inicio, :fim, 'CONCLUIDO')"
+        ), [{"os": i % 300 + 1, "usuario": i % 2 + 1, "setor": i % 2 + 1,
+             "inicio": inicio + timedelta(hours=i), "fim": inicio + timedelta(hours=i + 1)} for i in range(600)])
+        conn.execute(text(
+            "INSERT INTO pendencias (numero_os, cliente, data_inicio, id_responsavel_inicio, tipo_maquina, "
+            "descricao_maquina, descricao_pendencia, status) VALUES (:numero, 'ACME', :data, 1, 'MOTOR', 'MOTOR', 'PENDENTE', :status)"
+        ), [{"numero": str(10000 + i % 300 + 1), "data": inicio + timedelta(hours=i),
+             "status": "ABERTA" if i % 3 else "FECHADA"} for i in range(300)])
+        conn.execute(text("ANALYZE"))
+
+    yield engine
+    engine.dispose()
+
+class TestQueryPlanChecker:
+    """Testes para a detecção de varreduras completas no SQLite"""
+
+    def test_reprova_scan_e_aprova_com_indice(self):
+        """SCAN em tabela acima do limite reprova; com índice a consulta passa"""
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE pendencias (id INTEGER PRIMARY KEY, status TEXT, data_inicio TEXT)"))
+            conn.execute(
+                text("INSERT INTO pendencias (status, data_inicio) VALUES (:s, :d)"),
+                [{"s": "ABERTA" if i % 2 else "FECHADA", "d": f"2025-01-{i % 28 + 1:02d}"} for i in range(50)]
+            )
+
+        with capturar_consultas(engine) as consultas:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT p.id FROM pendencias p WHERE p.status = :s"), {"s": "ABERTA"}).fetchall()
+
+        violacoes = verificar_consultas(engine, consultas, limite_linhas=10)
+        assert [v.tabela for v in violacoes] == ["pendencias"]
+        assert verificar_consultas(engine, consultas, limite_linhas=100) == []
+
+        with engine.begin() as conn:
+            conn.execute(text("CREATE INDEX ix_pendencias_status ON pendencias (status)"))
+        assert verificar_consultas(engine, consultas, limite_linhas=10) == []
+
+    def test_rotas_indexadas_sem_scan_no_schema_migrado(self, banco_migrado):
+        """Consultas das rotas de listagem usam os índices das migrações (nenhum SCAN completo)"""
+        from fastapi.testclient import TestClient
+        from main import app
+        from config.database_config import get_db, get_read_db
+        from app.database_models import Usuario
+        from app.dependencies import get_current_user
+        from app.utils.response_cache import response_cache
+
+        Sessao = sessionmaker(bind=banco_migrado, autoflush=False)
+
+        def sessao_de_teste():
+            db = Sessao()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        db = Sessao()
+        usuario = db.query(Usuario).filter(Usuario.id == 1).one()
+        overrides = {get_db: sessao_de_teste, get_read_db: sessao_de_teste, get_current_user: lambda: usuario}
+        app.dependency_overrides.update(overrides)
+        response_cache.limpar()
+        try:
+            cliente = TestClient(app)
+            with capturar_consultas(banco_migrado) as consultas:
+                for rota in ROTAS_INDEXADAS:
+                    assert cliente.get(rota).status_code == 200, rota
+        finally:
+            for dependencia in overrides:
+                app.dependency_overrides.pop(dependencia, None)
+            response_cache.limpar()
+            db.close()
+
+        assert consultas
+        assert [str(v) for v in verificar_consultas(banco_migrado, consultas, limite_linhas=100)] == []
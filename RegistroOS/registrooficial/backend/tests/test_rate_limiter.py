@@ -0,0 +1,47 @@
+"""
+Testes do limitador de taxa por site (app/utils/rate_limiter.py)
+"""
+import sys
+import os
+import threading
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.rate_limiter import LimitadorTaxa, chave_do_site, limitador_do_site
+
+class TestRateLimiter:
+    """Testes para rajada, ritmo entre threads e limitadores por site"""
+
+    def test_rajada_imediata_e_depois_intervalo(self):
+        """As primeiras `rajada` reservas não esperam; as seguintes seguem a taxa"""
+        limitador = LimitadorTaxa("teste", taxa=10, rajada=3, config={"backend": "memory"})
+        esperas = [limitador.reservar() for _ in range(5)]
+
+        assert esperas[:3] == [0.0, 0.0, 0.0]
+        assert 0.05 < esperas[3] <= 0.1
+        assert 0.15 < esperas[4] <= 0.2
+
+    def test_threads_respeitam_a_taxa(self):
+        """Reservas concorrentes recebem horários distintos"""
+        limitador = LimitadorTaxa("teste", taxa=100, rajada=1, config={"backend": "memory"})
+        esperas = []
+
+        def reservar():
+            esperas.append(limitador.reservar())
+
+        threads = [threading.Thread(target=reservar) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert max(esperas) > 0.18
+        assert len({round(e, 3) for e in esperas}) == 20
+
+    def test_limitador_por_host(self):
+        """Mesma instância para o mesmo host; taxa 0 desliga o limite"""
+        assert chave_do_site("https://Sistema.Exemplo.com/login") == "sistema.exemplo.com"
+        assert limitador_do_site("https://sistema.exemplo.com/a") is limitador_do_site("https://sistema.exemplo.com/b")
+        assert limitador_do_site("https://outro.exemplo.com") is not limitador_do_site("https://sistema.exemplo.com")
+        assert LimitadorTaxa("teste", taxa=0).reservar() == 0.0
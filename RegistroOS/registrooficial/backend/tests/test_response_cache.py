@@ -0,0 +1,101 @@
+"""
+Testes do cache de respostas dos dashboards (app/utils/response_cache.py)
+"""
+import asyncio
+import pytest
+import sys
+import os
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database_config import create_configured_engine
+from app.utils.response_cache import TTLLRUCache, ResponseCache, response_cache, montar_chave, cache_resposta
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    response_cache.limpar()
+    yield
+    response_cache.limpar()
+
+class TestResponseCache:
+    """Testes para LRU com TTL, chave normalizada e invalidação por geração"""
+
+    def test_lru_expira_e_descarta_mais_antigo(self):
+        """Entradas expiram pelo TTL e o LRU respeita o limite"""
+        cache = TTLLRUCache(max_entries=2)
+        with patch("app.utils.response_cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1, ttl=10)
+            cache.set("b", 2, ttl=10)
+            assert cache.get("a") == (True, 1)
+            cache.set("c", 3, ttl=10)
+            assert cache.get("b") == (False, None)
+        with patch("app.utils.response_cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") == (False, None)
+
+    def test_chave_normaliza_parametros(self):
+        """Ordem, espaços, None e db não alteram a chave; o escopo altera"""
+        chave = montar_chave("dash", {"periodo": 30, "setor": " MECANICA ", "data_fim": None, "db": object()}, "ADMIN")
+        assert chave == montar_chave("dash", {"setor": "MECANICA", "periodo": 30}, "ADMIN")
+        assert chave != montar_chave("dash", {"setor": "MECANICA", "periodo": 30}, "USER:1")
+        assert montar_chave("dash", {"data_inicio": date(2025, 1, 1)}, "ADMIN") != montar_chave("dash", {}, "ADMIN")
+
+    def test_commit_incrementa_geracao(self):
+        """Commits que escrevem em pendências mudam a chave; rollback não"""
+        engine = create_configured_engine("sqlite://")
+        db = sessionmaker(bind=engine)()
+        db.execute(text("CREATE TABLE pendencias (id INTEGER PRIMARY KEY, status TEXT)"))
+        db.commit()
+        chave_inicial = montar_chave("dash", {}, "ADMIN", ("pendencias",))
+
+        db.execute(text("INSERT INTO pendencias (status) VALUES ('ABERTA')"))
+        db.rollback()
+        assert montar_chave("dash", {}, "ADMIN", ("pendencias",)) == chave_inicial
+
+        db.execute(text("UPDATE pendencias SET status = 'FECHADA'"))
+        db.commit()
+        assert montar_chave("dash", {}, "ADMIN", ("pendencias",)) != chave_inicial
+
+        db.close()
+        engine.dispose()
+
+    def test_resposta_com_erro_nao_fica_em_cache(self):
+        """Fallbacks com chave "error" são recalculados na próxima chamada"""
+        chamadas = []
+
+        @cache_resposta("dash_erro")
+        async def dashboard(periodo_dias=30):
+            chamadas.append(periodo_dias)
+            return {"error": "falha", "metricas_gerais": {}}
+
+        asyncio.run(dashboard(periodo_dias=30))
+        asyncio.run(dashboard(periodo_dias=30))
+        assert chamadas == [30, 30]
+
+    def test_redis_reconecta_apos_backoff(self):
+        """Após uma falha do Redis, usa memória e reconecta quando a espera vence"""
+        cliente = MagicMock()
+        cliente.ping.side_effect = [ConnectionError("fora"), True]
+        cliente.get.return_value = None
+        fake_redis = MagicMock()
+        fake_redis.Redis.from_url.return_value = cliente
+
+        with patch("app.utils.redis_compartilhado.redis", fake_redis), \
+             patch("app.utils.redis_compartilhado.REDIS_AVAILABLE", True), \
+             patch("app.utils.redis_compartilhado.time.monotonic", return_value=100.0) as relogio:
+            cache = ResponseCache({"backend": "redis"})
+            assert cache.estatisticas()["backend"] == "memory"
+
+            relogio.return_value = 103.0
+            cache.obter("chave")
+            assert fake_redis.Redis.from_url.call_count == 1
+
+            relogio.return_value = 106.0
+            cache.obter("chave")
+            assert cache.estatisticas()["backend"] == "redis"
+            cliente.get.assert_called_once()
@@ -0,0 +1,107 @@
+"""
+Testes do resumo diário de apontamentos (app/utils/resumo_diario.py)
+"""
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database_config import create_configured_engine
+from app.database_models import Base, ApontamentoDetalhado, ApontamentoResumoDiario
+from app.utils.resumo_diario import atualizar_resumo_apontamento, chave_resumo, reconstruir_resumo_diario
+
+@pytest.fixture
+def db():
+    """Sessão em banco SQLite em memória com o schema completo"""
+    engine = create_configured_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def _novo_apontamento(db, inicio, horas=None, **campos):
+    dados = dict(id_os=1, id_usuario=1, id_setor=1, status_apontamento="CONCLUIDO")
+    dados.update(campos)
+    apontamento = ApontamentoDetalhado(
+        data_hora_inicio=inicio,
+        data_hora_fim=inicio + timedelta(hours=horas) if horas is not None else None,
+        **dados
+    )
+    db.add(apontamento)
+    atualizar_resumo_apontamento(db, apontamento)
+    db.commit()
+    return apontamento
+
+def _linhas(db):
+    return sorted(
+        (r.data, r.id_setor, r.id_usuario, r.id_os, round(r.horas_trabalhadas, 4),
+         r.total_apontamentos, r.total_retrabalhos, r.total_aprovados, r.total_em_andamento)
+        for r in db.query(ApontamentoResumoDiario).all()
+    )
+
+class TestResumoDiario:
+    """Testes para manutenção incremental e backfill do rollup"""
+
+    def test_insercao_agrega_por_chave(self, db):
+        """Apontamentos do mesmo dia/setor/usuário/OS caem na mesma linha"""
+        inicio = datetime(2025, 3, 10, 8, 0)
+        _novo_apontamento(db, inicio, horas=2, foi_retrabalho=True)
+        _novo_apontamento(db, inicio + timedelta(hours=3), horas=1.5)
+        _novo_apontamento(db, inicio + timedelta(hours=6))
+
+        resumo = db.query(ApontamentoResumoDiario).one()
+        assert resumo.total_apontamentos == 3
+        assert resumo.total_retrabalhos == 1
+        assert resumo.total_em_andamento == 1
+        assert resumo.horas_trabalhadas == pytest.approx(3.5)
+
+    def test_edicao_move_chave(self, db):
+        """Editar setor/data remove horas da chave antiga e soma na nova"""
+        apontamento = _novo_apontamento(db, datetime(2025, 3, 10, 8, 0), horas=2)
+        chave_anterior = chave_resumo(apontamento)
+
+        apontamento.id_setor = 2
+        apontamento.data_hora_inicio = datetime(2025, 3, 11, 8, 0)
+        apontamento.data_hora_fim = datetime(2025, 3, 11, 12, 0)
+        apontamento.aprovado_supervisor = True
+        atualizar_resumo_apontamento(db, apontamento, chave_anterior)
+        db.commit()
+
+        resumo = db.query(ApontamentoResumoDiario).one()
+        assert (resumo.id_setor, resumo.total_aprovados) == (2, 1)
+        assert resumo.horas_trabalhadas == pytest.approx(4)
+
+    def test_incremental_igual_ao_backfill(self, db):
+        """O rollup incremental coincide com a reconstrução completa"""
+        inicio = datetime(2025, 3, 10, 8, 0)
+        for i in range(12):
+            _novo_apontamento(
+                db, inicio + timedelta(days=i % 3, hours=i), horas=(i % 4) or None,
+                id_setor=1 + i % 2, foi_retrabalho=(i % 5 == 0), aprovado_supervisor=(i % 3 == 0)
+            )
+        incremental = _linhas(db)
+
+        reconstruir_resumo_diario(db)
+        db.commit()
+
+        assert _linhas(db) == incremental
+
+    def test_erro_no_rollup_desfaz_o_apontamento(self, db):
+        """Falha ao atualizar o rollup propaga e o rollback leva o apontamento junto"""
+        ApontamentoResumoDiario.__table__.drop(bind=db.connection())
+        apontamento = ApontamentoDetalhado(
+            id_os=1, id_usuario=1, id_setor=1, status_apontamento="CONCLUIDO",
+            data_hora_inicio=datetime(2025, 3, 10, 8, 0)
+        )
+        db.add(apontamento)
+        with pytest.raises(Exception):
+            atualizar_resumo_apontamento(db, apontamento)
+        db.rollback()
+
+        assert db.query(ApontamentoDetalhado).count() == 0
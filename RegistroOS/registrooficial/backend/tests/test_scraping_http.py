@@ -0,0 +1,64 @@
+"""
+Testes do backend de scraping via HTTP (scripts/scrape_os_data_http.py)
+contra o stub do sistema externo (tests/stub_sistema_os.py)
+"""
+import sys
+import os
+
+import pytest
+
+pytest.importorskip("requests")
+
+# Adicionar o diretório pai (e scripts/) ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from tests.stub_sistema_os import StubSistemaOS
+from os_data_mapping import OS_TEMPLATE
+from scrape_os_data_http import HttpOsClient, HttpScrapingError
+
+class TestScrapingHttp:
+    """Testes para mapeamento do JSON, reuso da sessão e novo login"""
+
+    def test_json_mapeado_para_o_mesmo_modelo_do_selenium(self):
+        """Campos aninhados, camelCase e listas label/value viram as chaves de OS_TEMPLATE"""
+        with StubSistemaOS() as stub:
+            os_data, = HttpOsClient(stub.url, "operador", "senha123").scrape("12345")
+
+        assert set(OS_TEMPLATE) <= set(os_data)
+        assert os_data["OS"] == os_data["NÚMERO DA OS"] == "12345"
+        assert os_data["CLIENTE"] == os_data["NOME CLIENTE"] == "MINERAÇÃO VALE DO AÇO LTDA"
+        assert os_data["CENTRO DE CUSTO"] == "MANUTENÇÃO ELÉTRICA"
+        assert os_data["TIPO DO EQUIPAMENTO"] == "MOTOR DE INDUÇÃO TRIFÁSICO"
+        assert (os_data["NUMERO DE SERIE"], os_data["POTENCIA CV/HP"]) == ("1029384756", "250")
+        assert os_data["TIPO DE SERVICO"] == "REFORMA"
+        assert os_data["CLASSIFICACAO DO EQUIPAMENTO"] == ""  # placeholder "SELECIONE"
+        assert os_data["OBSERVACAO NO RECEBIMENTO"] == "Chegou sem placa"
+
+    def test_sessao_reaproveitada_e_novo_login_quando_expira(self):
+        """Um login para várias OS; 401 provoca um único novo login; 404 retorna []"""
+        with StubSistemaOS() as stub:
+            cliente = HttpOsClient(stub.url, "operador", "senha123", field_map={"razaoSocial": "CLIENTE"})
+            assert cliente.scrape("12345")[0]["OS"] == "12345"
+            assert cliente.scrape("777")[0]["CLIENTE"] == "SIDERÚRGICA CENTRO OESTE S/A"
+            assert cliente.scrape("404") == []
+            assert stub.contar("POST", "/api/login") == 1
+
+            stub.expirar_sessoes()
+            assert cliente.scrape("777")[0]["OS"] == "777"
+            assert stub.contar("POST", "/api/login") == 2
+
+    def test_busca_por_numero_e_detalhes_por_id(self):
+        """Com SEARCH_PATH o número é resolvido em id antes dos detalhes"""
+        with StubSistemaOS() as stub:
+            cliente = HttpOsClient(stub.url, "operador", "senha123",
+                                   search_path="/api/os?numero={os_number}", os_path="/api/os/{id}")
+            assert cliente.scrape("00012345")[0]["FABRICANTE"] == "WEG"
+            assert stub.contar("GET", "/api/os/901") == 1
+            assert cliente.scrape("999") == []
+
+    def test_login_recusado_levanta_erro_para_fallback(self):
+        """Credenciais recusadas levantam HttpScrapingError (a task usa o Selenium)"""
+        with StubSistemaOS() as stub:
+            with pytest.raises(HttpScrapingError):
+                HttpOsClient(stub.url, "operador", "errada").scrape("12345")
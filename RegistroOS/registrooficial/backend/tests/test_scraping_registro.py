@@ -0,0 +1,61 @@
+"""
+Testes do registro de backends de scraping (app/scraping)
+"""
+import sys
+import os
+
+import pytest
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scraping import registrar_backend, obter_backend, executar_scraping, cadeia_de_backends, registrar_backends_extras
+from app.scraping import registro
+
+@pytest.fixture(autouse=True)
+def registro_restaurado():
+    originais = dict(registro._backends)
+    yield
+    registro._backends.clear()
+    registro._backends.update(originais)
+
+class TestScrapingRegistro:
+    """Testes para carregamento único, fallback e backends extras"""
+
+    def test_script_importado_uma_vez_como_modulo_normal(self):
+        """O backend http é o mesmo módulo de sys.modules em todas as chamadas"""
+        pytest.importorskip("requests")
+        backend = obter_backend("http")
+        funcao = backend.carregar()
+
+        assert backend.modulo is sys.modules["scrape_os_data_http"]
+        assert backend.carregar() is funcao
+        assert [b.nome for b in cadeia_de_backends("http")] == ["http", "selenium", "selenium_original"]
+
+    def test_fallback_quando_backend_falha(self):
+        """Falha do backend segue para o fallback; a última falha é propagada"""
+        chamadas = []
+
+        def falhar(numero_os):
+            chamadas.append(("falha", numero_os))
+            raise RuntimeError("site fora do ar")
+
+        registrar_backend("teste_falha", falhar, fallback="teste_ok")
+        registrar_backend("teste_ok", lambda numero_os: [{"OS": numero_os}])
+
+        assert executar_scraping("123", backend="teste_falha") == [{"OS": "123"}]
+        assert chamadas == [("falha", "123")]
+
+        registrar_backend("so_falha", falhar)
+        with pytest.raises(RuntimeError):
+            executar_scraping("123", backend="so_falha")
+
+    def test_backends_extras_da_configuracao(self):
+        """SCRAPING_EXTRA_BACKENDS registra "nome=modulo:funcao>fallback"; entradas inválidas são ignoradas"""
+        registrar_backends_extras("json_loads=json:loads>selenium, invalido=sem_funcao")
+
+        backend = obter_backend("json_loads")
+        assert backend("[1]") == [1]
+        assert backend.fallback == "selenium"
+        with pytest.raises(KeyError):
+            obter_backend("invalido")
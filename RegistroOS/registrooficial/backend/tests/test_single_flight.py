@@ -0,0 +1,85 @@
+"""
+Testes do single flight do scraping por OS (app/utils/single_flight.py)
+"""
+import sys
+import os
+import asyncio
+import time
+
+import pytest
+
+# Adicionar o diretório pai ao path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.single_flight import SingleFlight, normalizar_numero_os
+
+class TestSingleFlight:
+    """Testes para travas por OS, coalescência e cache negativo"""
+
+    def test_trava_por_os_normalizada(self):
+        """Zeros à esquerda não criam outra trava; só o dono libera"""
+        voos = SingleFlight({"backend": "memory"})
+        assert normalizar_numero_os(" 000012345 ") == normalizar_numero_os("12345") == "12345"
+
+        assert voos.reservar("12345", "task_a").lider
+        seguidor = voos.reservar(normalizar_numero_os("00012345"), "task_b")
+        assert (seguidor.lider, seguidor.dono) == (False, "task_a")
+
+        voos.liberar("12345", "task_b")
+        assert voos.dono_atual("12345") == "task_a"
+        voos.liberar("12345", "task_a")
+        assert voos.reservar("12345", "task_b").lider
+
+    def test_pedidos_simultaneos_fazem_um_scraping(self):
+        """Cinco pedidos da mesma OS: um líder executa, os demais aguardam e recebem lider=False"""
+        voos = SingleFlight({"backend": "memory"})
+        execucoes = []
+
+        async def scraping():
+            execucoes.append(time.monotonic())
+            await asyncio.sleep(0.05)
+            return "resultado"
+
+        async def cenario():
+            return await asyncio.gather(*(voos.executar("777", scraping) for _ in range(5)))
+
+        resultados = asyncio.run(cenario())
+        assert len(execucoes) == 1
+        assert [v.lider for v in resultados].count(True) == 1
+        assert next(v for v in resultados if v.lider).resultado == "resultado"
+        assert voos.dono_atual("777") is None
+        assert voos.status()["coalescidos"] == 4
+
+    def test_aguarda_trava_de_outro_processo_e_cache_negativo(self):
+        """Trava de outro dono: aguarda a liberação sem executar; OS não encontrada expira pelo TTL"""
+        voos = SingleFlight({"backend": "memory", "follower_timeout": 2})
+        voos.reservar("55", "task_worker")
+
+        async def scraping():
+            raise AssertionError("não deveria executar")
+
+        async def cenario():
+            asyncio.get_running_loop().call_later(0.2, voos.liberar, "55", "task_worker")
+            return await voos.executar("55", scraping)
+
+        voo = asyncio.run(cenario())
+        assert (voo.lider, voo.dono) == (False, "task_worker")
+
+        voos.marcar_nao_encontrada("99", ttl=1)
+        assert voos.nao_encontrada("99")
+        voos._negativos["99"] = time.monotonic() - 1
+        assert not voos.nao_encontrada("99")
+
+    def test_com_celery_exige_redis(self):
+        """auto escolhe redis com Celery; Redis inacessível falha em vez de cair para memória"""
+        redis_fora = "redis://127.0.0.1:1/0"
+        com_celery = SingleFlight({"backend": "auto", "exigir_redis": True, "redis_url": redis_fora})
+        with pytest.raises(RuntimeError):
+            com_celery.reservar("12345", "task_a")
+        with pytest.raises(RuntimeError):
+            com_celery.nao_encontrada("12345")
+        assert com_celery._travas == {}
+
+        sem_celery = SingleFlight({"backend": "redis", "exigir_redis": False, "redis_url": redis_fora})
+        assert sem_celery.status()["backend"] == "memory"
+        assert SingleFlight({"backend": "auto", "exigir_redis": False}).status()["backend"] == "memory"
@@ -0,0 +1,46 @@
+"""
+Testes da manutenção de ordens_servico.ultima_atividade (app/utils/ultima_atividade.py)
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.database_models import OrdemServico, ApontamentoDetalhado
+from app.utils.ultima_atividade import reconstruir_ultima_atividade
+
+class TestUltimaAtividade:
+    """Testes para a última atividade da OS"""
+
+    def test_apontamento_avanca_e_nunca_recua(self, banco_memoria):
+        """OS nova recebe data_criacao; apontamentos só avançam a última atividade"""
+        _, db = banco_memoria(OrdemServico, ApontamentoDetalhado)
+
+        ordem = OrdemServico(os_numero="12345", data_criacao=datetime(2025, 1, 1))
+        db.add(ordem)
+        db.commit()
+        assert ordem.ultima_atividade == datetime(2025, 1, 1)
+
+        def apontar(inicio, fim=None):
+            db.add(ApontamentoDetalhado(
+                id_os=ordem.id, id_usuario=1, id_setor=1, status_apontamento="FINALIZADO",
+                data_hora_inicio=inicio, data_hora_fim=fim
+            ))
+            db.commit()
+            db.refresh(ordem)
+            return ordem.ultima_atividade
+
+        assert apontar(datetime(2025, 3, 1, 8), datetime(2025, 3, 1, 12)) == datetime(2025, 3, 1, 12)
+        assert apontar(datetime(2025, 2, 1, 8)) == datetime(2025, 3, 1, 12)
+
+        db.query(OrdemServico).update({"ultima_atividade": datetime(2000, 1, 1)})
+        db.commit()
+        assert reconstruir_ultima_atividade(db) == 1
+        db.refresh(ordem)
+        assert ordem.ultima_atividade == datetime(2025, 3, 1, 12)
+
+    def test_insert_textual_sem_coluna_nao_fica_fora_da_listagem(self, banco_memoria):
+        """INSERT que não informa ultima_atividade recebe o default do banco (nunca NULL)"""
+        engine, _ = banco_memoria(OrdemServico)
+        with engine.begin() as conexao:
+            conexao.execute(text("INSERT INTO ordens_servico (os_numero) VALUES ('999')"))
+            assert conexao.execute(text("SELECT ultima_atividade FROM ordens_servico")).scalar() is not None